@@ -4,29 +4,36 @@
 """
 
 import os
+import json
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 import jwt
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import hashlib
 
 try:
+    from .db_pool import DatabasePool, mysql_url
     from .hmy_proxy import (
-        HMYProxyClient,
         HMYProxyConfigError,
         HMYProxyUpstreamError,
+        close_async_proxy_client,
+        get_async_proxy_client,
         is_hmy_user_allowed,
     )
 except ImportError:
     # 生产 systemd 在 api 目录内以 ``uvicorn auth_api:app`` 启动。
+    from db_pool import DatabasePool, mysql_url
     from hmy_proxy import (
-        HMYProxyClient,
         HMYProxyConfigError,
         HMYProxyUpstreamError,
+        close_async_proxy_client,
+        get_async_proxy_client,
         is_hmy_user_allowed,
     )
 
@@ -47,15 +54,23 @@ JWT_EXPIRE_HOURS = 24
 if not DB_PASSWORD:
     raise ValueError("DB_PASSWORD environment variable is required")
 
-# 数据库连接
-import urllib.parse
-DB_PASSWORD_ENCODED = urllib.parse.quote_plus(DB_PASSWORD)
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD_ENCODED}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
+# 数据库连接：进程内共享一个连接池，数据库操作在有界线程池中执行
+DATABASE_URL = mysql_url(DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME)
+db = DatabasePool(DATABASE_URL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """服务停止时关闭慧牧云上游连接池和数据库连接池"""
+    yield
+    await close_async_proxy_client()
+    db.dispose()
+
 
 app = FastAPI(
     title="伊利奶牛选配系统 - 认证API",
     description="提供用户认证、注册等安全接口",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 security = HTTPBearer()
@@ -82,8 +97,8 @@ class TokenData(BaseModel):
     exp: int
 
 def get_db_engine():
-    """获取数据库引擎"""
-    return create_engine(DATABASE_URL, echo=False)
+    """获取数据库引擎（进程内共享）"""
+    return db.engine
 
 def create_access_token(username: str) -> str:
     """创建JWT访问令牌"""
@@ -134,41 +149,43 @@ async def health_check():
         timestamp=int(datetime.utcnow().timestamp())
     )
 
+def _find_login_user(username: str, password: str):
+    """按用户名密码查询用户"""
+    with db.engine.connect() as connection:
+        return connection.execute(
+            text("SELECT ID, PW, name FROM `id-pw` WHERE ID=:username AND PW=:password"),
+            {"username": username, "password": password}
+        ).fetchone()
+
 @app.post("/api/auth/login")
 async def login(request: LoginRequest):
     """用户登录接口"""
     try:
-        engine = get_db_engine()
-
-        with engine.connect() as connection:
-            # 验证用户名密码
-            result = connection.execute(
-                text("SELECT ID, PW, name FROM `id-pw` WHERE ID=:username AND PW=:password"),
-                {"username": request.username, "password": request.password}
-            ).fetchone()
-
-            if not result:
-                return APIResponse(
-                    success=False,
-                    message="用户名或密码错误",
-                    timestamp=int(datetime.utcnow().timestamp())
-                )
-
-            # 生成JWT令牌
-            token = create_access_token(request.username)
+        # 验证用户名密码
+        result = await db.run(_find_login_user, request.username, request.password)
 
+        if not result:
             return APIResponse(
-                success=True,
-                message="登录成功",
-                data={
-                    "token": token,
-                    "user_id": result[0],
-                    "name": result[2] if len(result) > 2 else None,
-                    "expires_in": JWT_EXPIRE_HOURS * 3600
-                },
+                success=False,
+                message="用户名或密码错误",
                 timestamp=int(datetime.utcnow().timestamp())
             )
 
+        # 生成JWT令牌
+        token = create_access_token(request.username)
+
+        return APIResponse(
+            success=True,
+            message="登录成功",
+            data={
+                "token": token,
+                "user_id": result[0],
+                "name": result[2] if len(result) > 2 else None,
+                "expires_in": JWT_EXPIRE_HOURS * 3600
+            },
+            timestamp=int(datetime.utcnow().timestamp())
+        )
+
     except Exception as e:
         logger.error(f"登录失败: {e}")
         return APIResponse(
@@ -177,103 +194,92 @@ async def login(request: LoginRequest):
             timestamp=int(datetime.utcnow().timestamp())
         )
 
-@app.post("/api/auth/register")
-async def register(request: RegisterRequest):
-    """用户注册接口"""
-    try:
-        engine = get_db_engine()
-
-        with engine.connect() as connection:
-            # 检查用户是否已存在
-            result = connection.execute(
-                text("SELECT ID FROM `id-pw` WHERE ID=:employee_id"),
-                {"employee_id": request.employee_id}
-            ).fetchone()
-
-            if result:
-                return APIResponse(
-                    success=False,
-                    message="用户名已存在",
-                    timestamp=int(datetime.utcnow().timestamp())
-                )
-
-            # 检查邀请码
-            invite_result = connection.execute(
+def _register_user(request: RegisterRequest) -> Optional[str]:
+    """校验邀请码并创建用户，失败时返回提示信息"""
+    with db.engine.connect() as connection:
+        # 检查用户是否已存在
+        result = connection.execute(
+            text("SELECT ID FROM `id-pw` WHERE ID=:employee_id"),
+            {"employee_id": request.employee_id}
+        ).fetchone()
+
+        if result:
+            return "用户名已存在"
+
+        # 检查邀请码
+        invite_result = connection.execute(
+            text("""
+                SELECT code, status, max_uses, current_uses, expire_time
+                FROM invitation_codes
+                WHERE code = :invite_code
+            """),
+            {"invite_code": request.invite_code}
+        ).fetchone()
+
+        if not invite_result:
+            return "邀请码不存在"
+
+        code, status, max_uses, current_uses, expire_time = invite_result
+
+        # 检查状态
+        if status != 1:
+            return "邀请码已失效"
+
+        # 检查过期时间
+        if expire_time and datetime.now() > expire_time:
+            return "邀请码已过期"
+
+        # 检查使用次数
+        if current_uses >= max_uses:
+            return "邀请码使用次数已达上限"
+
+        # 上面的查询已开启事务（SQLAlchemy 2 自动开始），在同一事务中写入
+        try:
+            # 创建用户
+            connection.execute(
+                text("INSERT INTO `id-pw` (ID, PW, name) VALUES (:employee_id, :password, :name)"),
+                {
+                    "employee_id": request.employee_id,
+                    "password": hash_password(request.password),
+                    "name": request.name
+                }
+            )
+
+            # 更新邀请码使用次数
+            connection.execute(
                 text("""
-                    SELECT code, status, max_uses, current_uses, expire_time
-                    FROM invitation_codes
+                    UPDATE invitation_codes
+                    SET current_uses = current_uses + 1
                     WHERE code = :invite_code
                 """),
                 {"invite_code": request.invite_code}
-            ).fetchone()
-
-            if not invite_result:
-                return APIResponse(
-                    success=False,
-                    message="邀请码不存在",
-                    timestamp=int(datetime.utcnow().timestamp())
-                )
-
-            code, status, max_uses, current_uses, expire_time = invite_result
-
-            # 检查状态
-            if status != 1:
-                return APIResponse(
-                    success=False,
-                    message="邀请码已失效",
-                    timestamp=int(datetime.utcnow().timestamp())
-                )
-
-            # 检查过期时间
-            if expire_time and datetime.now() > expire_time:
-                return APIResponse(
-                    success=False,
-                    message="邀请码已过期",
-                    timestamp=int(datetime.utcnow().timestamp())
-                )
-
-            # 检查使用次数
-            if current_uses >= max_uses:
-                return APIResponse(
-                    success=False,
-                    message="邀请码使用次数已达上限",
-                    timestamp=int(datetime.utcnow().timestamp())
-                )
-
-            # 开始事务
-            trans = connection.begin()
-            try:
-                # 创建用户
-                connection.execute(
-                    text("INSERT INTO `id-pw` (ID, PW, name) VALUES (:employee_id, :password, :name)"),
-                    {
-                        "employee_id": request.employee_id,
-                        "password": hash_password(request.password),
-                        "name": request.name
-                    }
-                )
-
-                # 更新邀请码使用次数
-                connection.execute(
-                    text("""
-                        UPDATE invitation_codes
-                        SET current_uses = current_uses + 1
-                        WHERE code = :invite_code
-                    """),
-                    {"invite_code": request.invite_code}
-                )
-
-                trans.commit()
-
-                return APIResponse(
-                    success=True,
-                    message="注册成功",
-                    timestamp=int(datetime.utcnow().timestamp())
-                )
-
-            except Exception as e:
-                trans.rollback()
-                raise e
+            )
+
+            connection.commit()
+            return None
+
+        except Exception as e:
+            connection.rollback()
+            raise e
+
+@app.post("/api/auth/register")
+async def register(request: RegisterRequest):
+    """用户注册接口"""
+    try:
+        error_message = await db.run(_register_user, request)
+
+        if error_message:
+            return APIResponse(
+                success=False,
+                message=error_message,
+                timestamp=int(datetime.utcnow().timestamp())
+            )
+
+        return APIResponse(
+            success=True,
+            message="注册成功",
+            timestamp=int(datetime.utcnow().timestamp())
+        )
 
     except Exception as e:
         logger.error(f"注册失败: {e}")
@@ -283,35 +289,37 @@ async def register(request: RegisterRequest):
             timestamp=int(datetime.utcnow().timestamp())
         )
 
+def _find_user(username: str):
+    """按用户名查询用户信息"""
+    with db.engine.connect() as connection:
+        return connection.execute(
+            text("SELECT ID, name FROM `id-pw` WHERE ID=:username"),
+            {"username": username}
+        ).fetchone()
+
 @app.get("/api/auth/profile")
 async def get_profile(current_user: str = Depends(verify_token)):
     """获取当前用户信息"""
     try:
-        engine = get_db_engine()
-
-        with engine.connect() as connection:
-            result = connection.execute(
-                text("SELECT ID, name FROM `id-pw` WHERE ID=:username"),
-                {"username": current_user}
-            ).fetchone()
-
-            if not result:
-                return APIResponse(
-                    success=False,
-                    message="用户不存在",
-                    timestamp=int(datetime.utcnow().timestamp())
-                )
+        result = await db.run(_find_user, current_user)
 
+        if not result:
             return APIResponse(
-                success=True,
-                message="获取用户信息成功",
-                data={
-                    "user_id": result[0],
-                    "name": result[1] if len(result) > 1 else None
-                },
+                success=False,
+                message="用户不存在",
                 timestamp=int(datetime.utcnow().timestamp())
             )
 
+        return APIResponse(
+            success=True,
+            message="获取用户信息成功",
+            data={
+                "user_id": result[0],
+                "name": result[1] if len(result) > 1 else None
+            },
+            timestamp=int(datetime.utcnow().timestamp())
+        )
+
     except Exception as e:
         logger.error(f"获取用户信息失败: {e}")
         return APIResponse(
@@ -321,14 +329,8 @@ async def get_profile(current_user: str = Depends(verify_token)):
         )
 
 
-@app.get("/api/auth/hmy/cows")
-async def get_hmy_cows(
-    farmCode: str,
-    pageSize: int = 2000,
-    pageNum: int = 1,
-    current_user: str = Depends(verify_token),
-):
-    """为已授权账号代理读取慧牧云牛群分页数据。"""
+def _check_hmy_request(current_user: str, farmCode: str, pageSize: int, pageNum: int = 1):
+    """校验慧牧云代理请求的账号权限和参数。"""
     if not is_hmy_user_allowed(current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -345,8 +347,27 @@ async def get_hmy_cows(
             detail="分页参数无效",
         )
 
+
+def _hmy_service_unavailable(exc: HMYProxyConfigError) -> HTTPException:
+    logger.error("慧牧云服务端鉴权未正确配置")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="慧牧云服务暂不可用",
+    )
+
+
+@app.get("/api/auth/hmy/cows")
+async def get_hmy_cows(
+    farmCode: str,
+    pageSize: int = 2000,
+    pageNum: int = 1,
+    current_user: str = Depends(verify_token),
+):
+    """为已授权账号代理读取慧牧云牛群分页数据。"""
+    _check_hmy_request(current_user, farmCode, pageSize, pageNum)
+
     try:
-        payload = HMYProxyClient().get_cow_page(
+        payload = await get_async_proxy_client().get_cow_page(
             farm_code=farmCode,
             page_size=pageSize,
             page_num=pageNum,
@@ -360,11 +381,7 @@ async def get_hmy_cows(
         )
         return payload
     except HMYProxyConfigError as exc:
-        logger.error("慧牧云服务端鉴权未正确配置")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="慧牧云服务暂不可用",
-        ) from exc
+        raise _hmy_service_unavailable(exc) from exc
     except HMYProxyUpstreamError as exc:
         logger.warning(
             "慧牧云上游请求失败: user=%s farm=%s page=%s",
@@ -378,6 +395,64 @@ async def get_hmy_cows(
         ) from exc
 
 
+def _ndjson_line(item: dict) -> bytes:
+    return (json.dumps(item, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+@app.get("/api/auth/hmy/cows/all")
+async def stream_hmy_cows(
+    farmCode: str,
+    pageSize: int = 2000,
+    current_user: str = Depends(verify_token),
+):
+    """
+    为已授权账号代理读取整场慧牧云牛群数据，以 NDJSON 流式返回。
+
+    第一行为 {"type": "meta", "count": 总数}，随后每个上游分页一行 {"type": "rows", "data": [...]}；
+    读到第一页后其余分页并发预取。传输中途上游失败时以 {"type": "error", "detail": ...} 结束。
+    """
+    _check_hmy_request(current_user, farmCode, pageSize)
+
+    try:
+        pages = get_async_proxy_client().iter_cow_pages(farmCode, page_size=pageSize)
+        first = await pages.__anext__()
+    except HMYProxyConfigError as exc:
+        raise _hmy_service_unavailable(exc) from exc
+    except HMYProxyUpstreamError as exc:
+        logger.warning("慧牧云上游请求失败: user=%s farm=%s page=1", current_user, farmCode)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="慧牧云上游请求失败",
+        ) from exc
+
+    async def body():
+        rows = len(first["data"])
+        try:
+            yield _ndjson_line({"type": "meta", "count": first["count"]})
+            yield _ndjson_line({"type": "rows", "data": first["data"]})
+            async for page in pages:
+                rows += len(page["data"])
+                yield _ndjson_line({"type": "rows", "data": page["data"]})
+            logger.info(
+                "慧牧云整场代理成功: user=%s farm=%s rows=%s",
+                current_user,
+                farmCode,
+                rows,
+            )
+        except HMYProxyUpstreamError:
+            logger.warning(
+                "慧牧云整场代理中断: user=%s farm=%s rows=%s",
+                current_user,
+                farmCode,
+                rows,
+            )
+            yield _ndjson_line({"type": "error", "detail": "慧牧云上游请求失败"})
+        finally:
+            await pages.aclose()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
 @app.post("/api/auth/verify")
 async def verify_token_endpoint(current_user: str = Depends(verify_token)):
     """验证令牌有效性"""
@@ -6,19 +6,29 @@
 
 import os
 import sys
+import threading
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 import logging
-import urllib.parse
 
 # FastAPI imports
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import MetaData, Table, text
+import jwt
 import pandas as pd
 
+try:
+    from .config import JWT_ALGORITHM, JWT_SECRET
+    from .db_pool import DatabasePool, mysql_url
+except ImportError:
+    # 生产环境以 ``python3 api/data_api.py`` 脚本方式启动
+    from config import JWT_ALGORITHM, JWT_SECRET
+    from db_pool import DatabasePool, mysql_url
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -33,8 +43,16 @@ DB_USER = os.getenv('DB_USER', 'defect_genetic_checking')
 DB_PASSWORD = os.getenv('DB_PASSWORD')  # 必须从环境变量获取
 DB_NAME = os.getenv('DB_NAME', 'bull_library')
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """服务停止时关闭数据库连接池"""
+    yield
+    if db is not None:
+        db.dispose()
+
+
 # 创建FastAPI应用
-app = FastAPI(title="伊利奶牛选配系统数据API", version="2.0.0")
+app = FastAPI(title="伊利奶牛选配系统数据API", version="2.0.0", lifespan=lifespan)
 
 # CORS配置
 app.add_middleware(
@@ -47,23 +65,52 @@ app.add_middleware(
 
 # ==================== 数据库连接 ====================
 
-def get_db_engine():
-    """获取数据库引擎"""
-    if not DB_PASSWORD:
+def get_db_pool() -> DatabasePool:
+    """创建数据库连接池（进程内只创建一次）"""
+    if not DB_PASSWORD and not os.getenv('DATABASE_URL'):
         raise ValueError("数据库密码未配置，请设置环境变量 DB_PASSWORD")
+    return DatabasePool(mysql_url(DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME))
 
-    db_password_encoded = urllib.parse.quote_plus(DB_PASSWORD)
-    db_uri = f"mysql+pymysql://{DB_USER}:{db_password_encoded}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
-    return create_engine(db_uri, pool_pre_ping=True, pool_size=10, max_overflow=20)
-
-# 初始化数据库引擎
+# 初始化数据库引擎：数据库操作在有界线程池中执行，不阻塞事件循环
 try:
-    engine = get_db_engine()
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = get_db_pool()
     logger.info("数据库引擎初始化成功")
 except Exception as e:
     logger.error(f"数据库引擎初始化失败: {e}")
-    engine = None
+    db = None
+
+# miss_bull 表结构（首次上传时读取）
+_miss_bull_table: Optional[Table] = None
+_miss_bull_lock = threading.Lock()
+
+def get_miss_bull_table() -> Table:
+    """缺失公牛表的结构（进程内缓存）"""
+    global _miss_bull_table
+    if _miss_bull_table is None:
+        with _miss_bull_lock:
+            if _miss_bull_table is None:
+                _miss_bull_table = Table('miss_bull', MetaData(), autoload_with=db.engine)
+    return _miss_bull_table
+
+# ==================== 认证 ====================
+
+security = HTTPBearer()
+
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
+    """验证JWT令牌（与认证API使用相同的密钥）"""
+    try:
+        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.PyJWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无效的令牌"
+        )
+    if payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无效的令牌"
+        )
+    return {"username": payload["sub"]}
 
 # ==================== 请求/响应模型 ====================
 # 注意：数据API不需要认证，方便下载公牛数据库和上传缺失记录
@@ -100,34 +147,49 @@ async def health_check():
         data={
             "service": "data_api",
             "version": "2.0.0",
-            "database": "connected" if engine else "disconnected"
+            "database": "connected" if db else "disconnected"
         }
     )
 
+def _latest_version():
+    with db.engine.connect() as conn:
+        return conn.execute(text("SELECT version, update_time FROM db_version ORDER BY id DESC LIMIT 1")).fetchone()
+
 @app.get("/api/data/version")
 async def get_database_version():
     """获取数据库版本（无需认证）"""
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT version, update_time FROM db_version ORDER BY id DESC LIMIT 1")).fetchone()
-
-            if result:
-                return APIResponse(
-                    success=True,
-                    data={
-                        "version": result[0],
-                        "update_time": str(result[1])
-                    }
-                )
-            else:
-                return APIResponse(
-                    success=False,
-                    message="版本信息不存在"
-                )
+        result = await db.run(_latest_version)
+
+        if result:
+            return APIResponse(
+                success=True,
+                data={
+                    "version": result[0],
+                    "update_time": str(result[1])
+                }
+            )
+        else:
+            return APIResponse(
+                success=False,
+                message="版本信息不存在"
+            )
     except Exception as e:
         logger.error(f"获取数据库版本失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _insert_missing_bulls(bulls: List[Dict[str, Any]]) -> int:
+    """批量写入缺失公牛记录（一条 executemany 语句）"""
+    table = get_miss_bull_table()
+    columns = list(dict.fromkeys(key for bull in bulls for key in bull))
+    unknown = [column for column in columns if column not in table.columns]
+    if unknown:
+        raise ValueError(f"未知的字段: {', '.join(unknown)}")
+    rows = [{column: bull.get(column) for column in columns} for bull in bulls]
+    with db.engine.begin() as conn:
+        conn.execute(table.insert(), rows)
+    return len(rows)
+
 @app.post("/api/data/missing_bulls")
 async def upload_missing_bulls(request: MissingBullRequest):
     """上传缺失公牛记录（无需认证）"""
@@ -138,13 +200,10 @@ async def upload_missing_bulls(request: MissingBullRequest):
                 message="没有要上传的公牛记录"
             )
 
-        # 转换为DataFrame
-        df = pd.DataFrame(request.bulls)
-
         # 上传到数据库
-        df.to_sql('miss_bull', engine, if_exists='append', index=False)
+        await db.run(_insert_missing_bulls, request.bulls)
 
-        logger.info(f"用户 {user.get('username')} 上传了 {len(request.bulls)} 条缺失公牛记录")
+        logger.info(f"上传了 {len(request.bulls)} 条缺失公牛记录")
 
         return APIResponse(
             success=True,
@@ -166,7 +225,7 @@ async def get_invitation_codes(user=Depends(verify_token)):
             FROM invitation_codes
             ORDER BY id DESC
         """
-        df = pd.read_sql(query, engine)
+        df = await db.run(pd.read_sql, text(query), db.engine)
 
         return APIResponse(
             success=True,
@@ -190,7 +249,7 @@ if __name__ == "__main__":
 
     # 测试数据库连接
     try:
-        with engine.connect() as conn:
+        with db.engine.connect() as conn:
             conn.execute(text("SELECT 1"))
             logger.info("数据库连接测试成功")
     except Exception as e:
@@ -0,0 +1,106 @@
+"""服务端数据库连接池。
+
+认证 API 与数据 API 在进程内各自只创建一个长期存在的 SQLAlchemy 引擎（连接池），
+同步的数据库操作放到与连接池同样大小的有界线程池中执行，不阻塞事件循环：
+线程数等于连接池可提供的连接数，线程不会在取连接时排队等待，超出的请求在线程池中排队。
+
+线上使用现有的 pymysql 驱动；DATABASE_URL 环境变量可替换为其他数据库（如压测用的 SQLite）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+T = TypeVar("T")
+
+# 常驻连接数与高峰时额外允许的连接数
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# 取连接的等待上限（秒）
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+# 连接回收时间（秒），小于 MySQL 的 wait_timeout，避免拿到已被服务端断开的连接
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def mysql_url(user: str, password: str, host: str, port: int, name: str) -> str:
+    """pymysql 连接串；DATABASE_URL 环境变量优先。"""
+    override = os.getenv("DATABASE_URL")
+    if override:
+        return override
+    password_encoded = urllib.parse.quote_plus(password or "")
+    return f"mysql+pymysql://{user}:{password_encoded}@{host}:{port}/{name}?charset=utf8mb4"
+
+
+class DatabasePool:
+    """一个数据库的连接池及执行同步数据库操作的线程池（首次使用时创建）。"""
+
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = DB_POOL_SIZE,
+        max_overflow: int = DB_MAX_OVERFLOW,
+    ):
+        self.url = url
+        self.pool_size = max(1, int(pool_size))
+        self.max_overflow = max(0, int(max_overflow))
+        self._engine: Optional[Engine] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self) -> int:
+        """线程池大小（等于连接池可提供的连接数）。"""
+        return self.pool_size + self.max_overflow
+
+    @property
+    def engine(self) -> Engine:
+        """进程内共享的引擎。"""
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = create_engine(
+                        self.url,
+                        echo=False,
+                        pool_pre_ping=True,
+                        pool_size=self.pool_size,
+                        max_overflow=self.max_overflow,
+                        pool_timeout=DB_POOL_TIMEOUT,
+                        pool_recycle=DB_POOL_RECYCLE,
+                    )
+        return self._engine
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="db",
+                    )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """在线程池中执行同步数据库操作并等待结果。"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), functools.partial(func, *args, **kwargs)
+        )
+
+    def dispose(self):
+        """关闭线程池和全部连接（服务停止时调用）。"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            engine, self._engine = self._engine, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if engine is not None:
+            engine.dispose()
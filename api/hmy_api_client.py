@@ -1,13 +1,14 @@
 """慧牧云只读数据接口客户端。
 
 客户端只携带软件登录 JWT，请求由 Genetic Improve 服务端代理并完成慧牧云鉴权。
+整场下载优先使用服务端的 NDJSON 流式接口（服务端并发预取分页），旧版服务端回退为逐页请求。
 """
 
 from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import requests
 
@@ -38,6 +39,8 @@ class HMYApiClient:
         self.session.headers.update(
             {"Authorization": f"Bearer {self._auth_token}"}
         )
+        # 服务端是否提供整场流式接口，首次返回 404/405 后不再尝试
+        self._stream_supported = True
 
     @staticmethod
     def _load_auth_token() -> Optional[str]:
@@ -84,12 +87,7 @@ class HMYApiClient:
         except requests.RequestException as exc:
             raise RuntimeError("无法连接慧牧云数据代理服务") from exc
 
-        if response.status_code == 401:
-            raise RuntimeError("登录状态已失效，请重新登录后再试")
-        if response.status_code == 403:
-            raise RuntimeError("当前账号未开通慧牧云功能")
-        if response.status_code in (502, 503):
-            raise RuntimeError("慧牧云服务暂时不可用，请稍后重试")
+        self._check_status(response)
 
         try:
             response.raise_for_status()
@@ -109,6 +107,68 @@ class HMYApiClient:
 
         return {"code": payload.get("code", 200), "count": count, "data": rows}
 
+    @staticmethod
+    def _check_status(response) -> None:
+        if response.status_code == 401:
+            raise RuntimeError("登录状态已失效，请重新登录后再试")
+        if response.status_code == 403:
+            raise RuntimeError("当前账号未开通慧牧云功能")
+        if response.status_code in (502, 503):
+            raise RuntimeError("慧牧云服务暂时不可用，请稍后重试")
+
+    def _stream_farm_herd(
+        self,
+        farm_code: str,
+        page_size: int,
+    ) -> Optional[Tuple[int, List[dict]]]:
+        """通过整场流式接口下载，返回（接口报告的总数, 记录）；服务端不支持时返回 None。"""
+        try:
+            response = self.session.get(
+                f"{self.base_url}/api/auth/hmy/cows/all",
+                params={"farmCode": str(farm_code), "pageSize": int(page_size)},
+                stream=True,
+                timeout=35,
+            )
+        except requests.RequestException as exc:
+            raise RuntimeError("无法连接慧牧云数据代理服务") from exc
+
+        try:
+            if response.status_code in (404, 405):
+                self._stream_supported = False
+                return None
+            self._check_status(response)
+
+            total: Optional[int] = None
+            records: List[dict] = []
+            try:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    item = json.loads(line)
+                    kind = item.get("type")
+                    if kind == "meta":
+                        total = int(item.get("count") or 0)
+                    elif kind == "rows":
+                        rows = item.get("data") or []
+                        if not isinstance(rows, list):
+                            raise ValueError("data 字段格式异常")
+                        records.extend(rows)
+                    elif kind == "error":
+                        raise ConnectionError(item.get("detail"))
+            except ConnectionError as exc:
+                raise RuntimeError("慧牧云服务暂时不可用，请稍后重试") from exc
+            except requests.RequestException as exc:
+                raise RuntimeError("慧牧云数据代理连接中断") from exc
+            except (ValueError, TypeError, AttributeError) as exc:
+                raise RuntimeError("慧牧云数据代理返回异常") from exc
+        finally:
+            response.close()
+
+        if total is None:
+            raise RuntimeError("慧牧云数据代理返回格式异常")
+        return total, records
+
     def get_farm_list(self) -> dict:
         """读取随应用发布的慧牧云牧场编码表。"""
         path = Path(__file__).resolve().parent.parent / "config" / "hmy_farms.json"
@@ -130,12 +190,21 @@ class HMYApiClient:
         return {"code": 200, "data": normalized}
 
     def get_farm_herd(self, farm_code: str, page_size: int = 2000) -> dict:
-        """通过受控代理分页下载指定牧场的完整牛群数据。"""
+        """通过受控代理下载指定牧场的完整牛群数据。"""
         records: List[dict] = []
         total: Optional[int] = None
         page_num = 1
 
-        while total is None or len(records) < total:
+        streamed = (
+            self._stream_farm_herd(farm_code, page_size)
+            if self._stream_supported
+            else None
+        )
+        if streamed is not None:
+            total, records = streamed
+
+        # 旧版服务端：逐页请求
+        while streamed is None and (total is None or len(records) < total):
             payload = self._get_cow_page(
                 farm_code=farm_code,
                 page_size=page_size,
@@ -1,15 +1,20 @@
 """慧牧云服务端只读代理。
 
 AES 鉴权信息仅允许存在于服务端环境变量中，不得返回给客户端或写入日志。
+
+服务端路由使用 AsyncHMYProxyClient：进程内共享一个 httpx 连接池，不阻塞事件循环，
+整场下载时在读到第一页（得到总数）后并发预取其余分页。
 """
 
 from __future__ import annotations
 
+import asyncio
 import base64
 import os
 from datetime import date
-from typing import Optional
+from typing import AsyncIterator, Optional, Tuple
 
+import httpx
 import requests
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives.padding import PKCS7
@@ -48,15 +53,54 @@ class HMYProxyUpstreamError(HMYProxyError):
     """慧牧云上游请求或响应异常。"""
 
 
-class HMYProxyClient:
-    """使用服务端 AES 密钥读取慧牧云牛群分页数据。"""
+# 上游单次请求超时（秒）
+HMY_UPSTREAM_TIMEOUT = 30
+# 进程内共享连接池的连接数上限
+HMY_MAX_CONNECTIONS = int(os.getenv("HMY_MAX_CONNECTIONS", "20"))
+# 整场下载时同时请求的分页数
+HMY_PAGE_CONCURRENCY = int(os.getenv("HMY_PAGE_CONCURRENCY", "4"))
+# 分页数上限，防止上游 count 异常时无限请求
+HMY_MAX_PAGES = 10000
 
-    def __init__(
-        self,
-        aes_key: Optional[str] = None,
-        base_url: Optional[str] = None,
-        session: Optional[requests.Session] = None,
-    ):
+
+def _page_params(farm_code: str, page_size: int, page_num: int) -> dict:
+    """校验分页参数，返回上游请求参数。"""
+    normalized_farm_code = str(farm_code or "").strip()
+    if not normalized_farm_code:
+        raise ValueError("牧场编码不能为空")
+    if not 1 <= int(page_size) <= 2000:
+        raise ValueError("page_size 必须在 1 到 2000 之间")
+    if int(page_num) < 1:
+        raise ValueError("page_num 必须大于等于 1")
+    return {
+        "farmCode": normalized_farm_code,
+        "pageSize": int(page_size),
+        "pageNum": int(page_num),
+    }
+
+
+def _parse_cow_page(payload: object) -> dict:
+    """在服务边界验证上游响应格式。"""
+    if not isinstance(payload, dict):
+        raise HMYProxyUpstreamError("慧牧云上游返回格式异常")
+
+    rows = payload.get("data") or []
+    if not isinstance(rows, list):
+        raise HMYProxyUpstreamError("慧牧云上游 data 字段格式异常")
+    try:
+        count = int(payload.get("count") or 0)
+    except (TypeError, ValueError) as exc:
+        raise HMYProxyUpstreamError("慧牧云上游 count 字段格式异常") from exc
+    if count < 0:
+        raise HMYProxyUpstreamError("慧牧云上游 count 字段无效")
+
+    return {"code": payload.get("code", 200), "count": count, "data": rows}
+
+
+class _HMYProxyConfig:
+    """服务端地址与 AES 鉴权配置。"""
+
+    def __init__(self, aes_key: Optional[str] = None, base_url: Optional[str] = None):
         base_url_value = base_url or os.getenv("HMY_API_BASE_URL")
         if not base_url_value:
             raise HMYProxyConfigError("慧牧云服务端地址未配置")
@@ -68,20 +112,39 @@ class HMYProxyClient:
         self._key_bytes = key_value.strip().encode("utf-8")
         if len(self._key_bytes) not in (16, 24, 32):
             raise HMYProxyConfigError("慧牧云服务端鉴权配置无效")
-
-        self.session = session or requests.Session()
-        self.session.trust_env = False
-        self.session.proxies = {"http": None, "https": None}
+        # 请求头只随日期变化，按天缓存
+        self._secret_cache: Optional[Tuple[date, str]] = None
 
     def _make_secret(self, request_date: Optional[date] = None) -> str:
         """按慧牧云协议生成当天请求头，不记录或返回原始密钥。"""
-        plain = (request_date or date.today()).isoformat().encode("utf-8")
+        request_date = request_date or date.today()
+        cached = self._secret_cache
+        if cached is not None and cached[0] == request_date:
+            return cached[1]
+        plain = request_date.isoformat().encode("utf-8")
         padder = PKCS7(128).padder()
         padded = padder.update(plain) + padder.finalize()
         cipher = Cipher(algorithms.AES(self._key_bytes), modes.ECB())
         encryptor = cipher.encryptor()
         encrypted = encryptor.update(padded) + encryptor.finalize()
-        return base64.b64encode(encrypted).decode("ascii")
+        secret = base64.b64encode(encrypted).decode("ascii")
+        self._secret_cache = (request_date, secret)
+        return secret
+
+
+class HMYProxyClient(_HMYProxyConfig):
+    """使用服务端 AES 密钥读取慧牧云牛群分页数据。"""
+
+    def __init__(
+        self,
+        aes_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+    ):
+        super().__init__(aes_key=aes_key, base_url=base_url)
+        self.session = session or requests.Session()
+        self.session.trust_env = False
+        self.session.proxies = {"http": None, "https": None}
 
     def get_cow_page(
         self,
@@ -90,41 +153,132 @@ class HMYProxyClient:
         page_num: int = 1,
     ) -> dict:
         """读取一页牛群数据，并在服务边界验证响应格式。"""
-        normalized_farm_code = str(farm_code or "").strip()
-        if not normalized_farm_code:
-            raise ValueError("牧场编码不能为空")
-        if not 1 <= int(page_size) <= 2000:
-            raise ValueError("page_size 必须在 1 到 2000 之间")
-        if int(page_num) < 1:
-            raise ValueError("page_num 必须大于等于 1")
+        params = _page_params(farm_code, page_size, page_num)
 
         try:
             response = self.session.get(
                 f"{self.base_url}/outside/yl/cow",
-                params={
-                    "farmCode": normalized_farm_code,
-                    "pageSize": int(page_size),
-                    "pageNum": int(page_num),
-                },
+                params=params,
                 headers={"secret": self._make_secret()},
-                timeout=30,
+                timeout=HMY_UPSTREAM_TIMEOUT,
             )
             response.raise_for_status()
             payload = response.json()
         except (requests.RequestException, ValueError) as exc:
             raise HMYProxyUpstreamError("慧牧云上游请求失败") from exc
 
-        if not isinstance(payload, dict):
-            raise HMYProxyUpstreamError("慧牧云上游返回格式异常")
+        return _parse_cow_page(payload)
+
 
-        rows = payload.get("data") or []
-        if not isinstance(rows, list):
-            raise HMYProxyUpstreamError("慧牧云上游 data 字段格式异常")
+class AsyncHMYProxyClient(_HMYProxyConfig):
+    """异步读取慧牧云牛群分页数据（服务端路由使用，不阻塞事件循环）。"""
+
+    def __init__(
+        self,
+        aes_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
+        super().__init__(aes_key=aes_key, base_url=base_url)
+        self.http_client = http_client or httpx.AsyncClient(
+            timeout=HMY_UPSTREAM_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HMY_MAX_CONNECTIONS,
+                max_keepalive_connections=HMY_MAX_CONNECTIONS,
+            ),
+            trust_env=False,
+        )
+
+    async def get_cow_page(
+        self,
+        farm_code: str,
+        page_size: int = 2000,
+        page_num: int = 1,
+    ) -> dict:
+        """读取一页牛群数据，并在服务边界验证响应格式。"""
+        params = _page_params(farm_code, page_size, page_num)
+
+        try:
+            response = await self.http_client.get(
+                f"{self.base_url}/outside/yl/cow",
+                params=params,
+                headers={"secret": self._make_secret()},
+            )
+            response.raise_for_status()
+            payload = response.json()
+        except (httpx.HTTPError, ValueError) as exc:
+            raise HMYProxyUpstreamError("慧牧云上游请求失败") from exc
+
+        return _parse_cow_page(payload)
+
+    async def iter_cow_pages(
+        self,
+        farm_code: str,
+        page_size: int = 2000,
+        concurrency: int = HMY_PAGE_CONCURRENCY,
+    ) -> AsyncIterator[dict]:
+        """
+        按页序依次产出整场牛群数据的各页。
+
+        先读第一页得到总数，其余分页最多 concurrency 个同时请求；
+        取得的记录数与上游报告的总数不一致时抛出 HMYProxyUpstreamError。
+        """
+        first = await self.get_cow_page(farm_code, page_size, 1)
+        yield first
+        total = first["count"]
+        received = len(first["data"])
+        page_count = -(-total // int(page_size))
+        if page_count > HMY_MAX_PAGES:
+            raise HMYProxyUpstreamError("慧牧云牛群接口分页异常")
+
+        semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+
+        async def fetch(page_num: int) -> dict:
+            async with semaphore:
+                return await self.get_cow_page(farm_code, page_size, page_num)
+
+        tasks = [
+            asyncio.ensure_future(fetch(page_num))
+            for page_num in range(2, page_count + 1)
+        ] if received else []
         try:
-            count = int(payload.get("count") or 0)
-        except (TypeError, ValueError) as exc:
-            raise HMYProxyUpstreamError("慧牧云上游 count 字段格式异常") from exc
-        if count < 0:
-            raise HMYProxyUpstreamError("慧牧云上游 count 字段无效")
+            for task in tasks:
+                page = await task
+                if not page["data"]:
+                    break
+                received += len(page["data"])
+                yield page
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if received != total:
+            raise HMYProxyUpstreamError("慧牧云牛群数据不完整")
+
+    async def aclose(self):
+        await self.http_client.aclose()
+
+
+_shared_client: Optional[Tuple[asyncio.AbstractEventLoop, AsyncHMYProxyClient]] = None
+
+
+def get_async_proxy_client() -> AsyncHMYProxyClient:
+    """
+    进程内共享的异步客户端（连接池与当天请求头在请求间复用）。
+
+    连接池绑定事件循环，须在事件循环内调用；事件循环更换时重新创建。
+    """
+    global _shared_client
+    loop = asyncio.get_running_loop()
+    if _shared_client is None or _shared_client[0] is not loop:
+        _shared_client = (loop, AsyncHMYProxyClient())
+    return _shared_client[1]
+
 
-        return {"code": payload.get("code", 200), "count": count, "data": rows}
+async def close_async_proxy_client():
+    """关闭共享客户端的连接池（服务停止时调用）。"""
+    global _shared_client
+    shared, _shared_client = _shared_client, None
+    if shared is not None and shared[0] is asyncio.get_running_loop():
+        await shared[1].aclose()
@@ -2,9 +2,15 @@
 伊起牛API客户端
 
 封装所有伊起牛API调用，提供统一的错误处理和重试机制。
+多牧场下载（download_farms）用线程池并发请求，共享连接池并按主机限制请求频率。
 """
 import requests
-from typing import Optional, List, Dict
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional, List, Dict, Sequence
+from urllib.parse import urlsplit
+import threading
+import time
 import logging
 
 
@@ -13,6 +19,9 @@ class YQNApiClient:
 
     BASE_URL = "https://yqnapi.yqndairy.com"
     TIMEOUT = 30  # 超时30秒
+    MAX_WORKERS = 6  # 多牧场并发下载的最大线程数
+    MIN_REQUEST_INTERVAL = 0.1  # 同一主机两次请求开始的最小间隔（秒）
+    FARM_RETRIES = 1  # 单个牧场的请求整体失败后再重试的次数
 
     def __init__(self, token: str):
         """
@@ -36,6 +45,24 @@ class YQNApiClient:
             'http': None,
             'https': None,
         }
+        # 连接池大小与并发线程数一致，并发下载时复用连接
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.MAX_WORKERS)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # 按主机限流：主机 → 下一次允许发出请求的时间
+        self._rate_lock = threading.Lock()
+        self._next_request_at: Dict[str, float] = {}
+
+    def _throttle(self, url: str):
+        """按主机限制请求频率（多线程共享）"""
+        host = urlsplit(url).netloc
+        with self._rate_lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_request_at.get(host, now))
+            self._next_request_at[host] = start_at + self.MIN_REQUEST_INTERVAL
+        if start_at > now:
+            time.sleep(start_at - now)
 
     def _request(self, method: str, endpoint: str, **kwargs) -> dict:
         """
@@ -61,6 +88,7 @@ class YQNApiClient:
         max_retries = 3
         for attempt in range(max_retries):
             try:
+                self._throttle(url)
                 self.logger.info(f"API请求: {method} {url}")
                 # 使用self.session而不是直接使用requests，以便使用代理
                 response = self.session.request(method, url, **kwargs)
@@ -273,6 +301,66 @@ class YQNApiClient:
         }
         return self._request("GET", "/stock/stock/getStockDetail", params=params)
 
+    def download_farms(self, farm_codes: Sequence[str], kinds: Sequence[str] = ("herd", "breeding", "stock"),
+                       progress_callback: Optional[Callable[[int, int, str, str], None]] = None,
+                       max_workers: Optional[int] = None) -> Dict[str, Dict[str, object]]:
+        """
+        并发下载多个牧场的数据
+
+        所有牧场、所有数据类型的请求一起提交到线程池，整体耗时接近最慢的单个牧场。
+        单个请求失败时整体再重试 FARM_RETRIES 次，仍失败则记录异常，不影响其他牧场。
+
+        参数:
+            farm_codes: 牧场站号列表
+            kinds: 数据类型，"herd"=牛群(get_farm_herd)，"breeding"=配种记录(get_breeding_records)，
+                   "stock"=冻精库存(get_stock_detail)
+            progress_callback: 每完成一个请求调用一次 (已完成数, 总数, 数据类型, 站号)
+            max_workers: 最大并发数，默认 MAX_WORKERS
+
+        返回:
+            {数据类型: {站号: API响应 或 Exception}}，站号顺序与 farm_codes 一致
+        """
+        fetchers = {
+            "herd": self.get_farm_herd,
+            "breeding": self.get_breeding_records,
+            "stock": self.get_stock_detail,
+        }
+        unknown = [kind for kind in kinds if kind not in fetchers]
+        if unknown:
+            raise ValueError(f"未知的数据类型: {unknown}")
+
+        def fetch(kind: str, farm_code: str):
+            for attempt in range(self.FARM_RETRIES + 1):
+                try:
+                    return fetchers[kind](farm_code)
+                except Exception as e:
+                    if attempt == self.FARM_RETRIES:
+                        raise
+                    self.logger.warning(f"牧场 {farm_code} {kind} 下载失败，重试 {attempt + 1}/{self.FARM_RETRIES}: {e}")
+                    time.sleep(1.0 * (attempt + 1))
+
+        tasks = [(kind, farm_code) for farm_code in farm_codes for kind in kinds]
+        results: Dict[str, Dict[str, object]] = {kind: {} for kind in kinds}
+        if not tasks:
+            return results
+
+        workers = min(max_workers or self.MAX_WORKERS, len(tasks))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="yqn-download") as executor:
+            futures = {executor.submit(fetch, kind, farm_code): (kind, farm_code) for kind, farm_code in tasks}
+            for done, future in enumerate(as_completed(futures), start=1):
+                kind, farm_code = futures[future]
+                try:
+                    results[kind][farm_code] = future.result()
+                except Exception as e:
+                    self.logger.error(f"牧场 {farm_code} {kind} 下载失败: {e}")
+                    results[kind][farm_code] = e
+                if progress_callback:
+                    progress_callback(done, len(tasks), kind, farm_code)
+
+        # 按传入的牧场顺序返回，合并结果与逐个下载时一致
+        return {kind: {farm_code: results[kind][farm_code] for farm_code in farm_codes}
+                for kind in kinds}
+
     def batch_add_selection(self, records: list) -> dict:
         """
         批量新增选配结果
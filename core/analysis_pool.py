@@ -0,0 +1,205 @@
+"""
+数据分析进程池 - 无GUI依赖
+
+自动报告的数据分析阶段由多个 CPU 密集任务组成（性状、指数、近交分析），在线程池中受 GIL 限制
+基本是串行执行。本模块提供一个常驻的进程池：
+
+- 任务以模块级函数提交，在子进程中执行，返回值与异常原样传回
+- 子进程中的进度回调经队列转发到主进程，由监听线程调用提交时登记的回调
+- 子进程启动时预先打开系谱库：系谱列式缓存以内存映射方式打开、bull_library 只读访问，
+  各进程共享操作系统页缓存而不是各自复制一份；公牛库或系谱缓存更新后子进程自动重新加载
+- 进程池在多次运行之间保持常驻，避免每次重新启动进程、导入依赖
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from importlib import import_module
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 子进程中转发进度的队列与已加载的共享数据快照签名
+_progress_queue = None
+_snapshot_signature = None
+
+
+def _shared_snapshot_signature() -> Tuple:
+    """公牛库与系谱列式缓存文件的签名，任一文件变化说明共享数据已更新"""
+    from core.data.update_manager import LOCAL_DB_PATH, PEDIGREE_CACHE_PATH
+    from core.inbreeding.pedigree_database import PedigreeDatabase
+
+    paths = [LOCAL_DB_PATH]
+    store_path = PedigreeDatabase.store_path_for(PEDIGREE_CACHE_PATH)
+    if store_path.is_dir():
+        paths.extend(sorted(entry.path for entry in os.scandir(store_path) if entry.is_file()))
+
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((str(path), None, None))
+    return tuple(signature)
+
+
+def _load_shared_snapshot():
+    """打开（或在数据更新后重新打开）系谱库；只打开已有的列式缓存，不在子进程中构建"""
+    global _snapshot_signature
+
+    from core.data import update_manager
+    from core.inbreeding.pedigree_database import PedigreeDatabase
+    from core.inbreeding.pedigree_store import PedigreeStore
+
+    signature = _shared_snapshot_signature()
+    if signature == _snapshot_signature:
+        return
+    # 丢弃旧实例，get_pedigree_db 按需重新加载（表格法计算器随实例替换自动重建）
+    update_manager.pedigree_db_instance = None
+    _snapshot_signature = signature
+    if PedigreeStore.exists(PedigreeDatabase.store_path_for(update_manager.PEDIGREE_CACHE_PATH)):
+        update_manager.get_pedigree_db()
+
+
+def _init_worker(progress_queue):
+    """子进程初始化"""
+    from core.data.project_data import enable_copy_on_write
+
+    global _progress_queue
+    _progress_queue = progress_queue
+    enable_copy_on_write()
+    try:
+        _load_shared_snapshot()
+    except Exception as e:
+        logger.warning(f"分析子进程预加载系谱库失败，将在任务中按需加载: {e}")
+
+
+def _run_task(task_id: str, module_name: str, function_name: str, args: tuple):
+    """在子进程中执行任务，进度回调转发到主进程"""
+    try:
+        _load_shared_snapshot()
+    except Exception as e:
+        logger.warning(f"刷新系谱库失败: {e}")
+
+    def progress_callback(pct=None, msg=""):
+        try:
+            _progress_queue.put_nowait((task_id, pct, msg))
+        except Exception:
+            pass
+
+    function = getattr(import_module(module_name), function_name)
+    return function(*args, progress_cb=progress_callback)
+
+
+class AnalysisProcessPool:
+    """常驻的数据分析进程池"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        初始化进程池（子进程在首次提交任务时启动）
+
+        Args:
+            max_workers: 最大进程数，默认为CPU核数
+        """
+        # spawn 启动：不继承主进程的 Qt 与线程状态，各平台行为一致
+        context = multiprocessing.get_context('spawn')
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._queue = context.Queue()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self._queue,)
+        )
+        self._callbacks: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._listener = threading.Thread(target=self._dispatch_progress, name="analysis-progress", daemon=True)
+        self._listener.start()
+
+    def submit(self, function: Callable, args: tuple, progress_callback: Optional[Callable] = None) -> Future:
+        """
+        提交任务
+
+        Args:
+            function: 模块级函数，调用方式为 function(*args, progress_cb=...)
+            args: 位置参数（需可pickle）
+            progress_callback: 主进程中的进度回调 (percent, message)
+
+        Returns:
+            Future: 任务结果
+        """
+        task_id = uuid.uuid4().hex
+        if progress_callback is not None:
+            with self._lock:
+                self._callbacks[task_id] = progress_callback
+        future = self._executor.submit(_run_task, task_id, function.__module__, function.__name__, tuple(args))
+        future.add_done_callback(lambda _: self._unregister(task_id))
+        return future
+
+    def _unregister(self, task_id: str):
+        with self._lock:
+            self._callbacks.pop(task_id, None)
+
+    def _dispatch_progress(self):
+        """监听线程：把子进程的进度消息交给对应任务的回调"""
+        while True:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            task_id, pct, msg = item
+            with self._lock:
+                callback = self._callbacks.get(task_id)
+            if callback is None:
+                continue
+            try:
+                callback(pct, msg)
+            except Exception as e:
+                logger.debug(f"进度回调失败: {e}")
+
+    def shutdown(self, wait: bool = True):
+        """关闭进程池"""
+        self._closed = True
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        try:
+            self._queue.put_nowait(None)
+        except Exception:
+            pass
+
+
+_pool_instance: Optional[AnalysisProcessPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_analysis_pool() -> AnalysisProcessPool:
+    """获取常驻进程池（首次调用时创建）"""
+    global _pool_instance
+    with _pool_lock:
+        if _pool_instance is None:
+            _pool_instance = AnalysisProcessPool()
+        return _pool_instance
+
+
+def shutdown_analysis_pool(wait: bool = True):
+    """关闭常驻进程池；进程池损坏（子进程异常退出）后调用，下次使用时重新创建"""
+    global _pool_instance
+    with _pool_lock:
+        pool, _pool_instance = _pool_instance, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+atexit.register(shutdown_analysis_pool, False)
@@ -7,13 +7,14 @@
 import sqlite3
 import logging
 import datetime
-import math
 from pathlib import Path
 from typing import Dict, List, Set, Tuple, Optional
 
+import numpy as np
 import pandas as pd
 
 from core.data.update_manager import LOCAL_DB_PATH
+from core.data.bull_table import get_bull_table
 
 logger = logging.getLogger(__name__)
 
@@ -332,12 +333,6 @@ def run_inbreeding_analysis(project_path, analysis_type, progress_cb=None):
 
         # 9. 保存结果
         emit_progress(95, "保存分析结果...")
-        results_df = pd.DataFrame(results)
-        # 移除不可序列化的详情字段
-        for col in ['后代近交详情', '近交详情']:
-            if col in results_df.columns:
-                results_df = results_df.drop(columns=[col])
-
         output_dir = project_path / "analysis_results"
         output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -350,8 +345,8 @@ def run_inbreeding_analysis(project_path, analysis_type, progress_cb=None):
         output_path = output_dir / filename
 
         with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            if not results_df.empty:
-                results_df.to_excel(writer, sheet_name='配对明细表', index=False)
+            if not results.empty:
+                results.to_excel(writer, sheet_name='配对明细表', index=False)
             if not abnormal_df.empty:
                 abnormal_df.to_excel(writer, sheet_name='异常明细表', index=False)
             if not stats_df.empty:
@@ -426,27 +421,10 @@ def _query_bull_genes(bull_ids):
         return bull_genes, list(bull_ids)
 
     try:
-        bull_ids_str = "', '".join(valid_ids)
-        query = f"""
-            SELECT `BULL NAAB`, `BULL REG`,
-                HH1, HH2, HH3, HH4, HH5, HH6,
-                BLAD, Chondrodysplasia, Citrullinemia,
-                DUMPS, `Factor XI`, CVM, Brachyspina,
-                Mulefoot, `Cholesterol deficiency`, MW
-            FROM bull_library
-            WHERE `BULL NAAB` IN ('{bull_ids_str}')
-            OR `BULL REG` IN ('{bull_ids_str}')
-        """
-
-        conn = sqlite3.connect(LOCAL_DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute(query)
-        result = cursor.fetchall()
+        result = get_bull_table(LOCAL_DB_PATH).lookup(valid_ids, DEFECT_GENES)
 
         found_bulls = set()
-        for row in result:
-            row_dict = dict(row)
+        for row_dict in result:
             naab = row_dict.get('BULL NAAB')
             reg = row_dict.get('BULL REG')
 
@@ -469,8 +447,6 @@ def _query_bull_genes(bull_ids):
                 found_bulls.add(str(reg))
 
         missing_bulls = list(valid_ids - found_bulls)
-        cursor.close()
-        conn.close()
 
         return bull_genes, missing_bulls
 
@@ -546,12 +522,84 @@ def _analyze_mated_pairs(project_path, bull_genes, pedigree_db, progress_cb=None
 
         results.append(result_dict)
 
-    return results
+    return pd.DataFrame(results)
+
+
+def _encode_gene_status(gene_dicts):
+    """
+    把每头动物的隐性基因状态编码为位掩码（DEFECT_GENES 中每个基因占一位）
+
+    Args:
+        gene_dicts: 每头动物的 {基因: 状态} 字典
+
+    Returns:
+        Tuple: (values, known, carrier, free)
+            values: (动物数, 基因数) 的原始状态数组，用于输出(母)/(公)列
+            known / carrier / free: uint32 位掩码，分别表示有数据、携带(C)、不携带(F)
+    """
+    values = np.array(
+        [[genes.get(gene, 'missing data') for gene in DEFECT_GENES] for genes in gene_dicts],
+        dtype=object
+    ).reshape(len(gene_dicts), len(DEFECT_GENES))
+    bits = np.left_shift(np.uint32(1), np.arange(len(DEFECT_GENES), dtype=np.uint32))
+
+    def to_mask(flags):
+        return np.bitwise_or.reduce(np.where(flags, bits, np.uint32(0)), axis=1).astype(np.uint32)
+
+    known = to_mask(values != 'missing data')
+    carrier = to_mask(values == 'C')
+    free = to_mask(values == 'F')
+    return values, known, carrier, free
+
+
+def _pairwise_gene_safety(cow_codes, bull_codes):
+    """
+    批量计算母牛父亲 × 公牛网格上每个基因的配对安全性（与 _analyze_gene_safety 规则一致）
+
+    Args:
+        cow_codes: 母牛父亲的 _encode_gene_status 结果
+        bull_codes: 公牛的 _encode_gene_status 结果
+
+    Returns:
+        Dict[str, np.ndarray]: {基因: 按母牛优先顺序展开的配对结果}
+    """
+    _, cow_known, cow_carrier, cow_free = cow_codes
+    _, bull_known, bull_carrier, bull_free = bull_codes
+
+    # 位掩码按位与，一次得到全部配对、全部基因的各类情况
+    cow_missing = ~cow_known[:, None]
+    bull_missing = ~bull_known[None, :]
+    masks = [
+        cow_missing & bull_missing,
+        np.broadcast_to(bull_missing, (len(cow_known), len(bull_known))),
+        np.broadcast_to(cow_missing, (len(cow_known), len(bull_known))),
+        cow_carrier[:, None] & bull_carrier[None, :],
+        cow_free[:, None] & bull_carrier[None, :],
+        cow_carrier[:, None] & bull_free[None, :],
+    ]
+    choices = ['缺少双方信息', '缺少公牛信息', '缺少母牛父亲信息', '高风险', '仅公牛携带', '仅母牛父亲携带']
+
+    result = {}
+    for i, gene in enumerate(DEFECT_GENES):
+        bit = np.uint32(1 << i)
+        conditions = [(mask & bit).ravel() != 0 for mask in masks]
+        result[gene] = np.select(conditions, choices, default='-').astype(object)
+    return result
+
+
+def _standardize_bull_ids(pedigree_db, raw_ids):
+    """标准化公牛号，相同的原始号只标准化一次"""
+    standardized = {raw_id: pedigree_db.standardize_animal_id(raw_id, 'bull') for raw_id in dict.fromkeys(raw_ids)}
+    return [standardized[raw_id] for raw_id in raw_ids]
 
 
 def _analyze_candidate_pairs(project_path, bull_genes, pedigree_db, progress_cb=None):
-    """分析备选公牛对"""
-    results = []
+    """
+    分析备选公牛对
+
+    每头母牛父亲、每头备选公牛的基因状态编码为位掩码，在 母牛 × 公牛 网格上按位与批量判定，
+    一次生成全部配对的结果表（行顺序为母牛优先，与逐对遍历一致）。
+    """
     cow_file = project_path / "standardized_data" / "processed_cow_data.xlsx"
     bull_file = project_path / "standardized_data" / "processed_bull_data.xlsx"
 
@@ -561,136 +609,151 @@ def _analyze_candidate_pairs(project_path, bull_genes, pedigree_db, progress_cb=
     cow_df = cow_df[cow_df['是否在场'] == '是']
     missing_gene_default = {gene: 'missing data' for gene in DEFECT_GENES}
 
-    for _, cow_row in cow_df.iterrows():
-        cow_id = str(cow_row['cow_id'])
-        original_sire_id = str(cow_row['sire']) if pd.notna(cow_row['sire']) else ''
-        sire_id = pedigree_db.standardize_animal_id(original_sire_id, 'bull')
-        cow_genes = bull_genes.get(sire_id, missing_gene_default)
+    cow_ids = [str(v) for v in cow_df['cow_id'].tolist()]
+    original_sire_ids = [str(v) if pd.notna(v) else '' for v in cow_df['sire'].tolist()]
+    sire_ids = _standardize_bull_ids(pedigree_db, original_sire_ids)
 
-        for _, bull_row in bull_df.iterrows():
-            original_bull_id = str(bull_row['bull_id'])
-            bull_id_std = pedigree_db.standardize_animal_id(original_bull_id, 'bull')
-            candidate_genes = bull_genes.get(bull_id_std, missing_gene_default)
+    original_bull_ids = [str(v) for v in bull_df['bull_id'].tolist()]
+    bull_ids = _standardize_bull_ids(pedigree_db, original_bull_ids)
 
-            gene_results = _analyze_gene_safety(cow_genes, candidate_genes)
+    cow_codes = _encode_gene_status([bull_genes.get(sire_id, missing_gene_default) for sire_id in sire_ids])
+    bull_codes = _encode_gene_status([bull_genes.get(bull_id, missing_gene_default) for bull_id in bull_ids])
+    gene_results = _pairwise_gene_safety(cow_codes, bull_codes)
 
-            result_dict = {
-                '母牛号': cow_id,
-                '父号': sire_id,
-                '原始父号': original_sire_id if original_sire_id != sire_id else '',
-                '备选公牛号': bull_id_std,
-                '原始备选公牛号': original_bull_id if original_bull_id != bull_id_std else '',
-                '近交系数': "0.00%",
-            }
+    n_cows, n_bulls = len(cow_ids), len(bull_ids)
+    sire_ids = np.array(sire_ids, dtype=object)
+    original_sire_ids = np.array(original_sire_ids, dtype=object)
+    bull_ids = np.array(bull_ids, dtype=object)
+    original_bull_ids = np.array(original_bull_ids, dtype=object)
 
-            for gene in DEFECT_GENES:
-                result_dict[gene] = gene_results[gene]
-                result_dict[f"{gene}(母)"] = cow_genes.get(gene, 'missing data')
-                result_dict[f"{gene}(公)"] = candidate_genes.get(gene, 'missing data')
-
-            results.append(result_dict)
+    columns = {
+        '母牛号': np.repeat(np.array(cow_ids, dtype=object), n_bulls),
+        '父号': np.repeat(sire_ids, n_bulls),
+        '原始父号': np.repeat(np.where(original_sire_ids != sire_ids, original_sire_ids, ''), n_bulls),
+        '备选公牛号': np.tile(bull_ids, n_cows),
+        '原始备选公牛号': np.tile(np.where(original_bull_ids != bull_ids, original_bull_ids, ''), n_cows),
+        '近交系数': np.full(n_cows * n_bulls, "0.00%", dtype=object),
+    }
+    for i, gene in enumerate(DEFECT_GENES):
+        columns[gene] = gene_results[gene]
+        columns[f"{gene}(母)"] = np.repeat(cow_codes[0][:, i], n_bulls)
+        columns[f"{gene}(公)"] = np.tile(bull_codes[0][:, i], n_cows)
 
-    return results
+    return pd.DataFrame(columns)
 
 
 def _calculate_inbreeding_coefficients(results, progress_cb=None):
-    """计算近交系数并更新结果"""
+    """计算近交系数并更新结果
+
+    所有配对的后代近交系数由表格法计算器一次性批量求出（每头公牛只计算一次），
+    不再对每个配对分别枚举通径。
+    """
+    if results.empty:
+        return results
+    bull_column = '配种公牛号' if '配种公牛号' in results.columns else '备选公牛号'
     try:
-        from core.inbreeding.path_inbreeding_calculator import PathInbreedingCalculator
-        calculator = PathInbreedingCalculator(max_generations=6)
-
-        total_count = len(results)
-        for i, result in enumerate(results):
-            cow_id = result['母牛号']
-            sire_id = result['父号']
-            bull_id = result.get('配种公牛号', result.get('备选公牛号', ''))
-
-            if bull_id:
-                try:
-                    offspring_inbreeding, offspring_contributions, offspring_paths = \
-                        calculator.calculate_potential_offspring_inbreeding(bull_id, cow_id)
-
-                    if math.isnan(offspring_inbreeding):
-                        offspring_inbreeding = 0.0
-
-                    # 父女配兜底：母牛 cow_id 在 pedigree 中查不到时，通径法会返回 0；
-                    # 但上层 result 里"父号"已经标准化好，若与配种公牛号一致，至少保证不漏报 0.25 这个直系血亲场景
-                    if offspring_inbreeding == 0.0 and sire_id and sire_id == bull_id:
-                        bull_f, _, _ = calculator.calculate_inbreeding_coefficient(bull_id)
-                        offspring_inbreeding = 0.25 * (1 + bull_f)
-                        offspring_contributions = {bull_id: offspring_inbreeding}
-                        offspring_paths = {bull_id: [(f"{bull_id} → 后代 ← {cow_id} ← {bull_id}", offspring_inbreeding, 0, 1, bull_f)]}
-
-                    # 保留到0.001个百分点，避免6.25%阈值附近因显示值
-                    # 过早四舍五入而改变后续选配判断。
-                    result['后代近交系数'] = f"{offspring_inbreeding:.3%}"
-                    result['后代近交详情'] = {
-                        'system': offspring_inbreeding,
-                        'common_ancestors': offspring_contributions,
-                        'paths': offspring_paths
-                    }
-                except Exception as e:
-                    result['后代近交系数'] = "0.00%"
-                    result['后代近交详情'] = {'system': 0.0, 'common_ancestors': {}, 'paths': {}}
-            else:
-                result['后代近交系数'] = "0.00%"
-                result['后代近交详情'] = {'system': 0.0, 'common_ancestors': {}, 'paths': {}}
-
-            # 更新进度（每100条更新一次）
-            if progress_cb and i % 100 == 0 and total_count > 0:
-                pct = int(72 + (i / total_count) * 16)
-                try:
-                    progress_cb(pct, f"计算近交系数 ({i+1}/{total_count})")
-                except Exception:
-                    pass
+        from core.inbreeding.tabular_inbreeding_calculator import get_tabular_inbreeding_calculator
+        calculator = get_tabular_inbreeding_calculator()
+
+        pair_bulls = results[bull_column].fillna('').astype(object).to_numpy()
+        pair_cows = results['母牛号'].to_numpy()
+        cow_ids = list(dict.fromkeys(pair_cows))
+        bull_ids = list(dict.fromkeys(b for b in pair_bulls if b))
+
+        if progress_cb:
+            try:
+                progress_cb(74, f"批量计算近交系数 ({len(cow_ids)}头母牛 × {len(bull_ids)}头公牛)")
+            except Exception:
+                pass
+
+        matrix = calculator.calculate_offspring_inbreeding_matrix(bull_ids, cow_ids)
+        has_bull = pair_bulls != ''
+        bull_pos = pd.Index(bull_ids).get_indexer(pair_bulls[has_bull])
+        cow_pos = pd.Index(cow_ids).get_indexer(pair_cows[has_bull])
+
+        offspring_inbreeding = np.zeros(len(results))
+        offspring_inbreeding[has_bull] = np.asarray(matrix)[bull_pos, cow_pos]
+        offspring_inbreeding = np.nan_to_num(offspring_inbreeding, nan=0.0)
+
+        # 父女配兜底：母牛 cow_id 在 pedigree 中查不到时，矩阵结果为 0；
+        # 但上层 result 里"父号"已经标准化好，若与配种公牛号一致，至少保证不漏报 0.25 这个直系血亲场景
+        sire_ids = results['父号'].fillna('').astype(object).to_numpy()
+        fallback = has_bull & (offspring_inbreeding == 0.0) & (sire_ids != '') & (sire_ids == pair_bulls)
+        if fallback.any():
+            bull_f = {bull_id: calculator.get_inbreeding(bull_id) for bull_id in set(pair_bulls[fallback])}
+            offspring_inbreeding[fallback] = [0.25 * (1 + bull_f[b]) for b in pair_bulls[fallback]]
+
+        # 保留到0.001个百分点，避免6.25%阈值附近因显示值
+        # 过早四舍五入而改变后续选配判断。
+        formatted = np.array([f"{value:.3%}" for value in offspring_inbreeding], dtype=object)
+        formatted[~has_bull] = "0.00%"
+        results['后代近交系数'] = formatted
+
+        if progress_cb:
+            try:
+                progress_cb(88, f"计算近交系数 ({len(results)}/{len(results)})")
+            except Exception:
+                pass
 
         return results
 
     except Exception as e:
         logger.error(f"计算近交系数失败: {e}")
         # 设置默认值
-        for result in results:
-            if '后代近交系数' not in result:
-                result['后代近交系数'] = "0.00%"
-                result['后代近交详情'] = {'system': 0.0, 'common_ancestors': {}, 'paths': {}}
+        if '后代近交系数' not in results.columns:
+            results['后代近交系数'] = "0.00%"
         return results
 
 
 def _collect_abnormal_pairs(results):
     """收集异常配对和统计信息"""
-    abnormal_records = []
+    bull_column = '配种公牛号' if '配种公牛号' in results.columns else '备选公牛号'
+    row_positions = np.arange(len(results))
+    frames = []
     gene_stats = {gene: 0 for gene in DEFECT_GENES}
     inbreeding_count = 0
 
-    for result in results:
-        for gene in DEFECT_GENES:
-            if result.get(gene) == '高风险':
-                abnormal_records.append({
-                    '母牛号': result['母牛号'],
-                    '父号': result['父号'],
-                    '公牛号': result.get('配种公牛号', result.get('备选公牛号')),
-                    '异常类型': gene,
-                    '状态': '公牛与母牛父亲共同携带隐性基因'
-                })
-                gene_stats[gene] += 1
-
-        if '后代近交系数' in result:
-            try:
-                inbreeding_str = result['后代近交系数']
-                inbreeding_value = float(inbreeding_str.strip('%')) / 100
-                if inbreeding_value > 0.0625:
-                    abnormal_records.append({
-                        '母牛号': result['母牛号'],
-                        '父号': result['父号'],
-                        '公牛号': result.get('配种公牛号', result.get('备选公牛号')),
-                        '异常类型': '近交系数过高',
-                        '状态': f'{inbreeding_value:.3%}'
-                    })
-                    inbreeding_count += 1
-            except (ValueError, TypeError):
-                pass
-
-    abnormal_df = pd.DataFrame(abnormal_records)
+    for order, gene in enumerate(DEFECT_GENES):
+        if gene not in results.columns:
+            continue
+        mask = (results[gene] == '高风险').to_numpy()
+        gene_stats[gene] = int(mask.sum())
+        if gene_stats[gene]:
+            frames.append(pd.DataFrame({
+                '_row': row_positions[mask],
+                '_order': order,
+                '母牛号': results['母牛号'].to_numpy()[mask],
+                '父号': results['父号'].to_numpy()[mask],
+                '公牛号': results[bull_column].to_numpy()[mask],
+                '异常类型': gene,
+                '状态': '公牛与母牛父亲共同携带隐性基因',
+            }))
+
+    if '后代近交系数' in results.columns:
+        inbreeding_values = pd.to_numeric(
+            results['后代近交系数'].astype(str).str.strip('%'), errors='coerce'
+        ).to_numpy() / 100
+        mask = inbreeding_values > 0.0625
+        inbreeding_count = int(mask.sum())
+        if inbreeding_count:
+            frames.append(pd.DataFrame({
+                '_row': row_positions[mask],
+                '_order': len(DEFECT_GENES),
+                '母牛号': results['母牛号'].to_numpy()[mask],
+                '父号': results['父号'].to_numpy()[mask],
+                '公牛号': results[bull_column].to_numpy()[mask],
+                '异常类型': '近交系数过高',
+                '状态': [f'{value:.3%}' for value in inbreeding_values[mask]],
+            }))
+
+    if frames:
+        # 按配对顺序排列，同一配对内先基因异常后近交异常
+        abnormal_df = (pd.concat(frames, ignore_index=True)
+                       .sort_values(['_row', '_order'], kind='stable')
+                       .drop(columns=['_row', '_order'])
+                       .reset_index(drop=True))
+    else:
+        abnormal_df = pd.DataFrame()
 
     stats_records = [
         {'异常类型': gene, '数量': count}
@@ -9,6 +9,8 @@ import numpy as np
 import datetime
 
 from core.data.update_manager import LOCAL_DB_PATH
+from core.data.bull_table import get_bull_table, BY_NAAB_THEN_REG
+from core.data.dataset_io import read_dataset, write_dataset
 
 class BaseCowCalculation:
     def __init__(self):
@@ -56,7 +58,7 @@ class BaseCowCalculation:
             return False, f"未找到数据文件：{data_filename}"
         
         try:
-            df = pd.read_excel(data_path)
+            df = read_dataset(data_path)
             for col in self.required_columns:
                 if col not in df.columns:
                     return False, f"数据文件缺少必需的列：{col}"
@@ -68,7 +70,7 @@ class BaseCowCalculation:
         """读取数据文件"""
         try:
             data_path = project_path / "standardized_data" / data_filename
-            return pd.read_excel(data_path)
+            return read_dataset(data_path)
         except Exception as e:
             print(f"读取数据失败: {e}")
             return None
@@ -93,7 +95,7 @@ class BaseCowCalculation:
 
         while True:
             try:
-                df.to_excel(output_path, index=False)
+                write_dataset(df, output_path)
                 return True
             except PermissionError:
                 if _is_main_thread():
@@ -111,7 +113,7 @@ class BaseCowCalculation:
                     for attempt in range(3):
                         time.sleep(1)
                         try:
-                            df.to_excel(output_path, index=False)
+                            write_dataset(df, output_path)
                             return True
                         except PermissionError:
                             continue
@@ -204,37 +206,11 @@ class BaseCowCalculation:
             return results_map
 
         try:
-            with self.db_engine.connect() as conn:
-                batch_size = 500
-                all_ids = [str(bid) for bid in bull_ids]
-
-                # 先用 BULL NAAB 批量查询
-                for batch_start in range(0, len(all_ids), batch_size):
-                    batch = all_ids[batch_start:batch_start + batch_size]
-                    placeholders = ','.join([f':id_{i}' for i in range(len(batch))])
-                    params = {f'id_{i}': bid for i, bid in enumerate(batch)}
-                    sql = text(f"SELECT * FROM bull_library WHERE `BULL NAAB` IN ({placeholders})")
-                    rows = conn.execute(sql, params).fetchall()
-                    for row in rows:
-                        row_dict = dict(row._mapping)
-                        bull_id_key = str(row_dict.get('BULL NAAB', ''))
-                        trait_data = {trait: row_dict.get(trait) for trait in selected_traits}
-                        results_map[bull_id_key] = (trait_data, True)
-
-                # 对未找到的ID，再用 BULL REG 查询
-                missing_ids = [bid for bid in all_ids if bid not in results_map]
-                if missing_ids:
-                    for batch_start in range(0, len(missing_ids), batch_size):
-                        batch = missing_ids[batch_start:batch_start + batch_size]
-                        placeholders = ','.join([f':id_{i}' for i in range(len(batch))])
-                        params = {f'id_{i}': bid for i, bid in enumerate(batch)}
-                        sql = text(f"SELECT * FROM bull_library WHERE `BULL REG` IN ({placeholders})")
-                        rows = conn.execute(sql, params).fetchall()
-                        for row in rows:
-                            row_dict = dict(row._mapping)
-                            bull_id_key = str(row_dict.get('BULL REG', ''))
-                            trait_data = {trait: row_dict.get(trait) for trait in selected_traits}
-                            results_map[bull_id_key] = (trait_data, True)
+            # 先按 BULL NAAB 匹配，未找到的再按 BULL REG 匹配（进程内列式表）
+            records = get_bull_table(LOCAL_DB_PATH).records(
+                [str(bid) for bid in bull_ids], selected_traits, by=BY_NAAB_THEN_REG
+            )
+            results_map = {bull_id: (trait_data, True) for bull_id, trait_data in records.items()}
 
         except Exception as e:
             print(f"批量查询公牛性状数据失败: {e}")
@@ -253,25 +229,11 @@ class BaseCowCalculation:
             Tuple[dict, bool]: (性状数据字典, 是否找到)
         """
         try:
-            with self.db_engine.connect() as conn:
-                # 先尝试用 BULL NAAB 查询
-                result = conn.execute(
-                    text("SELECT * FROM bull_library WHERE `BULL NAAB`=:bull_id"),
-                    {"bull_id": bull_id}
-                ).fetchone()
-                
-                if not result:
-                    # 如果找不到，再尝试用 BULL REG 查询
-                    result = conn.execute(
-                        text("SELECT * FROM bull_library WHERE `BULL REG`=:bull_id"),
-                        {"bull_id": bull_id}
-                    ).fetchone()
-
-                if result:
-                    result_dict = dict(result._mapping)
-                    trait_data = {trait: result_dict.get(trait) for trait in selected_traits}
-                    return trait_data, True
-                return {}, False
+            # 先尝试用 BULL NAAB 查询，找不到再用 BULL REG 查询
+            records = get_bull_table(LOCAL_DB_PATH).records([bull_id], selected_traits, by=BY_NAAB_THEN_REG)
+            if records:
+                return next(iter(records.values())), True
+            return {}, False
 
         except Exception as e:
             print(f"查询公牛性状数据失败: {e}")
@@ -4,15 +4,15 @@ from PyQt6.QtWidgets import (
     QMainWindow
 )
 from PyQt6.QtCore import Qt
-import pandas as pd
-import sqlite3
 import datetime
 from core.breeding_calc.traits_calculation import TraitsCalculation
 from core.data.update_manager import LOCAL_DB_PATH
 from core.data.bull_library_downloader import ensure_bull_library_exists
+from core.data.bull_table import get_bull_table, BY_NAAB_THEN_REG
 
 # 复用已有的性状翻译字典
 from core.breeding_calc.cow_traits_calc import TRAITS_TRANSLATION
+from core.data.dataset_io import read_dataset, write_dataset
 
 class BullKeyTraitsPage(QWidget):
     def __init__(self, parent=None):
@@ -193,7 +193,7 @@ class BullKeyTraitsPage(QWidget):
 
             # 读取备选公牛数据
             try:
-                bull_df = pd.read_excel(bull_data_path)
+                bull_df = read_dataset(bull_data_path)
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"读取备选公牛数据文件失败：{str(e)}")
                 return
@@ -214,60 +214,24 @@ class BullKeyTraitsPage(QWidget):
                         "请检查网络连接后重试。")
                     return
 
-            # 处理每个公牛的性状数据
+            # 处理每个公牛的性状数据（进程内公牛列式表，先 BULL NAAB 后 BULL REG）
+            bull_ids = bull_df['bull_id'].astype(str)
+            valid = bull_ids.str.strip() != ''
+            result_df = bull_df[valid].reset_index(drop=True)
+            result_ids = bull_ids[valid].tolist()
             missing_bulls = []
-            trait_data = []
 
-            for idx, row in bull_df.iterrows():
-                bull_id = str(row['bull_id'])
-                if pd.isna(bull_id) or bull_id.strip() == '':
-                    continue
-
-                try:
-                    conn = sqlite3.connect(LOCAL_DB_PATH)
-                    try:
-                        cursor = conn.cursor()
-                        # 先尝试用 BULL NAAB 查询
-                        cursor.execute(
-                            "SELECT * FROM bull_library WHERE `BULL NAAB`=?",
-                            (bull_id,)
-                        )
-                        result = cursor.fetchone()
-
-                        if not result:
-                            # 如果找不到，再尝试用 BULL REG 查询
-                            cursor.execute(
-                                "SELECT * FROM bull_library WHERE `BULL REG`=?",
-                                (bull_id,)
-                            )
-                            result = cursor.fetchone()
-
-                        if result:
-                            # 获取列名
-                            column_names = [description[0] for description in cursor.description]
-                            result_dict = dict(zip(column_names, result))
-
-                            # 提取性状数据
-                            bull_data = dict(row)  # 保留原始数据
-                            for trait in selected_traits:
-                                bull_data[trait] = result_dict.get(trait)
-                            trait_data.append(bull_data)
-                        else:
-                            missing_bulls.append(bull_id)
-                            # 对于缺失的公牛，保留原始数据，性状值设为空
-                            bull_data = dict(row)
-                            for trait in selected_traits:
-                                bull_data[trait] = None
-                            trait_data.append(bull_data)
-                    finally:
-                        conn.close()
-                except Exception as e:
-                    QMessageBox.critical(self, "错误", f"查询公牛 {bull_id} 的性状数据时发生错误：{str(e)}")
-                    # 对于查询失败的公牛，保留原始数据，性状值设为空
-                    bull_data = dict(row)
-                    for trait in selected_traits:
-                        bull_data[trait] = None
-                    trait_data.append(bull_data)
+            try:
+                table = get_bull_table(LOCAL_DB_PATH)
+                rows = table.rows(result_ids, by=BY_NAAB_THEN_REG)
+                for trait in selected_traits:
+                    result_df[trait] = table.take(trait, rows)
+                # 对于缺失的公牛，保留原始数据，性状值为空
+                missing_bulls = [bull_id for bull_id, row in zip(result_ids, rows) if row < 0]
+            except Exception as e:
+                QMessageBox.critical(self, "错误", f"查询公牛性状数据时发生错误：{str(e)}")
+                for trait in selected_traits:
+                    result_df[trait] = None
 
             # 如果有缺失的公牛，上传到云端数据库并提示用户
             if missing_bulls:
@@ -309,14 +273,11 @@ class BullKeyTraitsPage(QWidget):
                         f"缺失的公牛：{', '.join(missing_bulls)}"
                     )
 
-            # 生成结果DataFrame
-            result_df = pd.DataFrame(trait_data)
-
             # 保存结果文件
             output_path = main_window.selected_project_path / "analysis_results" / "processed_bull_data_key_traits.xlsx"
             while True:
                 try:
-                    result_df.to_excel(output_path, index=False)
+                    write_dataset(result_df, output_path)
                     QMessageBox.information(self, "成功", "公牛关键性状计算完成！")
                     break
                 except PermissionError:
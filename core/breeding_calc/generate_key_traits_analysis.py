@@ -6,6 +6,7 @@ import pandas as pd
 import logging
 from pathlib import Path
 from datetime import datetime
+from core.data.dataset_io import read_dataset, write_dataset_sheets
 
 logger = logging.getLogger(__name__)
 
@@ -110,7 +111,7 @@ def generate_key_traits_analysis_result(project_path: Path) -> bool:
             logger.error(f"文件不存在: {final_file}")
             return False
 
-        df = pd.read_excel(final_file)
+        df = read_dataset(final_file)
 
         # 只保留母牛（排除公牛）
         df_all = df[df['sex'] == '母'].copy()
@@ -228,13 +229,14 @@ def generate_key_traits_analysis_result(project_path: Path) -> bool:
         # 保存到Excel（多个sheet）
         output_file = project_path / "analysis_results" / "关键育种性状分析结果.xlsx"
 
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-            result_df_present.to_excel(writer, sheet_name='在群母牛年份汇总', index=False)
-            result_df_all.to_excel(writer, sheet_name='全部母牛年份汇总', index=False)
-            nm_distribution_present.to_excel(writer, sheet_name='在群母牛NM$分布', index=False)
-            nm_distribution_all.to_excel(writer, sheet_name='全部母牛NM$分布', index=False)
-            tpi_distribution_present.to_excel(writer, sheet_name='在群母牛TPI分布', index=False)
-            tpi_distribution_all.to_excel(writer, sheet_name='全部母牛TPI分布', index=False)
+        write_dataset_sheets({
+            '在群母牛年份汇总': result_df_present,
+            '全部母牛年份汇总': result_df_all,
+            '在群母牛NM$分布': nm_distribution_present,
+            '全部母牛NM$分布': nm_distribution_all,
+            '在群母牛TPI分布': tpi_distribution_present,
+            '全部母牛TPI分布': tpi_distribution_all,
+        }, output_file)
 
         logger.info(f"✓ 关键育种性状分析结果已保存: {output_file}")
         logger.info(f"  - 在群母牛: {len(df_present)}头")
@@ -7,6 +7,7 @@ import logging
 from pathlib import Path
 
 from config.breed_constants import is_dairy_breed
+from core.data.dataset_io import read_dataset, write_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +32,7 @@ def generate_pedigree_analysis_result(project_path: Path) -> bool:
             logger.error(f"文件不存在: {detail_file}")
             return False
 
-        df = pd.read_excel(detail_file)
+        df = read_dataset(detail_file)
 
         # 处理 sex 字段：空值默认为 '母'
         if 'sex' in df.columns:
@@ -121,7 +122,7 @@ def generate_pedigree_analysis_result(project_path: Path) -> bool:
         if 'cow_id' in result_df.columns:
             result_df['cow_id'] = result_df['cow_id'].astype(str)
 
-        result_df.to_excel(output_file, index=False)
+        write_dataset(result_df, output_file)
 
         logger.info(f"✓ 系谱识别分析结果已保存: {output_file}")
         logger.info(f"  - 总头数: {len(df)}头")
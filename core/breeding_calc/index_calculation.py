@@ -13,6 +13,9 @@ from core.breeding_calc.traits_calculation import TraitsCalculation
 
 from .base_calculation import BaseCowCalculation
 from .cow_traits_calc import TRAITS_TRANSLATION
+from core.data.dataset_io import read_dataset, save_columnar_copy, write_dataset
+from core.data.bull_table import get_bull_table, BY_NAAB_THEN_REG
+from core.data.update_manager import LOCAL_DB_PATH
 import os
 from pathlib import Path
 
@@ -202,7 +205,7 @@ class IndexCalculation(BaseCowCalculation):
             genomic_scores_path = project_path / "analysis_results" / "processed_cow_data_key_traits_scores_genomic.xlsx"
             if genomic_scores_path.exists():
                 # 3.1 基因组评估结果存在，检查是否完整
-                genomic_df = pd.read_excel(genomic_scores_path)
+                genomic_df = read_dataset(genomic_scores_path)
                 existing_traits = [col[:-6] for col in genomic_df.columns if col.endswith('_score')]
                 missing_traits = [trait for trait in selected_traits if trait not in existing_traits]
 
@@ -233,7 +236,7 @@ class IndexCalculation(BaseCowCalculation):
                         )
                         if not success:
                             return False, message
-                        df = pd.read_excel(project_path / "analysis_results" / "processed_cow_data_key_traits_scores_genomic.xlsx")
+                        df = read_dataset(project_path / "analysis_results" / "processed_cow_data_key_traits_scores_genomic.xlsx")
                     else:
                         # 没有基因组数据，使用系谱计算后更新基因组评估文件
                         success, message = self.traits_calculator.process_data(
@@ -245,7 +248,7 @@ class IndexCalculation(BaseCowCalculation):
                             return False, message
 
                         # 读取新计算的系谱结果
-                        pedigree_df = pd.read_excel(project_path / "analysis_results" / "processed_cow_data_key_traits_scores_pedigree.xlsx")
+                        pedigree_df = read_dataset(project_path / "analysis_results" / "processed_cow_data_key_traits_scores_pedigree.xlsx")
 
                         # 更新基因组评估文件中的缺失性状
                         for trait in missing_traits:
@@ -255,7 +258,7 @@ class IndexCalculation(BaseCowCalculation):
                             genomic_df[source_col] = 'P'  # 标记为系谱来源
 
                         # 保存更新后的基因组评估文件
-                        genomic_df.to_excel(genomic_scores_path, index=False)
+                        write_dataset(genomic_df, genomic_scores_path)
                         df = genomic_df
             else:
                 # 3.2 基因组评估结果不存在，检查是否有基因组数据
@@ -271,13 +274,13 @@ class IndexCalculation(BaseCowCalculation):
                     )
                     if not success:
                         return False, message
-                    df = pd.read_excel(project_path / "analysis_results" / "processed_cow_data_key_traits_scores_genomic.xlsx")
+                    df = read_dataset(project_path / "analysis_results" / "processed_cow_data_key_traits_scores_genomic.xlsx")
                 else:
                     # 没有基因组数据，检查系谱评估结果
                     pedigree_scores_path = project_path / "analysis_results" / "processed_cow_data_key_traits_scores_pedigree.xlsx"
                     if pedigree_scores_path.exists():
                         # 检查系谱评估结果是否完整
-                        pedigree_df = pd.read_excel(pedigree_scores_path)
+                        pedigree_df = read_dataset(pedigree_scores_path)
                         existing_traits = [col[:-6] for col in pedigree_df.columns if col.endswith('_score')]
                         missing_traits = [trait for trait in selected_traits if trait not in existing_traits]
 
@@ -304,7 +307,7 @@ class IndexCalculation(BaseCowCalculation):
                             )
                             if not success:
                                 return False, message
-                            df = pd.read_excel(project_path / "analysis_results" / "processed_cow_data_key_traits_scores_pedigree.xlsx")
+                            df = read_dataset(project_path / "analysis_results" / "processed_cow_data_key_traits_scores_pedigree.xlsx")
                     else:
                         # 没有任何评估结果，计算系谱评估结果
                         if task_info_callback:
@@ -316,7 +319,7 @@ class IndexCalculation(BaseCowCalculation):
                         )
                         if not success:
                             return False, message
-                        df = pd.read_excel(project_path / "analysis_results" / "processed_cow_data_key_traits_scores_pedigree.xlsx")
+                        df = read_dataset(project_path / "analysis_results" / "processed_cow_data_key_traits_scores_pedigree.xlsx")
 
             # 4. 计算指数得分 (向量化优化)
             if task_info_callback:
@@ -416,7 +419,7 @@ class IndexCalculation(BaseCowCalculation):
             if progress_callback:
                 progress_callback(20, "读取备选公牛数据...")
             try:
-                bull_df = pd.read_excel(bull_data_path)
+                bull_df = read_dataset(bull_data_path)
                 if bull_df.empty:
                     return False, "备选公牛数据为空"
             except Exception as e:
@@ -528,31 +531,17 @@ class IndexCalculation(BaseCowCalculation):
             if not self.init_db_connection():
                 return False, None
                 
-            cow_df = pd.read_excel(cow_data_path)
+            cow_df = read_dataset(cow_data_path)
 
             # 育种分析仅针对奶牛品种，排除肉牛品种
             from config.breed_constants import filter_dairy_cows
             cow_df = filter_dairy_cows(cow_df, log_prefix="母牛性状计算：")
 
-            # 对每个母牛计算选中的性状
+            # 父号映射为公牛列式表行号（先 BULL NAAB 后 BULL REG），各性状向量化取值
+            table = get_bull_table(LOCAL_DB_PATH)
+            sire_rows = table.rows(cow_df['sire'].tolist(), by=BY_NAAB_THEN_REG)
             for trait in selected_traits:
-                trait_col = f'sire_{trait}'
-                
-                # 从数据库查询公牛数据
-                bull_ids = cow_df['sire'].dropna().unique()
-                bull_traits = {}
-                
-                for bull_id in bull_ids:
-                    if pd.isna(bull_id):
-                        continue
-                    traits_data, found = self.query_bull_traits(str(bull_id), [trait])
-                    if found:
-                        bull_traits[str(bull_id)] = traits_data[trait]
-                
-                # 设置性状值
-                cow_df[trait] = cow_df['sire'].apply(
-                    lambda x: bull_traits.get(str(x)) if pd.notna(x) else None
-                )
+                cow_df[trait] = table.take(trait, sire_rows)
             
             return True, cow_df
             
@@ -577,9 +566,9 @@ class IndexCalculation(BaseCowCalculation):
         pedigree_path = project_path / "analysis_results" / "processed_cow_data_key_traits_scores_pedigree.xlsx"
         
         if genomic_path.exists():
-            df = pd.read_excel(genomic_path)
+            df = read_dataset(genomic_path)
         elif pedigree_path.exists():
-            df = pd.read_excel(pedigree_path)
+            df = read_dataset(pedigree_path)
         else:
             return None, False
         
@@ -607,7 +596,7 @@ class IndexCalculation(BaseCowCalculation):
                 # 尝试找到detail文件
                 detail_path = output_path.parent / "processed_cow_data_key_traits_detail.xlsx"
                 if detail_path.exists():
-                    detail_df = pd.read_excel(detail_path)
+                    detail_df = read_dataset(detail_path)
                     # 只保留需要的列
                     if 'cow_id' in detail_df.columns:
                         original_sources['cow_id'] = detail_df['cow_id']
@@ -714,6 +703,7 @@ class IndexCalculation(BaseCowCalculation):
                     cell.font = yellow_font
                     cell.fill = gray_fill
 
+            save_columnar_copy(df, output_path)
             print(f"文件已保存并格式化: {output_path}")
             return True
 
@@ -751,7 +741,7 @@ class IndexCalculation(BaseCowCalculation):
                     # 使用save_with_formatting应用格式
                     return self.save_with_formatting(df, output_path)
                 else:
-                    df.to_excel(output_path, index=False)
+                    write_dataset(df, output_path)
                     return True
             except PermissionError:
                 if _is_main_thread():
@@ -775,7 +765,7 @@ class IndexCalculation(BaseCowCalculation):
                             if 'cow_id' in df.columns:
                                 df = df.copy()
                                 df['cow_id'] = df['cow_id'].astype(str)
-                            df.to_excel(output_path, index=False)
+                            write_dataset(df, output_path)
                             return True
                         except PermissionError:
                             continue
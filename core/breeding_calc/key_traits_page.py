@@ -18,10 +18,12 @@ from sqlalchemy import create_engine, text
 import datetime
 from pathlib import Path
 from sklearn.linear_model import LinearRegression
-import shutil
 
 from core.breeding_calc.traits_calculation import TraitsCalculation
 from core.data.update_manager import LOCAL_DB_PATH
+from core.data.dataset_io import (
+    copy_dataset, read_dataset, save_columnar_copy, write_dataset, write_dataset_sheets
+)
 from gui.progress import ProgressDialog
 
 # 复用已有的性状翻译字典
@@ -350,6 +352,8 @@ class KeyTraitsPage(QWidget):
                             cell.font = yellow_font
                             cell.fill = black_fill
 
+        save_columnar_copy(df_to_save, output_path)
+
     def save_results_with_retry(self, df, output_path, apply_formatting=True):
         """尝试保存结果，如果文件被占用提示用户并重试
 
@@ -364,7 +368,7 @@ class KeyTraitsPage(QWidget):
                     # 使用ExcelWriter应用格式
                     self.save_with_formatting(df, output_path)
                 else:
-                    df.to_excel(output_path, index=False)
+                    write_dataset(df, output_path)
                 print(f"结果已保存到: {output_path}")
                 return True
             except PermissionError:
@@ -482,7 +486,7 @@ class KeyTraitsPage(QWidget):
             if isinstance(data_source, pd.DataFrame):
                 df = data_source.copy()
             else:
-                df = pd.read_excel(data_source)
+                df = read_dataset(data_source)
             
             # 2. 获取出生年份范围
             min_year = df['birth_year'].min()
@@ -603,9 +607,8 @@ class KeyTraitsPage(QWidget):
                 output_path = Path(output_path)
             while True:
                 try:
-                    with pd.ExcelWriter(output_path) as writer:
-                        for trait, data in results.items():
-                            data.to_excel(writer, sheet_name=trait, index=False)
+                    # 年度数据只在计算内部使用，只保存副本不导出xlsx
+                    write_dataset_sheets(results, output_path, excel=False)
                     print("年度关键性状数据处理完成")
                     break
                 except PermissionError:
@@ -640,7 +643,7 @@ class KeyTraitsPage(QWidget):
                 raise FileNotFoundError("请先上传并处理母牛数据")
             
             print("开始读取母牛数据...")
-            cow_df = pd.read_excel(cow_data_path)
+            cow_df = read_dataset(cow_data_path)
             
             # 添加birth_year列
             cow_df['birth_year'] = pd.to_datetime(cow_df['birth_date']).dt.year
@@ -786,7 +789,7 @@ class KeyTraitsPage(QWidget):
 
                 if source_path:
                     # 复制为final文件
-                    shutil.copy(source_path, final_output_path)
+                    copy_dataset(source_path, final_output_path)
                     print(f"✓ 已生成最终育种值文件: processed_cow_data_key_traits_final.xlsx (来源: {source_type})")
             except Exception as e:
                 print(f"生成最终育种值文件失败: {e}")
@@ -826,7 +829,7 @@ class KeyTraitsPage(QWidget):
         try:
             # 1. 读取详细数据文件和年度数据文件
             print("读取详细数据文件...")
-            df = pd.read_excel(detail_path)
+            df = read_dataset(detail_path)
             print(f"已读取 detail_path: {detail_path}")
             
             # 打印所有 sire_, mgs_, mmgs_ 相关列的数据类型
@@ -859,16 +862,15 @@ class KeyTraitsPage(QWidget):
             # 4. 读取所有年度数据到字典中
             print("读取年度数据...")
             yearly_data = {}
-            with pd.ExcelFile(yearly_path) as xls:
-                for trait in self.get_selected_traits():
-                    yearly_data[trait] = pd.read_excel(xls, sheet_name=trait)
-                    # 将birth_year设为索引以便快速查找
-                    yearly_data[trait].set_index('birth_year', inplace=True)
-                    # 记录可用的年份范围
-                    print(f"性状 {trait} 的年度数据范围: {yearly_data[trait].index.min()} - {yearly_data[trait].index.max()}")
-                    # 打印该性状的 yearly_data[trait]
-                    print(f"Yearly data for {trait}:")
-                    print(yearly_data[trait])           
+            for trait in self.get_selected_traits():
+                yearly_data[trait] = read_dataset(yearly_path, sheet_name=trait)
+                # 将birth_year设为索引以便快速查找
+                yearly_data[trait].set_index('birth_year', inplace=True)
+                # 记录可用的年份范围
+                print(f"性状 {trait} 的年度数据范围: {yearly_data[trait].index.min()} - {yearly_data[trait].index.max()}")
+                # 打印该性状的 yearly_data[trait]
+                print(f"Yearly data for {trait}:")
+                print(yearly_data[trait])           
             print(f"已读取 yearly_path: {yearly_path}")
 
 
@@ -1030,10 +1032,10 @@ class KeyTraitsPage(QWidget):
         
         try:
             # 1. 读取系谱计算的得分文件
-            df_pedigree = pd.read_excel(pedigree_path)
+            df_pedigree = read_dataset(pedigree_path)
             
             # 2. 读取基因组数据
-            df_genomic = pd.read_excel(genomic_path)
+            df_genomic = read_dataset(genomic_path)
             
             # 3. 为所有性状得分添加来源列，默认为"P"(系谱)
             score_columns = [col for col in df_pedigree.columns if col.endswith('_score')]
@@ -1171,7 +1173,7 @@ class KeyTraitsPage(QWidget):
 
             # 读取备选公牛数据
             try:
-                bull_df = pd.read_excel(bull_data_path)
+                bull_df = read_dataset(bull_data_path)
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"读取备选公牛数据文件失败：{str(e)}")
                 return
@@ -6,9 +6,10 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt
 import pandas as pd
-import sqlite3
 from core.data.update_manager import LOCAL_DB_PATH
+from core.data.bull_table import get_bull_table, BY_NAAB, BY_REG
 from core.breeding_calc.cow_traits_calc import TRAITS_TRANSLATION
+from core.data.dataset_io import read_dataset, write_dataset
 from gui.progress import ProgressDialog
 
 class MatedBullKeyTraitsPage(QWidget):
@@ -226,7 +227,7 @@ class MatedBullKeyTraitsPage(QWidget):
                 QMessageBox.warning(self, "警告", "未找到已标准化的配种记录")
                 return
             
-            breeding_df = pd.read_excel(breeding_data_path)
+            breeding_df = read_dataset(breeding_data_path)
             breeding_df['配种年份'] = pd.to_datetime(breeding_df['配种日期']).dt.year
             print(f"读取到 {len(breeding_df)} 条配种记录")
 
@@ -265,66 +266,45 @@ class MatedBullKeyTraitsPage(QWidget):
 
                 progress_dialog.set_task_info("数据库下载完成")
 
-            # 使用sqlite3直接连接
-            conn = sqlite3.connect(LOCAL_DB_PATH)
-            try:
-                # 检查bull_library表是否存在
-                cursor = conn.cursor()
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='bull_library'")
-                if not cursor.fetchone():
-                    conn.close()
-                    progress_dialog.close()
-                    QMessageBox.critical(self, "错误",
-                        "数据库中缺少bull_library表。\n"
-                        "请点击菜单栏的'数据库更新'来更新数据库。")
-                    return
+            # 检查bull_library表是否存在
+            from core.data.bull_library_downloader import has_bull_records
+            if not has_bull_records(LOCAL_DB_PATH):
+                progress_dialog.close()
+                QMessageBox.critical(self, "错误",
+                    "数据库中缺少bull_library表。\n"
+                    "请点击菜单栏的'数据库更新'来更新数据库。")
+                return
 
-                traits_data = []
-                
-                # 处理短ID公牛
-                if len(short_ids) > 0:
-                    progress_dialog.set_task_info("处理短ID公牛")
-                    progress_dialog.update_progress(40)
-                    
-                    # 为每个ID创建参数名
-                    param_names = [f':id{i}' for i in range(len(short_ids))]
-                    params_dict = {f'id{i}': id_val for i, id_val in enumerate(short_ids)}
-                    
-                    # 构建查询语句
-                    placeholders = ','.join(['?' for _ in short_ids])
-                    naab_query = f"""SELECT `BULL NAAB` as bull_id, {
-                        ','.join(f'`{trait}`' for trait in selected_traits)
-                        } FROM bull_library WHERE `BULL NAAB` IN ({placeholders})"""
-
-                    naab_df = pd.read_sql(naab_query, conn, params=list(short_ids))
-                    traits_data.append(naab_df)
-                    print(f"获取到 {len(naab_df)} 个短ID公牛的性状数据")
-                
-                # 处理长ID公牛
-                if len(long_ids) > 0:
-                    progress_dialog.set_task_info("处理长ID公牛")
-                    progress_dialog.update_progress(60)
-                    
-                    # 为每个ID创建参数名
-                    param_names = [f':id{i}' for i in range(len(long_ids))]
-                    params_dict = {f'id{i}': id_val for i, id_val in enumerate(long_ids)}
-                    
-                    # 构建查询语句
-                    placeholders = ','.join(['?' for _ in long_ids])
-                    reg_query = f"""SELECT `BULL REG` as bull_id, {
-                        ','.join(f'`{trait}`' for trait in selected_traits)
-                        } FROM bull_library WHERE `BULL REG` IN ({placeholders})"""
-
-                    reg_df = pd.read_sql(reg_query, conn, params=list(long_ids))
-                    traits_data.append(reg_df)
-                    print(f"获取到 {len(reg_df)} 个长ID公牛的性状数据")
-
-                if traits_data:
-                    bull_traits_df = pd.concat(traits_data, ignore_index=True)
-                else:
-                    bull_traits_df = pd.DataFrame(columns=['bull_id'] + selected_traits)
-            finally:
-                conn.close()
+            # 进程内公牛列式表：短ID按 BULL NAAB、长ID按 BULL REG 取行
+            table = get_bull_table(LOCAL_DB_PATH)
+            traits_data = []
+
+            # 处理短ID公牛
+            if len(short_ids) > 0:
+                progress_dialog.set_task_info("处理短ID公牛")
+                progress_dialog.update_progress(40)
+
+                naab_df = table.frame(short_ids, selected_traits, by=BY_NAAB)
+                naab_df.insert(0, 'bull_id', list(short_ids))
+                naab_df = naab_df[naab_df.pop('found')]
+                traits_data.append(naab_df)
+                print(f"获取到 {len(naab_df)} 个短ID公牛的性状数据")
+
+            # 处理长ID公牛
+            if len(long_ids) > 0:
+                progress_dialog.set_task_info("处理长ID公牛")
+                progress_dialog.update_progress(60)
+
+                reg_df = table.frame(long_ids, selected_traits, by=BY_REG)
+                reg_df.insert(0, 'bull_id', list(long_ids))
+                reg_df = reg_df[reg_df.pop('found')]
+                traits_data.append(reg_df)
+                print(f"获取到 {len(reg_df)} 个长ID公牛的性状数据")
+
+            if traits_data:
+                bull_traits_df = pd.concat(traits_data, ignore_index=True)
+            else:
+                bull_traits_df = pd.DataFrame(columns=['bull_id'] + selected_traits)
 
             # 4. 通过merge一次性关联数据
             progress_dialog.set_task_info("合并数据")
@@ -343,7 +323,7 @@ class MatedBullKeyTraitsPage(QWidget):
             progress_dialog.update_progress(90)
             
             output_path = main_window.selected_project_path / "analysis_results" / "processed_mated_bull_traits.xlsx"
-            result_df.to_excel(output_path, index=False)
+            write_dataset(result_df, output_path)
             
             progress_dialog.update_progress(100)
             progress_dialog.close()
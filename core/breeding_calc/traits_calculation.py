@@ -12,6 +12,11 @@ from openpyxl import load_workbook
 from openpyxl.styles import Font, PatternFill
 
 from .base_calculation import BaseCowCalculation
+from core.data.dataset_io import (
+    copy_dataset, read_dataset, save_columnar_copy, write_dataset, write_dataset_sheets
+)
+from core.data.bull_table import get_bull_table, BY_NAAB, BY_REG
+from core.data.update_manager import LOCAL_DB_PATH
 
 class TraitsCalculation(BaseCowCalculation):
     def __init__(self):
@@ -208,7 +213,6 @@ class TraitsCalculation(BaseCowCalculation):
                     progress_callback(99, f"基因组文件已创建（仅系谱数据）: {genomic_output_path.name}")
 
             # 10. 生成最终育种值文件
-            import shutil
             try:
                 print("生成最终育种值文件...")
                 genomic_scores_path = main_window.selected_project_path / "analysis_results" / "processed_cow_data_key_traits_scores_genomic.xlsx"
@@ -216,10 +220,10 @@ class TraitsCalculation(BaseCowCalculation):
                 final_output_path = main_window.selected_project_path / "analysis_results" / "processed_cow_data_key_traits_final.xlsx"
 
                 if genomic_scores_path.exists():
-                    shutil.copy(genomic_scores_path, final_output_path)
+                    copy_dataset(genomic_scores_path, final_output_path)
                     print(f"✓ 已生成最终育种值文件 (来源: genomic)")
                 elif pedigree_scores_path.exists():
-                    shutil.copy(pedigree_scores_path, final_output_path)
+                    copy_dataset(pedigree_scores_path, final_output_path)
                     print(f"✓ 已生成最终育种值文件 (来源: pedigree)")
                 else:
                     print("未找到scores文件，跳过生成final文件")
@@ -261,7 +265,7 @@ class TraitsCalculation(BaseCowCalculation):
         """处理年度关键性状数据"""
         try:
             # 读取详细数据
-            df = pd.read_excel(detail_path)
+            df = read_dataset(detail_path)
             
             # 检查birth_year列是否存在
             if 'birth_year' not in df.columns:
@@ -542,11 +546,9 @@ class TraitsCalculation(BaseCowCalculation):
         return default_values
 
     def save_yearly_results(self, results: dict, output_path: Path) -> bool:
-        """保存年度结果"""
+        """保存年度结果（只在计算内部使用，只保存副本不导出xlsx）"""
         try:
-            with pd.ExcelWriter(output_path) as writer:
-                for trait, data in results.items():
-                    data.to_excel(writer, sheet_name=trait, index=False)
+            write_dataset_sheets(results, output_path, excel=False)
             return True
         except Exception as e:
             print(f"保存年度结果失败: {e}")
@@ -565,7 +567,7 @@ class TraitsCalculation(BaseCowCalculation):
             selected_traits: 选择的性状列表（用于确保生成所有性状的得分）
         """
         try:
-            df = pd.read_excel(detail_path)
+            df = read_dataset(detail_path)
 
             # 处理日期列
             date_columns = ['birth_date', 'birth_date_dam', 'birth_date_mgd']
@@ -577,11 +579,9 @@ class TraitsCalculation(BaseCowCalculation):
             df['mgd_birth_year'] = df['birth_date_mgd'].dt.year
 
             # 读取年度数据
-            yearly_data = {}
-            with pd.ExcelFile(yearly_path) as xls:
-                for sheet in xls.sheet_names:
-                    yearly_data[sheet] = pd.read_excel(xls, sheet_name=sheet)
-                    yearly_data[sheet].set_index('birth_year', inplace=True)
+            yearly_data = read_dataset(yearly_path, sheet_name=None)
+            for sheet in yearly_data:
+                yearly_data[sheet].set_index('birth_year', inplace=True)
 
             # 必需的性状（用于生成正态分布图）
             required_traits = ['NM$', 'TPI']
@@ -688,11 +688,9 @@ class TraitsCalculation(BaseCowCalculation):
                 df['mgd_birth_year'] = df['birth_date_mgd'].dt.year if 'birth_date_mgd' in df.columns else None
 
             # 读取年度数据
-            yearly_data = {}
-            with pd.ExcelFile(yearly_path) as xls:
-                for sheet in xls.sheet_names:
-                    yearly_data[sheet] = pd.read_excel(xls, sheet_name=sheet)
-                    yearly_data[sheet].set_index('birth_year', inplace=True)
+            yearly_data = read_dataset(yearly_path, sheet_name=None)
+            for sheet in yearly_data:
+                yearly_data[sheet].set_index('birth_year', inplace=True)
 
             # 必需的性状（用于生成正态分布图）
             required_traits = ['NM$', 'TPI']
@@ -832,10 +830,10 @@ class TraitsCalculation(BaseCowCalculation):
         """用基因组数据更新关键性状得分 - 优化版本，使用向量化操作替代循环"""
         try:
             # 1. 读取系谱数据文件
-            df_pedigree = pd.read_excel(pedigree_path)
+            df_pedigree = read_dataset(pedigree_path)
 
             # 2. 读取基因组数据
-            df_genomic = pd.read_excel(genomic_path)
+            df_genomic = read_dataset(genomic_path)
 
             # 打印基因组数据的列名以便调试
             print(f"基因组数据列名: {df_genomic.columns.tolist()[:30]}...")  # 打印前30个
@@ -951,31 +949,10 @@ class TraitsCalculation(BaseCowCalculation):
                 reg_ids.append(bid_str)
 
         try:
-            with self.db_engine.connect() as conn:
-                # 分批查询，避免SQL IN子句过长（每批500个）
-                batch_size = 500
-
-                for batch_start in range(0, len(naab_ids), batch_size):
-                    batch = naab_ids[batch_start:batch_start + batch_size]
-                    placeholders = ','.join([f':id_{i}' for i in range(len(batch))])
-                    params = {f'id_{i}': bid for i, bid in enumerate(batch)}
-                    sql = text(f"SELECT * FROM bull_library WHERE `BULL NAAB` IN ({placeholders})")
-                    results = conn.execute(sql, params).fetchall()
-                    for row in results:
-                        row_dict = dict(row._mapping)
-                        bull_id_key = str(row_dict.get('BULL NAAB', ''))
-                        bull_traits[bull_id_key] = {trait: row_dict.get(trait) for trait in selected_traits}
-
-                for batch_start in range(0, len(reg_ids), batch_size):
-                    batch = reg_ids[batch_start:batch_start + batch_size]
-                    placeholders = ','.join([f':id_{i}' for i in range(len(batch))])
-                    params = {f'id_{i}': bid for i, bid in enumerate(batch)}
-                    sql = text(f"SELECT * FROM bull_library WHERE `BULL REG` IN ({placeholders})")
-                    results = conn.execute(sql, params).fetchall()
-                    for row in results:
-                        row_dict = dict(row._mapping)
-                        bull_id_key = str(row_dict.get('BULL REG', ''))
-                        bull_traits[bull_id_key] = {trait: row_dict.get(trait) for trait in selected_traits}
+            # 进程内列式表按公牛号取行，向量化读取各性状
+            table = get_bull_table(LOCAL_DB_PATH)
+            bull_traits.update(table.records(naab_ids, selected_traits, by=BY_NAAB))
+            bull_traits.update(table.records(reg_ids, selected_traits, by=BY_REG))
 
         except Exception as e:
             print(f"批量获取公牛性状数据时发生错误: {e}")
@@ -998,27 +975,12 @@ class TraitsCalculation(BaseCowCalculation):
                 return None
                 
             bull_id = str(bull_id)  # 确保ID是字符串
-            with self.db_engine.connect() as conn:
-                # 先尝试用 BULL NAAB 查询
-                if len(bull_id) <= 10:
-                    result = conn.execute(
-                        text("SELECT * FROM bull_library WHERE `BULL NAAB`=:bull_id"),
-                        {"bull_id": bull_id}
-                    ).fetchone()
-                else:
-                    # 对于长ID，使用 BULL REG 查询
-                    result = conn.execute(
-                        text("SELECT * FROM bull_library WHERE `BULL REG`=:bull_id"),
-                        {"bull_id": bull_id}
-                    ).fetchone()
-                
-                if result:
-                    # 如果找到了公牛，提取所选性状数据
-                    result_dict = dict(result._mapping)
-                    return {trait: result_dict.get(trait) for trait in selected_traits}
-                    
-                return None
-                
+            # 短ID用 BULL NAAB 查询，长ID用 BULL REG 查询
+            records = get_bull_table(LOCAL_DB_PATH).records(
+                [bull_id], selected_traits, by=BY_NAAB if len(bull_id) <= 10 else BY_REG
+            )
+            return records.get(bull_id)
+
         except Exception as e:
             print(f"获取公牛 {bull_id} 的性状数据时发生错误: {e}")
             return None
@@ -1036,7 +998,7 @@ class TraitsCalculation(BaseCowCalculation):
         """
         try:
             # 读取系谱数据
-            df_pedigree = pd.read_excel(pedigree_path)
+            df_pedigree = read_dataset(pedigree_path)
 
             # 如果没有source列，添加它们
             score_columns = [col for col in df_pedigree.columns if col.endswith('_score')]
@@ -1070,11 +1032,11 @@ class TraitsCalculation(BaseCowCalculation):
 
             # 读取年度数据并创建年份到均值的映射字典
             yearly_mean_maps = {}  # {trait: {year: mean}}
-            with pd.ExcelFile(yearly_data_path) as xlsx:
-                for trait in selected_traits:
-                    if trait in xlsx.sheet_names:
-                        yearly_df = pd.read_excel(xlsx, sheet_name=trait, index_col='birth_year')
-                        yearly_mean_maps[trait] = yearly_df['mean'].to_dict()
+            yearly_sheets = read_dataset(yearly_data_path, sheet_name=None)
+            for trait in selected_traits:
+                if trait in yearly_sheets:
+                    yearly_df = yearly_sheets[trait].set_index('birth_year')
+                    yearly_mean_maps[trait] = yearly_df['mean'].to_dict()
 
             # 获取默认值（999HO99999的值）
             default_values = self.get_default_values(selected_traits)
@@ -1201,6 +1163,7 @@ class TraitsCalculation(BaseCowCalculation):
                                 cell.font = yellow_font
                                 cell.fill = gray_fill
 
+            save_columnar_copy(df, output_path)
             print(f"文件已保存并格式化: {output_path}")
             return True
 
@@ -1238,7 +1201,7 @@ class TraitsCalculation(BaseCowCalculation):
                     # 使用save_with_formatting应用格式
                     return self.save_with_formatting(df, output_path)
                 else:
-                    df.to_excel(output_path, index=False)
+                    write_dataset(df, output_path)
                     return True
             except PermissionError:
                 if _is_main_thread():
@@ -1262,7 +1225,7 @@ class TraitsCalculation(BaseCowCalculation):
                             if 'cow_id' in df.columns:
                                 df = df.copy()
                                 df['cow_id'] = df['cow_id'].astype(str)
-                            df.to_excel(output_path, index=False)
+                            write_dataset(df, output_path)
                             return True
                         except PermissionError:
                             continue
@@ -0,0 +1,225 @@
+"""
+bull_library 只读访问层
+
+公牛库（bull_library.db）按 BULL NAAB / BULL REG 查询的地方很多，原来各自打开连接、拼接 IN 列表、
+SELECT * 全表扫描。本模块统一提供：
+
+- 下载或更新后在 BULL NAAB、BULL REG 上建立索引
+- 只读连接（mmap、较大的页缓存），每个线程一个连接并复用；数据库文件变化后自动重新打开
+  查询在 connection() 块内进行，替换数据库前关闭其他线程的连接时等待其正在进行的查询结束
+- 参数化的批量查询，只读取需要的列
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+NAAB_COLUMN = 'BULL NAAB'
+REG_COLUMN = 'BULL REG'
+
+# 每条语句的参数个数（低于旧版SQLite的999上限）
+BATCH_SIZE = 500
+
+# 只读连接的PRAGMA：内存映射256MB、页缓存64MB
+_READ_PRAGMAS = (
+    "PRAGMA query_only = 1",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA temp_store = MEMORY",
+)
+
+_local = threading.local()
+
+
+class _ReadConnection:
+    """一个线程的只读连接；查询期间持有 lock，其他线程关闭连接前等待查询结束"""
+
+    def __init__(self, conn: sqlite3.Connection, signature):
+        self.conn = conn
+        self.signature = signature
+        self.lock = threading.RLock()
+        self.closed = False
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+
+
+# 所有线程打开的连接，数据库替换前统一关闭
+_connections: Dict[int, _ReadConnection] = {}
+_connections_lock = threading.Lock()
+
+
+def _default_db_path() -> Path:
+    from core.data.update_manager import LOCAL_DB_PATH
+    return Path(LOCAL_DB_PATH)
+
+
+def _file_signature(db_path: Path):
+    stat = os.stat(db_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def ensure_indexes(db_path: Union[str, Path] = None) -> bool:
+    """
+    在 BULL NAAB、BULL REG 上建立索引（已存在时不做任何事）
+
+    Args:
+        db_path: 数据库路径，默认为本地公牛库
+
+    Returns:
+        bool: 是否成功
+    """
+    db_path = Path(db_path or _default_db_path())
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_bull_library_naab ON bull_library ("{NAAB_COLUMN}")')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_bull_library_reg ON bull_library ("{REG_COLUMN}")')
+            conn.commit()
+        finally:
+            conn.close()
+        return True
+    except Exception as e:
+        logger.warning(f"创建bull_library索引失败: {e}")
+        return False
+
+
+def _thread_connection(db_path: Path) -> _ReadConnection:
+    """当前线程的只读连接，未打开、已被关闭或数据库文件变化时重新打开"""
+    key = str(db_path.resolve())
+    signature = _file_signature(db_path)
+
+    cache = getattr(_local, 'connections', None)
+    if cache is None:
+        cache = _local.connections = {}
+    entry = cache.get(key)
+    if entry is not None:
+        if entry.signature == signature and not entry.closed:
+            return entry
+        _discard(entry)
+
+    conn = sqlite3.connect(db_path.resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    for pragma in _READ_PRAGMAS:
+        conn.execute(pragma)
+    entry = _ReadConnection(conn, signature)
+    with _connections_lock:
+        _connections[id(entry)] = entry
+    cache[key] = entry
+    return entry
+
+
+def _discard(entry: _ReadConnection):
+    with _connections_lock:
+        _connections.pop(id(entry), None)
+    entry.close()
+
+
+@contextmanager
+def connection(db_path: Union[str, Path] = None) -> Iterator[sqlite3.Connection]:
+    """
+    在当前线程的只读连接上查询
+
+    同一线程内复用连接；数据库文件被替换或更新（修改时间、大小变化）后重新打开。
+    查询结果需在块内取完，离开块后连接可能被 close_all_connections 关闭。
+
+    Args:
+        db_path: 数据库路径，默认为本地公牛库
+
+    Yields:
+        sqlite3.Connection: 只读连接（row_factory 为 sqlite3.Row）
+    """
+    db_path = Path(db_path or _default_db_path())
+    while True:
+        entry = _thread_connection(db_path)
+        with entry.lock:
+            # 取得锁之前可能已被其他线程关闭，此时重新打开
+            if not entry.closed:
+                yield entry.conn
+                return
+
+
+def close_all_connections():
+    """
+    关闭所有线程的只读连接（替换或更新数据库文件前调用，各线程下次查询时重新打开）
+
+    其他线程正在查询的连接等查询结束后再关闭，不会中断查询。
+    """
+    with _connections_lock:
+        entries = list(_connections.values())
+        _connections.clear()
+    for entry in entries:
+        entry.close()
+
+
+def _table_columns(conn: sqlite3.Connection) -> List[str]:
+    return [row[1] for row in conn.execute("PRAGMA table_info(bull_library)")]
+
+
+def table_columns(db_path: Union[str, Path] = None) -> List[str]:
+    """bull_library表的列名"""
+    with connection(db_path) as conn:
+        return _table_columns(conn)
+
+
+def lookup_bulls(
+    bull_ids: Iterable[str],
+    columns: Sequence[str],
+    key_columns: Sequence[str] = (NAAB_COLUMN, REG_COLUMN),
+    db_path: Union[str, Path] = None
+) -> List[dict]:
+    """
+    按公牛号批量查询
+
+    Args:
+        bull_ids: 公牛号
+        columns: 需要的列（表中不存在的列忽略，结果中不含该键）
+        key_columns: 匹配的列，任一列等于公牛号即命中
+        db_path: 数据库路径，默认为本地公牛库
+
+    Returns:
+        List[dict]: 命中的行（每行只出现一次），包含 key_columns 与 columns 中存在的列
+    """
+    ids = list(dict.fromkeys(str(bid) for bid in bull_ids if bid is not None))
+    if not ids:
+        return []
+
+    rows = {}
+    with connection(db_path) as conn:
+        existing = set(_table_columns(conn))
+        selected = [column for column in dict.fromkeys([*key_columns, *columns]) if column in existing]
+        column_list = ", ".join(f'"{column}"' for column in selected)
+
+        for key_column in key_columns:
+            for start in range(0, len(ids), BATCH_SIZE):
+                batch = ids[start:start + BATCH_SIZE]
+                placeholders = ", ".join("?" for _ in batch)
+                sql = f'SELECT rowid AS _rowid, {column_list} FROM bull_library WHERE "{key_column}" IN ({placeholders})'
+                for row in conn.execute(sql, batch):
+                    rows.setdefault(row['_rowid'], row)
+
+    return [{column: row[column] for column in selected} for _, row in sorted(rows.items())]
+
+
+def lookup_bull(
+    bull_id: str,
+    columns: Sequence[str],
+    key_columns: Sequence[str] = (NAAB_COLUMN, REG_COLUMN),
+    db_path: Union[str, Path] = None
+) -> Optional[dict]:
+    """按公牛号查询一行（多行命中时取第一行），未找到返回None"""
+    rows = lookup_bulls([bull_id], columns, key_columns, db_path)
+    return rows[0] if rows else None
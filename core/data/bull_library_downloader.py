@@ -7,14 +7,26 @@ import logging
 import sqlite3
 import requests
 from pathlib import Path
-from typing import Optional, Callable, Tuple
+from typing import Optional, Callable, Tuple, List
+import gzip
+import hashlib
 import json
 import pandas as pd
 import sys
 import os
+import time
+
+from core.data.bull_library_access import close_all_connections, ensure_indexes
 
 logger = logging.getLogger(__name__)
 
+# OSS上公牛库发布目录：完整数据库、版本文件、增量包（deltas/）
+OSS_BULL_LIBRARY_URL = "https://genetic-improve.oss-cn-beijing.aliyuncs.com/releases/bull_library"
+
+# 增量包以BULL REG为键：同一BULL REG的所有行整体替换
+DELTA_KEY_COLUMN = 'BULL REG'
+DELTA_FORMAT = 1
+
 def check_bundled_database() -> Optional[Path]:
     """
     检查是否存在打包的预装数据库
@@ -119,27 +131,95 @@ def save_local_db_version(local_db_path: Path, version: str):
     except Exception as e:
         logger.error(f"保存本地版本失败: {e}")
 
-def check_oss_version() -> Optional[str]:
+def get_oss_version_info() -> Optional[dict]:
     """
-    检查OSS上的数据库版本
+    获取OSS上的数据库版本信息
+
+    版本文件除 version 外还可包含：
+        sha256 / size: 完整数据库文件的SHA-256与字节数（校验完整下载）
+        content_hash: bull_library表的内容哈希（校验增量更新结果，见 compute_content_hash）
+        deltas: 增量包列表 [{'from': 旧版本, 'to': 新版本, 'file': 文件名, 'sha256': ..., 'size': ...}]
 
     Returns:
-        Optional[str]: OSS上的版本号，如果获取失败则返回None
+        Optional[dict]: 版本信息，获取失败则返回None
     """
     try:
-        version_url = "https://genetic-improve.oss-cn-beijing.aliyuncs.com/releases/bull_library/bull_library_version.json"
+        version_url = f"{OSS_BULL_LIBRARY_URL}/bull_library_version.json"
         response = requests.get(version_url, timeout=10)
         response.raise_for_status()
 
         data = response.json()
-        version = data.get('version')
-        logger.info(f"OSS数据库版本: {version}")
-        return version
+        logger.info(f"OSS数据库版本: {data.get('version')}")
+        return data
 
     except Exception as e:
         logger.warning(f"获取OSS版本失败: {e}")
         return None
 
+def check_oss_version() -> Optional[str]:
+    """
+    检查OSS上的数据库版本
+
+    Returns:
+        Optional[str]: OSS上的版本号，如果获取失败则返回None
+    """
+    version_info = get_oss_version_info()
+    return version_info.get('version') if version_info else None
+
+def has_bull_records(db_path: Path) -> bool:
+    """检查数据库是否包含非空的bull_library表（只读取一行，不做全表计数）"""
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='bull_library'")
+        if not cursor.fetchone():
+            return False
+        cursor.execute("SELECT 1 FROM bull_library LIMIT 1")
+        return cursor.fetchone() is not None
+    finally:
+        conn.close()
+
+def compute_content_hash(conn: sqlite3.Connection) -> str:
+    """
+    计算bull_library表的内容哈希
+
+    逐行序列化后取SHA-256，各行哈希按 2^256 取模求和，与行的物理顺序和数据库文件布局无关；
+    增量更新后的数据库与发布端的完整数据库内容相同时哈希一致。
+
+    Args:
+        conn: 数据库连接
+
+    Returns:
+        str: 十六进制哈希（含列名与行数）
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(bull_library)")]
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    total = 0
+    count = 0
+    for row in conn.execute(f"SELECT {column_list} FROM bull_library"):
+        encoded = json.dumps(row, ensure_ascii=False, separators=(',', ':'), default=_encode_value)
+        total += int.from_bytes(hashlib.sha256(encoded.encode('utf-8')).digest(), 'big')
+        count += 1
+    digest = hashlib.sha256()
+    digest.update(json.dumps(columns, ensure_ascii=False).encode('utf-8'))
+    digest.update(str(count).encode('ascii'))
+    digest.update((total % (1 << 256)).to_bytes(32, 'big'))
+    return digest.hexdigest()
+
+def _encode_value(value):
+    """序列化json不支持的列值（BLOB）"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+def file_sha256(path: Path) -> str:
+    """计算文件的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 def download_bull_library(
     local_db_path: Path,
     progress_callback: Optional[Callable] = None,
@@ -148,6 +228,9 @@ def download_bull_library(
     """
     下载bull_library数据库
 
+    本地已有旧版本且OSS提供了从该版本出发的增量包时，只下载增量包并在事务中应用；
+    否则（或增量更新失败时）下载完整数据库。
+
     Args:
         local_db_path: 本地数据库路径
         progress_callback: 进度回调函数 (progress: int, message: str)
@@ -163,8 +246,10 @@ def download_bull_library(
         if progress_callback:
             progress_callback(5, "正在检查数据库版本...")
 
-        # 保存OSS版本，供后续使用
-        oss_version_to_save = None
+        # 保存OSS版本信息，供后续使用
+        oss_version_info = None
+        # 可增量更新的本地版本
+        delta_base_version = None
 
         # 检查是否需要下载
         if not force_download:
@@ -175,26 +260,18 @@ def download_bull_library(
             if local_db_path.exists():
                 if local_version:
                     # 检查OSS版本
-                    oss_version = check_oss_version()
-                    oss_version_to_save = oss_version  # 保存供后续使用
+                    oss_version_info = get_oss_version_info()
+                    oss_version = oss_version_info.get('version') if oss_version_info else None
 
                     if oss_version and oss_version == local_version:
                         # 验证数据库完整性
                         try:
-                            conn = sqlite3.connect(local_db_path)
-                            cursor = conn.cursor()
-                            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='bull_library'")
-                            if cursor.fetchone():
-                                cursor.execute("SELECT COUNT(*) FROM bull_library")
-                                count = cursor.fetchone()[0]
-                                conn.close()
-
-                                if count > 0:
-                                    logger.info(f"数据库已是最新版本 {local_version}，包含{count}条记录")
-                                    if progress_callback:
-                                        progress_callback(100, f"数据库已是最新版本 ({count:,}条记录)")
-                                    return True, f"数据库已是最新版本 {local_version}", False  # 没有更新
-                            conn.close()
+                            if has_bull_records(local_db_path):
+                                ensure_indexes(local_db_path)
+                                logger.info(f"数据库已是最新版本 {local_version}")
+                                if progress_callback:
+                                    progress_callback(100, f"数据库已是最新版本 {local_version}")
+                                return True, f"数据库已是最新版本 {local_version}", False  # 没有更新
                         except Exception as e:
                             logger.warning(f"数据库验证失败: {e}")
 
@@ -202,6 +279,7 @@ def download_bull_library(
                         logger.info(f"发现新版本: {oss_version} (当前: {local_version})，开始更新...")
                         if progress_callback:
                             progress_callback(5, f"发现新版本 {oss_version}，开始更新...")
+                        delta_base_version = local_version
                         # 继续执行下载流程
                 else:
                     logger.info("数据库存在但没有版本信息，将重新下载")
@@ -213,8 +291,18 @@ def download_bull_library(
                     logger.info("首次下载数据库")
 
         # 如果之前没有获取版本（比如强制下载或首次下载），现在获取
-        if not oss_version_to_save:
-            oss_version_to_save = check_oss_version()
+        if not oss_version_info:
+            oss_version_info = get_oss_version_info()
+        oss_version_to_save = oss_version_info.get('version') if oss_version_info else None
+
+        # 优先增量更新
+        if delta_base_version and oss_version_info:
+            success, msg = apply_oss_deltas(local_db_path, delta_base_version, oss_version_info, progress_callback)
+            if success:
+                save_local_db_version(local_db_path, oss_version_to_save)
+                logger.info(f"版本信息已保存: {oss_version_to_save}")
+                return True, msg, True  # 有更新
+            logger.info(f"增量更新不可用（{msg}），改为下载完整数据库")
 
         logger.info(f"开始下载bull_library数据库到: {local_db_path}")
 
@@ -225,7 +313,7 @@ def download_bull_library(
         if progress_callback:
             progress_callback(20, "正在准备下载数据库...")
 
-        success, msg = download_from_oss(local_db_path, progress_callback)
+        success, msg = download_from_oss(local_db_path, progress_callback, oss_version_info)
 
         if success:
             # 保存版本信息（使用之前获取的版本）
@@ -244,90 +332,122 @@ def download_bull_library(
         logger.error(error_msg)
         return False, error_msg, False
 
-def download_from_oss(
-    local_db_path: Path,
-    progress_callback: Optional[Callable] = None
+def download_file(
+    url: str,
+    target_path: Path,
+    progress_callback: Optional[Callable] = None,
+    progress_range: Tuple[int, int] = (30, 90),
+    expected_sha256: Optional[str] = None,
+    expected_size: Optional[int] = None,
+    max_retries: int = 3
 ) -> Tuple[bool, str]:
     """
-    从OSS下载数据库
+    下载文件（支持断点续传）
+
+    数据先写入 <target>.part，中断后（包括重试与下次启动）用HTTP Range从已下载的位置继续，
+    并以 If-Range 携带首次响应的ETag：服务器文件已变化时返回完整内容、重新下载。
+    下载完成并通过大小/SHA-256校验后才替换目标文件。
 
     Args:
-        local_db_path: 本地数据库路径
+        url: 下载地址
+        target_path: 目标文件路径
         progress_callback: 进度回调函数
+        progress_range: 下载阶段占用的进度区间
+        expected_sha256: 期望的SHA-256（None表示不校验）
+        expected_size: 期望的字节数（None表示不校验）
+        max_retries: 网络错误最大重试次数
 
     Returns:
         Tuple[bool, str]: (成功标志, 消息)
     """
-    # OSS地址
-    oss_url = "https://genetic-improve.oss-cn-beijing.aliyuncs.com/releases/bull_library/bull_library.db"
+    part_path = target_path.with_name(target_path.name + '.part')
+    state_path = target_path.with_name(target_path.name + '.part.json')
+    target_path.parent.mkdir(parents=True, exist_ok=True)
 
-    import time
-    max_retries = 3  # 最大重试次数
+    # 续传状态：与本次下载的地址、期望哈希不一致时丢弃已下载的部分
+    state = {}
+    if part_path.exists() and state_path.exists():
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception:
+            state = {}
+    if state.get('url') != url or state.get('sha256') != expected_sha256:
+        state = {'url': url, 'sha256': expected_sha256}
+        part_path.unlink(missing_ok=True)
+
+    start_progress, end_progress = progress_range
     retry_count = 0
 
-    while retry_count < max_retries:
+    while True:
         try:
             if retry_count > 0:
                 logger.info(f"第{retry_count}次重试下载...")
                 if progress_callback:
-                    progress_callback(25, f"第{retry_count}次重试连接...")
+                    progress_callback(start_progress, f"第{retry_count}次重试连接...")
                 time.sleep(2)  # 等待2秒再重试
 
-            logger.info(f"从OSS下载: {oss_url}")
-
-            if progress_callback:
-                progress_callback(30, "正在连接OSS服务器...")
+            downloaded = part_path.stat().st_size if part_path.exists() else 0
+            headers = {}
+            if downloaded > 0:
+                headers['Range'] = f"bytes={downloaded}-"
+                if state.get('etag'):
+                    headers['If-Range'] = state['etag']
+                logger.info(f"从 {downloaded / 1024 / 1024:.1f}MB 处继续下载: {url}")
+            else:
+                logger.info(f"下载: {url}")
 
-            # 使用较长的超时时间，因为文件较大（132MB）
             # 连接超时30秒，读取超时300秒
-            response = requests.get(oss_url, stream=True, timeout=(30, 300))
+            response = requests.get(url, stream=True, timeout=(30, 300), headers=headers)
+
+            if response.status_code == 416 and downloaded > 0:
+                # 已下载部分不小于服务器文件，交给校验判断是否完整
+                response.close()
+                break
             response.raise_for_status()
 
-            # 获取文件大小
-            total_size = int(response.headers.get('content-length', 0))
+            if response.status_code == 206:
+                total_size = downloaded + int(response.headers.get('content-length', 0))
+                mode = 'ab'
+            else:
+                # 服务器不支持续传或文件已变化，从头下载
+                downloaded = 0
+                total_size = int(response.headers.get('content-length', 0))
+                mode = 'wb'
             logger.info(f"文件大小: {total_size / 1024 / 1024:.1f} MB")
 
-            # 确保目录存在
-            local_db_path.parent.mkdir(parents=True, exist_ok=True)
+            state['etag'] = response.headers.get('ETag')
+            with open(state_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
 
-            # 下载并写入文件，使用更大的块大小
-            downloaded = 0
             last_update_time = time.time()
-
-            # 如果文件已经部分下载，删除并重新下载（避免损坏文件）
-            if local_db_path.exists():
-                local_db_path.unlink()
-
-            with open(local_db_path, 'wb') as f:
+            with open(part_path, mode) as f:
                 for chunk in response.iter_content(chunk_size=1024*1024):  # 1MB chunks
                     if chunk:
                         f.write(chunk)
                         downloaded += len(chunk)
 
-                        # 每秒更新一次进度，避免频繁更新UI
+                        # 每0.5秒更新一次进度，避免频繁更新UI
                         current_time = time.time()
                         if progress_callback and total_size > 0 and (current_time - last_update_time) > 0.5:
-                            # 计算下载进度（30%开始，90%结束，留畀10%给验证）
-                            progress = 30 + int((downloaded / total_size) * 60)
-                            # 显示详细进度信息
+                            progress = start_progress + int((downloaded / total_size) * (end_progress - start_progress))
                             mb_downloaded = downloaded / 1024 / 1024
                             mb_total = total_size / 1024 / 1024
-                            progress_callback(progress, f"正在下载数据库... {mb_downloaded:.1f}MB / {mb_total:.1f}MB")
+                            progress_callback(progress, f"正在下载... {mb_downloaded:.1f}MB / {mb_total:.1f}MB")
                             last_update_time = current_time
 
+            if total_size and downloaded < total_size:
+                raise requests.exceptions.ConnectionError(f"连接中断（{downloaded}/{total_size}字节）")
+
             # 下载成功，跳出重试循环
             break
 
-        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                requests.exceptions.ChunkedEncodingError) as e:
             retry_count += 1
-            error_msg = f"网络连接错误: {e}"
-            logger.warning(f"{error_msg}，重试{retry_count}/{max_retries}")
-
-            # 如果还有重试机会，继续循环
-            if retry_count < max_retries:
-                continue
-            else:
-                # 没有重试机会了
+            logger.warning(f"网络连接错误: {e}，重试{retry_count}/{max_retries}")
+            if retry_count >= max_retries:
+                # 保留已下载的部分，下次从断点继续
                 return False, f"下载失败（网络连接问题）: {e}"
 
         except requests.exceptions.HTTPError as e:
@@ -336,54 +456,303 @@ def download_from_oss(
             return False, f"下载失败（HTTP错误）: {e}"
 
         except Exception as e:
-            # 其他错误
             logger.error(f"下载过程出错: {e}")
             return False, f"下载失败: {e}"
 
-    # 如果所有重试都失败
-    if retry_count >= max_retries:
-        return False, f"OSS数据库下载失败，已重试{max_retries}次"
-
-    try:
-        # 验证数据库
+    # 校验
+    actual_size = part_path.stat().st_size if part_path.exists() else 0
+    if expected_size is not None and actual_size != expected_size:
+        logger.error(f"文件大小不符: {actual_size} != {expected_size}")
+        part_path.unlink(missing_ok=True)
+        state_path.unlink(missing_ok=True)
+        return False, "下载的文件大小不符"
+    if expected_sha256:
         if progress_callback:
-            progress_callback(92, "正在验证数据库完整性...")
+            progress_callback(end_progress, "正在校验文件...")
+        actual_sha256 = file_sha256(part_path)
+        if actual_sha256 != expected_sha256:
+            logger.error(f"文件校验失败: {actual_sha256} != {expected_sha256}")
+            part_path.unlink(missing_ok=True)
+            state_path.unlink(missing_ok=True)
+            return False, "下载的文件校验失败"
+
+    os.replace(part_path, target_path)
+    state_path.unlink(missing_ok=True)
+    return True, f"下载完成（{actual_size / 1024 / 1024:.1f}MB）"
 
-        conn = sqlite3.connect(local_db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='bull_library'")
-        if not cursor.fetchone():
-            conn.close()
-            logger.error("下载的数据库缺少bull_library表")
-            # 删除损坏的数据库文件
-            if local_db_path.exists():
-                local_db_path.unlink()
-            return False, "下载的数据库格式错误"
+def download_from_oss(
+    local_db_path: Path,
+    progress_callback: Optional[Callable] = None,
+    version_info: Optional[dict] = None
+) -> Tuple[bool, str]:
+    """
+    从OSS下载完整数据库
 
-        cursor.execute("SELECT COUNT(*) FROM bull_library")
-        count = cursor.fetchone()[0]
-        conn.close()
+    下载支持断点续传；版本信息带有 sha256/size 时按其校验，否则检查bull_library表非空。
+    校验通过后才替换本地数据库，下载失败时原数据库保持不变。
 
-        if count == 0:
-            logger.error("数据库为空")
-            # 删除空数据库
-            if local_db_path.exists():
-                local_db_path.unlink()
-            return False, "下载的数据库为空"
+    Args:
+        local_db_path: 本地数据库路径
+        progress_callback: 进度回调函数
+        version_info: OSS版本信息（get_oss_version_info）
+
+    Returns:
+        Tuple[bool, str]: (成功标志, 消息)
+    """
+    # OSS地址
+    oss_url = f"{OSS_BULL_LIBRARY_URL}/bull_library.db"
+    version_info = version_info or {}
+    download_path = local_db_path.with_name(local_db_path.name + '.download')
+
+    if progress_callback:
+        progress_callback(30, "正在连接OSS服务器...")
 
+    # 文件较大（132MB），断点续传
+    success, msg = download_file(
+        oss_url, download_path, progress_callback, progress_range=(30, 90),
+        expected_sha256=version_info.get('sha256'), expected_size=version_info.get('size')
+    )
+    if not success:
+        return False, msg
+
+    try:
+        # 未发布文件哈希时，至少确认数据库可读且非空
+        if not version_info.get('sha256'):
+            if progress_callback:
+                progress_callback(92, "正在验证数据库完整性...")
+            if not has_bull_records(download_path):
+                logger.error("下载的数据库缺少bull_library表或为空")
+                download_path.unlink(missing_ok=True)
+                return False, "下载的数据库格式错误"
+
+        # 替换前建立查询索引，并关闭各线程对旧文件的只读连接
+        ensure_indexes(download_path)
+        close_all_connections()
+        os.replace(download_path, local_db_path)
+
+        size_mb = local_db_path.stat().st_size / 1024 / 1024
         if progress_callback:
-            progress_callback(100, f"数据库下载完成（{count:,}条记录）")
+            progress_callback(100, f"数据库下载完成（{size_mb:.1f}MB）")
 
-        logger.info(f"成功从OSS下载数据库，包含{count}条记录")
-        return True, f"数据库下载成功，包含{count}条记录"
+        logger.info(f"成功从OSS下载数据库（{size_mb:.1f}MB）")
+        return True, f"数据库下载成功（{size_mb:.1f}MB）"
 
     except Exception as e:
         logger.error(f"验证数据库时出错: {e}")
-        # 删除可能损坏的数据库文件
-        if local_db_path.exists():
-            local_db_path.unlink()
+        # 删除可能损坏的下载文件
+        download_path.unlink(missing_ok=True)
         return False, f"数据库验证失败: {e}"
 
+def find_delta_chain(version_info: dict, from_version: str) -> Optional[List[dict]]:
+    """
+    从版本信息中找出由本地版本到最新版本的增量包序列
+
+    Args:
+        version_info: OSS版本信息
+        from_version: 本地版本
+
+    Returns:
+        Optional[List[dict]]: 按应用顺序排列的增量包条目；无法连通或总大小不小于完整数据库时返回None
+    """
+    target_version = version_info.get('version')
+    deltas = {str(entry.get('from')): entry for entry in version_info.get('deltas') or []}
+    chain = []
+    current = str(from_version)
+    while current != str(target_version):
+        entry = deltas.get(current)
+        if entry is None or len(chain) >= len(deltas):
+            return None
+        chain.append(entry)
+        current = str(entry.get('to'))
+
+    full_size = version_info.get('size')
+    if full_size and sum(entry.get('size') or 0 for entry in chain) >= full_size:
+        return None
+    return chain
+
+def apply_oss_deltas(
+    local_db_path: Path,
+    local_version: str,
+    version_info: dict,
+    progress_callback: Optional[Callable] = None
+) -> Tuple[bool, str]:
+    """
+    下载并应用增量包，把本地数据库更新到最新版本
+
+    所有增量包在同一个事务中应用，结果的内容哈希与版本信息中的 content_hash 一致才提交；
+    任一步失败时回滚，本地数据库保持原版本。
+
+    Args:
+        local_db_path: 本地数据库路径
+        local_version: 本地数据库版本
+        version_info: OSS版本信息
+        progress_callback: 进度回调函数
+
+    Returns:
+        Tuple[bool, str]: (成功标志, 消息)
+    """
+    if not version_info.get('content_hash'):
+        return False, "OSS未提供内容哈希"
+    chain = find_delta_chain(version_info, local_version)
+    if not chain:
+        return False, f"没有从版本 {local_version} 出发的增量包"
+
+    delta_dir = local_db_path.parent / "bull_library_deltas"
+    packages = []
+    try:
+        # 1. 下载增量包（30-80%）
+        for index, entry in enumerate(chain):
+            start = 30 + 50 * index // len(chain)
+            end = 30 + 50 * (index + 1) // len(chain)
+            if progress_callback:
+                progress_callback(start, f"正在下载增量更新 {entry.get('from')} → {entry.get('to')}...")
+            package_path = delta_dir / entry['file']
+            success, msg = download_file(
+                f"{OSS_BULL_LIBRARY_URL}/deltas/{entry['file']}", package_path, progress_callback,
+                progress_range=(start, end), expected_sha256=entry.get('sha256'), expected_size=entry.get('size')
+            )
+            if not success:
+                return False, msg
+            packages.append(read_delta_package(package_path))
+
+        # 2. 事务中应用并校验（80-98%）
+        if progress_callback:
+            progress_callback(82, "正在应用增量更新...")
+        ensure_indexes(local_db_path)
+        close_all_connections()
+        conn = sqlite3.connect(local_db_path, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                changed = 0
+                for package in packages:
+                    changed += apply_delta_package(conn, package)
+                if progress_callback:
+                    progress_callback(92, "正在校验更新结果...")
+                content_hash = compute_content_hash(conn)
+                if content_hash != version_info['content_hash']:
+                    raise ValueError("更新后内容哈希不一致")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+        if progress_callback:
+            progress_callback(100, f"数据库增量更新完成（{changed:,}个公牛变更）")
+        logger.info(f"增量更新 {local_version} → {version_info.get('version')} 完成，变更{changed}个公牛")
+        return True, f"数据库增量更新成功（{changed}个公牛变更）"
+
+    except Exception as e:
+        logger.warning(f"增量更新失败: {e}")
+        return False, f"增量更新失败: {e}"
+
+    finally:
+        for entry in chain:
+            (delta_dir / entry['file']).unlink(missing_ok=True)
+        try:
+            delta_dir.rmdir()
+        except OSError:
+            pass
+
+def read_delta_package(path: Path) -> dict:
+    """
+    读取增量包（gzip压缩的json）
+
+    格式: {
+        'format': 1, 'from': 旧版本, 'to': 新版本, 'key': 'BULL REG',
+        'columns': 列名列表,
+        'deleted': 删除的BULL REG列表,
+        'rows': 新增或修改的BULL REG的全部新行（按columns顺序）
+    }
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        package = json.load(f)
+    if package.get('format') != DELTA_FORMAT or package.get('key') != DELTA_KEY_COLUMN:
+        raise ValueError(f"不支持的增量包格式: {path.name}")
+    return package
+
+def apply_delta_package(conn: sqlite3.Connection, package: dict) -> int:
+    """
+    在当前事务中应用一个增量包
+
+    删除包中涉及的每个BULL REG的全部旧行，再写入这些BULL REG的新行。
+
+    Returns:
+        int: 变更的公牛数
+    """
+    table_columns = [row[1] for row in conn.execute("PRAGMA table_info(bull_library)")]
+    columns = package['columns']
+    if sorted(columns) != sorted(table_columns):
+        raise ValueError("增量包的列与本地数据库不一致")
+
+    key_index = columns.index(DELTA_KEY_COLUMN)
+    keys = set(package.get('deleted') or [])
+    keys.update(row[key_index] for row in package.get('rows') or [])
+
+    # 经临时表一次性删除，避免逐个键扫描全表
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS delta_keys (key)")
+    conn.execute("DELETE FROM temp.delta_keys")
+    conn.executemany("INSERT INTO temp.delta_keys VALUES (?)", ((key,) for key in keys if key is not None))
+    conn.execute(f'DELETE FROM bull_library WHERE "{DELTA_KEY_COLUMN}" IN (SELECT key FROM temp.delta_keys)')
+    if None in keys:
+        conn.execute(f'DELETE FROM bull_library WHERE "{DELTA_KEY_COLUMN}" IS NULL')
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    conn.executemany(f"INSERT INTO bull_library ({column_list}) VALUES ({placeholders})", package.get('rows') or [])
+    return len(keys)
+
+def build_delta_package(old_db_path: Path, new_db_path: Path, from_version: str, to_version: str) -> dict:
+    """
+    比较两个版本的数据库，生成增量包（发布端使用）
+
+    Args:
+        old_db_path: 旧版本数据库
+        new_db_path: 新版本数据库
+        from_version: 旧版本号
+        to_version: 新版本号
+
+    Returns:
+        dict: 增量包（格式见 read_delta_package）
+    """
+    def load_groups(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(bull_library)")]
+            column_list = ", ".join(f'"{column}"' for column in columns)
+            key_index = columns.index(DELTA_KEY_COLUMN)
+            groups = {}
+            for row in conn.execute(f"SELECT {column_list} FROM bull_library"):
+                groups.setdefault(row[key_index], []).append(row)
+            return columns, groups
+        finally:
+            conn.close()
+
+    def encoded(rows):
+        return sorted(json.dumps(row, ensure_ascii=False, default=_encode_value) for row in rows)
+
+    old_columns, old_groups = load_groups(old_db_path)
+    columns, new_groups = load_groups(new_db_path)
+    if sorted(old_columns) != sorted(columns):
+        raise ValueError("两个版本的表结构不同，无法生成增量包")
+
+    deleted = [key for key in old_groups if key not in new_groups]
+    rows = []
+    for key, group in new_groups.items():
+        if key not in old_groups or encoded(group) != encoded(old_groups[key]):
+            rows.extend(list(row) for row in group)
+
+    return {
+        'format': DELTA_FORMAT,
+        'from': from_version,
+        'to': to_version,
+        'key': DELTA_KEY_COLUMN,
+        'columns': columns,
+        'deleted': deleted,
+        'rows': rows,
+    }
+
 def ensure_bull_library_exists(
     local_db_path: Path,
     progress_callback: Optional[Callable] = None
@@ -423,36 +792,19 @@ def ensure_bull_library_exists(
                     logger.error(f"自动下载失败: {msg}")
                     return False
 
-        # 验证数据库完整性
-        conn = sqlite3.connect(local_db_path)
-        cursor = conn.cursor()
-
-        # 检查bull_library表
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='bull_library'")
-        if not cursor.fetchone():
-            conn.close()
-            logger.warning("数据库文件存在但缺少bull_library表，重新下载")
+        # 验证数据库完整性（只读取一行）
+        if not has_bull_records(local_db_path):
+            logger.warning("数据库文件存在但缺少bull_library表或为空，重新下载")
             local_db_path.unlink()  # 删除损坏的文件
             success, msg, _ = download_bull_library(local_db_path, progress_callback)
             if not success:
                 logger.error(f"重新下载失败: {msg}")
                 return False
         else:
-            # 检查记录数
-            cursor.execute("SELECT COUNT(*) FROM bull_library")
-            count = cursor.fetchone()[0]
-            conn.close()
-
-            if count == 0:
-                logger.warning("bull_library表为空，重新下载")
-                local_db_path.unlink()
-                success, msg, _ = download_bull_library(local_db_path, progress_callback)
-                if not success:
-                    logger.error(f"重新下载失败: {msg}")
-                    return False
-            else:
-                logger.info(f"bull_library数据库正常，包含{count}条记录")
+            logger.info("bull_library数据库正常")
 
+        # 已有数据库（包括预装数据库）补建查询索引
+        ensure_indexes(local_db_path)
         return True
 
     except Exception as e:
@@ -0,0 +1,239 @@
+"""
+进程内公牛性状/基因列式表
+
+性状计算、指数计算、已配/备选公牛性状、隐性基因分析等都按公牛号查询 bull_library，
+原来每处各自建立连接、逐批执行SQL。本模块在进程内按需建立一份列式表：
+
+- 每个性状/基因列读取一次，保存为 NumPy 数组（数值列为 float64/int64，其他为 object）
+- BULL NAAB → 行号、BULL REG → 行号 两个哈希索引（公牛号重复时取最后一行）
+- 公牛库版本（bull_library_version.json）或数据库文件变化后自动重建
+
+查询时先把公牛号映射为行号，再对所需列做向量化 take，不再往返数据库。
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from core.data.bull_library_access import NAAB_COLUMN, REG_COLUMN, connection
+
+logger = logging.getLogger(__name__)
+
+# 公牛号匹配方式
+BY_NAAB = (NAAB_COLUMN,)
+BY_REG = (REG_COLUMN,)
+BY_NAAB_THEN_REG = (NAAB_COLUMN, REG_COLUMN)
+
+
+def _library_signature(db_path: Path):
+    """公牛库版本号与数据库文件签名"""
+    version = None
+    version_file = db_path.parent / "bull_library_version.json"
+    try:
+        with open(version_file, 'r', encoding='utf-8') as f:
+            version = json.load(f).get('version')
+    except Exception:
+        pass
+    stat = os.stat(db_path)
+    return version, stat.st_mtime_ns, stat.st_size
+
+
+def _to_array(values: list) -> np.ndarray:
+    """把一列SQLite值转换为NumPy数组：全部为数值（或NULL）时为数值数组，否则为object数组"""
+    has_null = False
+    all_int = True
+    for value in values:
+        if value is None:
+            has_null = True
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            return np.array(values, dtype=object)
+        elif not isinstance(value, int):
+            all_int = False
+    if all_int and not has_null:
+        return np.array(values, dtype=np.int64)
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+class BullTable:
+    """公牛库列式表（只读）"""
+
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        建立公牛号索引（性状列在首次使用时读取）
+
+        Args:
+            db_path: 公牛库路径
+        """
+        self.db_path = Path(db_path)
+        self.signature = _library_signature(self.db_path)
+        self._lock = threading.Lock()
+        self._columns: Dict[str, np.ndarray] = {}
+
+        with connection(self.db_path) as conn:
+            self.column_names = [row[1] for row in conn.execute("PRAGMA table_info(bull_library)")]
+            keys = conn.execute(f'SELECT "{NAAB_COLUMN}", "{REG_COLUMN}" FROM bull_library ORDER BY rowid').fetchall()
+        self.size = len(keys)
+
+        # 同一公牛号出现多次时保留最后一行
+        self._index = {
+            NAAB_COLUMN: {str(naab): row for row, (naab, _) in enumerate(keys) if naab is not None},
+            REG_COLUMN: {str(reg): row for row, (_, reg) in enumerate(keys) if reg is not None},
+        }
+        self._columns[NAAB_COLUMN] = np.array([naab for naab, _ in keys], dtype=object)
+        self._columns[REG_COLUMN] = np.array([reg for _, reg in keys], dtype=object)
+        logger.info(f"公牛列式表已建立: {self.size}头公牛")
+
+    def has_column(self, name: str) -> bool:
+        return name in self.column_names
+
+    def load_columns(self, names: Iterable[str]):
+        """读取尚未加载的列（一次查询读取多列）"""
+        missing = [name for name in dict.fromkeys(names) if name in self.column_names and name not in self._columns]
+        if not missing:
+            return
+        with self._lock:
+            missing = [name for name in missing if name not in self._columns]
+            if not missing:
+                return
+            column_list = ", ".join(f'"{name}"' for name in missing)
+            with connection(self.db_path) as conn:
+                values = conn.execute(f"SELECT {column_list} FROM bull_library ORDER BY rowid").fetchall()
+            for position, name in enumerate(missing):
+                self._columns[name] = _to_array([row[position] for row in values])
+
+    def column(self, name: str) -> Optional[np.ndarray]:
+        """整列数组（按行号排列），表中没有该列时返回None"""
+        if name not in self.column_names:
+            return None
+        self.load_columns([name])
+        return self._columns[name]
+
+    def rows(self, bull_ids: Iterable, by: Sequence[str] = BY_NAAB_THEN_REG) -> np.ndarray:
+        """
+        公牛号对应的行号
+
+        Args:
+            bull_ids: 公牛号（按字符串匹配，缺失值视为未找到）
+            by: 依次尝试匹配的列，前一列找不到时再用后一列
+
+        Returns:
+            np.ndarray: 行号（int64），未找到为 -1
+        """
+        indexes = [self._index[column] for column in by]
+        result = []
+        for bull_id in bull_ids:
+            row = -1
+            if bull_id is not None and not (isinstance(bull_id, float) and np.isnan(bull_id)):
+                key = str(bull_id)
+                for index in indexes:
+                    row = index.get(key, -1)
+                    if row >= 0:
+                        break
+            result.append(row)
+        return np.array(result, dtype=np.int64)
+
+    def take(self, name: str, rows: np.ndarray) -> np.ndarray:
+        """
+        按行号取列值，行号为 -1（或表中没有该列）时为缺失值（数值列NaN，其他None）
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        array = self.column(name)
+        found = rows >= 0
+        if array is None:
+            return np.full(len(rows), None, dtype=object)
+        if found.all():
+            return array[rows]
+        if array.dtype == object:
+            result = np.full(len(rows), None, dtype=object)
+        else:
+            result = np.full(len(rows), np.nan, dtype=np.float64)
+        result[found] = array[rows[found]]
+        return result
+
+    def frame(self, bull_ids: Iterable, columns: Sequence[str], by: Sequence[str] = BY_NAAB_THEN_REG) -> pd.DataFrame:
+        """
+        按公牛号取多列，返回与 bull_ids 逐行对应的DataFrame（含 found 列）
+        """
+        bull_ids = list(bull_ids)
+        rows = self.rows(bull_ids, by)
+        self.load_columns(columns)
+        data = {column: self.take(column, rows) for column in columns}
+        data['found'] = rows >= 0
+        return pd.DataFrame(data)
+
+    def records(self, bull_ids: Iterable, columns: Sequence[str],
+                by: Sequence[str] = BY_NAAB_THEN_REG) -> Dict[str, dict]:
+        """
+        按公牛号取多列，返回 {公牛号: {列: 值}}（只含找到的公牛；缺失值为None，与数据库查询结果一致）
+        """
+        bull_ids = [str(bull_id) for bull_id in dict.fromkeys(bull_ids)
+                    if bull_id is not None and not (isinstance(bull_id, float) and np.isnan(bull_id))]
+        rows = self.rows(bull_ids, by)
+        found = np.flatnonzero(rows >= 0)
+        self.load_columns(columns)
+        values = {}
+        for column in columns:
+            taken = self.take(column, rows[found])
+            values[column] = [None if isinstance(value, float) and np.isnan(value) else value
+                              for value in taken.tolist()]
+        return {
+            bull_ids[position]: {column: values[column][i] for column in columns}
+            for i, position in enumerate(found)
+        }
+
+    def lookup(self, bull_ids: Iterable, columns: Sequence[str],
+               by: Sequence[str] = BY_NAAB_THEN_REG) -> List[dict]:
+        """
+        按公牛号取命中的行（每行只出现一次，按行号排列），包含 BULL NAAB、BULL REG 与 columns 中存在的列
+        """
+        rows = self.rows(dict.fromkeys(bull_ids), by)
+        rows = np.unique(rows[rows >= 0])
+        selected = [column for column in dict.fromkeys([NAAB_COLUMN, REG_COLUMN, *columns]) if self.has_column(column)]
+        self.load_columns(selected)
+        values = {}
+        for column in selected:
+            values[column] = [None if isinstance(value, float) and np.isnan(value) else value
+                              for value in self.take(column, rows).tolist()]
+        return [{column: values[column][i] for column in selected} for i in range(len(rows))]
+
+
+_table: Optional[BullTable] = None
+_table_lock = threading.Lock()
+
+
+def get_bull_table(db_path: Union[str, Path] = None) -> BullTable:
+    """
+    获取进程内的公牛列式表（首次调用时建立；公牛库版本或文件变化后重建）
+
+    Args:
+        db_path: 公牛库路径，默认为本地公牛库
+
+    Returns:
+        BullTable
+    """
+    global _table
+    if db_path is None:
+        from core.data.update_manager import LOCAL_DB_PATH
+        db_path = LOCAL_DB_PATH
+    db_path = Path(db_path)
+
+    with _table_lock:
+        table = _table
+        if table is None or table.db_path != db_path or table.signature != _library_signature(db_path):
+            if table is not None:
+                logger.info("公牛库已更新，重建公牛列式表")
+            table = _table = BullTable(db_path)
+        return table
+
+
+def invalidate_bull_table():
+    """丢弃进程内的公牛列式表（下次使用时重建）"""
+    global _table
+    with _table_lock:
+        _table = None
@@ -9,6 +9,7 @@ from pathlib import Path
 from typing import Dict, Tuple, Optional, List
 import logging
 from datetime import datetime
+from core.data.project_data import get_project_data
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +36,9 @@ class DataLoader:
             # 从默认位置加载
             self.data_path = self.base_path / "data" / "标准化后文件"
             self.analysis_path = self.base_path / "analysis_results"
+
+        # 与分组、选配共用的解析数据缓存
+        self.project_data = get_project_data(self.project_path if project_name else self.base_path)
         
     def load_cow_data(self) -> pd.DataFrame:
         """
@@ -50,7 +54,7 @@ class DataLoader:
             return pd.DataFrame()
             
         try:
-            cow_df = pd.read_excel(cow_file)
+            cow_df = self.project_data.read(cow_file)
             logger.info(f"成功加载 {len(cow_df)} 头母牛数据")
             
             # 确保关键字段存在
@@ -85,7 +89,7 @@ class DataLoader:
             return pd.DataFrame()
             
         try:
-            index_df = pd.read_excel(index_file)
+            index_df = self.project_data.read(index_file)
             if 'cow_id' in index_df.columns:
                 index_df['cow_id'] = index_df['cow_id'].astype(str)
             logger.info(f"成功加载 {len(index_df)} 头母牛的指数得分")
@@ -107,7 +111,7 @@ class DataLoader:
             return pd.DataFrame()
             
         try:
-            bull_df = pd.read_excel(bull_file)
+            bull_df = self.project_data.read(bull_file)
             if 'bull_id' in bull_df.columns:
                 bull_df['bull_id'] = bull_df['bull_id'].astype(str)
             logger.info(f"成功加载 {len(bull_df)} 头公牛数据")
@@ -134,7 +138,7 @@ class DataLoader:
             return pd.DataFrame()
             
         try:
-            index_df = pd.read_excel(index_file)
+            index_df = self.project_data.read(index_file)
             if 'bull_id' in index_df.columns:
                 index_df['bull_id'] = index_df['bull_id'].astype(str)
             logger.info(f"成功加载 {len(index_df)} 头公牛的指数得分")
@@ -156,7 +160,7 @@ class DataLoader:
             return pd.DataFrame()
             
         try:
-            inbreeding_df = pd.read_excel(inbreeding_file)
+            inbreeding_df = self.project_data.read(inbreeding_file)
             # 确保ID是字符串
             if 'cow_id' in inbreeding_df.columns:
                 inbreeding_df['cow_id'] = inbreeding_df['cow_id'].astype(str)
@@ -181,7 +185,7 @@ class DataLoader:
             return pd.DataFrame()
             
         try:
-            defect_df = pd.read_excel(defect_file)
+            defect_df = self.project_data.read(defect_file)
             # 确保ID是字符串
             if 'cow_id' in defect_df.columns:
                 defect_df['cow_id'] = defect_df['cow_id'].astype(str)
@@ -206,7 +210,7 @@ class DataLoader:
             return pd.DataFrame()
             
         try:
-            strategy_df = pd.read_excel(strategy_file)
+            strategy_df = self.project_data.read(strategy_file)
             logger.info(f"成功加载策略表，包含 {len(strategy_df)} 条策略")
             return strategy_df
         except Exception as e:
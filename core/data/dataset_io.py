@@ -0,0 +1,495 @@
+"""
+项目中间数据集读写
+
+analysis_results / standardized_data 中的中间结果以 xlsx 形式交付给用户，但流水线各阶段之间反复
+用 openpyxl 解析 xlsx 代价很高（数万行的结果表每次十几秒）。本模块在写入 xlsx 时为其保存一份副本
+（同目录 .datasets/<文件名>/ 下），读取时优先使用副本：
+
+- 单元格副本（pickle）: 与 openpyxl 读出的单元格值一致，带 dtype/usecols 的读取用 pandas 的
+  TextParser 在其上解析，与 pd.read_excel 的结果完全一致
+- 列式副本（安装了 pyarrow 时为 Feather，否则为 pickle）: 默认参数读取的解析结果，毫秒级读取
+
+- write_dataset / save_columnar_copy: 写入 xlsx 时同时保存副本（可选择暂不导出 xlsx）
+- write_dataset_sheets / save_sheet_copies: 多工作表版本，每个工作表各保存一份副本
+- read_dataset: 替代 pd.read_excel（含 sheet_name=None 读取全部工作表）；没有有效副本时直接读 xlsx（读取不建立副本）
+- dataset_exists / export_excel: 判断数据集是否存在（含只有副本的），按需把只有副本的数据集导出为 xlsx
+- dataset_signature: 数据集当前版本的标识，供内存中的解析缓存判断是否失效
+- file_signature: 文件的大小和修改时间，可保存下来供以后（包括其他进程）比较
+- excel_roundtrip: 不经过文件，得到 DataFrame 写入 xlsx 再读出的结果
+
+xlsx 默认始终写入：用户直接在项目目录中打开这些文件，其他模块也按路径判断结果是否存在。
+写入 xlsx 本身是主要开销（数万行的结果表十几秒，副本约一秒），只在流水线内部使用的中间结果
+可以用 excel=False 只保存副本，需要时再用 export_excel 导出。
+副本记录了写入时 xlsx 的大小和修改时间，xlsx 被其他程序或用户修改后副本自动失效。
+"""
+
+import datetime
+import json
+import logging
+import os
+import pickle
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+try:
+    import pyarrow  # noqa: F401  仅用于判断Feather是否可用
+    FEATHER_AVAILABLE = True
+except ImportError:
+    FEATHER_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DATASET_DIR_NAME = '.datasets'
+META_FILENAME = 'meta.json'
+# to_excel 默认写入的工作表，写入方保存的副本同时登记为这两个键
+DEFAULT_SHEET_KEYS = ('0', 'Sheet1')
+# to_excel 默认的工作表名
+DEFAULT_SHEET_NAME = 'Sheet1'
+# 可以建立副本的文件类型
+CACHEABLE_SUFFIXES = ('.xlsx', '.xlsm')
+
+PathLike = Union[str, Path]
+
+# 本进程内每个数据集的写入次数（文件修改时间精度不足时，同一秒内的两次写入也能区分）
+_write_counts: Dict[str, int] = {}
+
+
+class _Unsupported(Exception):
+    """数据中含无法保证与xlsx往返一致的值"""
+
+
+def _dataset_dir(path: Path) -> Path:
+    return path.parent / DATASET_DIR_NAME / path.name
+
+
+def _mark_written(path: Path):
+    key = str(path.absolute())
+    _write_counts[key] = _write_counts.get(key, 0) + 1
+
+
+def _source_signature(path: Path) -> Optional[Dict]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def file_signature(path: PathLike) -> Optional[tuple]:
+    """
+    文件的大小和修改时间（可跨进程保存和比较）
+
+    Returns:
+        Optional[tuple]: (大小, 修改时间ns)，文件不存在时为None
+    """
+    signature = _source_signature(Path(path))
+    return None if signature is None else (signature['size'], signature['mtime_ns'])
+
+
+def _load_meta(dataset_dir: Path) -> Dict:
+    try:
+        with open(dataset_dir / META_FILENAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_meta(dataset_dir: Path, meta: Dict):
+    tmp_path = dataset_dir / (META_FILENAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, dataset_dir / META_FILENAME)
+
+
+def _write_frame(df: pd.DataFrame, dataset_dir: Path, stem: str) -> Dict:
+    """写入列式文件，返回登记信息；Feather不支持的数据（如混合类型的列）回退为pickle"""
+    if FEATHER_AVAILABLE:
+        tmp_path = dataset_dir / f"{stem}.feather.tmp"
+        try:
+            df.to_feather(tmp_path)
+            os.replace(tmp_path, dataset_dir / f"{stem}.feather")
+            return {'file': f"{stem}.feather", 'format': 'feather'}
+        except Exception as e:
+            logger.debug(f"Feather写入失败，改用pickle: {e}")
+            tmp_path.unlink(missing_ok=True)
+    tmp_path = dataset_dir / f"{stem}.pkl.tmp"
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, dataset_dir / f"{stem}.pkl")
+    return {'file': f"{stem}.pkl", 'format': 'pickle'}
+
+
+def _read_frame(dataset_dir: Path, entry: Dict) -> pd.DataFrame:
+    path = dataset_dir / entry['file']
+    if entry['format'] == 'feather':
+        return pd.read_feather(path)
+    return pd.read_pickle(path)
+
+
+def _write_cells(rows: List[list], dataset_dir: Path, stem: str) -> str:
+    filename = f"{stem}.cells.pkl"
+    tmp_path = dataset_dir / (filename + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, dataset_dir / filename)
+    return filename
+
+
+def _read_cells(dataset_dir: Path, entry: Dict) -> List[list]:
+    with open(dataset_dir / entry['cells'], 'rb') as f:
+        return pickle.load(f)
+
+
+def _excel_number(value):
+    """数值单元格：openpyxl 按 %.16g 写入，读出时整数值转为int"""
+    number = float('%.16g' % value)
+    return int(number) if number.is_integer() else number
+
+
+def _excel_datetime(value):
+    """日期单元格：openpyxl 写入为序列号，读出时再转换回日期时间"""
+    from openpyxl.utils.datetime import from_excel, to_excel
+    return from_excel(float('%.16g' % to_excel(value)))
+
+
+def _excel_cell(value):
+    """模拟 to_excel 写入的单元格再由 openpyxl 读出（pandas 的转换规则）后的值"""
+    if value is None or value is pd.NaT:
+        return ''
+    if isinstance(value, str):
+        if value.startswith('=') and len(value) > 1:
+            # 会被写成公式
+            raise _Unsupported('formula')
+        return value
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return _excel_number(int(value))
+    if isinstance(value, (float, np.floating)):
+        if np.isnan(value):
+            return ''
+        if np.isinf(value):
+            return 'inf' if value > 0 else '-inf'
+        return _excel_number(value)
+    if isinstance(value, (pd.Timestamp, datetime.datetime, np.datetime64)):
+        value = pd.Timestamp(value)
+        if value is pd.NaT:
+            return ''
+        if value.tzinfo is not None:
+            raise _Unsupported('timezone')
+        return _excel_datetime(value.to_pydatetime(warn=False))
+    if isinstance(value, datetime.date):
+        return _excel_datetime(value)
+    if isinstance(value, (list, tuple, dict, set)):
+        return str(value)
+    raise _Unsupported(type(value).__name__)
+
+
+def _column_cells(series: pd.Series) -> list:
+    """一列的单元格；数值列按列批量转换"""
+    if series.dtype.kind not in 'iuf':
+        return [_excel_cell(v) for v in series.astype(object).tolist()]
+    values = np.array(list(map(float, map('%.16g'.__mod__, series.tolist()))), dtype=np.float64)
+    if np.isinf(values).any():
+        return [_excel_cell(v) for v in series.tolist()]
+    cells = values.astype(object)
+    integral = (values == np.floor(values)) & (np.abs(values) < 2 ** 63)
+    cells[integral] = values[integral].astype(np.int64).tolist()
+    cells[np.isnan(values)] = ''
+    return cells.tolist()
+
+
+def _frame_cells(df: pd.DataFrame) -> Optional[List[list]]:
+    """
+    DataFrame 按 to_excel(index=False) 写入后 xlsx 中的单元格
+
+    Returns:
+        Optional[List[list]]: 含表头的行列表；含无法可靠模拟的数据时返回None
+    """
+    if isinstance(df.columns, pd.MultiIndex) or df.columns.duplicated().any():
+        return None
+    try:
+        header = [_excel_cell(c) for c in df.columns]
+        columns = [_column_cells(df.iloc[:, i]) for i in range(df.shape[1])]
+    except _Unsupported as e:
+        logger.debug(f"数据不支持建立副本: {e}")
+        return None
+    rows = [header] + [list(row) for row in zip(*columns)]
+    # openpyxl 读取时会去掉末尾的空行
+    while len(rows) > 1 and all(v == '' for v in rows[-1]):
+        rows.pop()
+    return rows
+
+
+def _parse_cells(rows: List[list], dtype=None, usecols=None) -> pd.DataFrame:
+    """按 pd.read_excel 的方式解析单元格"""
+    if not rows:
+        return pd.DataFrame()
+    parser = TextParser([list(r) for r in rows], header=0, dtype=dtype, usecols=usecols,
+                        skip_blank_lines=False)
+    return parser.read()
+
+
+def excel_roundtrip(df: pd.DataFrame, dtype=None, usecols=None) -> Optional[pd.DataFrame]:
+    """
+    DataFrame 按 to_excel(index=False) 写入 xlsx、再用 pd.read_excel(dtype=..., usecols=...) 读出的结果，
+    不经过文件
+
+    Returns:
+        Optional[pd.DataFrame]: 数据中含无法可靠模拟的值时为None（调用方应改为实际写入并读取xlsx）
+    """
+    rows = _frame_cells(df)
+    if rows is None:
+        return None
+    return _parse_cells(rows, dtype, usecols)
+
+
+def _cacheable(path: Path, sheet_name, usecols, kwargs) -> bool:
+    return (not kwargs
+            and path.suffix.lower() in CACHEABLE_SUFFIXES
+            and (sheet_name is None or isinstance(sheet_name, (str, int)))
+            and (usecols is None or (isinstance(usecols, (list, tuple))
+                                     and all(isinstance(c, str) for c in usecols))))
+
+
+def _store_sheet(dataset_dir: Path, stem: str, rows: List[list], df: pd.DataFrame) -> Dict:
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    entry = _write_frame(df, dataset_dir, stem)
+    entry['cells'] = _write_cells(rows, dataset_dir, stem)
+    return entry
+
+
+def _read_entry(dataset_dir: Path, entry: Dict, dtype, usecols) -> pd.DataFrame:
+    if dtype is None and usecols is None:
+        return _read_frame(dataset_dir, entry)
+    return _parse_cells(_read_cells(dataset_dir, entry), dtype, usecols)
+
+
+def read_dataset(path: PathLike, sheet_name: Union[str, int, None] = 0, dtype=None, usecols=None,
+                 **kwargs) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """
+    读取数据集（pd.read_excel 的替代）
+
+    有效的副本存在时（含只有副本、未导出 xlsx 的数据集）直接读取副本；否则读取 xlsx。
+    支持 sheet_name、dtype、usecols（列名列表），其他参数直接交给 pd.read_excel 且不使用副本。
+
+    Args:
+        path: xlsx 文件路径
+        sheet_name: 工作表名称或序号；None 表示全部工作表
+        dtype: 同 pd.read_excel
+        usecols: 需要的列名列表
+
+    Returns:
+        pd.DataFrame: 读取的数据；sheet_name 为 None 时为 {工作表名: DataFrame}（按工作表顺序）
+
+    Raises:
+        FileNotFoundError: xlsx 和副本都不存在
+    """
+    path = Path(path)
+    if not _cacheable(path, sheet_name, usecols, kwargs):
+        return pd.read_excel(path, sheet_name=sheet_name, dtype=dtype, usecols=usecols, **kwargs)
+
+    dataset_dir = _dataset_dir(path)
+    meta = _load_meta(dataset_dir)
+    sheets = meta.get('sheets', {})
+    signature = _source_signature(path)
+    if sheet_name is None:
+        names = meta.get('sheet_names')
+        entries = [sheets.get(name) for name in names] if names else [None]
+    else:
+        names, entries = None, [sheets.get(str(sheet_name))]
+    if all(entry is not None for entry in entries) and meta.get('source') == signature:
+        try:
+            frames = [_read_entry(dataset_dir, entry, dtype, usecols) for entry in entries]
+            return dict(zip(names, frames)) if names else frames[0]
+        except Exception as e:
+            logger.warning(f"读取数据集副本失败，改为读取xlsx: {path.name}: {e}")
+
+    if signature is None:
+        raise FileNotFoundError(f"数据文件不存在: {path}")
+    return pd.read_excel(path, sheet_name=sheet_name, dtype=dtype, usecols=usecols)
+
+
+def save_columnar_copy(df: pd.DataFrame, path: PathLike) -> bool:
+    """
+    为刚写入的 xlsx 保存副本
+
+    Args:
+        df: 写入 xlsx 的数据（按 index=False 写入）
+        path: xlsx 文件路径
+
+    Returns:
+        bool: 是否保存成功（失败时读取方会回退到 xlsx）
+    """
+    # 写入方的工作表名未知，不登记工作表列表（sheet_name=None 的读取直接读xlsx）
+    return _save_copies(Path(path), [(DEFAULT_SHEET_KEYS, df)], None, True)
+
+
+def save_sheet_copies(sheets: Dict[str, pd.DataFrame], path: PathLike) -> bool:
+    """
+    为刚写入的多工作表 xlsx 保存副本
+
+    Args:
+        sheets: {工作表名: 数据}，顺序与 xlsx 中的工作表顺序一致（均按 index=False 写入）
+        path: xlsx 文件路径
+
+    Returns:
+        bool: 是否全部保存成功（无法建立副本的工作表由读取方回退到 xlsx）
+    """
+    return _save_copies(Path(path), _sheet_items(sheets), list(sheets), True)
+
+
+def _sheet_items(sheets: Dict[str, pd.DataFrame]) -> List[Tuple[Sequence[str], pd.DataFrame]]:
+    """多工作表按名称和序号登记"""
+    return [((name, str(position)), df) for position, (name, df) in enumerate(sheets.items())]
+
+
+def _save_copies(path: Path, sheets: List[Tuple[Sequence[str], pd.DataFrame]],
+                 sheet_names: Optional[List[str]], excel_written: bool) -> bool:
+    """
+    保存各工作表的副本，sheets 为 [(登记的键, 数据)]，sheet_names 为按顺序的全部工作表名；
+    excel_written 为 False 时表示只保存副本（不登记 xlsx 的签名）
+    """
+    dataset_dir = _dataset_dir(path)
+    _mark_written(path)
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+    try:
+        entries = {}
+        for position, (keys, df) in enumerate(sheets):
+            rows = _frame_cells(df)
+            if rows is None:
+                # 无法保证与xlsx一致，读取方直接读xlsx
+                continue
+            entry = _store_sheet(dataset_dir, f'sheet_{position}', rows, _parse_cells(rows))
+            entries.update((key, entry) for key in keys)
+        complete = len(entries) == sum(len(keys) for keys, _ in sheets)
+        if not entries or not (complete or excel_written):
+            # 只有副本时必须全部工作表都可保存
+            shutil.rmtree(dataset_dir, ignore_errors=True)
+            return False
+        source = _source_signature(path) if excel_written else None
+        _save_meta(dataset_dir, {'source': source, 'sheets': entries, 'sheet_names': sheet_names})
+        return complete
+    except Exception as e:
+        logger.warning(f"保存数据集副本失败: {path.name}: {e}")
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        return False
+
+
+def _save_copies_only(path: Path, sheets: List[Tuple[Sequence[str], pd.DataFrame]],
+                      sheet_names: List[str]) -> bool:
+    """只保存副本；旧的 xlsx 已过期，保留会被误认为当前结果"""
+    if path.exists():
+        path.unlink()
+    return _save_copies(path, sheets, sheet_names, False)
+
+
+def write_dataset(df: pd.DataFrame, path: PathLike, excel: bool = True) -> bool:
+    """
+    写入数据集（xlsx 及其副本）
+
+    Args:
+        df: 数据（按 index=False 写入）
+        path: xlsx 文件路径
+        excel: 是否导出 xlsx；False 时只保存副本（数据无法建立副本时仍写入 xlsx），需要时用 export_excel 导出
+
+    Returns:
+        bool: 是否写入成功（副本保存失败不影响，读取方会回退到 xlsx）
+    """
+    path = Path(path)
+    if not excel and _save_copies_only(path, [(DEFAULT_SHEET_KEYS, df)], [DEFAULT_SHEET_NAME]):
+        return True
+    df.to_excel(path, index=False)
+    _save_copies(path, [(DEFAULT_SHEET_KEYS, df)], [DEFAULT_SHEET_NAME], True)
+    return True
+
+
+def write_dataset_sheets(sheets: Dict[str, pd.DataFrame], path: PathLike, excel: bool = True) -> bool:
+    """
+    写入多工作表数据集（xlsx 及各工作表的副本）
+
+    Args:
+        sheets: {工作表名: 数据}（按 index=False 写入）
+        path: xlsx 文件路径
+        excel: 是否导出 xlsx；含义同 write_dataset
+
+    Returns:
+        bool: 是否写入成功（副本保存失败不影响，读取方会回退到 xlsx）
+    """
+    path = Path(path)
+    if not excel and _save_copies_only(path, _sheet_items(sheets), list(sheets)):
+        return True
+    with pd.ExcelWriter(path) as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    save_sheet_copies(sheets, path)
+    return True
+
+
+def dataset_exists(path: PathLike) -> bool:
+    """xlsx 或只有副本的数据集是否存在"""
+    path = Path(path)
+    if path.exists():
+        return True
+    meta = _load_meta(_dataset_dir(path))
+    return bool(meta.get('sheets')) and meta.get('source') is None
+
+
+def export_excel(path: PathLike) -> bool:
+    """
+    按需把只有副本的数据集导出为 xlsx
+
+    Returns:
+        bool: xlsx 是否存在（已存在或导出成功）
+    """
+    path = Path(path)
+    if path.exists():
+        return True
+    if not dataset_exists(path):
+        return False
+    write_dataset_sheets(read_dataset(path, sheet_name=None), path)
+    return True
+
+
+def dataset_signature(path: PathLike) -> Optional[tuple]:
+    """
+    数据集当前版本的标识
+
+    xlsx 存在时为其大小和修改时间，只有副本时为副本登记文件的；另加本进程内的写入次数。
+    标识不变即内容未变。
+
+    Returns:
+        Optional[tuple]: 数据集不存在时为None
+    """
+    path = Path(path)
+    signature = _source_signature(path)
+    if signature is None:
+        if not dataset_exists(path):
+            return None
+        signature = _source_signature(_dataset_dir(path) / META_FILENAME)
+        if signature is None:
+            return None
+    return (signature['size'], signature['mtime_ns'], _write_counts.get(str(path.absolute()), 0))
+
+
+def copy_dataset(src: PathLike, dst: PathLike):
+    """复制数据集（xlsx 及其副本）"""
+    src, dst = Path(src), Path(dst)
+    _mark_written(dst)
+    if src.exists():
+        shutil.copy(src, dst)
+    elif dst.exists():
+        dst.unlink()
+    src_dir, dst_dir = _dataset_dir(src), _dataset_dir(dst)
+    shutil.rmtree(dst_dir, ignore_errors=True)
+    meta = _load_meta(src_dir)
+    if not meta.get('sheets') or meta.get('source') != _source_signature(src):
+        return
+    if meta['source'] is not None:
+        meta['source'] = _source_signature(dst)
+    shutil.copytree(src_dir, dst_dir)
+    _save_meta(dst_dir, meta)
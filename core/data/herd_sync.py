@@ -0,0 +1,218 @@
+"""
+牛群数据增量同步
+
+自动报告每次都从接口下载牧场的完整牛群（含离场牛）和全部配种记录，再整体标准化。伊起牛接口不支持
+按修改时间筛选，因此在本地为每个牧场（合并模式下为牧场组合）保存上次同步的快照，按内容摘要比较：
+
+- 母牛以耳号为键，每行原始记录的摘要（不含日龄、月龄、泌乳天数等每天变化的计数列）判断新增、变化、离开
+- 配种记录按整行摘要识别，上次没有的即为新增事件
+- 快照同时保存上次的标准化结果，标准化时只重新处理受影响的母牛和新增的配种记录
+  （processor.process_cow_data_file / process_breeding_record_file 的 herd_delta 参数）
+
+近交系数缓存按个体的系谱内容建键（TabularInbreedingCalculator），未变化母牛的F值在下次分析时直接命中缓存。
+
+快照目录：<项目所在目录>/.herd_sync/<数据来源>_<牧场编号>/
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import pandas as pd
+
+from .processor import cow_column_mapping
+
+logger = logging.getLogger(__name__)
+
+SYNC_DIR_NAME = '.herd_sync'
+# 快照格式或标准化规则变化时递增，旧快照作废
+SNAPSHOT_FORMAT = 1
+
+# 每天都会变化的计数列，不参与摘要（标准化时按本次数据刷新）
+VOLATILE_COLUMNS = ('日龄', '月龄', '泌乳天数', '产后天数', '在胎天数', '配后天数', '干奶天数')
+
+PathLike = Union[str, Path]
+
+
+def row_digests(df: pd.DataFrame, exclude: Iterable[str] = ()) -> List[str]:
+    """
+    逐行计算内容摘要
+
+    Args:
+        df: 原始数据
+        exclude: 不参与摘要的列
+
+    Returns:
+        List[str]: 与行一一对应的16位十六进制摘要
+    """
+    columns = [column for column in df.columns if column not in set(exclude)]
+    if not len(df):
+        return []
+    hashed = pd.util.hash_pandas_object(df[columns].astype(str), index=False)
+    return [f"{value:016x}" for value in hashed.to_numpy()]
+
+
+def _columns_digest(columns: Iterable[str]) -> str:
+    return hashlib.md5(json.dumps([str(c) for c in columns], ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class HerdDelta:
+    """一次同步相对上次快照的变化"""
+
+    def __init__(self):
+        # 本次：耳号 → 摘要（无法按耳号识别时为None）、每条配种记录的摘要
+        self.cow_digests: Optional[Dict[str, str]] = None
+        self.breeding_digests: Optional[List[str]] = None
+        # 上次的标准化结果（没有可用快照时为None）
+        self.previous_cows: Optional[pd.DataFrame] = None
+        self.previous_breeding: Optional[pd.DataFrame] = None
+        self.added: set = set()
+        self.changed: set = set()
+        self.removed: set = set()
+        self.new_breeding = 0
+        # 本次的标准化结果，由 processor 写入
+        self.cow_frame: Optional[pd.DataFrame] = None
+        self.breeding_frame: Optional[pd.DataFrame] = None
+
+    @property
+    def incremental(self) -> bool:
+        """是否有可用的上次快照"""
+        return self.previous_cows is not None
+
+    def summary(self) -> str:
+        """变化摘要（用于进度提示）"""
+        if not self.incremental:
+            return "首次同步，完整标准化"
+        text = f"新增 {len(self.added)} 头、变化 {len(self.changed)} 头、离开 {len(self.removed)} 头"
+        if self.breeding_digests is not None:
+            text += f"，新配种记录 {self.new_breeding} 条"
+        return text
+
+
+class HerdSnapshotStore:
+    """一个牧场（或合并的牧场组合）的同步快照"""
+
+    def __init__(self, storage_root: PathLike, farm_codes: Iterable, source_system: str = "伊起牛",
+                 is_merged: bool = False):
+        """
+        Args:
+            storage_root: 快照根目录的上级目录（一般为项目所在目录）
+            farm_codes: 牧场编号
+            source_system: 数据来源系统
+            is_merged: 是否为合并模式
+        """
+        key = '+'.join(sorted(str(code) for code in farm_codes))
+        if is_merged:
+            key += '_merged'
+        self.source_system = source_system
+        self.path = Path(storage_root) / SYNC_DIR_NAME / f"{source_system}_{key}"
+
+    @property
+    def _meta_file(self) -> Path:
+        return self.path / 'snapshot.json'
+
+    def _load_meta(self) -> Optional[dict]:
+        try:
+            with open(self._meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('format') != SNAPSHOT_FORMAT or meta.get('source_system') != self.source_system:
+            return None
+        return meta
+
+    def diff(self, herd_df: pd.DataFrame, breeding_df: Optional[pd.DataFrame] = None) -> HerdDelta:
+        """
+        比较本次下载的原始数据与上次快照
+
+        Args:
+            herd_df: 原始牛群数据（转换为表格后、标准化前）
+            breeding_df: 原始配种记录，没有时为None
+
+        Returns:
+            HerdDelta: 标准化时作为 herd_delta 传入，成功后交给 save 保存
+        """
+        delta = HerdDelta()
+        id_col = next((raw for raw, standard in cow_column_mapping(herd_df.columns).items()
+                       if standard == 'cow_id'), None)
+        if id_col is not None and herd_df[id_col].notna().all():
+            ids = herd_df[id_col].astype(str)
+            if not ids.duplicated().any():
+                delta.cow_digests = dict(zip(ids, row_digests(herd_df, VOLATILE_COLUMNS)))
+        if breeding_df is not None:
+            # 完全相同的记录按出现次序区分
+            digests = pd.Series(row_digests(breeding_df), dtype=object)
+            occurrence = digests.groupby(digests).cumcount()
+            delta.breeding_digests = [f"{d}#{n}" for d, n in zip(digests, occurrence)]
+
+        meta = self._load_meta()
+        if meta is None or delta.cow_digests is None:
+            return delta
+        if meta.get('cow_columns') != _columns_digest(herd_df.columns):
+            logger.info("牛群数据的列发生变化，完整标准化")
+            return delta
+        try:
+            delta.previous_cows = pd.read_pickle(self.path / 'cows.pkl')
+            if delta.breeding_digests is not None and meta.get('breeding_columns') == _columns_digest(breeding_df.columns):
+                delta.previous_breeding = pd.read_pickle(self.path / 'breeding.pkl')
+        except Exception as e:
+            logger.warning(f"读取同步快照失败，完整标准化: {e}")
+            delta.previous_cows = None
+            delta.previous_breeding = None
+            return delta
+
+        previous_digests = meta.get('cows', {})
+        for cow_id, digest in delta.cow_digests.items():
+            old = previous_digests.get(cow_id)
+            if old is None:
+                delta.added.add(cow_id)
+            elif old != digest:
+                delta.changed.add(cow_id)
+        delta.removed = set(previous_digests) - set(delta.cow_digests)
+        if delta.previous_breeding is not None:
+            seen = set(delta.previous_breeding['_digest'])
+            delta.new_breeding = sum(1 for digest in delta.breeding_digests if digest not in seen)
+        elif delta.breeding_digests is not None:
+            delta.new_breeding = len(delta.breeding_digests)
+        logger.info(f"牛群增量同步: {delta.summary()}")
+        return delta
+
+    def save(self, delta: HerdDelta, herd_df: pd.DataFrame, breeding_df: Optional[pd.DataFrame] = None):
+        """
+        标准化成功后保存本次快照（失败只记录日志）
+
+        Args:
+            delta: diff 返回、已经过标准化的变化
+            herd_df: 与 diff 相同的原始牛群数据
+            breeding_df: 与 diff 相同的原始配种记录
+        """
+        if delta.cow_digests is None or delta.cow_frame is None:
+            return
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            meta = {
+                'format': SNAPSHOT_FORMAT,
+                'source_system': self.source_system,
+                'cow_columns': _columns_digest(herd_df.columns),
+                'cows': delta.cow_digests,
+            }
+            # 先写数据再写摘要，中途失败时旧摘要与新数据不会被一起使用
+            self._meta_file.unlink(missing_ok=True)
+            self._write_pickle(delta.cow_frame, 'cows.pkl')
+            if breeding_df is not None and delta.breeding_frame is not None:
+                self._write_pickle(delta.breeding_frame, 'breeding.pkl')
+                meta['breeding_columns'] = _columns_digest(breeding_df.columns)
+            tmp_path = self._meta_file.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(tmp_path, self._meta_file)
+        except Exception as e:
+            logger.warning(f"保存同步快照失败: {e}")
+
+    def _write_pickle(self, df: pd.DataFrame, name: str):
+        tmp_path = self.path / f"{name}.tmp"
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, self.path / name)
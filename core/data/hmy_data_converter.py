@@ -67,6 +67,14 @@ class HMYDataConverter:
 
     @classmethod
     def convert_herd_to_excel(cls, api_data: dict, output_path: Path) -> Path:
+        frame = cls.herd_to_frame(api_data)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        frame.to_excel(output_path, index=False)
+        return output_path
+
+    @classmethod
+    def herd_to_frame(cls, api_data: dict) -> pd.DataFrame:
+        """API牛群数据转换为原始母牛数据表（即 convert_herd_to_excel 写入的内容）"""
         records = api_data.get("data") or []
         if not records:
             raise ValueError("慧牧云接口返回的牛群数据为空")
@@ -85,7 +93,4 @@ class HMYDataConverter:
 
         if "耳号" in frame.columns:
             frame = frame[frame["耳号"].notna() & (frame["耳号"] != "")]
-
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        frame.to_excel(output_path, index=False)
-        return output_path
+        return frame
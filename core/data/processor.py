@@ -6,6 +6,8 @@ import numpy as np
 import logging
 import traceback
 
+from core.data.dataset_io import save_columnar_copy, write_dataset
+
 # 品种字母和对应双字母代码的映射
 BREED_CORRECTIONS = {
     'H': 'HO',
@@ -964,6 +966,74 @@ def format_naab_number(naab_number):
 
     return formatted_naab if not errors else None, errors
 
+# 母牛数据多系统列名映射（标准列名 -> 可能的原始列名列表）
+COW_COLUMN_ALIASES = {
+    "cow_id": ["耳号", "牛号"],  # 伊起牛+慧牧云用"耳号"，DC305用"牛号"
+    "breed": ["品种"],
+    "sex": ["性别"],
+    "sire": ["父亲号", "父号", "公牛号"],  # 伊起牛"父亲号"、慧牧云"父号"、DC305"公牛号"
+    "mgs": ["外祖父", "外祖父号"],  # 伊起牛+慧牧云"外祖父"、DC305"外祖父号"
+    "dam": ["母亲号", "母号", "母亲牛号"],  # 伊起牛"母亲号"、慧牧云"母号"、DC305"母亲牛号"
+    "mmgs": ["外曾外祖父"],
+    "lac": ["胎次"],
+    "calving_date": ["最近产犊日期", "产犊日期"],  # 伊起牛"最近产犊日期"、慧牧云+DC305"产犊日期"
+    "birth_date": ["出生日期", "牛只出生日期", "生日"],  # 伊起牛"出生日期"、慧牧云+DC305"生日"
+    "age": ["月龄"],
+    "days_of_age": ["日龄"],  # DC305特有，用于计算月龄
+    "services_time": ["本胎次配次", "配次", "配种次数"],  # 伊起牛"本胎次配次"、慧牧云"配次"、DC305"配种次数"
+    "peak_milk": ["本胎次奶厅高峰产量"],
+    "milk_305": ["305奶量", "305ME"],  # 伊起牛+慧牧云"305奶量"、DC305"305ME"
+    "DIM": ["泌乳天数"],
+    "repro_status": ["繁育状态", "繁育代号"],  # 伊起牛+慧牧云"繁育状态"、DC305"繁育代号"
+}
+
+
+def cow_column_mapping(columns) -> dict:
+    """原始列名 -> 标准列名（每个标准列取第一个存在的别名）"""
+    column_mapping = {}
+    for standard_name, aliases in COW_COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in columns:
+                column_mapping[alias] = standard_name
+                break  # 找到第一个匹配的就停止
+    return column_mapping
+
+
+def derive_cow_age(cow_df):
+    """
+    补全月龄（age）：原始数据没有月龄时依次由日龄、出生日期计算（原地修改，birth_date 转换为日期）
+
+    参数:
+        cow_df: 已转换为标准列名的母牛数据
+    """
+    if 'age' not in cow_df.columns:
+        cow_df['age'] = np.nan
+
+    # 优先使用 days_of_age（DC305特有）计算月龄
+    if 'days_of_age' in cow_df.columns:
+        print("[DEBUG-4.5] 使用日龄计算月龄...")
+        # 日龄转月龄: days_of_age / 30.44
+        cow_df['days_of_age'] = pd.to_numeric(cow_df['days_of_age'], errors='coerce')
+        mask = cow_df['age'].isna() & cow_df['days_of_age'].notna()
+        cow_df.loc[mask, 'age'] = (cow_df.loc[mask, 'days_of_age'] / 30.44).round(1)
+        calculated_count = mask.sum()
+        if calculated_count > 0:
+            print(f"[DEBUG-4.5] 从日龄计算了 {calculated_count} 条月龄数据")
+
+    # 其次使用 birth_date 计算月龄
+    if 'birth_date' in cow_df.columns:
+        print("[DEBUG-4.6] 检查是否需要从出生日期计算月龄...")
+        cow_df['birth_date'] = pd.to_datetime(cow_df['birth_date'], errors='coerce')
+        today = pd.Timestamp.now()
+        mask = cow_df['age'].isna() & cow_df['birth_date'].notna()
+        if mask.any():
+            cow_df.loc[mask, 'age'] = cow_df.loc[mask, 'birth_date'].apply(
+                lambda bd: (today.year - bd.year) * 12 + (today.month - bd.month) if pd.notna(bd) else np.nan
+            )
+            calculated_count = mask.sum()
+            print(f"[DEBUG-4.6] 从出生日期计算了 {calculated_count} 条月龄数据")
+
+
 def preprocess_cow_data(cow_df, progress_callback=None, source_system: str = "伊起牛"):
     """
     预处理母牛数据
@@ -975,38 +1045,12 @@ def preprocess_cow_data(cow_df, progress_callback=None, source_system: str = "
     """
     print(f"[DEBUG-1] 开始预处理母牛数据，行数: {len(cow_df)}, source_system={source_system}")
     try:
-        # 多系统列名映射（标准列名 -> 可能的原始列名列表）
-        column_aliases = {
-            "cow_id": ["耳号", "牛号"],  # 伊起牛+慧牧云用"耳号"，DC305用"牛号"
-            "breed": ["品种"],
-            "sex": ["性别"],
-            "sire": ["父亲号", "父号", "公牛号"],  # 伊起牛"父亲号"、慧牧云"父号"、DC305"公牛号"
-            "mgs": ["外祖父", "外祖父号"],  # 伊起牛+慧牧云"外祖父"、DC305"外祖父号"
-            "dam": ["母亲号", "母号", "母亲牛号"],  # 伊起牛"母亲号"、慧牧云"母号"、DC305"母亲牛号"
-            "mmgs": ["外曾外祖父"],
-            "lac": ["胎次"],
-            "calving_date": ["最近产犊日期", "产犊日期"],  # 伊起牛"最近产犊日期"、慧牧云+DC305"产犊日期"
-            "birth_date": ["出生日期", "牛只出生日期", "生日"],  # 伊起牛"出生日期"、慧牧云+DC305"生日"
-            "age": ["月龄"],
-            "days_of_age": ["日龄"],  # DC305特有，用于计算月龄
-            "services_time": ["本胎次配次", "配次", "配种次数"],  # 伊起牛"本胎次配次"、慧牧云"配次"、DC305"配种次数"
-            "peak_milk": ["本胎次奶厅高峰产量"],
-            "milk_305": ["305奶量", "305ME"],  # 伊起牛+慧牧云"305奶量"、DC305"305ME"
-            "DIM": ["泌乳天数"],
-            "repro_status": ["繁育状态", "繁育代号"],  # 伊起牛+慧牧云"繁育状态"、DC305"繁育代号"
-        }
-
         # 替换表头中的中文列名为英文列名
         print("[DEBUG-2] 开始转换列名...")
         print("[DEBUG-3] 原始列名:", cow_df.columns.tolist())
 
         # 构建实际的列名映射（根据当前数据中存在的列名）
-        column_mapping = {}
-        for standard_name, aliases in column_aliases.items():
-            for alias in aliases:
-                if alias in cow_df.columns:
-                    column_mapping[alias] = standard_name
-                    break  # 找到第一个匹配的就停止
+        column_mapping = cow_column_mapping(cow_df.columns)
 
         print(f"[DEBUG-3.1] 构建的列名映射: {column_mapping}")
         cow_df.rename(columns=column_mapping, inplace=True)
@@ -1099,32 +1143,7 @@ def preprocess_cow_data(cow_df, progress_callback=None, source_system: str = "
             print("[DEBUG-4.4] 是否在场字段不存在，已创建并填充为 '是'")
 
         # 处理 age（月龄）字段：从 days_of_age 或 birth_date 计算
-        if 'age' not in cow_df.columns:
-            cow_df['age'] = np.nan
-
-        # 优先使用 days_of_age（DC305特有）计算月龄
-        if 'days_of_age' in cow_df.columns:
-            print("[DEBUG-4.5] 使用日龄计算月龄...")
-            # 日龄转月龄: days_of_age / 30.44
-            cow_df['days_of_age'] = pd.to_numeric(cow_df['days_of_age'], errors='coerce')
-            mask = cow_df['age'].isna() & cow_df['days_of_age'].notna()
-            cow_df.loc[mask, 'age'] = (cow_df.loc[mask, 'days_of_age'] / 30.44).round(1)
-            calculated_count = mask.sum()
-            if calculated_count > 0:
-                print(f"[DEBUG-4.5] 从日龄计算了 {calculated_count} 条月龄数据")
-
-        # 其次使用 birth_date 计算月龄
-        if 'birth_date' in cow_df.columns:
-            print("[DEBUG-4.6] 检查是否需要从出生日期计算月龄...")
-            cow_df['birth_date'] = pd.to_datetime(cow_df['birth_date'], errors='coerce')
-            today = pd.Timestamp.now()
-            mask = cow_df['age'].isna() & cow_df['birth_date'].notna()
-            if mask.any():
-                cow_df.loc[mask, 'age'] = cow_df.loc[mask, 'birth_date'].apply(
-                    lambda bd: (today.year - bd.year) * 12 + (today.month - bd.month) if pd.notna(bd) else np.nan
-                )
-                calculated_count = mask.sum()
-                print(f"[DEBUG-4.6] 从出生日期计算了 {calculated_count} 条月龄数据")
+        derive_cow_age(cow_df)
 
         # 定义需要保留的列
         print("[DEBUG-5] 设置需要保留的列...")
@@ -1451,12 +1470,116 @@ def preprocess_cow_data(cow_df, progress_callback=None, source_system: str = "
         raise ValueError(f"预处理母牛数据时出错: {e}")
 
 
-def process_cow_data_file(input_file: Path, project_path: Path, progress_callback=None, source_system: str = "伊起牛") -> Path:
+# 各数据来源系统的母牛数据中按文本读取的列
+COW_DATA_DTYPES = {
+    "慧牧云": {'耳号': str, '父号': str, '母号': str, '外祖父': str, '外曾外祖父': str},
+    "优源-DC305": {'牛号': str, '公牛号': str, '母亲牛号': str, '外祖父号': str},
+    "伊起牛": {'耳号': str, '父亲号': str, '母亲号': str, '外祖父': str, '外曾外祖父': str, '祖父': str, '与配冻精编号': str},
+}
+# 配种记录中按文本读取的列
+BREEDING_DATA_DTYPES = {'耳号': str, '母牛号': str, '冻精编号': str}
+
+
+def cow_data_dtypes(source_system: str) -> dict:
+    """母牛数据按文本读取的列（未知的来源系统按伊起牛处理）"""
+    return COW_DATA_DTYPES.get(source_system, COW_DATA_DTYPES["伊起牛"])
+
+
+def restandardize_changed_cows(df, herd_delta, progress_callback=None, source_system: str = "伊起牛"):
+    """
+    增量标准化母牛数据：只重新处理变化的母牛，其余沿用上次同步的标准化结果
+
+    一头牛的标准化结果取决于自身、母亲和外祖母的原始记录（birth_date_dam、mgd、birth_date_mgd），
+    因此受影响的是新增/变化的母牛，以及母亲或外祖母新增/变化/离开的母牛。受影响的母牛连同其母亲、
+    外祖母的记录一起交给 preprocess_cow_data；未受影响的母牛沿用上次的结果，只按本次原始数据刷新
+    随日期变化的月龄和泌乳天数。
+
+    参数:
+        df: 原始母牛数据（不修改）
+        herd_delta: core.data.herd_sync.HerdDelta
+        progress_callback: 进度回调函数
+        source_system: 数据来源系统
+
+    返回:
+        与 preprocess_cow_data(df) 相同的结果；无法增量处理（如存在重复或空的牛号）时返回None
+    """
+    previous = herd_delta.previous_cows
+    if previous is None or 'cow_id' not in previous.columns:
+        return None
+    mapping = cow_column_mapping(df.columns)
+    raw_names = {standard: raw for raw, standard in mapping.items()}
+    id_col = raw_names.get('cow_id')
+    if id_col is None or df[id_col].isna().any():
+        return None
+    ids = df[id_col].astype(str)
+    if ids.duplicated().any():
+        return None
+
+    changed = set(herd_delta.added) | set(herd_delta.changed)
+    touched = changed | set(herd_delta.removed)
+
+    # 母亲、外祖母的牛号（按原始值匹配，与 preprocess_cow_data 的查找方式一致）
+    dam_col = raw_names.get('dam')
+    if dam_col is not None:
+        key_of = dict(zip(df[id_col], ids))
+        dam_key = df[dam_col].map(key_of).fillna(df[dam_col].astype(str).where(df[dam_col].notna()))
+        granddam_key = dam_key.map(pd.Series(dam_key.values, index=ids.values))
+        affected_mask = ids.isin(changed) | dam_key.isin(touched) | granddam_key.isin(touched)
+        affected = set(ids[affected_mask])
+        context = affected | set(dam_key[affected_mask].dropna()) | set(granddam_key[affected_mask].dropna())
+    else:
+        affected = set(ids[ids.isin(changed)])
+        context = affected
+
+    # 未受影响的母牛沿用上次结果；上次结果中没有的只能是被过滤掉的公牛
+    reused_mask = ~ids.isin(affected)
+    reused = previous[previous['cow_id'].isin(set(ids[reused_mask]))]
+    missing = reused_mask & ~ids.isin(set(reused['cow_id']))
+    if missing.any():
+        sex_col = raw_names.get('sex')
+        if sex_col is None or not df.loc[missing, sex_col].isin(['公', 1, 1.0, '1']).all():
+            return None
+    print(f"[DEBUG-SYNC] 增量标准化母牛数据：重新处理 {len(affected)} 头，沿用上次结果 {len(reused)} 头")
+
+    label_of = pd.Series(df.index, index=ids.values)
+    reused = reused.copy()
+    reused.index = label_of.loc[reused['cow_id'].values].values
+    if len(reused):
+        # 刷新随日期变化的计数列
+        counters = df.loc[reused.index].rename(columns=mapping)
+        derive_cow_age(counters)
+        for column in ('age', 'DIM'):
+            if column in counters.columns:
+                values = pd.to_numeric(counters[column], errors='coerce').replace([np.inf, -np.inf], np.nan)
+                reused[column] = values.values
+
+    parts = [reused]
+    if affected:
+        subset = df[ids.isin(context)].copy()
+        processed = preprocess_cow_data(subset, progress_callback, source_system)
+        processed = processed[processed['cow_id'].isin(affected)]
+        for column in processed.columns:
+            if column in reused.columns and reused[column].dtype != processed[column].dtype and len(reused):
+                try:
+                    reused[column] = reused[column].astype(processed[column].dtype)
+                except (TypeError, ValueError):
+                    pass
+        parts = [processed, reused]
+
+    result = pd.concat(parts)
+    return result.loc[df.index[df.index.isin(result.index)]]
+
+
+def process_cow_data_file(input_file: Path, project_path: Path, progress_callback=None, source_system: str = "伊起牛",
+                          raw_df: pd.DataFrame = None, herd_delta=None) -> Path:
     """
     标准化母牛数据文件
 
     参数:
         source_system: 数据来源系统，可选值：伊起牛、慧牧云、优源-DC305
+        raw_df: 已在内存中的原始数据（与按 cow_data_dtypes 读取 input_file 的结果相同），给出时不读取文件
+        herd_delta: 与上次同步相比的变化（core.data.herd_sync.HerdDelta）；给出时只重新处理变化的母牛，
+            标准化结果记录在 herd_delta.cow_frame 中供保存快照
     """
     import logging
     print(f"[DEBUG-FILE-1] 开始标准化母牛数据文件: {input_file}, source_system={source_system}")
@@ -1481,20 +1604,10 @@ def process_cow_data_file(input_file: Path, project_path: Path, progress_callbac
         logging.info(f"开始读取母牛数据文件, source_system={source_system}")
 
         # 根据数据来源系统选择dtype配置
-        if source_system == "慧牧云":
-            dtype_config = {
-                '耳号': str, '父号': str, '母号': str, '外祖父': str, '外曾外祖父': str
-            }
-        elif source_system == "优源-DC305":
-            dtype_config = {
-                '牛号': str, '公牛号': str, '母亲牛号': str, '外祖父号': str
-            }
-        else:  # 默认伊起牛
-            dtype_config = {
-                '耳号': str, '父亲号': str, '母亲号': str, '外祖父': str, '外曾外祖父': str, '祖父': str, '与配冻精编号': str
-            }
-
-        df = pd.read_excel(input_file, dtype=dtype_config)
+        if raw_df is not None:
+            df = raw_df
+        else:
+            df = pd.read_excel(input_file, dtype=cow_data_dtypes(source_system))
         print(f"[DEBUG-FILE-4] 成功读取母牛数据文件，数据形状: {df.shape}")
         logging.info(f"成功读取母牛数据文件，数据形状: {df.shape}")
         logging.info(f"列名: {df.columns.tolist()}")
@@ -1509,7 +1622,13 @@ def process_cow_data_file(input_file: Path, project_path: Path, progress_callbac
     try:
         print("[DEBUG-FILE-5] 开始预处理母牛数据...")
         logging.info("开始预处理母牛数据...")
-        df_cleaned = preprocess_cow_data(df, progress_callback, source_system)
+        df_cleaned = None
+        if herd_delta is not None and herd_delta.previous_cows is not None:
+            df_cleaned = restandardize_changed_cows(df, herd_delta, progress_callback, source_system)
+        if df_cleaned is None:
+            df_cleaned = preprocess_cow_data(df, progress_callback, source_system)
+        if herd_delta is not None:
+            herd_delta.cow_frame = df_cleaned.copy()
         print(f"[DEBUG-FILE-6] 成功预处理母牛数据，处理后数据形状: {df_cleaned.shape}")
         logging.info(f"成功预处理母牛数据，处理后数据形状: {df_cleaned.shape}")
     except Exception as e:
@@ -1544,7 +1663,7 @@ def process_cow_data_file(input_file: Path, project_path: Path, progress_callbac
     try:
         print(f"[DEBUG-FILE-8] 开始保存标准化后的母牛数据到: {output_file}")
         logging.info(f"开始保存标准化后的母牛数据到: {output_file}")
-        df_cleaned.to_excel(output_file, index=False)
+        write_dataset(df_cleaned, output_file)
         print("[DEBUG-FILE-9] 成功保存标准化后的母牛数据")
         logging.info("成功保存标准化后的母牛数据")
     except Exception as e:
@@ -1715,7 +1834,7 @@ def process_bull_data_file(input_file: Path, project_path: Path, progress_callba
     # 假设标准化后的文件名固定为 "processed_bull_data.xlsx"
     output_file = standardized_path / "processed_bull_data.xlsx"
     try:
-        df_cleaned.to_excel(output_file, index=False)
+        write_dataset(df_cleaned, output_file)
     except Exception as e:
         raise ValueError(f"保存备选公牛数据文件失败: {e}")
 
@@ -1855,7 +1974,7 @@ def process_body_conformation_file(input_file: Path, project_path: Path, progres
     # 保存标准化后的文件
     output_file = standardized_path / "processed_body_conformation_data.xlsx"
     try:
-        df_cleaned.to_excel(output_file, index=False)
+        write_dataset(df_cleaned, output_file)
     except Exception as e:
         raise ValueError(f"保存体型外貌数据文件失败: {e}")
 
@@ -1865,7 +1984,8 @@ def process_body_conformation_file(input_file: Path, project_path: Path, progres
 
     return output_file
 
-def process_breeding_record_file(input_file: Path, project_path: Path, cow_df=None, progress_callback=None, source_system: str = "伊起牛") -> Path:
+def process_breeding_record_file(input_file: Path, project_path: Path, cow_df=None, progress_callback=None, source_system: str = "伊起牛",
+                                 raw_df: pd.DataFrame = None, herd_delta=None) -> Path:
     """
     标准化配种记录数据文件 - 完全重写版本
 
@@ -1877,6 +1997,10 @@ def process_breeding_record_file(input_file: Path, project_path: Path, cow_df=No
         cow_df (DataFrame, optional): 母牛数据的DataFrame，用于映射父号
         progress_callback (callable, optional): 进度回调函数
         source_system (str): 数据来源系统，可选值：伊起牛、慧牧云、优源-DC305
+        raw_df (DataFrame, optional): 已在内存中的原始数据（与按 BREEDING_DATA_DTYPES 读取 input_file 的结果相同），
+            给出时不读取文件
+        herd_delta (HerdDelta, optional): 与上次同步相比的变化（core.data.herd_sync）；给出时只处理新增的配种记录，
+            其余沿用上次的结果（父号按本次母牛数据重新映射），结果记录在 herd_delta.breeding_frame 中供保存快照
 
     返回:
         Path: 标准化后的配种记录数据文件路径
@@ -1894,11 +2018,13 @@ def process_breeding_record_file(input_file: Path, project_path: Path, cow_df=No
     standardized_path.mkdir(parents=True, exist_ok=True)
 
     try:
-        if input_file.suffix.lower() == '.csv':
-            df_raw = pd.read_csv(input_file, dtype={'耳号': str, '母牛号': str, '冻精编号': str})
+        if raw_df is not None:
+            df_raw = raw_df.copy()
+        elif input_file.suffix.lower() == '.csv':
+            df_raw = pd.read_csv(input_file, dtype=BREEDING_DATA_DTYPES)
         else:
             # 🔧 关键修复：先读取，然后立即转换日期列为字符串
-            df_raw = pd.read_excel(input_file, dtype={'耳号': str, '母牛号': str, '冻精编号': str})
+            df_raw = pd.read_excel(input_file, dtype=BREEDING_DATA_DTYPES)
         print(f"  ✓ 读取成功，原始数据形状: {df_raw.shape}")
         print(f"  ✓ 包含列: {', '.join(df_raw.columns)}")
 
@@ -1935,6 +2061,21 @@ def process_breeding_record_file(input_file: Path, project_path: Path, cow_df=No
         print(f"  ✗ {error_msg}")
         raise ValueError(error_msg)
 
+    # 增量同步：每条记录按内容摘要识别，上次已标准化的记录直接沿用
+    digests = None
+    reused_records = None
+    if herd_delta is not None and herd_delta.breeding_digests is not None \
+            and len(herd_delta.breeding_digests) == len(df_raw):
+        df_raw = df_raw.reset_index(drop=True)
+        digests = pd.Series(herd_delta.breeding_digests, dtype=object)
+        previous = herd_delta.previous_breeding
+        if previous is not None:
+            position_of = pd.Series(digests.index, index=digests.values)
+            reused_records = previous[previous['_digest'].isin(position_of.index)]
+            reused_records = reused_records.set_index(position_of.loc[reused_records['_digest']].values)
+            df_raw = df_raw[~digests.isin(set(previous['_digest']))]
+            print(f"  ✓ 增量同步：新增 {len(df_raw)} 条记录，沿用上次结果 {len(reused_records)} 条")
+
 
     # ========== 第2步: 列名映射 ==========
     print(f"\n【步骤2】列名标准化")
@@ -2008,7 +2149,7 @@ def process_breeding_record_file(input_file: Path, project_path: Path, cow_df=No
 
     df_cleaned = df_raw.dropna(subset=required_columns).copy()
     print(f"  - 删除缺失值后: {len(df_cleaned)}")
-    print(f"  - 删除了 {len(df_raw) - len(df_cleaned)} 条记录 ({(len(df_raw) - len(df_cleaned))/len(df_raw)*100:.1f}%)")
+    print(f"  - 删除了 {len(df_raw) - len(df_cleaned)} 条记录 ({(len(df_raw) - len(df_cleaned))/max(len(df_raw), 1)*100:.1f}%)")
 
 
     # ========== 第5步: 备份配种日期列（关键步骤！） ==========
@@ -2081,9 +2222,9 @@ def process_breeding_record_file(input_file: Path, project_path: Path, cow_df=No
 
     print(f"  ✓ 冻精编号格式化完成")
     print(f"  - 总编号数: {non_empty_count}/{len(df_cleaned)}")
-    print(f"  - 标准NAAB号: {standard_count} ({standard_count/len(df_cleaned)*100:.1f}%)")
+    print(f"  - 标准NAAB号: {standard_count} ({standard_count/max(len(df_cleaned), 1)*100:.1f}%)")
     if non_standard_count > 0:
-        print(f"  - 非标准编号: {non_standard_count} ({non_standard_count/len(df_cleaned)*100:.1f}%) [已保留原值]")
+        print(f"  - 非标准编号: {non_standard_count} ({non_standard_count/max(len(df_cleaned), 1)*100:.1f}%) [已保留原值]")
 
     # ========== 第8步: 恢复配种日期并转换为datetime ==========
     print(f"\n【步骤8】🔓 恢复并转换配种日期")
@@ -2145,7 +2286,7 @@ def process_breeding_record_file(input_file: Path, project_path: Path, cow_df=No
     successful_conversions = df_cleaned['配种日期'].notna().sum()
     print(f"  ✓ datetime转换完成")
     print(f"  - 成功转换: {successful_conversions}/{len(breed_date_backup)}")
-    print(f"  - 转换成功率: {successful_conversions/len(breed_date_backup)*100:.1f}%")
+    print(f"  - 转换成功率: {successful_conversions/max(len(breed_date_backup), 1)*100:.1f}%")
 
     if successful_conversions < len(breed_date_backup) * 0.9:
         print(f"  ⚠️  警告: 超过10%的日期转换失败")
@@ -2170,6 +2311,13 @@ def process_breeding_record_file(input_file: Path, project_path: Path, cow_df=No
         df_cleaned[col] = df_cleaned[col].fillna('')
     print(f"  ✓ 非日期列空值填充完成")
 
+    if digests is not None:
+        record_columns = ['耳号', '冻精编号', '配种日期', '冻精类型']
+        if reused_records is not None:
+            df_cleaned = pd.concat([df_cleaned[record_columns], reused_records[record_columns]]).sort_index()
+            df_cleaned['配种日期'] = pd.to_datetime(df_cleaned['配种日期'])
+        herd_delta.breeding_frame = df_cleaned[record_columns].assign(_digest=digests.loc[df_cleaned.index].values)
+
     # ========== 第10步: 添加父号列（从母牛数据映射） ==========
     print(f"\n【步骤10】映射父号")
     if cow_df is not None and not cow_df.empty and 'cow_id' in cow_df.columns and 'sire' in cow_df.columns:
@@ -2223,6 +2371,7 @@ def process_breeding_record_file(input_file: Path, project_path: Path, cow_df=No
                             else:
                                 cell.value = str(v)
                         cell.number_format = '@'
+        save_columnar_copy(df_final, output_file)
         print(f"  ✓ 文件已保存: {output_file}")
     except Exception as e:
         error_msg = f"保存文件失败: {e}"
@@ -2443,7 +2592,7 @@ def process_genomic_data_file(input_files: list[Path], project_path: Path, progr
 
             # 保存独立的处理结果
             output_file = standardized_path / f"processed_genomic_data_{idx}.xlsx"
-            df_cleaned.to_excel(output_file, index=False)
+            write_dataset(df_cleaned, output_file)
             print(f"已保存处理结果到: {output_file}")
             processed_files.append(output_file)
             
@@ -2501,7 +2650,7 @@ def process_genomic_data_file(input_files: list[Path], project_path: Path, progr
                     final_df['cow_id'] = final_df['cow_id'].astype(str)
 
                 # 保存最终结果
-                final_df.to_excel(final_output, index=False)
+                write_dataset(final_df, final_output)
                 print(f"已保存最终汇总结果到: {final_output}")
                 if progress_callback:
                     progress_callback(95, f"多文件合并完成，保存至: {final_output.name}")
@@ -2543,7 +2692,7 @@ def process_genomic_data_file(input_files: list[Path], project_path: Path, progr
                 progress_callback(92, f"增量合并去重: {original_count} -> {deduplicated_count} 条记录")
 
             # 保存最终结果
-            final_df.to_excel(final_output, index=False)
+            write_dataset(final_df, final_output)
             print(f"已保存最终汇总结果到: {final_output}")
             if progress_callback:
                 progress_callback(95, f"增量合并完成，保存至: {final_output.name}")
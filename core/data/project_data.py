@@ -0,0 +1,266 @@
+"""
+项目数据上下文
+
+一次完整的个体选配（分组 → 推荐矩阵 → 分配 → 报告）中，GroupManager、MatrixRecommendationGenerator、
+CycleBasedMatcher、CompleteMatingExecutor、DataLoader 各自读取同一批文件（母牛指数、公牛数据、
+公牛指数、备选公牛近交系数及隐性基因分析结果等），同一文件要解析好几次；备选公牛分析结果还要在
+整个项目目录下递归 glob 查找。
+
+ProjectData 按项目缓存解析后的 DataFrame：
+
+- 以 文件路径 + 读取参数 为键，记录数据集的大小和修改时间（dataset_io.dataset_signature），
+  文件变化后自动重新读取
+- 返回的是共享数据的浅拷贝（pandas 写时复制），调用方修改列不会影响缓存，也不需要整表复制；
+  pandas 2.x 由 enable_copy_on_write() 在程序启动时开启写时复制，未开启时退回为深拷贝
+- 按内存预算淘汰最久未使用的数据
+- latest() 缓存 glob 查找结果，以查找时经过的各目录的修改时间判断是否失效
+
+同一时间只保留一个项目的上下文，切换项目时释放上一个项目的缓存。
+"""
+
+import fnmatch
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from .dataset_io import DATASET_DIR_NAME, dataset_signature, read_dataset
+
+logger = logging.getLogger(__name__)
+
+# 缓存的解析结果总内存上限
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+
+PathLike = Union[str, Path]
+
+
+def _copy_on_write() -> bool:
+    """pandas 是否启用了写时复制（3.0 起始终启用）"""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    try:
+        return pd.get_option('mode.copy_on_write') is True
+    except Exception:
+        return False
+
+
+def enable_copy_on_write() -> bool:
+    """
+    在 pandas 2.x 上开启写时复制（与 pandas 3 的行为一致），进程启动时调用一次
+
+    Returns:
+        bool: 当前进程是否已启用写时复制
+    """
+    if not _copy_on_write():
+        try:
+            pd.set_option('mode.copy_on_write', True)
+        except Exception as e:
+            logger.warning(f"无法开启pandas写时复制，缓存数据将按深拷贝返回: {e}")
+    return _copy_on_write()
+
+
+def _frame_size(df: pd.DataFrame) -> int:
+    try:
+        return int(df.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return 0
+
+
+def _freeze(value):
+    """读取参数转换为可作为字典键的值"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, type):
+        return value.__name__
+    return str(value) if value is not None else None
+
+
+class ProjectData:
+    """一个项目的解析数据缓存（线程安全）"""
+
+    def __init__(self, project_path: PathLike, memory_budget: int = DEFAULT_MEMORY_BUDGET):
+        """
+        Args:
+            project_path: 项目路径（相对路径按项目路径解析）
+            memory_budget: 缓存的解析结果总内存上限（字节）
+        """
+        self.project_path = Path(project_path).absolute()
+        self.memory_budget = memory_budget
+        # 键 → (标识, DataFrame, 占用字节数)，按最近使用排序
+        self._frames: 'OrderedDict[tuple, Tuple[tuple, pd.DataFrame, int]]' = OrderedDict()
+        self._memory = 0
+        # glob模式 → (经过的目录及其修改时间, 匹配的文件)
+        self._globs: Dict[str, Tuple[Dict[str, int], List[Path]]] = {}
+        self._lock = threading.Lock()
+        # 同一文件只由一个线程解析，其他线程等待结果
+        self._key_locks: Dict[tuple, threading.Lock] = {}
+        self.parse_count = 0
+        self.hit_count = 0
+
+    def _resolve(self, path: PathLike) -> Path:
+        path = Path(path)
+        return path if path.is_absolute() else self.project_path / path
+
+    def _view(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df.copy(deep=False) if _copy_on_write() else df.copy()
+
+    def read(self, path: PathLike, sheet_name: Union[str, int] = 0, dtype=None, usecols=None,
+             **kwargs) -> pd.DataFrame:
+        """
+        读取数据集（参数同 dataset_io.read_dataset，其他参数交给 pd.read_excel）
+
+        Returns:
+            pd.DataFrame: 调用方可以直接修改，不影响缓存
+
+        Raises:
+            FileNotFoundError: 数据集不存在
+        """
+        path = self._resolve(path)
+        key = (str(path), str(sheet_name), _freeze(dtype), _freeze(usecols), _freeze(kwargs))
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            signature = dataset_signature(path)
+            if signature is None:
+                raise FileNotFoundError(f"数据文件不存在: {path}")
+            with self._lock:
+                cached = self._frames.get(key)
+                if cached is not None and cached[0] == signature:
+                    self._frames.move_to_end(key)
+                    self.hit_count += 1
+                    return self._view(cached[1])
+
+            df = read_dataset(path, sheet_name=sheet_name, dtype=dtype, usecols=usecols, **kwargs)
+            size = _frame_size(df)
+            with self._lock:
+                self.parse_count += 1
+                self._discard(key)
+                self._frames[key] = (signature, df, size)
+                self._memory += size
+                self._evict()
+            logger.debug(f"已解析并缓存: {path.name} ({size / 1024 / 1024:.1f} MB)")
+            return self._view(df)
+
+    def _discard(self, key: tuple):
+        cached = self._frames.pop(key, None)
+        if cached is not None:
+            self._memory -= cached[2]
+
+    def _evict(self):
+        """超出内存预算时淘汰最久未使用的数据（至少保留最新的一份）"""
+        while self._memory > self.memory_budget and len(self._frames) > 1:
+            key, (_, _, size) = self._frames.popitem(last=False)
+            self._memory -= size
+            logger.debug(f"超出缓存内存预算，释放: {Path(key[0]).name}")
+
+    def latest(self, pattern: str, root: Optional[PathLike] = None) -> Optional[Path]:
+        """
+        在项目目录下递归查找与模式匹配的文件，返回修改时间最新的一个
+
+        相当于 max(root.glob("**/" + pattern), key=修改时间)，但只匹配文件，并跳过数据集副本目录。
+
+        Args:
+            pattern: 文件名模式，如 "备选公牛_近交系数及隐性基因分析结果*.xlsx"
+            root: 查找的目录，默认为项目路径
+
+        Returns:
+            Optional[Path]: 没有匹配的文件时为None
+        """
+        matches = self.glob(pattern, root)
+        latest_file, latest_mtime = None, None
+        for path in matches:
+            try:
+                mtime = path.stat().st_mtime
+            except OSError:
+                continue
+            if latest_mtime is None or mtime > latest_mtime:
+                latest_file, latest_mtime = path, mtime
+        return latest_file
+
+    def glob(self, pattern: str, root: Optional[PathLike] = None) -> List[Path]:
+        """递归查找与文件名模式匹配的文件（结果按目录修改时间缓存）"""
+        root = self._resolve(root) if root is not None else self.project_path
+        cache_key = f"{root}|{pattern}"
+        with self._lock:
+            cached = self._globs.get(cache_key)
+        if cached is not None and self._directories_unchanged(cached[0]):
+            return list(cached[1])
+
+        directories: Dict[str, int] = {}
+        matches: List[Path] = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            try:
+                directories[dirpath] = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                continue
+            dirnames[:] = [name for name in dirnames if name != DATASET_DIR_NAME]
+            matches.extend(Path(dirpath) / name for name in fnmatch.filter(filenames, pattern))
+        with self._lock:
+            self._globs[cache_key] = (directories, matches)
+        return list(matches)
+
+    @staticmethod
+    def _directories_unchanged(directories: Dict[str, int]) -> bool:
+        # 目录中增删文件或子目录会改变目录的修改时间
+        for dirpath, mtime_ns in directories.items():
+            try:
+                if os.stat(dirpath).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def invalidate(self, path: Optional[PathLike] = None):
+        """丢弃某个文件（默认全部）的缓存"""
+        with self._lock:
+            if path is None:
+                self._frames.clear()
+                self._globs.clear()
+                self._memory = 0
+                return
+            path = str(self._resolve(path))
+            for key in [key for key in self._frames if key[0] == path]:
+                self._discard(key)
+
+    def get_stats(self) -> dict:
+        """缓存统计信息"""
+        with self._lock:
+            return {
+                'cached_frames': len(self._frames),
+                'memory_mb': self._memory / 1024 / 1024,
+                'parse_count': self.parse_count,
+                'hit_count': self.hit_count,
+                'files': sorted({Path(key[0]).name for key in self._frames}),
+            }
+
+
+_current: Optional[ProjectData] = None
+_current_lock = threading.Lock()
+
+
+def get_project_data(project_path: PathLike) -> ProjectData:
+    """
+    项目的数据上下文（同一项目返回同一个实例）
+
+    Args:
+        project_path: 项目路径
+
+    Returns:
+        ProjectData
+    """
+    global _current
+    project_path = Path(project_path).absolute()
+    with _current_lock:
+        if _current is None or _current.project_path != project_path:
+            if _current is not None:
+                logger.debug(f"切换项目，释放数据缓存: {_current.project_path}")
+            _current = ProjectData(project_path)
+        return _current
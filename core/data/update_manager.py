@@ -71,13 +71,14 @@ def get_cloud_engine():
 # 全局系谱库管理器实例
 pedigree_db_instance = None
 
-def get_pedigree_db(force_update=False, progress_callback=None):
+def get_pedigree_db(force_update=False, progress_callback=None, incremental=False):
     """
     获取系谱库管理器实例，如果不存在则创建
 
     Args:
         force_update: 是否强制更新系谱库
         progress_callback: 进度回调函数
+        incremental: 强制更新时是否按bull_library行差异增量更新（复用现有实例），无法增量时全量重建
 
     Returns:
         PedigreeDatabase: 系谱库管理器实例
@@ -91,7 +92,9 @@ def get_pedigree_db(force_update=False, progress_callback=None):
                 pedigree_db_instance = update_pedigree(
                     db_path=LOCAL_DB_PATH,
                     pedigree_cache_path=PEDIGREE_CACHE_PATH,
-                    progress_callback=progress_callback
+                    progress_callback=progress_callback,
+                    incremental=incremental,
+                    pedigree_db=pedigree_db_instance
                 )
             else:
                 logging.info("加载或构建系谱库")
@@ -231,7 +234,9 @@ def run_update_process(force_update: bool = False, progress_callback: Optional[C
             logging.info("将重建系谱索引（原因: %s）",
                         "用户强制更新" if force_update else "公牛库已更新")
 
-        pedigree_db = get_pedigree_db(force_update=should_rebuild_pedigree, progress_callback=progress_callback)
+        # 公牛库版本更新时只按行差异增量更新系谱；用户强制更新时全量重建
+        pedigree_db = get_pedigree_db(force_update=should_rebuild_pedigree, progress_callback=progress_callback,
+                                      incremental=not force_update)
 
         if pedigree_db:
             logging.info("数据库更新成功")
@@ -2,10 +2,16 @@
 
 import datetime
 import logging
+import os
+import threading
 import traceback
 import shutil
 from pathlib import Path
+from typing import Dict, Optional
+from core.data.dataset_io import excel_roundtrip, read_dataset
 from core.data.processor import (
+    BREEDING_DATA_DTYPES,
+    cow_data_dtypes,
     process_breeding_record_file,
     process_cow_data_file,
     process_bull_data_file,
@@ -17,7 +23,75 @@ import pandas as pd
 # 设置日志配置（可选）
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def upload_and_standardize_breeding_data(input_files: list[Path], project_path: Path, progress_callback=None, source_system: str = "伊起牛") -> Path:
+# 正在后台写入的原始数据存档：文件路径 → 写入线程
+_archive_threads: Dict[str, threading.Thread] = {}
+_archive_lock = threading.Lock()
+
+
+def archive_raw_frame(df: pd.DataFrame, path: Path) -> threading.Thread:
+    """
+    在后台把内存中的原始数据写为 raw_data 下的xlsx存档（不在标准化的关键路径上）
+
+    先写临时文件再替换，读取方不会读到写了一半的文件；需要读取存档的地方先调用 wait_for_raw_archives。
+
+    参数:
+        df (DataFrame): 原始数据（按 index=False 写入）
+        path (Path): 存档路径
+
+    返回:
+        threading.Thread: 写入线程
+    """
+    path = Path(path)
+
+    def write():
+        tmp_path = path.with_name(path.stem + '.tmp' + path.suffix)
+        try:
+            df.to_excel(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            logging.info(f"原始数据存档已写入: {path}")
+        except Exception as e:
+            logging.warning(f"写入原始数据存档失败: {path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+    with _archive_lock:
+        previous = _archive_threads.get(str(path))
+    if previous is not None:
+        # 同一文件的上一次存档写完后再写，避免旧数据覆盖新数据
+        previous.join()
+    thread = threading.Thread(target=write, name=f"archive-{path.name}")
+    with _archive_lock:
+        _archive_threads[str(path)] = thread
+    thread.start()
+    return thread
+
+
+def wait_for_raw_archives(timeout: Optional[float] = None):
+    """等待后台的原始数据存档写完"""
+    with _archive_lock:
+        threads = list(_archive_threads.values())
+    for thread in threads:
+        thread.join(timeout)
+
+
+def _ingest_raw_frame(raw_df: pd.DataFrame, target_file: Path, dtype: dict) -> Optional[pd.DataFrame]:
+    """
+    内存中的原始数据按xlsx读取规则转换后直接交给标准化，xlsx存档在后台写入
+
+    返回:
+        Optional[DataFrame]: 与读取存档xlsx得到的相同数据；无法可靠模拟xlsx读取时同步写入存档并返回None，
+            由标准化照常读取文件
+    """
+    df_as_read = excel_roundtrip(raw_df, dtype=dtype)
+    if df_as_read is None:
+        wait_for_raw_archives()
+        raw_df.to_excel(target_file, index=False)
+        return None
+    archive_raw_frame(raw_df, target_file)
+    return df_as_read
+
+
+def upload_and_standardize_breeding_data(input_files: list[Path], project_path: Path, progress_callback=None, source_system: str = "伊起牛",
+                                         raw_df: pd.DataFrame = None, herd_delta=None) -> Path:
     """
     处理上传的配种记录数据并进行标准化。
 
@@ -26,6 +100,9 @@ def upload_and_standardize_breeding_data(input_files: list[Path], project_path:
         project_path (Path): 当前项目的路径。
         progress_callback (callable, optional): 进度回调函数，用于更新进度条或显示信息。
         source_system (str): 数据来源系统，可选值：伊起牛、慧牧云、优源-DC305
+        raw_df (DataFrame, optional): 已在内存中的原始配种记录（如API下载后转换的数据）。给出时忽略
+            input_files 直接标准化，raw_data/breeding_records.xlsx 只作为存档在后台写入。
+        herd_delta (HerdDelta, optional): 与上次同步相比的变化（core.data.herd_sync），给出时只处理新增的配种记录
 
     返回:
         Path: 标准化后的配种记录数据文件路径。
@@ -55,7 +132,7 @@ def upload_and_standardize_breeding_data(input_files: list[Path], project_path:
     # 读取母牛数据
     try:
         print("[DEBUG-BREEDING-UPLOAD-3] 读取母牛数据...")
-        cow_df = pd.read_excel(cow_data_file, dtype={'cow_id': str, 'sire': str})
+        cow_df = read_dataset(cow_data_file, dtype={'cow_id': str, 'sire': str})
         print(f"[DEBUG-BREEDING-UPLOAD-4] 母牛数据读取成功，形状: {cow_df.shape}")
     except Exception as e:
         error_msg = f"读取母牛数据时出错: {e}"
@@ -63,32 +140,40 @@ def upload_and_standardize_breeding_data(input_files: list[Path], project_path:
         logging.error(error_msg)
         raise ValueError(error_msg)
 
-    # 确保只上传一个文件
-    if len(input_files) != 1:
-        logging.error("请上传且仅上传一个配种记录数据文件。")
-        raise ValueError("请上传且仅上传一个配种记录数据文件。")
-
-    source_file = input_files[0]
-    if not source_file.exists():
-        logging.error(f"输入文件不存在: {source_file}")
-        raise FileNotFoundError(f"输入文件不存在: {source_file}")
-
     # 固定文件名为 'breeding_records.xlsx'
     target_file = raw_data_path / "breeding_records.xlsx"
 
-    # 检查源文件和目标文件是否相同
-    if source_file.resolve() == target_file.resolve():
-        logging.info(f"源文件已在目标位置，跳过复制: {target_file}")
+    if raw_df is not None:
+        # 内存中的数据直接标准化，存档在后台写入
+        raw_df = _ingest_raw_frame(raw_df, target_file, BREEDING_DATA_DTYPES)
+        print(f"[DEBUG-BREEDING-UPLOAD-5] 配种记录直接从内存标准化，存档至: {target_file}")
     else:
-        shutil.copy2(source_file, target_file)
-        logging.info(f"已上传并重命名配种记录文件至: {target_file}")
-    print(f"[DEBUG-BREEDING-UPLOAD-5] 已上传配种记录文件至: {target_file}")
+        # 确保只上传一个文件
+        if len(input_files) != 1:
+            logging.error("请上传且仅上传一个配种记录数据文件。")
+            raise ValueError("请上传且仅上传一个配种记录数据文件。")
+
+        source_file = input_files[0]
+        if not source_file.exists():
+            logging.error(f"输入文件不存在: {source_file}")
+            raise FileNotFoundError(f"输入文件不存在: {source_file}")
+
+        # 检查源文件和目标文件是否相同
+        if source_file.resolve() == target_file.resolve():
+            logging.info(f"源文件已在目标位置，跳过复制: {target_file}")
+        else:
+            shutil.copy2(source_file, target_file)
+            logging.info(f"已上传并重命名配种记录文件至: {target_file}")
+        print(f"[DEBUG-BREEDING-UPLOAD-5] 已上传配种记录文件至: {target_file}")
 
     # 预检查：读取文件列名，检测是否缺少必需列
     print(f"[DEBUG-BREEDING-UPLOAD-5.1] 开始预检查配种记录数据格式...")
     try:
-        preview_df = pd.read_excel(target_file, nrows=5)  # 只读前5行用于检测列名
-        actual_columns = list(preview_df.columns)
+        if raw_df is not None:
+            actual_columns = list(raw_df.columns)
+        else:
+            preview_df = pd.read_excel(target_file, nrows=5)  # 只读前5行用于检测列名
+            actual_columns = list(preview_df.columns)
         print(f"[DEBUG-BREEDING-UPLOAD-5.2] 检测到的列名: {actual_columns}")
 
         # 定义列名映射（与 processor.py 保持一致）
@@ -136,9 +221,11 @@ def upload_and_standardize_breeding_data(input_files: list[Path], project_path:
         project_path,
         cow_df=cow_df,  # 传入母牛数据，用于匹配父号
         progress_callback=progress_callback,
-        source_system=source_system  # 传递数据来源系统
+        source_system=source_system,  # 传递数据来源系统
+        raw_df=raw_df,
+        herd_delta=herd_delta
     )
-    
+
     if final_path is None or not final_path.exists():
         logging.error("标准化后的配种记录数据文件未生成，请检查标准化逻辑。")
         raise ValueError("标准化后的配种记录数据文件未生成，请检查标准化逻辑。")
@@ -148,7 +235,8 @@ def upload_and_standardize_breeding_data(input_files: list[Path], project_path:
     return final_path
 
 
-def upload_and_standardize_cow_data(input_files: list[Path], project_path: Path, progress_callback=None, source_system: str = "伊起牛") -> Path:
+def upload_and_standardize_cow_data(input_files: list[Path], project_path: Path, progress_callback=None, source_system: str = "伊起牛",
+                                    raw_df: pd.DataFrame = None, remap_breeding: bool = True, herd_delta=None) -> Path:
     """
     处理上传的母牛数据并进行标准化，同时自动重新映射配种记录中的父号。
 
@@ -157,6 +245,10 @@ def upload_and_standardize_cow_data(input_files: list[Path], project_path: Path,
         project_path (Path): 当前项目的路径。
         progress_callback (callable, optional): 进度回调函数，用于更新进度条或显示信息。
         source_system (str): 数据来源系统，可选值：伊起牛、慧牧云、优源-DC305
+        raw_df (DataFrame, optional): 已在内存中的原始母牛数据（如API下载后转换的数据）。给出时忽略
+            input_files 直接标准化，raw_data/cow_data.xlsx 只作为存档在后台写入。
+        remap_breeding (bool): 是否用已有的原始配种记录重新映射父号；调用方随后会标准化新下载的配种记录时传False
+        herd_delta (HerdDelta, optional): 与上次同步相比的变化（core.data.herd_sync），给出时只重新处理变化的母牛
 
     返回:
         Path: 标准化后的母牛数据文件路径。
@@ -204,67 +296,73 @@ def upload_and_standardize_cow_data(input_files: list[Path], project_path: Path,
         logging.error(error_msg)
         raise ValueError(error_msg)
 
-    # 确保只上传一个文件
-    if not input_files:
-        error_msg = "未提供输入文件。"
-        print(f"[DEBUG-UPLOAD-ERROR] {error_msg}")
-        logging.error(error_msg)
-        raise ValueError(error_msg)
-        
-    if len(input_files) != 1:
-        error_msg = f"请上传且仅上传一个母牛数据文件，当前文件数: {len(input_files)}"
-        print(f"[DEBUG-UPLOAD-ERROR] {error_msg}")
-        logging.error(error_msg)
-        raise ValueError(error_msg)
+    # 固定文件名为 'cow_data.xlsx'
+    target_file = raw_data_path / "cow_data.xlsx"
 
-    source_file = input_files[0]
-    print(f"[DEBUG-UPLOAD-7] 源文件路径: {source_file}")
-    logging.info(f"源文件路径: {source_file}")
-    
-    if not source_file.exists():
-        error_msg = f"输入文件不存在: {source_file}"
-        print(f"[DEBUG-UPLOAD-ERROR] {error_msg}")
-        logging.error(error_msg)
-        raise FileNotFoundError(error_msg)
-    
-    # 记录文件信息
-    try:
-        print("[DEBUG-UPLOAD-8] 获取文件信息...")
-        file_size = source_file.stat().st_size
-        print(f"[DEBUG-UPLOAD-9] 源文件大小: {file_size} 字节")
-        logging.info(f"源文件大小: {file_size} 字节")
-        if file_size == 0:
-            error_msg = f"源文件为空: {source_file}"
+    if raw_df is not None:
+        # 内存中的数据直接标准化，存档在后台写入
+        raw_df = _ingest_raw_frame(raw_df, target_file, cow_data_dtypes(source_system))
+        print(f"[DEBUG-UPLOAD-10] 母牛数据直接从内存标准化，存档至: {target_file}")
+        logging.info(f"母牛数据直接从内存标准化，存档至: {target_file}")
+    else:
+        # 确保只上传一个文件
+        if not input_files:
+            error_msg = "未提供输入文件。"
+            print(f"[DEBUG-UPLOAD-ERROR] {error_msg}")
+            logging.error(error_msg)
+            raise ValueError(error_msg)
+        
+        if len(input_files) != 1:
+            error_msg = f"请上传且仅上传一个母牛数据文件，当前文件数: {len(input_files)}"
             print(f"[DEBUG-UPLOAD-ERROR] {error_msg}")
             logging.error(error_msg)
             raise ValueError(error_msg)
-    except Exception as e:
-        error_msg = f"获取文件信息时出错: {e}"
-        print(f"[DEBUG-UPLOAD-ERROR] {error_msg}")
-        logging.error(error_msg)
-        raise ValueError(error_msg)
-
-    # 固定文件名为 'cow_data.xlsx'
-    target_file = raw_data_path / "cow_data.xlsx"
 
-    # 检查源文件和目标文件是否相同
-    import os
-    if source_file.resolve() == target_file.resolve():
-        print(f"[DEBUG-UPLOAD-10] 源文件已在目标位置，跳过复制: {target_file}")
-        logging.info(f"源文件已在目标位置，跳过复制: {target_file}")
-    else:
+        source_file = input_files[0]
+        print(f"[DEBUG-UPLOAD-7] 源文件路径: {source_file}")
+        logging.info(f"源文件路径: {source_file}")
+    
+        if not source_file.exists():
+            error_msg = f"输入文件不存在: {source_file}"
+            print(f"[DEBUG-UPLOAD-ERROR] {error_msg}")
+            logging.error(error_msg)
+            raise FileNotFoundError(error_msg)
+    
+        # 记录文件信息
         try:
-            print(f"[DEBUG-UPLOAD-10] 开始复制文件: {source_file} -> {target_file}")
-            import shutil
-            shutil.copy2(source_file, target_file)
-            print(f"[DEBUG-UPLOAD-11] 已上传并重命名母牛数据文件至: {target_file}")
-            logging.info(f"已上传并重命名母牛数据文件至: {target_file}")
+            print("[DEBUG-UPLOAD-8] 获取文件信息...")
+            file_size = source_file.stat().st_size
+            print(f"[DEBUG-UPLOAD-9] 源文件大小: {file_size} 字节")
+            logging.info(f"源文件大小: {file_size} 字节")
+            if file_size == 0:
+                error_msg = f"源文件为空: {source_file}"
+                print(f"[DEBUG-UPLOAD-ERROR] {error_msg}")
+                logging.error(error_msg)
+                raise ValueError(error_msg)
         except Exception as e:
-            error_msg = f"复制文件时出错: {e}"
+            error_msg = f"获取文件信息时出错: {e}"
             print(f"[DEBUG-UPLOAD-ERROR] {error_msg}")
             logging.error(error_msg)
             raise ValueError(error_msg)
 
+        # 检查源文件和目标文件是否相同
+        import os
+        if source_file.resolve() == target_file.resolve():
+            print(f"[DEBUG-UPLOAD-10] 源文件已在目标位置，跳过复制: {target_file}")
+            logging.info(f"源文件已在目标位置，跳过复制: {target_file}")
+        else:
+            try:
+                print(f"[DEBUG-UPLOAD-10] 开始复制文件: {source_file} -> {target_file}")
+                import shutil
+                shutil.copy2(source_file, target_file)
+                print(f"[DEBUG-UPLOAD-11] 已上传并重命名母牛数据文件至: {target_file}")
+                logging.info(f"已上传并重命名母牛数据文件至: {target_file}")
+            except Exception as e:
+                error_msg = f"复制文件时出错: {e}"
+                print(f"[DEBUG-UPLOAD-ERROR] {error_msg}")
+                logging.error(error_msg)
+                raise ValueError(error_msg)
+
     # 处理母牛数据
     try:
         print(f"[DEBUG-UPLOAD-12] 开始处理母牛数据..., source_system={source_system}")
@@ -275,7 +373,9 @@ def upload_and_standardize_cow_data(input_files: list[Path], project_path: Path,
             target_file,
             project_path,
             progress_callback=progress_callback,
-            source_system=source_system  # 传递数据来源系统
+            source_system=source_system,  # 传递数据来源系统
+            raw_df=raw_df,
+            herd_delta=herd_delta
         )
         
         print(f"[DEBUG-UPLOAD-13] 处理完成，得到结果路径: {final_path}")
@@ -302,7 +402,7 @@ def upload_and_standardize_cow_data(input_files: list[Path], project_path: Path,
 
     # 检查是否存在标准化后的配种记录文件
     breeding_records_file = standardized_path / "processed_breeding_data.xlsx"
-    if breeding_records_file.exists():
+    if remap_breeding and breeding_records_file.exists():
         try:
             print("[DEBUG-UPLOAD-15] 开始重新处理配种记录以映射父号")
             logging.info("开始重新处理配种记录以映射父号")
@@ -311,9 +411,8 @@ def upload_and_standardize_cow_data(input_files: list[Path], project_path: Path,
                 
             # 读取标准化后的母牛数据
             print("[DEBUG-UPLOAD-16] 读取标准化后的母牛数据...")
-            import pandas as pd
             try:
-                cow_df = pd.read_excel(final_path, dtype={'cow_id': str, 'sire': str})
+                cow_df = read_dataset(final_path, dtype={'cow_id': str, 'sire': str})
                 print(f"[DEBUG-UPLOAD-17] 读取成功，数据形状: {cow_df.shape}")
             except Exception as e:
                 error_msg = f"读取标准化的母牛数据失败: {e}"
@@ -324,7 +423,8 @@ def upload_and_standardize_cow_data(input_files: list[Path], project_path: Path,
                     progress_callback(95, f"重新映射父号时出错: {e}，但继续处理")
                 return final_path
             
-            # 读取原始配种记录文件
+            # 读取原始配种记录文件（等待后台存档写完）
+            wait_for_raw_archives()
             raw_breeding_records_file = raw_data_path / "breeding_records.xlsx"
             if raw_breeding_records_file.exists():
                 print(f"[DEBUG-UPLOAD-18] 找到原始配种记录文件: {raw_breeding_records_file}")
@@ -126,6 +126,39 @@ class YQNDataConverter:
         """
         logger = logging.getLogger(__name__)
 
+        df_cleaned = YQNDataConverter.herd_to_frame(api_data, farm_code, add_prefix)
+
+        # 确保输出目录存在
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 保存为Excel
+        df_cleaned.to_excel(output_path, index=False)
+
+        logger.info(f"数据已保存到: {output_path}")
+        return output_path
+
+    @staticmethod
+    def herd_to_frame(
+        api_data: dict,
+        farm_code: str = None,
+        add_prefix: bool = False
+    ) -> pd.DataFrame:
+        """
+        将API牛群数据转换为原始母牛数据表（即 convert_herd_to_excel 写入的内容）
+
+        参数:
+            api_data: API返回的原始数据
+            farm_code: 牧场站号（多选模式下用于添加前缀）
+            add_prefix: 是否添加牧场前缀到牛号字段
+
+        返回:
+            DataFrame（列名已映射为伊起牛导出文件的中文列名）
+
+        异常:
+            ValueError: 数据为空或格式错误
+        """
+        logger = logging.getLogger(__name__)
+
         # 提取数据记录
         records = api_data.get("data", [])
         if not records:
@@ -172,16 +205,9 @@ class YQNDataConverter:
         # 数据清洗
         df_cleaned = YQNDataConverter._clean_data(df_renamed)
 
-        # 确保输出目录存在
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-
-        # 保存为Excel
-        df_cleaned.to_excel(output_path, index=False)
-
-        logger.info(f"数据已保存到: {output_path}")
         logger.info(f"最终行数: {len(df_cleaned)}, 列数: {len(df_cleaned.columns)}")
 
-        return output_path
+        return df_cleaned
 
     @staticmethod
     def _rename_columns(df: pd.DataFrame) -> pd.DataFrame:
@@ -394,6 +420,31 @@ class YQNDataConverter:
         """
         logger = logging.getLogger(__name__)
 
+        df = YQNDataConverter.breeding_records_to_frame(api_data)
+
+        # 保存
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_excel(output_path, index=False)
+
+        logger.info(f"配种记录已保存到: {output_path}, 共 {len(df)} 条")
+        return output_path
+
+    @staticmethod
+    def breeding_records_to_frame(api_data: dict) -> pd.DataFrame:
+        """
+        将配种记录API数据转换为原始配种记录表（即 convert_breeding_records_to_excel 写入的内容）
+
+        参数:
+            api_data: API返回的原始数据 {"code": 0, "data": {"rows": [...]}}
+
+        返回:
+            DataFrame（列为 BREEDING_OUTPUT_COLUMNS 中存在的列）
+
+        异常:
+            ValueError: 数据为空或格式错误
+        """
+        logger = logging.getLogger(__name__)
+
         # 提取数据记录 - 配种记录在 data.rows 中
         data = api_data.get("data", {})
         if isinstance(data, dict):
@@ -429,14 +480,7 @@ class YQNDataConverter:
 
         # 只保留需要的列（存在的列）
         output_cols = [c for c in YQNDataConverter.BREEDING_OUTPUT_COLUMNS if c in df.columns]
-        df = df[output_cols]
-
-        # 保存
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        df.to_excel(output_path, index=False)
-
-        logger.info(f"配种记录已保存到: {output_path}, 共 {len(df)} 条")
-        return output_path
+        return df[output_cols]
 
     @staticmethod
     def convert_stock_to_semen_inventory(api_data: dict, output_path: Path) -> Path:
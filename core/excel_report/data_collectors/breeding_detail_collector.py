@@ -5,8 +5,8 @@
 
 from pathlib import Path
 import logging
-import pandas as pd
 import glob
+from core.data.dataset_io import read_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +45,7 @@ def collect_breeding_detail_data(analysis_folder: Path, cache=None) -> dict:
         if cache:
             df = cache.get_excel(latest_file)
         else:
-            df = pd.read_excel(latest_file)
+            df = read_dataset(latest_file)
 
         logger.info(f"成功读取配种记录明细数据: {len(df)}行, {len(df.columns)}列")
 
@@ -8,6 +8,7 @@ import logging
 from datetime import datetime, timedelta
 import pandas as pd
 import glob
+from core.data.dataset_io import read_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -65,7 +66,7 @@ def collect_breeding_inbreeding_data(analysis_folder: Path, cache=None) -> dict:
         if cache:
             df = cache.get_excel(latest_file)
         else:
-            df = pd.read_excel(latest_file)
+            df = read_dataset(latest_file)
 
         # 确保有必要的列
         if '后代近交系数' not in df.columns:
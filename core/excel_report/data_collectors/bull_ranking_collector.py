@@ -11,6 +11,7 @@ import logging
 import glob
 from sqlalchemy import create_engine, text
 from core.data.update_manager import LOCAL_DB_PATH
+from core.data.dataset_io import read_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +39,7 @@ def _extract_bull_genes(analysis_folder: Path) -> pd.DataFrame:
         logger.info(f"读取基因分析文件: {gene_file.name}")
 
         # 读取配对明细表
-        df = pd.read_excel(gene_file, sheet_name="配对明细表")
+        df = read_dataset(gene_file, sheet_name="配对明细表")
 
         # 获取所有备选公牛（使用原始公牛号作为ID）
         # 原始备选公牛号是短号，与ranking数据匹配
@@ -218,11 +219,11 @@ def collect_bull_ranking_data(analysis_folder) -> dict:
         logger.info("开始收集备选公牛排名数据...")
 
         # 1. 读取排名和指数数据
-        df_ranking = pd.read_excel(ranking_file, sheet_name="Sheet1")
+        df_ranking = read_dataset(ranking_file, sheet_name="Sheet1")
         logger.info(f"读取排名数据: {len(df_ranking)} 条记录")
 
         # 2. 读取性状数据
-        df_traits = pd.read_excel(traits_file, sheet_name="Sheet1")
+        df_traits = read_dataset(traits_file, sheet_name="Sheet1")
         logger.info(f"读取性状数据: {len(df_traits)} 条记录")
 
         # 3. 合并数据：以ranking数据为基础，补充traits数据
@@ -297,7 +298,7 @@ def collect_bull_ranking_data(analysis_folder) -> dict:
                     # 读取第一个找到的公牛文件
                     bull_file = bull_files[0]
                     logger.info(f"从原始文件读取支数: {bull_file.name}")
-                    df_bull_raw = pd.read_excel(bull_file)
+                    df_bull_raw = read_dataset(bull_file)
 
                     # 确保有必要的列
                     if 'bull_id' in df_bull_raw.columns:
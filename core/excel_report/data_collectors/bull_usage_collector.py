@@ -12,6 +12,7 @@ from pathlib import Path
 import pandas as pd
 import logging
 from datetime import datetime
+from core.data.dataset_io import read_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +46,7 @@ def collect_bull_usage_summary_data(analysis_folder: Path) -> dict:
             return {}
 
         logger.info(f"读取配种记录数据: {breeding_file}")
-        breeding_df = pd.read_excel(breeding_file)
+        breeding_df = read_dataset(breeding_file)
 
         if breeding_df.empty:
             logger.warning("配种记录数据为空")
@@ -59,7 +60,7 @@ def collect_bull_usage_summary_data(analysis_folder: Path) -> dict:
 
         if traits_file.exists():
             logger.info(f"读取性状数据: {traits_file}")
-            traits_df = pd.read_excel(traits_file)
+            traits_df = read_dataset(traits_file)
             logger.info(f"✓ 读取到 {len(traits_df)} 条性状记录")
         else:
             logger.warning(f"性状文件不存在: {traits_file}，将只统计使用次数")
@@ -7,6 +7,7 @@ from pathlib import Path
 import logging
 import pandas as pd
 import glob
+from core.data.dataset_io import read_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -94,7 +95,7 @@ def collect_candidate_bulls_genes_data(analysis_folder: Path, project_folder: Pa
         if cache:
             df = cache.get_excel(latest_file)
         else:
-            df = pd.read_excel(latest_file)
+            df = read_dataset(latest_file)
 
         # 3. 读取processed_cow_data获取胎次和在场信息
         cow_data_file = project_folder / "standardized_data" / "processed_cow_data.xlsx"
@@ -105,7 +106,7 @@ def collect_candidate_bulls_genes_data(analysis_folder: Path, project_folder: Pa
         if cache:
             cow_data = cache.get_excel(str(cow_data_file))
         else:
-            cow_data = pd.read_excel(cow_data_file)
+            cow_data = read_dataset(cow_data_file)
 
         # 提取需要的列（processed_cow_data使用cow_id作为列名）
         cow_info = cow_data[['cow_id', '是否在场', 'sex', 'lac']].copy()
@@ -7,6 +7,7 @@ from pathlib import Path
 import logging
 import pandas as pd
 import glob
+from core.data.dataset_io import read_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -69,7 +70,7 @@ def collect_candidate_bulls_inbreeding_data(analysis_folder: Path, project_folde
         if cache:
             df = cache.get_excel(latest_file)
         else:
-            df = pd.read_excel(latest_file)
+            df = read_dataset(latest_file)
 
         # 确保有必要的列
         if '后代近交系数' not in df.columns:
@@ -85,7 +86,7 @@ def collect_candidate_bulls_inbreeding_data(analysis_folder: Path, project_folde
         if cache:
             cow_data = cache.get_excel(str(cow_data_file))
         else:
-            cow_data = pd.read_excel(cow_data_file)
+            cow_data = read_dataset(cow_data_file)
 
         # 提取需要的列（processed_cow_data使用cow_id作为列名）
         cow_info = cow_data[['cow_id', '是否在场', 'sex', 'lac']].copy()
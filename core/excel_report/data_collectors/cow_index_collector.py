@@ -7,6 +7,7 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 import logging
+from core.data.project_data import get_project_data
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +30,9 @@ def collect_cow_index_data(analysis_folder: Path, project_folder: Path = None) -
     if project_folder:
         project_folder = Path(project_folder)
 
+    # 与其他collector共用解析结果（processed_cow_data 等）
+    project_data = get_project_data(project_folder or analysis_folder.parent)
+
     try:
         logger.info("收集母牛指数数据...")
 
@@ -39,7 +43,7 @@ def collect_cow_index_data(analysis_folder: Path, project_folder: Path = None) -
             logger.warning(f"母牛指数文件不存在: {index_file}")
             return _get_empty_data()
 
-        df_index = pd.read_excel(index_file)
+        df_index = project_data.read(index_file)
         logger.info(f"读取到 {len(df_index)} 条母牛指数数据")
 
         # 读取母牛基础数据（获取是否在场信息）
@@ -54,7 +58,7 @@ def collect_cow_index_data(analysis_folder: Path, project_folder: Path = None) -
             logger.info("指数文件中已包含是否在场和性别信息")
         elif cow_data_file and cow_data_file.exists():
             # 从母牛基础数据文件合并
-            df_cow = pd.read_excel(cow_data_file)
+            df_cow = project_data.read(cow_data_file)
 
             # 合并数据
             df_merged = df_index.merge(
@@ -7,6 +7,8 @@ from pathlib import Path
 import pandas as pd
 import logging
 from datetime import datetime
+from core.data.project_data import get_project_data
+from core.data.uploader import wait_for_raw_archives
 
 logger = logging.getLogger(__name__)
 
@@ -125,7 +127,7 @@ def _collect_herd_structure(project_folder: Path) -> dict:
         return _get_empty_herd_structure()
 
     try:
-        df = pd.read_excel(cow_data_path)
+        df = get_project_data(project_folder).read(cow_data_path)
 
         # 确保sex列正确填充（处理全NaN的情况，母牛数据默认为'母'）
         if 'sex' in df.columns:
@@ -257,7 +259,7 @@ def _collect_upload_summary(project_folder: Path) -> dict:
         # 1. 母牛信息数据
         cow_data_path = standardized_folder / "processed_cow_data.xlsx"
         if cow_data_path.exists():
-            df_cow = pd.read_excel(cow_data_path)
+            df_cow = get_project_data(project_folder).read(cow_data_path)
             summary['cow_data_count'] = len(df_cow)
 
             if '是否在场' in df_cow.columns:
@@ -284,25 +286,25 @@ def _collect_upload_summary(project_folder: Path) -> dict:
         # 2. 配种记录
         breeding_path = standardized_folder / "processed_breeding_data.xlsx"
         if breeding_path.exists():
-            df_breeding = pd.read_excel(breeding_path)
+            df_breeding = get_project_data(project_folder).read(breeding_path)
             summary['breeding_records'] = len(df_breeding)
 
         # 3. 备选公牛数据
         bull_path = standardized_folder / "processed_bull_data.xlsx"
         if bull_path.exists():
-            df_bull = pd.read_excel(bull_path)
+            df_bull = get_project_data(project_folder).read(bull_path)
             summary['bull_count'] = len(df_bull)
 
         # 4. 体型外貌数据
         body_path = standardized_folder / "processed_body_conformation_data.xlsx"
         if body_path.exists():
-            df_body = pd.read_excel(body_path)
+            df_body = get_project_data(project_folder).read(body_path)
             summary['body_conformation_count'] = len(df_body)
 
         # 5. 基因组数据
         genomic_path = standardized_folder / "processed_genomic_data.xlsx"
         if genomic_path.exists():
-            df_genomic = pd.read_excel(genomic_path)
+            df_genomic = get_project_data(project_folder).read(genomic_path)
             summary['genomic_count'] = len(df_genomic)
 
     except Exception as e:
@@ -338,7 +340,8 @@ def _collect_raw_cow_data(project_folder: Path) -> Path:
     Returns:
         原始母牛数据文件路径（Path对象），如果不存在则返回None
     """
-    # 尝试从raw_data文件夹读取
+    # 尝试从raw_data文件夹读取（API下载的数据在后台存档，先等待写完）
+    wait_for_raw_archives()
     raw_data_path = project_folder / "raw_data" / "cow_data.xlsx"
 
     if raw_data_path.exists():
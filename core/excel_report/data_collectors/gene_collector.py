@@ -8,6 +8,7 @@ import logging
 from datetime import datetime, timedelta
 import pandas as pd
 import glob
+from core.data.dataset_io import read_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -84,7 +85,7 @@ def collect_breeding_genes_data(analysis_folder: Path, cache=None) -> dict:
         if cache:
             df = cache.get_excel(latest_file)
         else:
-            df = pd.read_excel(latest_file)
+            df = read_dataset(latest_file)
 
         # 确保有配种日期列
         if '配种日期' not in df.columns:
@@ -6,6 +6,7 @@
 from pathlib import Path
 import pandas as pd
 import logging
+from core.data.dataset_io import read_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +42,7 @@ def collect_mating_data(analysis_folder) -> dict:
             '1选性控', '2选性控', '3选性控',
             '1选常规', '2选常规', '3选常规',
         ]
-        df = pd.read_excel(
+        df = read_dataset(
             mating_file,
             sheet_name="选配结果",
             dtype={column: str for column in id_columns},
@@ -6,6 +6,7 @@
 from pathlib import Path
 import pandas as pd
 import logging
+from core.data.dataset_io import read_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -70,7 +71,7 @@ def collect_pedigree_data(analysis_folder: Path) -> dict:
 
     try:
         # 读取汇总数据文件
-        summary_source_df = pd.read_excel(pedigree_file, sheet_name=0)
+        summary_source_df = read_dataset(pedigree_file, sheet_name=0)
 
         if summary_source_df.empty:
             logger.warning("系谱识别分析结果文件为空")
@@ -81,7 +82,7 @@ def collect_pedigree_data(analysis_folder: Path) -> dict:
             }
 
         # 读取原始明细数据文件
-        detail_source_df = pd.read_excel(detail_file)
+        detail_source_df = read_dataset(detail_file)
         # 确保sex列正确填充（处理全NaN的情况，母牛数据默认为'母'）
         if 'sex' in detail_source_df.columns:
             if detail_source_df['sex'].isna().all():
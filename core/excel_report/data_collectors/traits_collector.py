@@ -4,9 +4,9 @@
 """
 
 from pathlib import Path
-import pandas as pd
 import logging
 from .benchmark_collector import BenchmarkDataCollector
+from core.data.dataset_io import read_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -40,13 +40,12 @@ def collect_traits_data(analysis_folder: Path, project_folder: Path) -> dict:
         logger.info(f"读取关键育种性状分析结果: {traits_file}")
 
         # 读取各个sheet
-        with pd.ExcelFile(traits_file) as xls:
-            present_summary = pd.read_excel(xls, sheet_name='在群母牛年份汇总')
-            all_summary = pd.read_excel(xls, sheet_name='全部母牛年份汇总')
-            nm_distribution_present = pd.read_excel(xls, sheet_name='在群母牛NM$分布')
-            nm_distribution_all = pd.read_excel(xls, sheet_name='全部母牛NM$分布')
-            tpi_distribution_present = pd.read_excel(xls, sheet_name='在群母牛TPI分布')
-            tpi_distribution_all = pd.read_excel(xls, sheet_name='全部母牛TPI分布')
+        present_summary = read_dataset(traits_file, sheet_name='在群母牛年份汇总')
+        all_summary = read_dataset(traits_file, sheet_name='全部母牛年份汇总')
+        nm_distribution_present = read_dataset(traits_file, sheet_name='在群母牛NM$分布')
+        nm_distribution_all = read_dataset(traits_file, sheet_name='全部母牛NM$分布')
+        tpi_distribution_present = read_dataset(traits_file, sheet_name='在群母牛TPI分布')
+        tpi_distribution_all = read_dataset(traits_file, sheet_name='全部母牛TPI分布')
 
         logger.info("✓ 育种性状数据收集完成")
 
@@ -54,7 +53,7 @@ def collect_traits_data(analysis_folder: Path, project_folder: Path) -> dict:
         detail_file = analysis_folder / "processed_cow_data_key_traits_final.xlsx"
         detail_df = None
         if detail_file.exists():
-            detail_df = pd.read_excel(detail_file)
+            detail_df = read_dataset(detail_file)
             logger.info(f"✓ 读取育种性状明细数据: {len(detail_df)}行")
             # 确保 sex 列存在且正确填充（母牛数据默认为'母'）
             if 'sex' not in detail_df.columns:
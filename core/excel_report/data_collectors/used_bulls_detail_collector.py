@@ -8,6 +8,7 @@ import pandas as pd
 import logging
 from pathlib import Path
 from typing import Dict, List
+from core.data.dataset_io import read_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -57,7 +58,7 @@ class UsedBullsDetailCollector:
                 }
 
             # 读取Excel，指定dtype避免类型转换错误
-            df = pd.read_excel(self.data_file, dtype={'bull_id': str, '冻精编号': str})
+            df = read_dataset(self.data_file, dtype={'bull_id': str, '冻精编号': str})
             logger.info(f"读取到 {len(df)} 条配种记录")
 
             # 2. 确保配种年份列存在
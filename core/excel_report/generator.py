@@ -6,10 +6,19 @@ Excel综合报告生成器
 from pathlib import Path
 from openpyxl import Workbook
 import logging
+import os
+import pickle
+import shutil
+import tempfile
+import time
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# 自动模式下并行构建Sheet的最小母牛数：牛群较小时分布图等构建很快，
+# 进程间传递数据和合并工作表的开销超过并行节省的时间
+PARALLEL_MIN_COWS = 3000
+
 
 class ExcelReportGenerator:
     """Excel综合报告生成器 v1.3"""
@@ -20,6 +29,7 @@ class ExcelReportGenerator:
         service_staff: str = None,
         progress_callback=None,
         farm_name: str = None,
+        parallel_sheets: bool = None,
     ):
         """
         初始化生成器
@@ -28,12 +38,15 @@ class ExcelReportGenerator:
             project_folder: 项目文件夹路径
             service_staff: 牧场服务人员（工号 姓名）
             progress_callback: 进度回调函数 callback(progress: int, message: str)
+            parallel_sheets: 是否在进程池中并行构建Sheet（None表示多核机器上、母牛数达到
+                PARALLEL_MIN_COWS 时自动启用）
         """
         self.project_folder = Path(project_folder)
         self.analysis_folder = self.project_folder / "analysis_results"
         self.service_staff = service_staff
         self.farm_name = farm_name
         self.progress_callback = progress_callback
+        self.parallel_sheets = parallel_sheets
 
         # 初始化workbook
         self.wb = Workbook()
@@ -87,7 +100,7 @@ class ExcelReportGenerator:
             logger.info("\nStep 2: 收集数据...")
             # 创建数据缓存实例，避免重复读取相同文件
             from .utils import DataCache
-            cache = DataCache()
+            cache = DataCache(self.project_folder)
             data = self._collect_all_data(cache)
             self._report_progress(14, "✓ 数据收集完成")
             logger.info("✓ 数据收集完成")
@@ -100,106 +113,12 @@ class ExcelReportGenerator:
             self._report_progress(15, "开始生成报告...")
             logger.info("\nStep 3: 生成Sheet...")
 
-            # Sheet 1: 牧场基础信息
-            self._report_progress(16, "[1/20] 生成Sheet 1...")
-            logger.info("  [1/20] 生成Sheet 1: 牧场基础信息")
-            self._build_sheet1(data['farm_info'])
-            self._report_progress(17, "✓ Sheet 1 完成")
-
-            # Sheet 2: 牧场牛群原始数据
-            self._report_progress(17, "[2/20] 生成Sheet 2...")
-            logger.info("  [2/20] 生成Sheet 2: 牧场牛群原始数据")
-            self._build_sheet1a(data['farm_info'])
-            self._report_progress(20, "✓ Sheet 2 完成")
-
-            # Sheet 3: 系谱识别分析
-            self._report_progress(20, "[3/20] 生成Sheet 3...")
-            logger.info("  [3/20] 生成Sheet 3: 系谱识别分析")
-            self._build_sheet2(data['pedigree'])
-            self._report_progress(22, "✓ Sheet 3 完成")
-
-            # Sheet 4: 全群母牛系谱识别明细
-            self._report_progress(22, "[4/20] 生成Sheet 4...")
-            logger.info("  [4/20] 生成Sheet 4: 全群母牛系谱识别明细")
-            self._build_sheet2_detail(data['pedigree'])
-            self._report_progress(25, "✓ Sheet 4 完成")
-
-            # Sheets 5-8: 育种性状分析（4个子表，含NM$/TPI/指数分布图，耗时最长）
-            self._report_progress(25, "[5-8/20] 生成Sheet 5-8（NM$/TPI分布分析，请耐心等待）...")
-            logger.info("  [5-8/20] 生成Sheet 5-8: 育种性状分析")
-            self._build_sheet3(data['traits'])
-            self._report_progress(55, "✓ Sheet 5-8 完成")
-
-            # Sheets 9-10: 母牛指数分析（2个子表，含育种指数分布图，较耗时）
-            self._report_progress(55, "[9-10/20] 生成Sheet 9-10（育种指数分布分析）...")
-            logger.info("  [9-10/20] 生成Sheet 9-10: 母牛指数分析")
-            self._build_sheet4(data['cow_index'])
-            self._report_progress(70, "✓ Sheet 9-10 完成")
-
-            # Sheet 11: 配种记录-隐性基因分析
-            self._report_progress(70, "[11/20] 生成Sheet 11...")
-            logger.info("  [11/20] 生成Sheet 11: 配种记录-隐性基因分析")
-            self._build_sheet5(data.get('breeding_genes', {}))
-            self._report_progress(72, "✓ Sheet 11 完成")
-
-            # Sheet 12: 配种记录-近交系数分析
-            self._report_progress(72, "[12/20] 生成Sheet 12...")
-            logger.info("  [12/20] 生成Sheet 12: 配种记录-近交系数分析")
-            self._build_sheet6(data.get('breeding_inbreeding', {}))
-            self._report_progress(74, "✓ Sheet 12 完成")
-
-            # Sheet 13: 配种记录明细
-            self._report_progress(74, "[13/20] 生成Sheet 13...")
-            logger.info("  [13/20] 生成Sheet 13: 配种记录明细")
-            self._build_sheet7(data.get('breeding_details', {}))
-            self._report_progress(76, "✓ Sheet 13 完成")
-
-            # Sheet 14: 已用公牛性状汇总分析
-            self._report_progress(76, "[14/20] 生成Sheet 14...")
-            logger.info("  [14/20] 生成Sheet 14: 已用公牛性状汇总分析")
-            self._build_sheet8(data.get('used_bulls_summary', {}))
-            self._report_progress(80, "✓ Sheet 14 完成")
-
-            # Sheet 15: 已用公牛性状明细
-            self._report_progress(80, "[15/20] 生成Sheet 15...")
-            logger.info("  [15/20] 生成Sheet 15: 已用公牛性状明细")
-            self._build_sheet9(data.get('used_bulls_detail', {}))
-            self._report_progress(82, "✓ Sheet 15 完成")
-
-            # Sheet 16: 备选公牛排名
-            self._report_progress(82, "[16/20] 生成Sheet 16...")
-            logger.info("  [16/20] 生成Sheet 16: 备选公牛排名")
-            self._build_sheet10(data.get('bull_ranking', {}))
-            self._report_progress(83, "✓ Sheet 16 完成")
-
-            # Sheet 17: 备选公牛-隐性基因分析
-            self._report_progress(83, "[17/20] 生成Sheet 17...")
-            logger.info("  [17/20] 生成Sheet 17: 备选公牛-隐性基因分析")
-            self._build_sheet12(data.get('candidate_bulls_genes', {}))
-            self._report_progress(84, "✓ Sheet 17 完成")
-
-            # Sheet 18: 备选公牛-近交系数分析
-            self._report_progress(84, "[18/20] 生成Sheet 18...")
-            logger.info("  [18/20] 生成Sheet 18: 备选公牛-近交系数分析")
-            self._build_sheet13(data.get('candidate_bulls_inbreeding', {}))
-            self._report_progress(85, "✓ Sheet 18 完成")
-
-            # Sheet 19: 备选公牛-明细表
-            self._report_progress(85, "[19/20] 生成Sheet 19...")
-            logger.info("  [19/20] 生成Sheet 19: 备选公牛-明细表")
-            self._build_sheet14(data.get('candidate_bulls_detail', {}))
-            self._report_progress(86, "✓ Sheet 19 完成")
-
-            # Sheet 20: 选配推荐结果
-            if data.get('mating'):
-                self._report_progress(86, "[20/20] 生成Sheet 20...")
-                logger.info("  [20/20] 生成Sheet 20: 选配推荐结果")
-                self._build_sheet11(data['mating'])
-                self._report_progress(87, "✓ Sheet 20 完成")
+            sheet_tasks = self._sheet_tasks(data)
+            if self._use_parallel_build(data):
+                timings = self._build_sheets_parallel(sheet_tasks)
             else:
-                self._report_progress(86, "[20/20] 跳过Sheet 20...")
-                logger.info("  [20/20] Sheet 20: 无选配数据，跳过")
-                self._report_progress(87, "✓ 跳过Sheet 20")
+                timings = self._build_sheets_sequential(sheet_tasks)
+            self._log_sheet_timings(timings)
 
             self._report_progress(88, "✓ 所有Sheet生成完成")
             logger.info("✓ 所有Sheet生成完成")
@@ -215,8 +134,15 @@ class ExcelReportGenerator:
             reports_folder.mkdir(parents=True, exist_ok=True)
             output_path = reports_folder / filename
 
+            # 报告数据模型（PPT生成时直接读取，无需重新解析xlsx）在写入前提取：
+            # 写入xlsx时内存中的图片流读取后即被关闭
+            report_model = self._extract_report_model()
+
             self._report_progress(90, "正在写入Excel文件...")
             self.wb.save(output_path)
+
+            self._report_progress(96, "正在保存报告数据模型...")
+            self._save_report_model(report_model, output_path)
             self._report_progress(98, "正在完成...")
             self._report_progress(100, "✓ 报告生成完成!")
             logger.info(f"✓ Excel报告已保存: {output_path}")
@@ -231,6 +157,26 @@ class ExcelReportGenerator:
             logger.error(f"✗ 生成Excel报告失败: {e}", exc_info=True)
             return False, str(e)
 
+    def _extract_report_model(self):
+        """从内存中的workbook提取报告数据模型（失败返回None，不影响报告本身）"""
+        from .report_model import ReportModel
+        try:
+            return ReportModel.from_workbook(self.wb)
+        except Exception as e:
+            logger.warning(f"提取报告数据模型失败，PPT生成时将重新读取Excel: {e}")
+            return None
+
+    def _save_report_model(self, model, output_path: Path):
+        """把报告数据模型保存到报告旁（失败不影响报告本身）"""
+        if model is None:
+            return
+        try:
+            model_path = model.save(output_path)
+            if model_path:
+                logger.info(f"✓ 报告数据模型已保存: {model_path.name}")
+        except Exception as e:
+            logger.warning(f"保存报告数据模型失败，PPT生成时将重新读取Excel: {e}")
+
     def _collect_all_data(self, cache) -> dict:
         """
         并行收集所有需要的数据 (v1.3)
@@ -333,103 +279,314 @@ class ExcelReportGenerator:
 
         return results
 
-    def _build_sheet1(self, data: dict):
-        """构建Sheet 1: 牧场基础信息"""
-        from .sheet_builders import Sheet1Builder
-        builder = Sheet1Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
-        builder.build(data)
-
-    def _build_sheet1a(self, data: dict):
-        """构建Sheet 1A: 牧场牛群原始数据"""
-        from .sheet_builders import Sheet1ABuilder
-        builder = Sheet1ABuilder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
-        # 传递原始母牛数据文件路径
-        builder.build({
-            'raw_file_path': data.get('raw_cow_data')
-        })
-
-    def _build_sheet2(self, data: dict):
-        """构建Sheet 2: 系谱识别分析"""
-        from .sheet_builders import Sheet2Builder
-        builder = Sheet2Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
-        builder.build(data)
-
-    def _build_sheet2_detail(self, data: dict):
-        """构建Sheet 2明细: 全群母牛系谱识别明细"""
-        from .sheet_builders import Sheet2DetailBuilder
-        builder = Sheet2DetailBuilder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
-        builder.build(data)
-
-    def _build_sheet3(self, data: dict):
-        """构建Sheet 3: 育种性状分析"""
-        from .sheet_builders import Sheet3Builder
-        builder = Sheet3Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
-        builder.build(data)
-
-    def _build_sheet4(self, data: dict):
-        """构建Sheet 4: 母牛指数分析"""
-        from .sheet_builders import Sheet4Builder
-        builder = Sheet4Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
-        builder.build(data)
-
-    def _build_sheet5(self, data: dict):
-        """构建Sheet 5: 配种记录-隐性基因分析"""
-        from .sheet_builders import Sheet5Builder
-        builder = Sheet5Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
-        builder.build(data)
-
-    def _build_sheet6(self, data: dict):
-        """构建Sheet 6: 配种记录-近交系数分析"""
-        from .sheet_builders import Sheet6Builder
-        builder = Sheet6Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
-        builder.build(data)
+    # ==================== Sheet构建 ====================
 
-    def _build_sheet7(self, data: dict):
-        """构建Sheet 7: 配种记录-隐性基因/近交系数明细"""
-        from .sheet_builders import Sheet7Builder
-        builder = Sheet7Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
-        builder.build(data)
+    def _sheet_tasks(self, data: dict) -> list:
+        """
+        按报告顺序列出各Sheet的构建任务
 
-    def _build_sheet8(self, data: dict):
-        """构建Sheet 8: 已用公牛性状汇总分析"""
-        from .sheet_builders import Sheet8Builder
-        builder = Sheet8Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback,
-                               output_dir=self.analysis_folder)
-        builder.build(data)
+        Args:
+            data: _collect_all_data 收集的数据
 
-    def _build_sheet9(self, data: dict):
-        """构建Sheet 9: 已用公牛性状明细"""
-        from .sheet_builders import Sheet9Builder
-        builder = Sheet9Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
-        builder.build(data)
+        Returns:
+            任务列表，每项为 {
+                'label': 进度标签, 'name': Sheet名称, 'hint': 进度提示,
+                'start'/'end': 进度区间, 'builder': 构建器类名（None表示跳过）,
+                'data': 构建数据, 'builder_kwargs': 构建器额外参数,
+                'parts': 可拆分并行构建的子Sheet（None表示不拆分）
+            }
+        """
+        from .sheet_builders import Sheet3Builder, Sheet4Builder
+
+        def task(label, name, start, end, builder, sheet_data, hint="", builder_kwargs=None, parts=None):
+            return {
+                'label': label, 'name': name, 'hint': hint, 'start': start, 'end': end,
+                'builder': builder, 'data': sheet_data,
+                'builder_kwargs': builder_kwargs or {}, 'parts': parts,
+            }
+
+        output_dir = {'output_dir': self.analysis_folder}
+        tasks = [
+            task("1", "牧场基础信息", 16, 17, 'Sheet1Builder', data['farm_info']),
+            # 传递原始母牛数据文件路径
+            task("2", "牧场牛群原始数据", 17, 20, 'Sheet1ABuilder',
+                 {'raw_file_path': data['farm_info'].get('raw_cow_data')}),
+            task("3", "系谱识别分析", 20, 22, 'Sheet2Builder', data['pedigree']),
+            task("4", "全群母牛系谱识别明细", 22, 25, 'Sheet2DetailBuilder', data['pedigree']),
+            # 4个子表，含NM$/TPI/指数分布图，耗时最长
+            task("5-8", "育种性状分析", 25, 55, 'Sheet3Builder', data['traits'],
+                 hint="（NM$/TPI分布分析，请耐心等待）", parts=Sheet3Builder.PARTS),
+            # 2个子表，含育种指数分布图，较耗时
+            task("9-10", "母牛指数分析", 55, 70, 'Sheet4Builder', data['cow_index'],
+                 hint="（育种指数分布分析）", parts=Sheet4Builder.PARTS),
+            task("11", "配种记录-隐性基因分析", 70, 72, 'Sheet5Builder', data.get('breeding_genes', {})),
+            task("12", "配种记录-近交系数分析", 72, 74, 'Sheet6Builder', data.get('breeding_inbreeding', {})),
+            task("13", "配种记录明细", 74, 76, 'Sheet7Builder', data.get('breeding_details', {})),
+            task("14", "已用公牛性状汇总分析", 76, 80, 'Sheet8Builder', data.get('used_bulls_summary', {}),
+                 builder_kwargs=output_dir),
+            task("15", "已用公牛性状明细", 80, 82, 'Sheet9Builder', data.get('used_bulls_detail', {})),
+            task("16", "备选公牛排名", 82, 83, 'Sheet10Builder', data.get('bull_ranking', {}),
+                 builder_kwargs=output_dir),
+            task("17", "备选公牛-隐性基因分析", 83, 84, 'Sheet12Builder', data.get('candidate_bulls_genes', {})),
+            task("18", "备选公牛-近交系数分析", 84, 85, 'Sheet13Builder', data.get('candidate_bulls_inbreeding', {})),
+            task("19", "备选公牛-明细表", 85, 86, 'Sheet14Builder', data.get('candidate_bulls_detail', {})),
+            # 无选配数据时跳过
+            task("20", "选配推荐结果", 86, 87, 'Sheet11Builder' if data.get('mating') else None,
+                 data.get('mating')),
+        ]
+        return tasks
+
+    def _report_task_start(self, task: dict):
+        """报告Sheet构建开始（跳过的Sheet同时报告完成）"""
+        sheet_label = f"Sheet {task['label']}"
+        if task['builder'] is None:
+            self._report_progress(task['start'], f"[{task['label']}/20] 跳过{sheet_label}...")
+            logger.info(f"  [{task['label']}/20] {sheet_label}: 无数据，跳过")
+            self._report_progress(task['end'], f"✓ 跳过{sheet_label}")
+            return
+        self._report_progress(task['start'], f"[{task['label']}/20] 生成{sheet_label}{task['hint']}...")
+        logger.info(f"  [{task['label']}/20] 生成{sheet_label}: {task['name']}")
+
+    def _build_in_place(self, task: dict, part: str = None) -> float:
+        """在当前workbook中构建任务（或其中一个子Sheet），返回耗时"""
+        from . import sheet_builders
+        builder_class = getattr(sheet_builders, task['builder'])
+        builder = builder_class(self.wb, self.style_manager, self.chart_builder, self.progress_callback,
+                                **task['builder_kwargs'])
+        t0 = time.perf_counter()
+        if part is None:
+            builder.build(task['data'])
+        else:
+            builder.build(task['data'], parts=[part])
+        return time.perf_counter() - t0
+
+    def _build_sheets_sequential(self, tasks: list) -> list:
+        """
+        在当前进程中按顺序构建所有Sheet
 
-    def _build_sheet10(self, data: dict):
-        """构建Sheet 10: 备选公牛排名"""
-        from .sheet_builders import Sheet10Builder
-        builder = Sheet10Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback,
-                                 output_dir=self.analysis_folder)
-        builder.build(data)
+        Returns:
+            各Sheet耗时列表 [(名称, 秒), ...]
+        """
+        timings = []
+        for task in tasks:
+            self._report_task_start(task)
+            if task['builder'] is None:
+                continue
+            timings.append((f"Sheet {task['label']} {task['name']}", self._build_in_place(task)))
+            self._report_progress(task['end'], f"✓ Sheet {task['label']} 完成")
+        return timings
+
+    def _use_parallel_build(self, data: dict) -> bool:
+        """是否并行构建Sheet（未指定时多核机器上、母牛数达到 PARALLEL_MIN_COWS 时启用）"""
+        if self.parallel_sheets is not None:
+            return self.parallel_sheets
+        if (os.cpu_count() or 1) <= 1:
+            return False
+        cows = max(_detail_rows(data.get('traits')), _detail_rows(data.get('cow_index')))
+        if cows < PARALLEL_MIN_COWS:
+            logger.info(f"母牛数 {cows} 头，少于 {PARALLEL_MIN_COWS} 头，顺序构建Sheet")
+            return False
+        return True
+
+    def _build_sheets_parallel(self, tasks: list) -> list:
+        """
+        并行构建所有Sheet
 
-    def _build_sheet11(self, data: dict):
-        """构建Sheet 11: 选配推荐结果"""
-        from .sheet_builders import Sheet11Builder
-        builder = Sheet11Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
-        builder.build(data)
+        各Sheet（Sheet 5-8、9-10 按子Sheet拆分）提交到常驻进程池，分别构建到独立的
+        workbook，matplotlib分布图等耗时步骤在各进程中同时进行；主进程按报告顺序把
+        各工作表并入最终workbook，结果与顺序构建逐单元格一致。
+        拆分的子Sheet共用同一份数据，只序列化一次写入临时文件，各子进程从文件读取。
+        进程池不可用时回退到顺序构建；子进程异常退出时剩余部分在当前进程中构建。
 
-    def _build_sheet12(self, data: dict):
-        """构建Sheet 12: 备选公牛-隐性基因分析"""
-        from .sheet_builders import Sheet12Builder
-        builder = Sheet12Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
-        builder.build(data)
+        Returns:
+            各Sheet耗时列表 [(名称, 秒), ...]（子进程构建耗时 + 合并耗时）
+        """
+        shared_dir = Path(tempfile.mkdtemp(prefix="report_sheets_"))
+        try:
+            return self._submit_and_merge(tasks, shared_dir)
+        finally:
+            shutil.rmtree(shared_dir, ignore_errors=True)
 
-    def _build_sheet13(self, data: dict):
-        """构建Sheet 13: 备选公牛-近交系数分析"""
-        from .sheet_builders import Sheet13Builder
-        builder = Sheet13Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
-        builder.build(data)
+    def _submit_and_merge(self, tasks: list, shared_dir: Path) -> list:
+        """提交构建单元并按报告顺序合并（_build_sheets_parallel 的主体，共用数据写入 shared_dir）"""
+        from concurrent.futures.process import BrokenProcessPool
+        from core.analysis_pool import get_analysis_pool, shutdown_analysis_pool
 
-    def _build_sheet14(self, data: dict):
-        """构建Sheet 14: 备选公牛-明细表"""
-        from .sheet_builders import Sheet14Builder
-        builder = Sheet14Builder(self.wb, self.style_manager, self.chart_builder, self.progress_callback)
+        # 1. 提交所有构建单元
+        units = []
+        try:
+            pool = get_analysis_pool()
+            for task in tasks:
+                if task['builder'] is None:
+                    continue
+                parts = task['parts'] or [None]
+                sheet_data = task['data']
+                if len(parts) > 1:
+                    sheet_data = _SheetDataFile.dump(sheet_data, shared_dir / f"{len(units)}.pkl")
+                for part in parts:
+                    args = (task['builder'], sheet_data, task['builder_kwargs'],
+                            None if part is None else [part])
+                    units.append((id(task), part, pool.submit(_build_sheet_workbook, args, self.progress_callback)))
+        except Exception as e:
+            logger.warning(f"进程池不可用，改为顺序构建Sheet: {e}")
+            for _, _, future in units:
+                future.cancel()
+            return self._build_sheets_sequential(tasks)
+        logger.info(f"已提交 {len(units)} 个Sheet构建任务到进程池")
+
+        # 2. 按报告顺序合并
+        timings = []
+        pool_broken = False
+        for task in tasks:
+            self._report_task_start(task)
+            if task['builder'] is None:
+                continue
+            for _, part, future in (unit for unit in units if unit[0] == id(task)):
+                name = f"Sheet {task['label']} {task['name']}" + (f" ({part})" if part else "")
+                if not pool_broken:
+                    try:
+                        workbook, elapsed = future.result()
+                    except BrokenProcessPool as e:
+                        logger.error(f"Sheet构建进程异常退出，剩余Sheet改为在当前进程中构建: {e}")
+                        shutdown_analysis_pool(wait=False)
+                        pool_broken = True
+                if pool_broken:
+                    elapsed = self._build_in_place(task, part)
+                else:
+                    t0 = time.perf_counter()
+                    _adopt_worksheets(self.wb, workbook)
+                    elapsed += time.perf_counter() - t0
+                timings.append((name, elapsed))
+            self._report_progress(task['end'], f"✓ Sheet {task['label']} 完成")
+        return timings
+
+    @staticmethod
+    def _log_sheet_timings(timings: list):
+        """输出各Sheet构建耗时（从高到低）"""
+        if not timings:
+            return
+        logger.info("各Sheet构建耗时:")
+        for name, seconds in sorted(timings, key=lambda item: item[1], reverse=True):
+            logger.info(f"  {seconds:7.2f}秒  {name}")
+
+
+# ==================== 并行构建（进程池任务与工作表合并） ====================
+
+def _detail_rows(sheet_data) -> int:
+    """Sheet数据中明细表（detail_df）的行数"""
+    detail = sheet_data.get('detail_df') if isinstance(sheet_data, dict) else None
+    return 0 if detail is None else len(detail)
+
+
+class _SheetDataFile:
+    """写入临时文件的Sheet数据：多个子Sheet任务只传递文件路径，数据只序列化一次"""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    @classmethod
+    def dump(cls, data, path: Path) -> '_SheetDataFile':
+        with open(path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return cls(path)
+
+    def load(self):
+        with open(self.path, 'rb') as f:
+            return pickle.load(f)
+
+
+def _build_sheet_workbook(builder_name: str, data: dict, builder_kwargs: dict, parts=None, progress_cb=None):
+    """
+    进程池任务：在独立的workbook中构建Sheet
+
+    Args:
+        builder_name: 构建器类名（sheet_builders 中导出）
+        data: 构建数据（或写入临时文件的 _SheetDataFile）
+        builder_kwargs: 构建器额外参数
+        parts: 只构建的子Sheet（Sheet3Builder/Sheet4Builder）
+        progress_cb: 进度回调
+
+    Returns:
+        (workbook, 构建耗时秒数)
+    """
+    from . import sheet_builders
+    from .formatters import StyleManager, ChartBuilder
+
+    if isinstance(data, _SheetDataFile):
+        data = data.load()
+
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    builder_class = getattr(sheet_builders, builder_name)
+    builder = builder_class(workbook, StyleManager(), ChartBuilder(), progress_cb, **builder_kwargs)
+    t0 = time.perf_counter()
+    if parts is None:
         builder.build(data)
+    else:
+        builder.build(data, parts=parts)
+    return workbook, time.perf_counter() - t0
+
+
+def _adopt_worksheets(target, source):
+    """
+    把 source 中的工作表按顺序移入 target
+
+    单元格样式在workbook中以共享样式表的编号保存，按 source 样式表的顺序把样式加入
+    target 并重新编号；与直接在 target 中构建时样式的登记顺序相同，保存结果一致。
+    """
+    from openpyxl.styles.cell_style import StyleArray
+    from openpyxl.styles.numbers import BUILTIN_FORMATS_MAX_SIZE, BUILTIN_FORMATS_REVERSE
+
+    font_ids = [target._fonts.add(font) for font in source._fonts]
+    fill_ids = [target._fills.add(fill) for fill in source._fills]
+    border_ids = [target._borders.add(border) for border in source._borders]
+    alignment_ids = [target._alignments.add(alignment) for alignment in source._alignments]
+    protection_ids = [target._protections.add(protection) for protection in source._protections]
+    named_style_ids = {}
+    for index, style in enumerate(source._named_styles):
+        if style.name not in target.named_styles:
+            target.add_named_style(style)
+        named_style_ids[index] = target.named_styles.index(style.name)
+
+    def number_format_id(fmt_id):
+        if fmt_id < BUILTIN_FORMATS_MAX_SIZE:
+            return fmt_id
+        fmt = source._number_formats[fmt_id - BUILTIN_FORMATS_MAX_SIZE]
+        if fmt in BUILTIN_FORMATS_REVERSE:
+            return BUILTIN_FORMATS_REVERSE[fmt]
+        return target._number_formats.add(fmt) + BUILTIN_FORMATS_MAX_SIZE
+
+    # 先登记 source 中自定义数字格式（保持登记顺序）
+    for index in range(len(source._number_formats)):
+        number_format_id(index + BUILTIN_FORMATS_MAX_SIZE)
+
+    remapped = {}
+
+    def remap(style):
+        key = tuple(style)
+        new_style = remapped.get(key)
+        if new_style is None:
+            new_style = StyleArray()
+            new_style.fontId = font_ids[style.fontId]
+            new_style.fillId = fill_ids[style.fillId]
+            new_style.borderId = border_ids[style.borderId]
+            new_style.alignmentId = alignment_ids[style.alignmentId]
+            new_style.protectionId = protection_ids[style.protectionId]
+            new_style.numFmtId = number_format_id(style.numFmtId)
+            new_style.xfId = named_style_ids.get(style.xfId, 0)
+            new_style.quotePrefix = style.quotePrefix
+            new_style.pivotButton = style.pivotButton
+            remapped[key] = new_style
+        return StyleArray(new_style)
+
+    for ws in list(source.worksheets):
+        for cell in ws._cells.values():
+            if cell.has_style:
+                cell._style = remap(cell._style)
+        for dimensions in (ws.column_dimensions, ws.row_dimensions):
+            for dimension in dimensions.values():
+                if dimension.has_style:
+                    dimension._style = remap(dimension._style)
+        source._sheets.remove(ws)
+        ws._parent = target
+        target._sheets.append(ws)
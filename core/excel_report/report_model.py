@@ -0,0 +1,544 @@
+"""
+Excel综合报告数据模型
+
+PPT报告基于刚生成的Excel综合报告构建，原先需要用 openpyxl 把整个报告重新加载两遍
+（data_only=True 读数据、data_only=False 取图片，合计约20秒）。本模块在生成Excel时
+直接从内存中的 workbook 提取PPT所需的全部内容，保存为报告旁的二进制副本：
+
+- 单元格值：与 openpyxl 读取刚保存的报告得到的值一致；公式单元格在 data_only=True 时为None
+  （openpyxl 写入的公式没有缓存结果），否则为公式文本，见 ReportModel.view
+- 单元格样式：字体、填充、边框、对齐、数字格式（共享样式池 + 每个单元格的样式编号）
+- 图表：按写入xlsx时的XML保存，读取时用 openpyxl 的图表读取器还原
+- 图片：图片原始字节，读取时还原为 openpyxl 图片对象
+- 列宽、行高、合并单元格
+
+ReportModel 对外提供与 openpyxl Workbook/Worksheet 相同的只读接口（sheetnames、ws.cell、
+ws.iter_rows、ws.merged_cells、ws._charts、ws._images 等），PPT各构建器无需区分数据来源；
+read_frame 按 pd.read_excel 的规则把工作表解析为DataFrame。
+
+副本记录了报告保存时的文件大小和修改时间，报告被其他程序修改后副本自动失效，PPT生成器
+回退到加载xlsx。
+"""
+
+import datetime
+import logging
+import os
+import pickle
+from copy import copy
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from openpyxl.styles import Alignment, PatternFill
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.worksheet.cell_range import MultiCellRange
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import column_index_from_string, coordinate_from_string, range_boundaries
+from openpyxl.utils.datetime import from_excel, to_excel
+
+logger = logging.getLogger(__name__)
+
+# 模型目录（报告同目录下的隐藏目录）与格式版本
+MODEL_DIR_NAME = '.report_models'
+MODEL_SUFFIX = '.model'
+MODEL_VERSION = 2
+
+PathLike = Union[str, Path]
+
+
+def model_path_for(xlsx_path: PathLike) -> Path:
+    """报告对应的模型文件路径"""
+    xlsx_path = Path(xlsx_path)
+    return xlsx_path.parent / MODEL_DIR_NAME / (xlsx_path.name + MODEL_SUFFIX)
+
+
+def _source_signature(xlsx_path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = xlsx_path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _saved_number(value):
+    """数值单元格：openpyxl 按 %.16g 写入，读取时含小数点或指数的转为float，否则为int"""
+    text = '%.16g' % value
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+    return int(text)
+
+
+def _saved_value(cell):
+    """
+    单元格保存后再由 openpyxl（data_only=True）读出的值
+
+    Returns:
+        (值, 是否为错误值)
+    """
+    value = cell._value
+    data_type = cell.data_type
+    if value is None:
+        return None, False
+    if data_type == 'f':
+        # openpyxl 写入的公式没有缓存结果，data_only 读取时为空
+        return None, False
+    if data_type == 'e':
+        return value, True
+    if data_type == 'b':
+        return bool(value), False
+    if data_type == 'd':
+        is_timedelta = isinstance(value, datetime.timedelta)
+        number = _saved_number(to_excel(value))
+        return from_excel(number, timedelta=is_timedelta), False
+    if data_type == 'n':
+        number = _saved_number(value)
+        if cell.is_date:
+            return from_excel(number), False
+        return number, False
+    if isinstance(value, str):
+        return value, False
+    # 富文本等：写入为字符串
+    return str(value), False
+
+
+def _image_bytes(image) -> bytes:
+    """
+    图片原始字节（与 Image._data 一致）
+
+    Image._data 读取内存中的图片流（如 BytesIO）后会将其关闭，之后保存xlsx时无法再读取；
+    png/jpeg/gif 的图片流在这里直接读取并复位，不关闭。
+    """
+    ref = image.ref
+    if image.format in ('gif', 'jpeg', 'png') and hasattr(ref, 'read') and hasattr(ref, 'seek'):
+        ref.seek(0)
+        data = ref.read()
+        ref.seek(0)
+        return data
+    return image._data()
+
+
+class _Dimension:
+    """列宽/行高（只读）"""
+
+    __slots__ = ('width', 'height')
+
+    def __init__(self, width=None, height=None):
+        self.width = width
+        self.height = height
+
+
+class _DimensionHolder(dict):
+    """未设置的列/行返回 openpyxl 的默认值（列宽13，行高None）"""
+
+    def __init__(self, values: Dict, is_column: bool):
+        super().__init__()
+        self._is_column = is_column
+        for key, size in values.items():
+            self[key] = _Dimension(width=size) if is_column else _Dimension(height=size)
+
+    def __missing__(self, key):
+        return _Dimension(width=13) if self._is_column else _Dimension()
+
+
+class ReportCell:
+    """单元格（只读），接口与 openpyxl Cell 一致"""
+
+    __slots__ = ('row', 'column', 'value', '_style', '_is_error', '_is_formula')
+
+    def __init__(self, row: int, column: int, value=None, style=None, is_error: bool = False,
+                 is_formula: bool = False):
+        self.row = row
+        self.column = column
+        self.value = value
+        self._style = style
+        self._is_error = is_error
+        self._is_formula = is_formula
+
+    @property
+    def coordinate(self) -> str:
+        return f"{get_column_letter(self.column)}{self.row}"
+
+    @property
+    def has_style(self) -> bool:
+        return self._style is not None
+
+    @property
+    def data_type(self) -> str:
+        if self._is_error:
+            return 'e'
+        if self._is_formula:
+            return 'f'
+        if isinstance(self.value, str):
+            return 's'
+        if isinstance(self.value, bool):
+            return 'b'
+        if isinstance(self.value, (datetime.datetime, datetime.date, datetime.time, datetime.timedelta)):
+            return 'd'
+        return 'n'
+
+    def _style_item(self, index: int, default):
+        if self._style is None:
+            return default
+        return self._style[index]
+
+    @property
+    def font(self):
+        return self._style_item(0, DEFAULT_FONT)
+
+    @property
+    def fill(self):
+        return self._style_item(1, PatternFill())
+
+    @property
+    def border(self):
+        return self._style_item(2, DEFAULT_BORDER)
+
+    @property
+    def alignment(self):
+        return self._style_item(3, Alignment())
+
+    @property
+    def number_format(self) -> str:
+        return self._style_item(4, 'General')
+
+
+class ReportSheet:
+    """工作表（只读），接口与 openpyxl Worksheet 的读取部分一致"""
+
+    def __init__(self, title: str, state: Dict, styles: List[tuple], data_only: bool = True):
+        self.title = title
+        self._rows: List[list] = state['rows']
+        self._style_ids: Optional[np.ndarray] = state['style_ids']
+        self._errors = state['errors']
+        # data_only=False 时公式单元格返回公式文本
+        self._formulas: Dict[Tuple[int, int], object] = {} if data_only else state['formulas']
+        self.merged_cells = MultiCellRange(state['merged'])
+        self._styles = styles
+        self._chart_xml: List[bytes] = state['charts']
+        self._image_data: List[bytes] = state['images']
+        self.column_dimensions = _DimensionHolder(state['column_widths'], is_column=True)
+        self.row_dimensions = _DimensionHolder(state['row_heights'], is_column=False)
+        self.max_row = len(self._rows) or 1
+        self.max_column = max((len(r) for r in self._rows), default=0) or 1
+        self.min_row = 1
+        self.min_column = 1
+        self._charts_cache = None
+        self._images_cache = None
+
+    def __repr__(self):
+        return f'<ReportSheet "{self.title}">'
+
+    def _value_at(self, row: int, column: int):
+        if self._formulas and (row, column) in self._formulas:
+            return self._formulas[row, column]
+        if 1 <= row <= len(self._rows):
+            values = self._rows[row - 1]
+            if 1 <= column <= len(values):
+                return values[column - 1]
+        return None
+
+    def cell(self, row: int, column: int, value=None) -> ReportCell:
+        if value is not None:
+            raise TypeError("报告数据模型为只读，不能写入单元格")
+        style = None
+        ids = self._style_ids
+        if ids is not None and row <= ids.shape[0] and column <= ids.shape[1]:
+            style_id = ids[row - 1, column - 1]
+            if style_id >= 0:
+                style = self._styles[style_id]
+        return ReportCell(row, column, self._value_at(row, column), style,
+                          (row, column) in self._errors, (row, column) in self._formulas)
+
+    def __getitem__(self, key: str):
+        if ':' in key:
+            min_col, min_row, max_col, max_row = range_boundaries(key)
+            return tuple(self.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col))
+        column_letter, row = coordinate_from_string(key)
+        return self.cell(row=row, column=column_index_from_string(column_letter))
+
+    def iter_rows(self, min_row=None, max_row=None, min_col=None, max_col=None, values_only=False):
+        if not self._rows and not any([min_row, max_row, min_col, max_col]):
+            # 与 openpyxl 一致：空工作表不产生任何行
+            return
+        min_row = min_row or 1
+        min_col = min_col or 1
+        max_row = max_row or self.max_row
+        max_col = max_col or self.max_column
+        for row in range(min_row, max_row + 1):
+            if values_only:
+                yield tuple(self._value_at(row, column) for column in range(min_col, max_col + 1))
+            else:
+                yield tuple(self.cell(row=row, column=column) for column in range(min_col, max_col + 1))
+
+    @property
+    def rows(self):
+        return self.iter_rows()
+
+    @property
+    def values(self):
+        return self.iter_rows(values_only=True)
+
+    @property
+    def _charts(self) -> list:
+        """图表对象（与 openpyxl 从xlsx读出的图表一致）"""
+        if self._charts_cache is None:
+            from openpyxl.chart.chartspace import ChartSpace
+            from openpyxl.chart.reader import read_chart
+            from openpyxl.xml.functions import fromstring
+
+            charts = []
+            for xml in self._chart_xml:
+                try:
+                    charts.append(read_chart(ChartSpace.from_tree(fromstring(xml))))
+                except Exception as e:
+                    logger.warning(f"还原图表失败（{self.title}）: {e}")
+            self._charts_cache = charts
+        return self._charts_cache
+
+    @property
+    def _images(self) -> list:
+        """图片对象（openpyxl Image，数据来自保存的原始字节）"""
+        if self._images_cache is None:
+            images = []
+            try:
+                from openpyxl.drawing.image import Image
+                for data in self._image_data:
+                    images.append(Image(BytesIO(data)))
+            except Exception as e:
+                logger.warning(f"还原图片失败（{self.title}）: {e}")
+            self._images_cache = images
+        return self._images_cache
+
+    def read_frame(self, header: Optional[int] = 0) -> pd.DataFrame:
+        """按 pd.read_excel(sheet_name=..., header=header) 的规则解析工作表"""
+        from pandas.io.parsers import TextParser
+
+        data = []
+        last_row_with_data = -1
+        for row_number, values in enumerate(self._rows, start=1):
+            converted = []
+            for column, value in enumerate(values, start=1):
+                if value is None:
+                    converted.append('')
+                elif (row_number, column) in self._errors:
+                    converted.append(np.nan)
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    as_int = int(value)
+                    converted.append(as_int if as_int == value else float(value))
+                else:
+                    converted.append(value)
+            while converted and converted[-1] == '':
+                converted.pop()
+            if converted:
+                last_row_with_data = len(data)
+            data.append(converted)
+        data = data[:last_row_with_data + 1]
+        if not data:
+            return pd.DataFrame()
+        width = max(len(r) for r in data)
+        data = [r + [''] * (width - len(r)) for r in data]
+        parser = TextParser(data, header=header, skip_blank_lines=False)
+        return parser.read()
+
+
+class ReportModel:
+    """
+    Excel综合报告的内存模型，接口与只读的 openpyxl Workbook 一致
+
+    默认与 load_workbook(data_only=True) 一致；view(data_only=False) 得到与
+    load_workbook(data_only=False) 一致的视图（只有公式单元格的值不同）。
+    """
+
+    def __init__(self, sheets: Dict[str, Dict], styles: List[tuple], data_only: bool = True):
+        self._states = sheets
+        self._styles = styles
+        self.data_only = data_only
+        self._sheets: Dict[str, ReportSheet] = {}
+
+    def view(self, data_only: bool) -> 'ReportModel':
+        """共用同一份数据、按指定 data_only 规则读取单元格值的模型"""
+        if data_only == self.data_only:
+            return self
+        return ReportModel(self._states, self._styles, data_only=data_only)
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return list(self._states)
+
+    @property
+    def worksheets(self) -> List[ReportSheet]:
+        return [self[name] for name in self._states]
+
+    def __contains__(self, sheet_name: str) -> bool:
+        return sheet_name in self._states
+
+    def __getitem__(self, sheet_name: str) -> ReportSheet:
+        sheet = self._sheets.get(sheet_name)
+        if sheet is None:
+            if sheet_name not in self._states:
+                raise KeyError(f"Worksheet {sheet_name} does not exist.")
+            sheet = ReportSheet(sheet_name, self._states[sheet_name], self._styles, self.data_only)
+            self._sheets[sheet_name] = sheet
+        return sheet
+
+    def close(self):
+        """与 Workbook.close 一致（无需释放资源）"""
+
+    def read_frame(self, sheet_name: str, header: Optional[int] = 0) -> pd.DataFrame:
+        """按 pd.read_excel 的规则解析指定工作表"""
+        return self[sheet_name].read_frame(header=header)
+
+    # ------------------------------------------------------------------ #
+    @classmethod
+    def from_workbook(cls, wb) -> 'ReportModel':
+        """
+        从内存中的 openpyxl Workbook 提取模型（应在 wb.save 之前调用：保存时会关闭内存中的图片流）
+
+        Args:
+            wb: 已构建完成的Workbook
+
+        Returns:
+            ReportModel
+        """
+        from openpyxl.xml.functions import tostring
+
+        style_index: Dict[tuple, int] = {}
+        styles: List[tuple] = []
+        sheets: Dict[str, Dict] = {}
+
+        for ws in wb.worksheets:
+            max_row = ws.max_row if ws._cells else 0
+            max_col = ws.max_column if ws._cells else 0
+            rows = [[None] * max_col for _ in range(max_row)]
+            style_ids = np.full((max_row, max_col), -1, dtype=np.int32)
+            errors = set()
+            formulas = {}
+
+            for (row, column), cell in ws._cells.items():
+                value, is_error = _saved_value(cell)
+                rows[row - 1][column - 1] = value
+                if is_error:
+                    errors.add((row, column))
+                elif cell.data_type == 'f':
+                    formulas[row, column] = copy(cell._value)
+                if cell.has_style:
+                    key = tuple(cell._style)
+                    style_id = style_index.get(key)
+                    if style_id is None:
+                        style_id = len(styles)
+                        style_index[key] = style_id
+                        # cell.font 等返回样式代理对象，复制出实际的样式对象再保存
+                        styles.append((copy(cell.font), copy(cell.fill), copy(cell.border),
+                                       copy(cell.alignment), cell.number_format))
+                    style_ids[row - 1, column - 1] = style_id
+
+            charts = []
+            for chart in ws._charts:
+                try:
+                    charts.append(tostring(chart._write()))
+                except Exception as e:
+                    logger.warning(f"保存图表失败（{ws.title}）: {e}")
+
+            images = []
+            for image in ws._images:
+                try:
+                    images.append(_image_bytes(image))
+                except Exception as e:
+                    logger.warning(f"保存图片失败（{ws.title}）: {e}")
+
+            sheets[ws.title] = {
+                'rows': rows,
+                'style_ids': style_ids if (style_ids >= 0).any() else None,
+                'errors': errors,
+                'formulas': formulas,
+                'merged': [str(cell_range) for cell_range in ws.merged_cells.ranges],
+                'charts': charts,
+                'images': images,
+                'column_widths': {key: dim.width for key, dim in ws.column_dimensions.items()
+                                  if dim.width is not None},
+                'row_heights': {key: dim.height for key, dim in ws.row_dimensions.items()
+                                if dim.height is not None},
+            }
+
+        return cls(sheets, styles)
+
+    def save(self, xlsx_path: PathLike) -> Optional[Path]:
+        """
+        保存为报告旁的模型文件（记录报告当前的大小和修改时间）
+
+        Args:
+            xlsx_path: 已保存的Excel报告路径
+
+        Returns:
+            模型文件路径；失败返回None
+        """
+        xlsx_path = Path(xlsx_path)
+        signature = _source_signature(xlsx_path)
+        if signature is None:
+            logger.warning(f"报告文件不存在，跳过保存数据模型: {xlsx_path}")
+            return None
+
+        path = model_path_for(xlsx_path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            payload = {
+                'version': MODEL_VERSION,
+                'source': signature,
+                'sheets': self._states,
+                'styles': self._styles,
+            }
+            tmp_path = path.with_name(path.name + '.tmp')
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"保存报告数据模型失败: {e}")
+            return None
+
+        _remove_orphan_models(path.parent)
+        return path
+
+    @classmethod
+    def load(cls, xlsx_path: PathLike) -> Optional['ReportModel']:
+        """
+        读取报告对应的模型
+
+        Args:
+            xlsx_path: Excel报告路径
+
+        Returns:
+            ReportModel；没有模型、模型版本不符或报告已被修改时返回None
+        """
+        xlsx_path = Path(xlsx_path)
+        path = model_path_for(xlsx_path)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'rb') as f:
+                payload = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"读取报告数据模型失败: {e}")
+            return None
+
+        if payload.get('version') != MODEL_VERSION:
+            logger.info("报告数据模型版本不符，忽略")
+            return None
+        if tuple(payload.get('source') or ()) != _source_signature(xlsx_path):
+            logger.info("Excel报告在生成后被修改，忽略报告数据模型")
+            return None
+        return cls(payload['sheets'], payload['styles'])
+
+
+def _remove_orphan_models(model_dir: Path):
+    """删除对应报告已不存在的模型文件"""
+    try:
+        for entry in model_dir.iterdir():
+            if entry.name.endswith(MODEL_SUFFIX):
+                xlsx_path = model_dir.parent / entry.name[:-len(MODEL_SUFFIX)]
+                if not xlsx_path.exists():
+                    entry.unlink()
+    except OSError as e:
+        logger.debug(f"清理报告数据模型失败: {e}")
@@ -16,7 +16,10 @@ logger = logging.getLogger(__name__)
 class Sheet3Builder(BaseSheetBuilder):
     """Sheet 3: 育种性状分析（协调器）"""
 
-    def build(self, data: dict):
+    # 子Sheet编号（按构建顺序）
+    PARTS = ('3-1', '3-2', '3-3', '3-4')
+
+    def build(self, data: dict, parts=None):
         """
         构建Sheet 3的所有子Sheet
 
@@ -31,6 +34,7 @@ class Sheet3Builder(BaseSheetBuilder):
                 'comparison_data': 对比数据字典 {'farms': [...], 'references': [...]},
                 'detail_df': 育种性状明细DataFrame
             }
+            parts: 只构建指定的子Sheet（如 ['3-2']，并行构建时使用），默认全部
         """
         try:
             logger.info("开始构建Sheet 3: 育种性状分析")
@@ -40,44 +44,50 @@ class Sheet3Builder(BaseSheetBuilder):
                 logger.warning("Sheet 3数据为空，跳过构建")
                 return
 
+            parts = self.PARTS if parts is None else parts
+
             # 构建Sheet 3-1: 年份汇总与性状进展
-            try:
-                logger.info("  构建Sheet 3-1: 年份汇总与性状进展")
-                sheet3_1 = Sheet3YearlySummaryBuilder(self.wb, self.style_manager, self.chart_builder)
-                sheet3_1.build({
-                    'present_summary': data.get('present_summary'),
-                    'all_summary': data.get('all_summary'),
-                    'comparison_data': data.get('comparison_data', {'farms': [], 'references': []})
-                })
-                logger.info("  ✓ Sheet 3-1构建完成")
-            except Exception as e:
-                logger.error(f"  ✗ Sheet 3-1构建失败: {e}", exc_info=True)
-                # 继续构建其他sheet
+            if '3-1' in parts:
+                try:
+                    logger.info("  构建Sheet 3-1: 年份汇总与性状进展")
+                    sheet3_1 = Sheet3YearlySummaryBuilder(self.wb, self.style_manager, self.chart_builder)
+                    sheet3_1.build({
+                        'present_summary': data.get('present_summary'),
+                        'all_summary': data.get('all_summary'),
+                        'comparison_data': data.get('comparison_data', {'farms': [], 'references': []})
+                    })
+                    logger.info("  ✓ Sheet 3-1构建完成")
+                except Exception as e:
+                    logger.error(f"  ✗ Sheet 3-1构建失败: {e}", exc_info=True)
+                    # 继续构建其他sheet
 
             # 构建Sheet 3-2: NM$分布分析
-            logger.info("  构建Sheet 3-2: NM$分布分析")
-            sheet3_2 = Sheet3NMDistributionBuilder(self.wb, self.style_manager, self.chart_builder)
-            sheet3_2.build({
-                'distribution_present': data.get('nm_distribution_present'),
-                'distribution_all': data.get('nm_distribution_all'),
-                'detail_df': data.get('detail_df')  # 传递明细数据用于正态分布图
-            })
+            if '3-2' in parts:
+                logger.info("  构建Sheet 3-2: NM$分布分析")
+                sheet3_2 = Sheet3NMDistributionBuilder(self.wb, self.style_manager, self.chart_builder)
+                sheet3_2.build({
+                    'distribution_present': data.get('nm_distribution_present'),
+                    'distribution_all': data.get('nm_distribution_all'),
+                    'detail_df': data.get('detail_df')  # 传递明细数据用于正态分布图
+                })
 
             # 构建Sheet 3-3: TPI分布分析
-            logger.info("  构建Sheet 3-3: TPI分布分析")
-            sheet3_3 = Sheet3TPIDistributionBuilder(self.wb, self.style_manager, self.chart_builder)
-            sheet3_3.build({
-                'distribution_present': data.get('tpi_distribution_present'),
-                'distribution_all': data.get('tpi_distribution_all'),
-                'detail_df': data.get('detail_df')  # 传递明细数据用于正态分布图
-            })
+            if '3-3' in parts:
+                logger.info("  构建Sheet 3-3: TPI分布分析")
+                sheet3_3 = Sheet3TPIDistributionBuilder(self.wb, self.style_manager, self.chart_builder)
+                sheet3_3.build({
+                    'distribution_present': data.get('tpi_distribution_present'),
+                    'distribution_all': data.get('tpi_distribution_all'),
+                    'detail_df': data.get('detail_df')  # 传递明细数据用于正态分布图
+                })
 
             # 构建Sheet 3-4: 育种性状明细
-            logger.info("  构建Sheet 3-4: 育种性状明细")
-            sheet3_4 = Sheet3DetailBuilder(self.wb, self.style_manager, self.chart_builder)
-            sheet3_4.build({
-                'detail_df': data.get('detail_df')
-            })
+            if '3-4' in parts:
+                logger.info("  构建Sheet 3-4: 育种性状明细")
+                sheet3_4 = Sheet3DetailBuilder(self.wb, self.style_manager, self.chart_builder)
+                sheet3_4.build({
+                    'detail_df': data.get('detail_df')
+                })
 
             logger.info("✓ Sheet 3所有子Sheet构建完成")
 
@@ -14,7 +14,10 @@ logger = logging.getLogger(__name__)
 class Sheet4Builder(BaseSheetBuilder):
     """Sheet 4: 母牛指数分析（协调器）"""
 
-    def build(self, data: dict):
+    # 子Sheet编号（按构建顺序）
+    PARTS = ('4-1', '4-2')
+
+    def build(self, data: dict, parts=None):
         """
         构建Sheet 4的所有子Sheet
 
@@ -24,6 +27,7 @@ class Sheet4Builder(BaseSheetBuilder):
                 'distribution_all': 全部母牛指数分布DataFrame,
                 'detail_df': 母牛指数明细DataFrame
             }
+            parts: 只构建指定的子Sheet（如 ['4-1']，并行构建时使用），默认全部
         """
         try:
             logger.info("开始构建Sheet 4: 母牛指数分析")
@@ -33,21 +37,25 @@ class Sheet4Builder(BaseSheetBuilder):
                 logger.warning("Sheet 4数据为空，跳过构建")
                 return
 
+            parts = self.PARTS if parts is None else parts
+
             # 构建Sheet 4-1: 母牛指数分布分析
-            logger.info("  构建Sheet 4-1: 母牛指数分布分析")
-            sheet4_1 = Sheet4IndexDistributionBuilder(self.wb, self.style_manager, self.chart_builder)
-            sheet4_1.build({
-                'distribution_present': data.get('distribution_present'),
-                'distribution_all': data.get('distribution_all'),
-                'detail_df': data.get('detail_df')
-            })
+            if '4-1' in parts:
+                logger.info("  构建Sheet 4-1: 母牛指数分布分析")
+                sheet4_1 = Sheet4IndexDistributionBuilder(self.wb, self.style_manager, self.chart_builder)
+                sheet4_1.build({
+                    'distribution_present': data.get('distribution_present'),
+                    'distribution_all': data.get('distribution_all'),
+                    'detail_df': data.get('detail_df')
+                })
 
             # 构建Sheet 4-2: 母牛指数排名明细
-            logger.info("  构建Sheet 4-2: 母牛指数排名明细")
-            sheet4_2 = Sheet4DetailBuilder(self.wb, self.style_manager, self.chart_builder)
-            sheet4_2.build({
-                'detail_df': data.get('detail_df')
-            })
+            if '4-2' in parts:
+                logger.info("  构建Sheet 4-2: 母牛指数排名明细")
+                sheet4_2 = Sheet4DetailBuilder(self.wb, self.style_manager, self.chart_builder)
+                sheet4_2.build({
+                    'detail_df': data.get('detail_df')
+                })
 
             logger.info("✓ Sheet 4所有子Sheet构建完成")
 
@@ -1,6 +1,11 @@
 """
 数据缓存工具
 用于缓存已读取的Excel文件，避免重复读取
+
+解析结果放在项目数据上下文（core.data.project_data）中，与分组、选配共用：
+- 读取经 dataset_io，xlsx 旁的列式副本（Feather/pickle，按大小和修改时间失效）使重新生成报告时
+  未修改的文件无需再解析
+- 命中时返回浅拷贝（pandas 写时复制），不再每次整表深拷贝；collector 修改返回的DataFrame不会影响缓存
 """
 
 from pathlib import Path
@@ -8,14 +13,24 @@ import threading
 import pandas as pd
 import logging
 
+from core.data.project_data import ProjectData, get_project_data
+
 logger = logging.getLogger(__name__)
 
 
 class DataCache:
     """数据缓存类 - 缓存已读取的Excel文件（线程安全）"""
 
-    def __init__(self):
-        self._cache = {}
+    def __init__(self, project_folder: Path = None):
+        """
+        Args:
+            project_folder: 项目文件夹；指定时与同一项目的分组、选配共用解析结果
+        """
+        if project_folder is not None:
+            self._data = get_project_data(project_folder)
+        else:
+            self._data = ProjectData(Path.cwd())
+        self._files = set()
         self._lock = threading.Lock()
 
     def get_excel(self, file_path: Path, **read_excel_kwargs) -> pd.DataFrame:
@@ -27,33 +42,26 @@ class DataCache:
             **read_excel_kwargs: pd.read_excel的其他参数
 
         Returns:
-            DataFrame
+            DataFrame（与缓存共享数据，修改时自动复制）
         """
-        # 使用绝对路径作为缓存key
-        cache_key = str(Path(file_path).resolve())
-
+        file_path = Path(file_path).resolve()
+        df = self._data.read(file_path, **read_excel_kwargs)
         with self._lock:
-            if cache_key in self._cache:
-                logger.debug(f"从缓存读取: {Path(file_path).name}")
-                return self._cache[cache_key].copy()
-
-        # 缓存未命中，在锁外读取文件（IO密集，不阻塞其他线程）
-        logger.debug(f"首次读取: {Path(file_path).name}")
-        df = pd.read_excel(file_path, **read_excel_kwargs)
-
-        with self._lock:
-            # 双重检查：可能另一个线程已经读取了同一文件
-            if cache_key not in self._cache:
-                self._cache[cache_key] = df
-            return self._cache[cache_key].copy()
+            self._files.add(str(file_path))
+        return df
 
     def clear(self):
         """清空缓存"""
-        self._cache.clear()
+        with self._lock:
+            files, self._files = self._files, set()
+        for file_path in files:
+            self._data.invalidate(file_path)
 
     def get_cache_stats(self) -> dict:
         """获取缓存统计信息"""
+        with self._lock:
+            files = sorted(self._files)
         return {
-            'cached_files': len(self._cache),
-            'files': [Path(k).name for k in self._cache.keys()]
+            'cached_files': len(files),
+            'files': [Path(k).name for k in files]
         }
@@ -2,12 +2,77 @@
 分组管理模块
 """
 
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
 import json
 from typing import Dict, List, Tuple
 import os
+from core.data.project_data import get_project_data
+
+PREGNANT_STATUSES = ("初检孕", "复检孕")
+INELIGIBLE_STATUSES = ("已配", "干奶", "禁配")
+SEXED_BREEDING_METHODS = ("普通性控", "超级性控")
+BEEF_BREEDING_METHOD = "肉牛冻精"
+HEIFER_DIFFICULT_AGE = 18 * 30.8  # 后备牛难孕日龄（18个月）
+MATURE_DIFFICULT_DIM = 600  # 成母牛难孕DIM
+
+
+def status_mask(status: pd.Series, statuses) -> np.ndarray:
+    """繁育状态（去除首尾空格后）是否属于 statuses"""
+    return status.astype(str).str.strip().isin(statuses).to_numpy(dtype=bool)
+
+
+def heifer_cycle_numbers(age_days: np.ndarray, reserve_age, cycle_days, cycle_count: int) -> np.ndarray:
+    """
+    后备牛周期序号
+
+    第i周期为日龄 [reserve_age - i×cycle_days, reserve_age - (i-1)×cycle_days)，第1周期的上限为18月龄。
+
+    Returns:
+        np.ndarray: 周期序号（int64），不属于任何周期（含日龄为空）为0
+    """
+    age_days = np.asarray(age_days, dtype=np.float64)
+    valid = ~np.isnan(age_days)
+    offset = np.where(valid, age_days - reserve_age, 0.0)
+    # 向上取整的整除：日龄每低于开配日龄一个周期，周期序号加1
+    cycle = np.maximum(1, -(offset // cycle_days)).astype(np.int64)
+    valid &= (age_days >= reserve_age - cycle_days * cycle) & (cycle <= cycle_count)
+    valid &= (cycle > 1) | (age_days < HEIFER_DIFFICULT_AGE)
+    return np.where(valid, cycle, 0)
+
+
+def compile_strategy_rules(strategy_rows: List[dict]) -> List[dict]:
+    """
+    把策略表中的策略组编译为按排名切片的规则
+
+    每条规则包含累计比例区间，以及按已配种次数索引的配种类型（性控/非性控，策略组中有肉牛冻精时加"（肉牛）"）。
+    """
+    rules = []
+    cumulative_ratio = 0
+    for row in strategy_rows:
+        breeding_methods = row['breeding_methods']
+        beef_suffix = "（肉牛）" if BEEF_BREEDING_METHOD in breeding_methods else ""
+        sexed = np.array([method in SEXED_BREEDING_METHODS for method in breeding_methods], dtype=bool)
+        rules.append({
+            'group': row['group'],
+            'ratio': row['ratio'],
+            'breeding_methods': breeding_methods,
+            'start_ratio': cumulative_ratio,
+            'end_ratio': cumulative_ratio + row['ratio'],
+            'breeding_types': np.array([("性控" if flag else "非性控") + beef_suffix for flag in sexed], dtype=object),
+            'sexed': sexed,
+            'has_beef': bool(beef_suffix),
+        })
+        cumulative_ratio += row['ratio']
+    return rules
+
+
+def rule_slice(rule: dict, total_cows: int) -> Tuple[int, int]:
+    """规则在按排名排列的 total_cows 头牛中对应的 [起, 止) 位置"""
+    return int(total_cows * rule['start_ratio'] / 100), int(total_cows * rule['end_ratio'] / 100)
+
 
 class GroupManager:
     def __init__(self, project_path: Path):
@@ -72,7 +137,7 @@ class GroupManager:
         """加载牛只数据"""
         if not self.index_file.exists():
             raise FileNotFoundError("请先进行牛只指数计算排名")
-        self.cow_data = pd.read_excel(self.index_file)
+        self.cow_data = get_project_data(self.project_path).read(self.index_file)
         # 确保cow_id保持为字符串格式（修复pandas自动转换为数字的问题）
         if 'cow_id' in self.cow_data.columns:
             self.cow_data['cow_id'] = self.cow_data['cow_id'].astype(str)
@@ -165,7 +230,7 @@ class GroupManager:
 
     def is_pregnant(self, status: str) -> bool:
         """判断是否已孕"""
-        return str(status).strip() in ["初检孕", "复检孕"]
+        return str(status).strip() in PREGNANT_STATUSES
 
     def is_temporarily_ineligible(self, status: str) -> bool:
         """判断当前是否不应进入选配。
@@ -174,7 +239,7 @@ class GroupManager:
         状态。这些牛不应仅因为不是“初检孕/复检孕”就被当作未孕牛再次
         分配公牛。
         """
-        return str(status).strip() in ["已配", "干奶", "禁配"]
+        return str(status).strip() in INELIGIBLE_STATUSES
 
     def is_sexed_method(self, method: str) -> bool:
         """判断是否为性控方法"""
@@ -335,6 +400,19 @@ class GroupManager:
         
         return df
 
+    @staticmethod
+    def _normalize_manual_groups(df: pd.DataFrame) -> Tuple[int, int]:
+        """
+        把手动分组中的空值、空字符串和"nan"标记为"未分组"（就地修改 df）
+
+        Returns:
+            (已手动分组头数, 未分组头数)
+        """
+        empty = df['group'].isna() | df['group'].astype(str).str.strip().isin(['nan', ''])
+        df['group'] = df['group'].where(~empty, '未分组')
+        empty_group_count = int(empty.sum())
+        return len(df) - empty_group_count, empty_group_count
+
     def apply_temp_strategy(self, strategy: dict, progress_callback=None, grouping_mode: str = None) -> pd.DataFrame:
         """
         应用临时分组策略，返回分组结果
@@ -360,7 +438,7 @@ class GroupManager:
             raise FileNotFoundError("请先进行牛只指数计算排名")
 
         try:
-            df = pd.read_excel(self.index_file)
+            df = get_project_data(self.project_path).read(self.index_file)
             # 确保cow_id保持为字符串格式（修复pandas自动转换为数字的问题）
             if 'cow_id' in df.columns:
                 df['cow_id'] = df['cow_id'].astype(str)
@@ -399,17 +477,7 @@ class GroupManager:
                 empty_group_count = len(df)
             else:
                 # 检查并处理现有group列
-                for idx in df.index:
-                    if pd.notna(df.at[idx, 'group']):
-                        group_val = str(df.at[idx, 'group']).strip()
-                        if group_val == 'nan' or group_val == '':
-                            df.at[idx, 'group'] = '未分组'
-                            empty_group_count += 1
-                        else:
-                            manual_grouped_count += 1
-                    else:
-                        df.at[idx, 'group'] = '未分组'
-                        empty_group_count += 1
+                manual_grouped_count, empty_group_count = self._normalize_manual_groups(df)
         elif grouping_mode == 'auto':
             # 强制使用自动分组模式
             has_manual_groups = False
@@ -429,21 +497,7 @@ class GroupManager:
                 has_manual_groups = True
 
                 # 处理group列的值
-                for idx in df.index:
-                    if pd.notna(df.at[idx, 'group']):
-                        group_val = str(df.at[idx, 'group']).strip()
-                        if group_val == 'nan':  # pandas可能将NaN转为字符串'nan'
-                            df.at[idx, 'group'] = '未分组'
-                            empty_group_count += 1
-                        elif group_val == '':  # 空字符串
-                            df.at[idx, 'group'] = '未分组'  # 将空字符串标记为"未分组"
-                            empty_group_count += 1
-                        else:
-                            manual_grouped_count += 1
-                    else:
-                        # NaN值，标记为未分组
-                        df.at[idx, 'group'] = '未分组'
-                        empty_group_count += 1
+                manual_grouped_count, empty_group_count = self._normalize_manual_groups(df)
 
                 print(f"检测到手动分组模式: {manual_grouped_count} 头牛已手动分组, {empty_group_count} 头牛未分组")
                 print("将跳过所有自动分组，保留用户的手动分组设置")
@@ -496,16 +550,11 @@ class GroupManager:
                 df[col] = pd.to_numeric(df[col], errors='coerce')
         df['lac'] = df['lac'].fillna(0)
 
-        # 计算日龄和DIM
+        # 计算日龄和DIM（按天数整除，缺失日期为NaN）
         today = datetime.now()
         df['birth_date'] = pd.to_datetime(df['birth_date'], errors='coerce')
         df['calving_date'] = pd.to_datetime(df['calving_date'], errors='coerce')
-
-        # 计算日龄 - 正确处理NaN值
-        df['日龄'] = df['birth_date'].apply(
-            lambda x: (today - x).days if pd.notna(x) else None
-        )
-        df['日龄'] = pd.to_numeric(df['日龄'], errors='coerce')
+        df['日龄'] = (today - df['birth_date']).dt.days
 
         # 保留源系统提供的DIM。部分干奶牛的DIM会停留在干奶时点，若直接
         # 用当前日期减产犊日期覆盖，会改变源数据并导致报告对账不一致。
@@ -514,10 +563,7 @@ class GroupManager:
             if 'DIM' in df.columns
             else pd.Series(index=df.index, dtype='float64')
         )
-        calculated_dim = df['calving_date'].apply(
-            lambda x: (today - x).days if pd.notna(x) else None
-        )
-        calculated_dim = pd.to_numeric(calculated_dim, errors='coerce')
+        calculated_dim = (today - df['calving_date']).dt.days
         df['calculated_DIM'] = calculated_dim
         df['DIM'] = source_dim.combine_first(calculated_dim)
 
@@ -556,24 +602,18 @@ class GroupManager:
         # 处理后备牛
         heifer_df = df[heifer_mask].copy()
 
-        # 标记已孕和难孕牛 - 先处理NaN值
-        pregnant_mask = heifer_df['repro_status'].apply(self.is_pregnant)
-        ineligible_mask = heifer_df['repro_status'].apply(
-            self.is_temporarily_ineligible
-        )
-        # 日龄中的None/NaN值视为0，确保布尔表达式有效性
-        valid_age_mask = heifer_df['日龄'].notna()
+        # 标记已孕和难孕牛（繁育状态为空时按字符串"nan"比较，不属于任何状态）
+        pregnant_mask = status_mask(heifer_df['repro_status'], PREGNANT_STATUSES)
+        ineligible_mask = status_mask(heifer_df['repro_status'], INELIGIBLE_STATUSES)
+        # 日龄为空的牛不参与日龄比较
+        heifer_age = heifer_df['日龄'].to_numpy(dtype=np.float64)
+        valid_age_mask = ~np.isnan(heifer_age)
         difficult_mask = (
             valid_age_mask
-            & (heifer_df['日龄'] >= 18 * 30.8)
+            & (heifer_age >= HEIFER_DIFFICULT_AGE)
             & ~pregnant_mask
             & ~ineligible_mask
         )
-
-        # 分配特殊组
-        heifer_df.loc[pregnant_mask, 'group'] = '后备牛已孕牛'
-        heifer_df.loc[ineligible_mask, 'group'] = '后备牛暂不选配牛'
-        heifer_df.loc[difficult_mask, 'group'] = '后备牛难孕牛'
         
         pregnant_count = pregnant_mask.sum()
         difficult_count = difficult_mask.sum()
@@ -587,8 +627,7 @@ class GroupManager:
         
         # 处理普通后备牛（排除已孕和难孕）
         normal_mask = ~(pregnant_mask | ineligible_mask | difficult_mask)
-        heifer_normal = heifer_df[normal_mask]
-        normal_count = len(heifer_normal)
+        normal_count = int(normal_mask.sum())
         
         if progress_callback:
             progress_callback.update_info(f"待分组后备牛: ({normal_count}/{heifer_count}头) 需要按周期分组")
@@ -610,29 +649,31 @@ class GroupManager:
         print(f"\n使用分组参数：后备牛开配日龄={reserve_age}天，选配周期={cycle_days}天")
         
         # 计算需要的周期数（最多处理4个周期）
-        max_age = 18 * 30.8  # 18个月
+        max_age = HEIFER_DIFFICULT_AGE  # 18个月
         cycle_count = min(4, int((max_age - (reserve_age - 4 * cycle_days)) / cycle_days) + 1)
         
         if progress_callback:
             progress_callback.update_info(f"计算周期数: 共 {cycle_count} 个周期")
         
         print(f"计算需要的周期数: {cycle_count}")
-        
-        # 统计各周期牛只数量
-        heifer_cycles_count = {}
-        
-        # 重新实现周期分配逻辑
+
+        # 周期序号：第i周期为日龄 [开配日龄-i×周期, 开配日龄-(i-1)×周期)，第1周期上限为18月龄
+        cycle = heifer_cycle_numbers(heifer_age, reserve_age, cycle_days, cycle_count)
+        cycle[~normal_mask] = 0
+        cycle_labels = np.array([None] + [f'后备牛第{i}周期' for i in range(1, max(cycle_count, 0) + 1)], dtype=object)
+
+        # 分配特殊组和周期组（保持object列，未分组的牛仍为None，避免推断为字符串列后变成NaN）
+        heifer_df['group'] = pd.Series(np.select(
+            [pregnant_mask, ineligible_mask, difficult_mask, cycle > 0],
+            ['后备牛已孕牛', '后备牛暂不选配牛', '后备牛难孕牛', cycle_labels[cycle]],
+            default=heifer_df['group'].to_numpy(dtype=object)
+        ), index=heifer_df.index, dtype=object)
+
+        cycle_sizes = np.bincount(cycle, minlength=max(cycle_count, 0) + 1)
         for i in range(1, cycle_count + 1):
             cycle_start = reserve_age - cycle_days * i
-            cycle_end = reserve_age - cycle_days * (i-1) if i > 1 else 18 * 30.8
-            
-            # 确保有效的布尔掩码
-            valid_age_data = heifer_normal['日龄'].notna()
-            cycle_mask = valid_age_data & (heifer_normal['日龄'] >= cycle_start) & (heifer_normal['日龄'] < cycle_end)
-            heifer_df.loc[heifer_normal[cycle_mask].index, 'group'] = f'后备牛第{i}周期'
-            heifer_cycles_count[i] = cycle_mask.sum()
-            
-            cycle_info = f"后备牛第{i}周期 (日龄 {cycle_start}-{cycle_end}): {cycle_mask.sum()} 头"
+            cycle_end = reserve_age - cycle_days * (i-1) if i > 1 else HEIFER_DIFFICULT_AGE
+            cycle_info = f"后备牛第{i}周期 (日龄 {cycle_start}-{cycle_end}): {cycle_sizes[i]} 头"
             print(cycle_info)
             if progress_callback:
                 progress_callback.update_info(cycle_info)
@@ -644,28 +685,25 @@ class GroupManager:
         
         # 处理成母牛
         mature_df = df[mature_mask].copy()
-        # 标记已孕和难孕牛 - 先处理NaN值
-        pregnant_mask = mature_df['repro_status'].apply(self.is_pregnant)
-        ineligible_mask = mature_df['repro_status'].apply(
-            self.is_temporarily_ineligible
-        )
+        pregnant_mask = status_mask(mature_df['repro_status'], PREGNANT_STATUSES)
+        ineligible_mask = status_mask(mature_df['repro_status'], INELIGIBLE_STATUSES)
         # 难孕牛：有DIM数据且DIM >= 600天且未孕（根据实际数据调整阈值）
         # DIM为空的牛不算难孕牛，应该归为未孕牛
+        mature_dim = mature_df['DIM'].to_numpy(dtype=np.float64)
         difficult_mask = (
-            mature_df['DIM'].notna()
-            & (mature_df['DIM'] >= 600)
+            ~np.isnan(mature_dim)
+            & (mature_dim >= MATURE_DIFFICULT_DIM)
             & ~pregnant_mask
             & ~ineligible_mask
         )
 
-        # 分配周期
-        mature_df.loc[pregnant_mask, 'group'] = '成母牛已孕牛'
-        mature_df.loc[ineligible_mask, 'group'] = '成母牛暂不选配牛'
-        mature_df.loc[difficult_mask, 'group'] = '成母牛难孕牛'
-
-        # 标记正常成母牛为未孕牛（而不是按周期分）
+        # 其余正常成母牛为未孕牛（而不是按周期分）
         normal_mask = ~(pregnant_mask | ineligible_mask | difficult_mask)
-        mature_df.loc[normal_mask, 'group'] = '成母牛未孕牛'
+        mature_df['group'] = pd.Series(np.select(
+            [pregnant_mask, ineligible_mask, difficult_mask],
+            ['成母牛已孕牛', '成母牛暂不选配牛', '成母牛难孕牛'],
+            default='成母牛未孕牛'
+        ), index=mature_df.index, dtype=object)
         
         pregnant_count = pregnant_mask.sum()
         difficult_count = difficult_mask.sum()
@@ -800,8 +838,15 @@ class GroupManager:
             if progress_callback:
                 progress_callback.update_info(f"警告: {warning}")
         
-        # 跟踪已处理牛只，避免重复处理
-        processed_cows = set()
+        # 各策略组按排名切片分配配种方法（group 为分组数组，processed 标记已处理的牛）
+        groups = result_df['group'].to_numpy(dtype=object).copy()
+        processed = np.zeros(len(result_df), dtype=bool)
+        if 'services_time' in result_df.columns:
+            services = np.trunc(result_df['services_time'].fillna(0).to_numpy(dtype=np.float64)).astype(np.int64)
+        else:
+            services = np.zeros(len(result_df), dtype=np.int64)
+        heifer_rules = compile_strategy_rules(heifer_strategies)
+        mature_rules = compile_strategy_rules(mature_strategies)
         
         # 1. 处理后备牛各周期
         print("\n开始处理后备牛分组...")
@@ -809,12 +854,10 @@ class GroupManager:
             progress_callback.update_info("开始处理后备牛各周期分组...")
         
         # 找出所有后备牛周期组
-        heifer_cycle_groups = set()
-        for group in result_df['group']:
-            if pd.isna(group):
-                continue
-            if group.startswith('后备牛第') and not ('+性控' in group or '+非性控' in group):
-                heifer_cycle_groups.add(group)
+        heifer_cycle_groups = {
+            group for group in pd.unique(groups[pd.notna(groups)])
+            if group.startswith('后备牛第') and not ('+性控' in group or '+非性控' in group)
+        }
         
         if progress_callback:
             progress_callback.update_info(f"发现后备牛周期组: {sorted(heifer_cycle_groups)}")
@@ -823,11 +866,10 @@ class GroupManager:
         
         # 对每个周期组应用策略
         for cycle_group in sorted(heifer_cycle_groups):
-            cycle_df = result_df[result_df['group'] == cycle_group]
+            cycle_df = result_df[groups == cycle_group]
             
             # 确保该组有ranking列且可以排序
             if 'ranking' in cycle_df.columns and not cycle_df['ranking'].isna().all():
-                cycle_df = cycle_df.sort_values('ranking')
                 total_cows = len(cycle_df)
                 
                 if progress_callback:
@@ -835,25 +877,18 @@ class GroupManager:
                 
                 print(f"\n处理{cycle_group}，共{total_cows}头牛:")
                 
-                cumulative_ratio = 0
-                
-                # 遍历每个策略组（A/B/C）
-                for strategy_row in heifer_strategies:
-                    group = strategy_row['group']
-                    ratio = strategy_row['ratio']
-                    breeding_methods = strategy_row['breeding_methods']
-                    
-                    # 计算该组应该包含的牛的数量和范围
-                    start_idx = int(total_cows * cumulative_ratio / 100)
-                    end_idx = int(total_cows * (cumulative_ratio + ratio) / 100)
+                ranked = self._ranked_positions(result_df, groups == cycle_group)
+                for rule in heifer_rules:
+                    group = rule['group']
+                    ratio = rule['ratio']
+                    start_idx, end_idx = rule_slice(rule, total_cows)
                     count = end_idx - start_idx
-                    
+
                     if count <= 0:
                         info = f"  {group} 比例{ratio}% 计算结果为0头牛，跳过"
                         print(info)
                         if progress_callback:
                             progress_callback.update_info(info)
-                        cumulative_ratio += ratio
                         continue
                     
                     info = f"  {group}: 比例{ratio}%, 第{start_idx+1}-{end_idx}头, 共{count}头"
@@ -861,62 +896,15 @@ class GroupManager:
                     if progress_callback:
                         progress_callback.update_info(info)
                     
-                    # 获取该组的牛
-                    group_df = cycle_df.iloc[start_idx:end_idx]
-                    
-                    # 对每头牛应用配种策略
-                    sexed_count = 0
-                    non_sexed_count = 0
-                    beef_count = 0
-                    
-                    for idx, row in group_df.iterrows():
-                        # 获取该牛的配种次数，如果为空则默认为0（未配种）
-                        services = row.get('services_time', 0)
-                        if pd.isna(services):
-                            services = 0
-                        services = int(services)
-                        
-                        # 获取对应的配种方法（根据已配种次数确定下次使用什么）
-                        # services=0表示还没配过，下次是第1次，对应索引0
-                        # services=1表示已配1次，下次是第2次，对应索引1
-                        method_idx = min(services, len(breeding_methods) - 1)
-                        method = breeding_methods[method_idx]
-                        
-                        # 判断配种类型
-                        if method in ["普通性控", "超级性控"]:
-                            breeding_type = "性控"
-                        else:
-                            breeding_type = "非性控"
-                        
-                        # 检查该牛的所有配种方法中是否有肉牛冻精
-                        has_beef = "肉牛冻精" in breeding_methods
-                        
-                        # 如果有肉牛冻精，添加肉牛标记
-                        if has_beef:
-                            breeding_type += "（肉牛）"
-                        
-                        # 更新分组信息
-                        new_group = f"{cycle_group}+{breeding_type}"
-                        result_df.loc[idx, 'group'] = new_group
-                        processed_cows.add(idx)
-                        
-                        if "性控（肉牛）" in breeding_type:
-                            sexed_count += 1
-                            beef_count += 1
-                        elif "性控" in breeding_type:
-                            sexed_count += 1
-                        elif "非性控（肉牛）" in breeding_type:
-                            beef_count += 1
-                            non_sexed_count += 1
-                        else:
-                            non_sexed_count += 1
+                    positions = ranked[start_idx:end_idx]
+                    sexed_count, non_sexed_count, beef_count = self._assign_breeding_types(
+                        groups, processed, positions, services, rule, f"{cycle_group}+"
+                    )
                     
                     summary = f"    {group} 完成: 性控 {sexed_count} 头, 非性控 {non_sexed_count} 头, 肉牛 {beef_count} 头"
                     print(summary)
                     if progress_callback:
                         progress_callback.update_info(summary)
-                    
-                    cumulative_ratio += ratio
             else:
                 warning = f"警告: {cycle_group} 没有有效的ranking数据，跳过"
                 print(warning)
@@ -928,12 +916,11 @@ class GroupManager:
             progress_callback.update_info("开始处理成母牛未孕牛分组...")
         
         print("\n处理成母牛未孕牛...")
-        mature_mask = result_df['group'] == '成母牛未孕牛'
+        mature_mask = groups == '成母牛未孕牛'
         mature_df = result_df[mature_mask]
         
         if not mature_df.empty:
             if 'ranking' in mature_df.columns and not mature_df['ranking'].isna().all():
-                mature_df = mature_df.sort_values('ranking')
                 total_cows = len(mature_df)
                 
                 if progress_callback:
@@ -941,20 +928,15 @@ class GroupManager:
                 
                 print(f"成母牛未孕牛共{total_cows}头")
                 
-                cumulative_ratio = 0
-                
-                # 遍历每个策略组（A/B/C）
-                print(f"  开始应用 {len(mature_strategies)} 个成母牛策略...")
-                for strategy_row in mature_strategies:
-                    group = strategy_row['group']
-                    ratio = strategy_row['ratio']
-                    breeding_methods = strategy_row['breeding_methods']
+                ranked = self._ranked_positions(result_df, mature_mask)
+                print(f"  开始应用 {len(mature_rules)} 个成母牛策略...")
+                for rule in mature_rules:
+                    group = rule['group']
+                    ratio = rule['ratio']
                     
-                    print(f"    策略组 {group}: 比例 {ratio}%, 配种方法: {breeding_methods}")
+                    print(f"    策略组 {group}: 比例 {ratio}%, 配种方法: {rule['breeding_methods']}")
                     
-                    # 计算该组应该包含的牛的数量和范围
-                    start_idx = int(total_cows * cumulative_ratio / 100)
-                    end_idx = int(total_cows * (cumulative_ratio + ratio) / 100)
+                    start_idx, end_idx = rule_slice(rule, total_cows)
                     count = end_idx - start_idx
                     
                     if count <= 0:
@@ -962,7 +944,6 @@ class GroupManager:
                         print(info)
                         if progress_callback:
                             progress_callback.update_info(info)
-                        cumulative_ratio += ratio
                         continue
                     
                     info = f"处理 {group}: 比例{ratio}%, 第{start_idx+1}-{end_idx}头, 共{count}头"
@@ -970,62 +951,15 @@ class GroupManager:
                     if progress_callback:
                         progress_callback.update_info(info)
                     
-                    # 获取该组的牛
-                    group_df = mature_df.iloc[start_idx:end_idx]
-                    
-                    # 对每头牛应用配种策略
-                    sexed_count = 0
-                    non_sexed_count = 0
-                    beef_count = 0
-                    
-                    for idx, row in group_df.iterrows():
-                        # 获取该牛的配种次数，如果为空则默认为0（未配种）
-                        services = row.get('services_time', 0)
-                        if pd.isna(services):
-                            services = 0
-                        services = int(services)
-                        
-                        # 获取对应的配种方法（根据已配种次数确定下次使用什么）
-                        # services=0表示还没配过，下次是第1次，对应索引0
-                        # services=1表示已配1次，下次是第2次，对应索引1
-                        method_idx = min(services, len(breeding_methods) - 1)
-                        method = breeding_methods[method_idx]
-                        
-                        # 判断配种类型
-                        if method in ["普通性控", "超级性控"]:
-                            breeding_type = "性控"
-                        else:
-                            breeding_type = "非性控"
-                        
-                        # 检查该牛的所有配种方法中是否有肉牛冻精
-                        has_beef = "肉牛冻精" in breeding_methods
-                        
-                        # 如果有肉牛冻精，添加肉牛标记
-                        if has_beef:
-                            breeding_type += "（肉牛）"
-                        
-                        # 更新分组信息
-                        new_group = f"成母牛未孕牛+{breeding_type}"
-                        result_df.loc[idx, 'group'] = new_group
-                        processed_cows.add(idx)
-                        
-                        if "性控（肉牛）" in breeding_type:
-                            sexed_count += 1
-                            beef_count += 1
-                        elif "性控" in breeding_type:
-                            sexed_count += 1
-                        elif "非性控（肉牛）" in breeding_type:
-                            beef_count += 1
-                            non_sexed_count += 1
-                        else:
-                            non_sexed_count += 1
+                    positions = ranked[start_idx:end_idx]
+                    sexed_count, non_sexed_count, beef_count = self._assign_breeding_types(
+                        groups, processed, positions, services, rule, "成母牛未孕牛+"
+                    )
                     
                     summary = f"  {group} 完成: 性控 {sexed_count} 头, 非性控 {non_sexed_count} 头, 肉牛 {beef_count} 头"
                     print(summary)
                     if progress_callback:
                         progress_callback.update_info(summary)
-                    
-                    cumulative_ratio += ratio
             else:
                 warning = "警告：成母牛未孕牛没有ranking列，跳过"
                 print(warning)
@@ -1042,93 +976,48 @@ class GroupManager:
             progress_callback.update_info("处理已孕牛和难孕牛...")
         
         print("\n处理已孕牛和难孕牛...")
-        # 确保group列存在且处理NaN值
-        if 'group' in result_df.columns:
-            special_mask = result_df['group'].fillna('').str.contains(
-                '已孕牛|难孕牛|暂不选配牛', na=False
-            )
-            special_mask = special_mask & ~result_df.index.isin(processed_cows)
-            special_df = result_df[special_mask]
-            special_count = len(special_df)
-            
-            if progress_callback:
-                progress_callback.update_info(f"处理特殊牛只: {special_count} 头 (已孕牛和难孕牛)")
-            
-            # 统计各类型数量
-            beef_count = 0
-            regular_count = 0
-            
-            for idx, row in special_df.iterrows():
-                current_group = row['group']
-                if pd.notna(current_group) and not ('+性控' in current_group or '+非性控' in current_group):
-                    # 获取该牛的配种次数
-                    services = row.get('services_time', 0)
-                    if pd.isna(services):
-                        services = 0
-                    services = int(services)
-
-                    # 从策略表中查找对应的配种方法
-                    # 已孕牛和难孕牛通常使用最后一个配种方法（第4次+）
-                    breeding_method = None
-
-                    # 判断是后备牛还是成母牛
-                    if '后备牛' in current_group:
-                        # 查找后备牛策略（使用任意一个后备牛策略组，因为难孕牛和已孕牛的处理相同）
-                        for strategy_row in heifer_strategies:
-                            if strategy_row['breeding_methods']:
-                                # 使用最后一个配种方法（第4次+）
-                                breeding_method = strategy_row['breeding_methods'][-1]
-                                break
-                    else:  # 成母牛
-                        # 查找成母牛策略
-                        for strategy_row in mature_strategies:
-                            if strategy_row['breeding_methods']:
-                                # 使用最后一个配种方法（第4次+）
-                                breeding_method = strategy_row['breeding_methods'][-1]
-                                break
-
-                    # 根据配种方法决定分组
-                    if breeding_method == "肉牛冻精":
-                        result_df.loc[idx, 'group'] = f"{current_group}+非性控（肉牛）"
-                        beef_count += 1
-                    else:
-                        result_df.loc[idx, 'group'] = f"{current_group}+非性控"
-                        regular_count += 1
-
-                    processed_cows.add(idx)
-            
-            if special_count > 0:
-                summary = f"  已孕牛和难孕牛处理完成: 常规非性控 {regular_count} 头, 肉牛 {beef_count} 头"
-                print(summary)
-                if progress_callback:
-                    progress_callback.update_info(summary)
-        else:
-            warning = "警告：结果数据中没有group列"
-            print(warning)
+        group_text = pd.Series(groups, dtype=object).fillna('').astype(str)
+        marked = group_text.str.contains('[+]性控|[+]非性控', na=False).to_numpy()
+        special_mask = group_text.str.contains('已孕牛|难孕牛|暂不选配牛', na=False).to_numpy() & ~processed
+        special_count = int(special_mask.sum())
+        
+        if progress_callback:
+            progress_callback.update_info(f"处理特殊牛只: {special_count} 头 (已孕牛和难孕牛)")
+
+        # 已孕牛和难孕牛通常使用策略中最后一个配种方法（第4次+），后备牛和成母牛各取第一个有配种方法的策略组
+        heifer_method = next((row['breeding_methods'][-1] for row in heifer_strategies if row['breeding_methods']), None)
+        mature_method = next((row['breeding_methods'][-1] for row in mature_strategies if row['breeding_methods']), None)
+        special_mask &= ~marked
+        is_heifer = group_text.str.contains('后备牛', regex=False).to_numpy()
+        beef_mask = special_mask & np.where(is_heifer, heifer_method == BEEF_BREEDING_METHOD,
+                                            mature_method == BEEF_BREEDING_METHOD)
+        regular_mask = special_mask & ~beef_mask
+        groups[beef_mask] = group_text[beef_mask].to_numpy(dtype=object) + "+非性控（肉牛）"
+        groups[regular_mask] = group_text[regular_mask].to_numpy(dtype=object) + "+非性控"
+        processed |= special_mask
+        beef_count = int(beef_mask.sum())
+        regular_count = int(regular_mask.sum())
+        
+        if special_count > 0:
+            summary = f"  已孕牛和难孕牛处理完成: 常规非性控 {regular_count} 头, 肉牛 {beef_count} 头"
+            print(summary)
             if progress_callback:
-                progress_callback.update_info(warning)
+                progress_callback.update_info(summary)
         
         # 处理任何剩余未添加性控/非性控/肉牛标记的牛 - 默认使用非性控
-        if 'group' in result_df.columns:
-            # 确保安全地处理可能的NaN值
-            has_group_mask = result_df['group'].notna()
-            not_processed_mask = ~result_df.index.isin(processed_cows)
-            no_breeding_mark_mask = ~result_df['group'].fillna('').str.contains('[+]性控|[+]非性控', na=False)
+        remaining_mask = pd.notna(groups) & ~processed & ~marked
+        remaining_count = remaining_mask.sum()
 
-            remaining_mask = has_group_mask & not_processed_mask & no_breeding_mark_mask
-            remaining_count = remaining_mask.sum()
+        if remaining_count > 0:
+            if progress_callback:
+                progress_callback.update_info(f"处理剩余牛只: {remaining_count} 头 (默认非性控)")
 
-            if remaining_count > 0:
-                if progress_callback:
-                    progress_callback.update_info(f"处理剩余牛只: {remaining_count} 头 (默认非性控)")
+            groups[remaining_mask] = group_text[remaining_mask].to_numpy(dtype=object) + "+非性控"
+            processed |= remaining_mask
 
-                for idx in result_df[remaining_mask].index:
-                    current_group = result_df.loc[idx, 'group']
-                    if pd.notna(current_group):
-                        result_df.loc[idx, 'group'] = f"{current_group}+非性控"
-                        processed_cows.add(idx)
+        result_df['group'] = pd.Series(groups, index=result_df.index, dtype=object)
         
-        final_info = f"分组完成，共处理 {len(processed_cows)} 头牛"
+        final_info = f"分组完成，共处理 {int(processed.sum())} 头牛"
         print(final_info)
         if progress_callback:
             progress_callback.update_info(final_info)
@@ -1152,6 +1041,30 @@ class GroupManager:
         
         return result_df
 
+    @staticmethod
+    def _ranked_positions(result_df: pd.DataFrame, mask: np.ndarray) -> np.ndarray:
+        """mask 选中的牛按 ranking 从小到大排列的行位置（ranking为空的排在最后）"""
+        positions = np.flatnonzero(mask)
+        ranking = pd.Series(result_df['ranking'].to_numpy()[positions], index=positions)
+        return ranking.sort_values().index.to_numpy()
+
+    @staticmethod
+    def _assign_breeding_types(groups: np.ndarray, processed: np.ndarray, positions: np.ndarray,
+                               services: np.ndarray, rule: dict, prefix: str) -> Tuple[int, int, int]:
+        """
+        按已配种次数为一段牛分配配种类型（services=0 表示下次是第1次，对应第1个配种方法；超出时用最后一个）
+
+        Returns:
+            (性控头数, 非性控头数, 肉牛头数)
+        """
+        method_index = np.minimum(services[positions], len(rule['breeding_types']) - 1)
+        types = rule['breeding_types'][method_index]
+        groups[positions] = prefix + types
+        processed[positions] = True
+        sexed_count = int(rule['sexed'][method_index].sum())
+        beef_count = len(types) if rule['has_beef'] else 0
+        return sexed_count, len(types) - sexed_count, beef_count
+
     def apply_grouping(self, strategy_name: str) -> pd.DataFrame:
         """应用指定的分组策略"""
         # 加载策略
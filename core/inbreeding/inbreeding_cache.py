@@ -0,0 +1,253 @@
+# core/inbreeding/inbreeding_cache.py
+
+"""
+近交系数持久化缓存
+
+使用 SQLite（WAL 模式，多读单写）保存两类计算结果，供不同项目、不同进程共享：
+
+- animal_f: (系谱版本, 动物ID) -> 个体近交系数
+- pair_f:   (系谱版本, 公牛ID, 母牛ID) -> 潜在后代近交系数（即二者亲缘系数的一半）
+
+系谱版本由 PedigreeDatabase.bull_version 给出，系谱内容变化后旧版本的条目不再命中；项目相关个体
+（母牛等）的ID附带祖先摘要，个体系谱变化后只有该个体及其后代的条目不再命中。失效的条目
+按最近使用时间(LRU)逐步淘汰。缓存只是加速手段，读写出错时记录日志并按未命中处理。
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class InbreedingCache:
+    """基于SQLite的近交系数持久化缓存"""
+
+    DEFAULT_MAX_ANIMAL_ENTRIES = 2_000_000
+    DEFAULT_MAX_PAIR_ENTRIES = 2_000_000
+    # 命中时只刷新超过该时长未刷新的最近使用时间，避免读操作频繁写库
+    LRU_REFRESH_SECONDS = 3600
+    # 超出上限时淘汰到上限的该比例，避免每次写入都触发淘汰
+    EVICT_TO_RATIO = 0.9
+    # 单条SQL中IN列表的最大参数数
+    BATCH_SIZE = 500
+
+    def __init__(self, path: Path, max_animal_entries: int = DEFAULT_MAX_ANIMAL_ENTRIES,
+                 max_pair_entries: int = DEFAULT_MAX_PAIR_ENTRIES):
+        """
+        初始化缓存
+
+        Args:
+            path: 缓存数据库文件路径
+            max_animal_entries: 个体近交系数条目上限
+            max_pair_entries: 配对近交系数条目上限
+        """
+        self.path = Path(path)
+        self.max_entries = {'animal_f': max_animal_entries, 'pair_f': max_pair_entries}
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._init_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        """每个线程使用各自的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS animal_f (
+                    version TEXT NOT NULL,
+                    animal_id TEXT NOT NULL,
+                    f REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (version, animal_id)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pair_f (
+                    version TEXT NOT NULL,
+                    sire_id TEXT NOT NULL,
+                    dam_id TEXT NOT NULL,
+                    f REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (version, sire_id, dam_id)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_animal_f_last_used ON animal_f(last_used)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pair_f_last_used ON pair_f(last_used)")
+
+    def get_inbreeding_many(self, version: str, animal_ids: Iterable[str]) -> Dict[str, float]:
+        """
+        批量读取个体近交系数
+
+        Args:
+            version: 系谱版本
+            animal_ids: 动物ID
+
+        Returns:
+            Dict[str, float]: 命中的 {动物ID: 近交系数}
+        """
+        animal_ids = list(dict.fromkeys(animal_ids))
+        result = {}
+        stale = []
+        now = time.time()
+        try:
+            conn = self._connection()
+            for start in range(0, len(animal_ids), self.BATCH_SIZE):
+                batch = animal_ids[start:start + self.BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                rows = conn.execute(
+                    f"SELECT animal_id, f, last_used FROM animal_f WHERE version = ? AND animal_id IN ({placeholders})",
+                    [version, *batch]
+                ).fetchall()
+                for animal_id, f, last_used in rows:
+                    result[animal_id] = f
+                    if now - last_used > self.LRU_REFRESH_SECONDS:
+                        stale.append(animal_id)
+            if stale:
+                self._touch("UPDATE animal_f SET last_used = ? WHERE version = ? AND animal_id = ?",
+                            [(now, version, animal_id) for animal_id in stale])
+        except sqlite3.Error as e:
+            logger.warning(f"读取近交系数缓存失败: {e}")
+        return result
+
+    def set_inbreeding_many(self, version: str, values: Dict[str, float]):
+        """
+        批量写入个体近交系数
+
+        Args:
+            version: 系谱版本
+            values: {动物ID: 近交系数}
+        """
+        if not values:
+            return
+        now = time.time()
+        self._write(
+            'animal_f',
+            "INSERT OR REPLACE INTO animal_f (version, animal_id, f, last_used) VALUES (?, ?, ?, ?)",
+            [(version, animal_id, float(f), now) for animal_id, f in values.items()]
+        )
+
+    def get_offspring_inbreeding(self, version: str, sire_id: str,
+                                 dam_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        读取一头公牛在指定系谱版本下已缓存的配对结果
+
+        Args:
+            version: 系谱版本
+            sire_id: 公牛ID
+            dam_ids: 只读取这些母牛，None 表示全部
+
+        Returns:
+            Dict[str, float]: {母牛ID: 潜在后代近交系数}
+        """
+        result = {}
+        now = time.time()
+        try:
+            conn = self._connection()
+            if dam_ids is None:
+                rows = conn.execute(
+                    "SELECT dam_id, f, last_used FROM pair_f WHERE version = ? AND sire_id = ?",
+                    (version, sire_id)
+                ).fetchall()
+            else:
+                dam_ids = list(dict.fromkeys(dam_ids))
+                rows = []
+                for start in range(0, len(dam_ids), self.BATCH_SIZE):
+                    batch = dam_ids[start:start + self.BATCH_SIZE]
+                    placeholders = ','.join('?' * len(batch))
+                    rows.extend(conn.execute(
+                        f"SELECT dam_id, f, last_used FROM pair_f "
+                        f"WHERE version = ? AND sire_id = ? AND dam_id IN ({placeholders})",
+                        [version, sire_id, *batch]
+                    ).fetchall())
+            stale = []
+            for dam_id, f, last_used in rows:
+                result[dam_id] = f
+                if now - last_used > self.LRU_REFRESH_SECONDS:
+                    stale.append(dam_id)
+            if stale:
+                self._touch("UPDATE pair_f SET last_used = ? WHERE version = ? AND sire_id = ? AND dam_id = ?",
+                            [(now, version, sire_id, dam_id) for dam_id in stale])
+        except sqlite3.Error as e:
+            logger.warning(f"读取配对近交系数缓存失败: {e}")
+        return result
+
+    def set_offspring_inbreeding_many(self, version: str, rows: Iterable[Tuple[str, str, float]]):
+        """
+        批量写入配对结果
+
+        Args:
+            version: 系谱版本
+            rows: (公牛ID, 母牛ID, 潜在后代近交系数)
+        """
+        now = time.time()
+        records = [(version, sire_id, dam_id, float(f), now) for sire_id, dam_id, f in rows]
+        if not records:
+            return
+        self._write(
+            'pair_f',
+            "INSERT OR REPLACE INTO pair_f (version, sire_id, dam_id, f, last_used) VALUES (?, ?, ?, ?, ?)",
+            records
+        )
+
+    def _touch(self, sql: str, params: List[tuple]):
+        """刷新最近使用时间；其他进程正在写入时跳过，不阻塞读取"""
+        try:
+            conn = self._connection()
+            with self._write_lock, conn:
+                conn.executemany(sql, params)
+        except sqlite3.OperationalError as e:
+            logger.debug(f"刷新缓存使用时间跳过: {e}")
+
+    def _write(self, table: str, sql: str, records: List[tuple]):
+        try:
+            conn = self._connection()
+            with self._write_lock, conn:
+                conn.executemany(sql, records)
+                self._evict(conn, table)
+        except sqlite3.Error as e:
+            logger.warning(f"写入近交系数缓存失败: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, table: str):
+        """条目数超过上限时按最近使用时间淘汰（须在写事务内调用）"""
+        limit = self.max_entries[table]
+        count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if count <= limit:
+            return
+        excess = count - int(limit * self.EVICT_TO_RATIO)
+        conn.execute(
+            f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        logger.info(f"近交系数缓存 {table} 超出上限{limit}，淘汰{excess}条最久未使用的条目")
+
+    def clear(self):
+        """清空缓存"""
+        try:
+            conn = self._connection()
+            with self._write_lock, conn:
+                conn.execute("DELETE FROM animal_f")
+                conn.execute("DELETE FROM pair_f")
+        except sqlite3.Error as e:
+            logger.warning(f"清空近交系数缓存失败: {e}")
+
+
+def open_inbreeding_cache(path: Path) -> Optional[InbreedingCache]:
+    """打开缓存，失败（如目录不可写）时返回None，调用方按无缓存处理"""
+    try:
+        return InbreedingCache(path)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"无法打开近交系数缓存 {path}: {e}")
+        return None
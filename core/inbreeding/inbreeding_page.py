@@ -2570,43 +2570,21 @@ class InbreedingPage(QWidget):
                 print("没有有效的公牛ID")
                 return bull_genes, list(bull_ids)
                 
-            # 使用字符串拼接构建SQL查询
-            # 注意：这种方式可能存在SQL注入风险，但在这种特定场景下风险较低
-            bull_ids_str = "', '".join(valid_bull_ids)
-            
-            query = f"""
-                SELECT `BULL NAAB`, `BULL REG`,
-                    HH1, HH2, HH3, HH4, HH5, HH6,
-                    BLAD, Chondrodysplasia, Citrullinemia,
-                    DUMPS, `Factor XI`, CVM, Brachyspina,
-                    Mulefoot, `Cholesterol deficiency`, MW
-                FROM bull_library
-                WHERE `BULL NAAB` IN ('{bull_ids_str}')
-                OR `BULL REG` IN ('{bull_ids_str}')
-            """
-
             logging.info(f"要查询的公牛号: {valid_bull_ids}")
-            print(f"SQL查询: {query}")
 
-            # 执行查询
-            import sqlite3
-            conn = sqlite3.connect(LOCAL_DB_PATH)
-            conn.row_factory = sqlite3.Row  # 让结果可以像字典一样访问
-            cursor = conn.cursor()
-            print("开始执行SQL查询...")
-            cursor.execute(query)
-            result = cursor.fetchall()
+            # 按 BULL NAAB / BULL REG 从进程内公牛列式表取基因列
+            from core.data.bull_table import get_bull_table
+            print("开始查询公牛列式表...")
+            result = get_bull_table(LOCAL_DB_PATH).lookup(valid_bull_ids, self.defect_genes)
             print(f"查询完成，获取到{len(result)}条记录")
             logging.info(f"查询到的记录数: {len(result)}")
 
             # 处理查询结果
             found_bulls = set()
             print("开始处理查询结果...")
-            for i, row in enumerate(result):
+            for i, row_dict in enumerate(result):
                 if i < 5:  # 只打印前5行，避免日志过长
                     print(f"处理第{i+1}行数据")
-                # 转换Row对象为字典
-                row_dict = dict(row)
                 naab = row_dict.get('BULL NAAB')
                 reg = row_dict.get('BULL REG')
 
@@ -2640,16 +2618,11 @@ class InbreedingPage(QWidget):
             logging.info(f"找到基因信息的公牛数量: {len(found_bulls)}")
             logging.info(f"未找到基因信息的公牛数量: {len(missing_bulls)}")
 
-            # 关闭数据库连接
-            cursor.close()
-            conn.close()
-
             return bull_genes, missing_bulls
                 
         except Exception as e:
             print(f"查询公牛基因信息时发生错误: {e}")
             logging.error(f"查询公牛基因信息失败: {e}")
-            logging.error(f"SQL语句: {query}")
             return {}, list(bull_ids)
 
     def process_missing_bulls(self, missing_bulls: List[str], analysis_type: str, bull_sources: Dict[str, str] = None) -> None:
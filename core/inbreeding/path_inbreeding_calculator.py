@@ -15,6 +15,7 @@ import csv
 
 from core.inbreeding.inbreeding_calculator import InbreedingCalculator
 from core.data.update_manager import get_pedigree_db
+from core.inbreeding.tabular_inbreeding_calculator import get_tabular_inbreeding_calculator
 
 # 配置日志
 logging.basicConfig(
@@ -24,7 +25,12 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class PathInbreedingCalculator:
-    """使用通径法(Path Method)计算近交系数的计算器"""
+    """
+    使用通径法(Path Method)计算近交系数的计算器
+
+    通径法用于展示共同祖先贡献和具体通径；共同祖先自身的近交系数(F_A)
+    由表格法计算器(TabularInbreedingCalculator)提供，避免对每个祖先再做一次路径枚举。
+    """
     
     def __init__(self, max_generations: int = 6):
         """
@@ -34,6 +40,7 @@ class PathInbreedingCalculator:
             max_generations: 追溯的最大代数
         """
         self.pedigree_db = get_pedigree_db()
+        self.tabular_calculator = get_tabular_inbreeding_calculator()
         self.max_generations = max_generations
         self._inbreeding_cache = {}  # 缓存计算结果
         self._path_cache = {}  # 缓存路径结果
@@ -294,18 +301,8 @@ class PathInbreedingCalculator:
                     # 先计算路径贡献: (0.5)^(n₁+n₂)
                     path_contribution = 0.5 ** (sire_length + dam_length)
                     
-                    # 检查共同祖先是否有自身的近交系数
-                    ancestor_f = 0.0
-                    if ancestor_id in self._inbreeding_cache:
-                        ancestor_f, _, _ = self._inbreeding_cache[ancestor_id]
-                    elif ancestor_id in self.pedigree_db.pedigree:
-                        # 检查是否有GIB值
-                        ancestor_info = self.pedigree_db.pedigree[ancestor_id]
-                        if ancestor_info.get('gib') is not None:
-                            ancestor_f = ancestor_info['gib']
-                            # 确保GIB值是小数（有些系统可能存储为百分比）
-                            if ancestor_f > 1.0:
-                                ancestor_f = ancestor_f / 100.0
+                    # 共同祖先自身的近交系数（有GIB值时即为GIB值）
+                    ancestor_f = self.tabular_calculator.get_inbreeding(ancestor_id)
                     
                     # Wright's公式中的(1+F_A)部分
                     path_contribution *= (1 + ancestor_f)
@@ -769,7 +766,7 @@ class PathInbreedingCalculator:
                     sire_length = len(bull_path)
                     dam_length = len(cow_path)
                     path_length = sire_length + dam_length
-                    ancestor_inbreeding, _, _ = self.calculate_inbreeding_coefficient(ancestor)
+                    ancestor_inbreeding = self.tabular_calculator.get_inbreeding(ancestor)
                     path_coef = (0.5) ** (path_length + 1) * (1 + ancestor_inbreeding)
 
                     # 构建路径字符串（格式：公牛 ← 父系路径 ← 共同祖先 → 母系路径 → 母牛）
@@ -1,9 +1,11 @@
 # core/inbreeding/pedigree_database.py
 
+import hashlib
 import logging
 import sqlite3
 import pickle
 import os
+import uuid
 from pathlib import Path
 import pandas as pd
 import re
@@ -11,11 +13,22 @@ from typing import Dict, Set, List, Tuple, Optional
 # Removed sqlalchemy dependency - using sqlite3 directly
 import time
 
+import numpy as np
+
+from core.inbreeding.pedigree_store import PedigreeStore, PedigreeView, VirtualNodeSet, NaabRegMap
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class PedigreeDatabase:
     """系谱库管理类，负责构建和维护基于本地bull_library的系谱库"""
+
+    # 构建公牛系谱用到的bull_library列，行哈希也基于这些列计算
+    BULL_COLUMNS = ['BULL REG', 'SIRE REG', 'MGS REG', 'MMGS REG', 'GIB', 'BULL NAAB']
+    # 增量变更累计超过列式缓存记录数的该比例时改为全量重建（顺带压实缓存）
+    DELTA_REBUILD_RATIO = 0.05
+    # 保留的变更日志条数
+    CHANGE_LOG_SIZE = 32
     
     def __init__(self, db_path: Path, pedigree_cache_path: Optional[Path] = None):
         """
@@ -23,19 +36,65 @@ class PedigreeDatabase:
         
         Args:
             db_path: 本地bull_library.db的路径
-            pedigree_cache_path: 系谱库缓存文件路径，默认为db_path同目录下的pedigree_cache.pkl
+            pedigree_cache_path: 系谱库缓存文件路径，默认为db_path同目录下的pedigree_cache.pkl。
+                列式缓存保存在同目录的 <文件名>_store 目录中，pkl 仅用于读取旧版缓存
         """
         self.db_path = db_path
         self.pedigree_cache_path = pedigree_cache_path or db_path.parent / 'pedigree_cache.pkl'
+        self.pedigree_store_path = self.store_path_for(self.pedigree_cache_path)
         # Store the database path instead of engine
         self.db_connection = None
         
         # 系谱数据结构
         self.pedigree = {}  # 格式: {animal_id: {'sire': sire_id, 'dam': dam_id, 'type': type}}
         self.virtual_nodes = set()  # 跟踪虚拟节点
+        self.revision = 0  # 系谱结构变更计数，供表格法等派生结构判断是否需要重建
+        # 变更日志：[(变更前revision, 变更的动物ID集合)]，全量重建/重新加载不记日志
+        self.change_log: List[Tuple[int, frozenset]] = []
+
+        # 增量更新状态：列式缓存 + 公牛行哈希覆盖层（全量构建后为全部公牛的哈希）
+        self._store: Optional[PedigreeStore] = None
+        self._row_hash_overlay: Dict[str, int] = {}
+        # 相对于磁盘列式缓存的增量变更，保存在缓存目录的delta.pkl中
+        self._delta = self._empty_delta()
+
+        # 系谱内容版本，用于持久化计算缓存的键（见 bull_version / version）
+        self._base_token = uuid.uuid4().hex  # 列式缓存写入时生成的token；未落盘时为随机值
+        self._bull_digest = ""   # 公牛系谱增量变更摘要
+        self._merge_digest = ""  # 合并母牛系谱的内容摘要（逐次链接）
+        self.modified_bull_nodes: Set[str] = set()  # 被合并操作修改过的公牛系谱节点
         
         # NAAB到REG映射缓存
         self.naab_to_reg_map = {}
+
+    @staticmethod
+    def store_path_for(pedigree_cache_path: Path) -> Path:
+        """系谱缓存文件路径对应的列式缓存目录"""
+        return pedigree_cache_path.with_name(pedigree_cache_path.stem + '_store')
+
+    @property
+    def bull_version(self) -> str:
+        """公牛系谱（bull_library部分）的内容版本，跨进程、跨项目一致"""
+        return hashlib.sha1(f"{self._base_token}:{self._bull_digest}".encode('utf-8')).hexdigest()[:20]
+
+    @property
+    def version(self) -> str:
+        """当前完整系谱（含合并的母牛系谱）的内容版本"""
+        if not self._merge_digest:
+            return self.bull_version
+        return f"{self.bull_version}+{self._merge_digest[:20]}"
+
+    def _reset_version(self, base_token: Optional[str] = None):
+        self._base_token = base_token or uuid.uuid4().hex
+        self._bull_digest = self._delta_digest(self._delta)
+        self._merge_digest = ""
+        self.modified_bull_nodes = set()
+
+    @staticmethod
+    def _delta_digest(delta: Dict) -> str:
+        if not delta['row_hashes']:
+            return ""
+        return hashlib.sha1(repr(sorted(delta['row_hashes'].items())).encode('utf-8')).hexdigest()
         
     def build_pedigree(self, progress_callback=None) -> Dict:
         """
@@ -64,7 +123,7 @@ class PedigreeDatabase:
             # 保存系谱库
             if progress_callback:
                 progress_callback(90, "保存系谱库...")
-            self._save_pedigree_to_cache()
+            self._save_pedigree_to_cache(self._row_hash_overlay)
             
             if progress_callback:
                 progress_callback(100, "系谱库构建完成")
@@ -79,21 +138,37 @@ class PedigreeDatabase:
     def load_pedigree(self) -> Dict:
         """
         尝试从缓存加载系谱库
-        
+
+        优先以内存映射方式打开列式缓存，self.pedigree 为其上的字典视图；
+        只有旧版pkl缓存时读取后转换为列式缓存。
+
         Returns:
             Dict: 加载的系谱库，如果加载失败则返回空字典
         """
         try:
-            if not self.pedigree_cache_path.exists():
+            start_time = time.time()
+            if PedigreeStore.exists(self.pedigree_store_path):
+                store = PedigreeStore.load(self.pedigree_store_path, mmap=True)
+                self.pedigree = PedigreeView(store)
+                self.virtual_nodes = VirtualNodeSet(store)
+                self.naab_to_reg_map = NaabRegMap(store)
+                self._store = store
+                self._delta = self._load_delta()
+                self._apply_delta(self._delta)
+                self._row_hash_overlay = dict(self._delta['row_hashes'])
+                self._reset_version(store.meta.get('token') or str(store.meta.get('timestamp')))
+            elif self.pedigree_cache_path.exists():
+                with open(self.pedigree_cache_path, 'rb') as f:
+                    cached_data = pickle.load(f)
+                    self.pedigree = cached_data.get('pedigree', {})
+                    self.virtual_nodes = cached_data.get('virtual_nodes', set())
+                    self.naab_to_reg_map = cached_data.get('naab_to_reg_map', {})
+                logging.info("从旧版pkl缓存加载系谱库，转换为列式缓存")
+                self._save_pedigree_to_cache()
+            else:
                 logging.info("系谱缓存文件不存在")
                 return {}
-                
-            start_time = time.time()
-            with open(self.pedigree_cache_path, 'rb') as f:
-                cached_data = pickle.load(f)
-                self.pedigree = cached_data.get('pedigree', {})
-                self.virtual_nodes = cached_data.get('virtual_nodes', set())
-                self.naab_to_reg_map = cached_data.get('naab_to_reg_map', {})
+            self.revision += 1
                 
             logging.info(f"从缓存加载系谱库完成，包含{len(self.pedigree)}个动物，耗时{time.time()-start_time:.2f}秒")
             return self.pedigree
@@ -104,26 +179,271 @@ class PedigreeDatabase:
             self.virtual_nodes = set()
             return {}
     
-    def _save_pedigree_to_cache(self):
-        """将系谱库保存到缓存文件"""
+    def _save_pedigree_to_cache(self, row_hashes: Optional[Dict[str, int]] = None):
+        """
+        将系谱库保存为列式缓存（可内存映射的.npy文件）
+
+        Args:
+            row_hashes: 公牛源数据行哈希，提供时一并保存以支持增量更新
+        """
         try:
-            # 确保存在父目录
-            self.pedigree_cache_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # 准备缓存数据
-            cache_data = {
-                'pedigree': self.pedigree,
-                'virtual_nodes': self.virtual_nodes,
-                'naab_to_reg_map': self.naab_to_reg_map,
-                'timestamp': time.time()
-            }
-            
-            with open(self.pedigree_cache_path, 'wb') as f:
-                pickle.dump(cache_data, f)
+            store = PedigreeStore.from_pedigree(self.pedigree, self.virtual_nodes, self.naab_to_reg_map,
+                                                row_hashes)
+            meta = store.save(self.pedigree_store_path)
+            # 与从缓存加载后的状态一致：行哈希由列式缓存提供，覆盖层只记录增量变更
+            self._store = store
+            self._delta = self._empty_delta()
+            self._row_hash_overlay = {}
+            self._reset_version(meta['token'])
+
+            # 列式缓存写入成功后移除旧版pkl缓存
+            if self.pedigree_cache_path.exists():
+                self.pedigree_cache_path.unlink()
                 
-            logging.info(f"系谱库已保存到缓存文件: {self.pedigree_cache_path}")
+            logging.info(f"系谱库已保存到缓存目录: {self.pedigree_store_path}")
         except Exception as e:
             logging.error(f"保存系谱库到缓存失败: {e}")
+
+    @staticmethod
+    def _empty_delta() -> Dict:
+        return {'records': {}, 'deleted': set(), 'row_hashes': {}, 'naab': {}}
+
+    @property
+    def _delta_path(self) -> Path:
+        return self.pedigree_store_path / 'delta.pkl'
+
+    def _load_delta(self) -> Dict:
+        """读取列式缓存目录中的增量变更，不存在时返回空变更"""
+        if not self._delta_path.exists():
+            return self._empty_delta()
+        with open(self._delta_path, 'rb') as f:
+            delta = pickle.load(f)
+        logging.info(f"加载系谱增量变更: {len(delta['records'])}条记录，删除{len(delta['deleted'])}条")
+        return delta
+
+    def _save_delta(self):
+        """原子地写入增量变更（先写临时文件再替换）"""
+        tmp_path = self._delta_path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self._delta, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._delta_path)
+
+    def _apply_delta(self, delta: Dict):
+        """把增量变更应用到当前系谱（列式缓存视图的覆盖层）"""
+        for animal_id in delta['deleted']:
+            if animal_id in self.pedigree:
+                del self.pedigree[animal_id]
+            self.virtual_nodes.discard(animal_id)
+        for animal_id, info in delta['records'].items():
+            self.pedigree[animal_id] = dict(info)
+            if info.get('type') == 'virtual_cow':
+                self.virtual_nodes.add(animal_id)
+        for naab, reg in delta['naab'].items():
+            self.naab_to_reg_map[naab] = reg
+
+    def _record_changes(self, animal_ids):
+        """记录一次系谱变更并递增revision，供派生结构只处理受影响的个体"""
+        self.change_log.append((self.revision, frozenset(animal_ids)))
+        del self.change_log[:-self.CHANGE_LOG_SIZE]
+        self.revision += 1
+
+    def get_changes_since(self, revision: Optional[int]) -> Optional[Set[str]]:
+        """
+        获取自指定revision以来变更过的动物ID
+
+        Args:
+            revision: 派生结构构建时记录的revision
+
+        Returns:
+            Optional[Set[str]]: 变更的动物ID集合；期间发生过全量重建/重新加载或日志已被截断时返回None
+        """
+        if revision is None:
+            return None
+        entries = [ids for rev, ids in self.change_log if rev >= revision]
+        if len(entries) != self.revision - revision:
+            return None
+        changed = set()
+        for ids in entries:
+            changed.update(ids)
+        return changed
+
+    def _query_bull_rows(self) -> pd.DataFrame:
+        """
+        读取构建公牛系谱所需的bull_library列
+
+        字符串列去除首尾空白、空值统一为空字符串，按BULL REG去重（保留最后一条，与逐行写入字典一致），
+        并附加 row_hash 列（各列内容的64位哈希）供增量更新比对。
+        """
+        columns = ', '.join(f"`{col}`" for col in self.BULL_COLUMNS)
+        query = f"SELECT {columns} FROM bull_library WHERE `BULL REG` IS NOT NULL"
+        conn = sqlite3.connect(self.db_path)
+        try:
+            df = pd.read_sql(query, conn)
+        finally:
+            conn.close()
+
+        for col in ['BULL REG', 'SIRE REG', 'MGS REG', 'MMGS REG', 'BULL NAAB']:
+            df[col] = df[col].where(df[col].notna(), '').astype(str).str.strip()
+        df = df[df['BULL REG'] != ''].drop_duplicates('BULL REG', keep='last').reset_index(drop=True)
+        df['row_hash'] = pd.util.hash_pandas_object(
+            df[self.BULL_COLUMNS].astype(str), index=False
+        ).to_numpy(dtype=np.uint64)
+        return df
+
+    @staticmethod
+    def _parse_gib(raw_value, bull_reg: str) -> Optional[float]:
+        """解析GIB值（数据库中为百分比，可能带%），超出-30%到100%的值不使用"""
+        if raw_value is None or pd.isna(raw_value):
+            return None
+        try:
+            gib_str = str(raw_value).strip()
+            # 无论是否带百分号，数据库中的值都是百分比形式（如18.6代表18.6%），需要除以100转换为小数
+            gib_value = float(gib_str.rstrip('%')) / 100.0
+
+            # 验证值是否在合理范围内（允许负值，因为GIB可以是负的）
+            # 根据实际数据调整范围：允许-30%到100%
+            if gib_value < -0.3 or gib_value > 1:
+                logging.warning(f"公牛 {bull_reg} 的GIB值 {gib_str} (转换后: {gib_value:.4f}) 超出正常范围(-30%到100%)，将不使用此值")
+                return None
+            return gib_value
+        except (ValueError, TypeError) as e:
+            logging.warning(f"公牛 {bull_reg} 的GIB值 '{raw_value}' 无法转换为数值: {e}")
+            return None
+
+    @staticmethod
+    def _bull_records(bull_reg: str, sire_reg: str, mgs_reg: str, mmgs_reg: str,
+                      gib_value: Optional[float]) -> Dict[str, Dict]:
+        """生成一头公牛的系谱记录：公牛本身、虚拟母亲和虚拟外祖母"""
+        # 创建虚拟母亲和外祖母ID
+        virtual_dam_id = f"{bull_reg}_dam"
+        virtual_mgd_id = f"{bull_reg}_mgd"
+        return {
+            # 公牛本身，包含GIB值
+            bull_reg: {'sire': sire_reg, 'dam': virtual_dam_id, 'type': 'bull', 'gib': gib_value},
+            # 虚拟母亲（虚拟节点没有GIB值）
+            virtual_dam_id: {'sire': mgs_reg, 'dam': virtual_mgd_id, 'type': 'virtual_cow', 'gib': None},
+            # 虚拟外祖母
+            virtual_mgd_id: {'sire': mmgs_reg, 'dam': "", 'type': 'virtual_cow', 'gib': None},
+        }
+
+    def _stored_row_hashes(self, bull_regs: List[str]) -> np.ndarray:
+        """当前系谱中各公牛对应的源数据行哈希，未收录的为0"""
+        hashes = np.zeros(len(bull_regs), dtype=np.uint64)
+        if self._store is not None and self._store.row_hash is not None:
+            rows = self._store.rows_of(bull_regs)
+            found = rows >= 0
+            hashes[found] = self._store.row_hash[rows[found]]
+        if self._row_hash_overlay:
+            # 逐个查找覆盖层，保持uint64（经float转换会损坏64位哈希）
+            overlay = self._row_hash_overlay
+            hashes = np.fromiter((overlay.get(reg, h) for reg, h in zip(bull_regs, hashes.tolist())),
+                                 dtype=np.uint64, count=len(bull_regs))
+        return hashes
+
+    def _removed_bulls(self, bull_regs: List[str]) -> List[str]:
+        """已收录但不再出现在bull_library中的公牛"""
+        current = set(bull_regs)
+        removed = [reg for reg, h in self._row_hash_overlay.items() if h and reg not in current]
+        if self._store is not None and self._store.row_hash is not None:
+            present = np.zeros(len(self._store.ids), dtype=bool)
+            rows = self._store.rows_of(bull_regs)
+            present[rows[rows >= 0]] = True
+            for row in np.flatnonzero((self._store.row_hash != 0) & ~present).tolist():
+                reg = self._store.id_at(row)
+                if reg not in self._row_hash_overlay:
+                    removed.append(reg)
+        return removed
+
+    def update_bull_pedigree_incremental(self, progress_callback=None) -> bool:
+        """
+        按bull_library的行差异增量更新公牛系谱
+
+        以BULL REG为键比较源数据行哈希，只对新增、修改、删除的公牛重写系谱记录；变更写入缓存目录的
+        delta.pkl，不重写整个列式缓存，并记入变更日志，使表格法计算器只失效受影响个体及其后代。
+
+        Args:
+            progress_callback: 进度回调函数
+
+        Returns:
+            bool: 是否完成增量更新；缓存缺少行哈希或变更过多时返回False，应改为全量重建
+        """
+        try:
+            start_time = time.time()
+            has_baseline = (self._store.row_hash is not None) if self._store is not None \
+                else bool(self._row_hash_overlay)
+            if not has_baseline:
+                logging.info("系谱缓存缺少源数据行哈希，无法增量更新")
+                return False
+
+            if progress_callback:
+                progress_callback(20, "比对公牛数据变更...")
+            df = self._query_bull_rows()
+            bull_regs = df['BULL REG'].tolist()
+            new_hashes = df['row_hash'].to_numpy()
+            changed_rows = np.flatnonzero(new_hashes != self._stored_row_hashes(bull_regs))
+            removed = self._removed_bulls(bull_regs)
+
+            # 与公牛系谱规模（每头公牛3个节点）比较，不计入合并进来的母牛
+            pending = len(self._delta['records']) + len(self._delta['deleted']) + 3 * (len(changed_rows) + len(removed))
+            if pending > self.DELTA_REBUILD_RATIO * max(3 * len(bull_regs), 1):
+                logging.info(f"公牛数据变更较多（{len(changed_rows)}条修改/新增，{len(removed)}条删除），改为全量重建")
+                return False
+
+            if progress_callback:
+                progress_callback(50, f"应用{len(changed_rows)}条新增/修改、{len(removed)}条删除...")
+
+            changed_ids = set()
+            delta = self._delta
+            for row in df.iloc[changed_rows].itertuples(index=False):
+                bull_reg = row[0]
+                gib_value = self._parse_gib(row[4], bull_reg)
+                for animal_id, info in self._bull_records(bull_reg, row[1], row[2], row[3], gib_value).items():
+                    old = self.pedigree.get(animal_id)
+                    if old is None or old.get('sire') != info['sire'] or old.get('dam') != info['dam'] \
+                            or (old.get('gib') is None) != (info['gib'] is None) \
+                            or (info['gib'] is not None and abs(old['gib'] - info['gib']) > 1e-6):
+                        changed_ids.add(animal_id)
+                    self.pedigree[animal_id] = info
+                    if info['type'] == 'virtual_cow':
+                        self.virtual_nodes.add(animal_id)
+                    delta['records'][animal_id] = info
+                    delta['deleted'].discard(animal_id)
+                naab = row[5]
+                if naab:
+                    self.naab_to_reg_map[naab] = bull_reg
+                    delta['naab'][naab] = bull_reg
+
+            for bull_reg in removed:
+                for animal_id in (bull_reg, f"{bull_reg}_dam", f"{bull_reg}_mgd"):
+                    if animal_id in self.pedigree:
+                        del self.pedigree[animal_id]
+                        changed_ids.add(animal_id)
+                    self.virtual_nodes.discard(animal_id)
+                    delta['records'].pop(animal_id, None)
+                    delta['deleted'].add(animal_id)
+
+            row_hashes = dict(zip(df['BULL REG'].iloc[changed_rows].tolist(),
+                                  new_hashes[changed_rows].tolist()))
+            row_hashes.update((bull_reg, 0) for bull_reg in removed)
+            self._row_hash_overlay.update(row_hashes)
+            delta['row_hashes'].update(row_hashes)
+            self._bull_digest = self._delta_digest(delta)
+
+            if progress_callback:
+                progress_callback(80, "保存系谱增量变更...")
+            if len(changed_rows) or removed:
+                self._save_delta()
+            if changed_ids:
+                self._record_changes(changed_ids)
+
+            logging.info(f"系谱库增量更新完成：新增/修改{len(changed_rows)}头公牛，删除{len(removed)}头，"
+                         f"{len(changed_ids)}个系谱节点发生变化，耗时{time.time()-start_time:.2f}秒")
+            if progress_callback:
+                progress_callback(100, "系谱库增量更新完成")
+            return True
+        except Exception as e:
+            logging.error(f"系谱库增量更新失败: {e}")
+            return False
     
     def _load_naab_reg_mapping(self):
         """加载NAAB号到REG号的映射"""
@@ -198,18 +518,13 @@ class PedigreeDatabase:
             # 清空现有系谱
             self.pedigree = {}
             self.virtual_nodes = set()
+            self._store = None
+            self._delta = self._empty_delta()
+            self.change_log = []
+            self._reset_version()
             
-            # 查询所有公牛记录，增加GIB字段
-            query = """
-            SELECT `BULL REG`, `SIRE REG`, `MGS REG`, `MMGS REG`, `GIB` 
-            FROM bull_library 
-            WHERE `BULL REG` IS NOT NULL
-            """
-            
-            # Use sqlite3 directly
-            conn = sqlite3.connect(self.db_path)
-            df = pd.read_sql(query, conn)
-            conn.close()
+            # 查询所有公牛记录（含GIB字段和源数据行哈希）
+            df = self._query_bull_rows()
             
             total_bulls = len(df)
             logging.info(f"从数据库加载了{total_bulls}头公牛记录")
@@ -218,76 +533,22 @@ class PedigreeDatabase:
                 progress_callback(40, f"处理{total_bulls}头公牛...")
             
             # 处理每个公牛记录
-            for idx, row in df.iterrows():
-                bull_reg = str(row['BULL REG']).strip() if pd.notna(row['BULL REG']) else None
-                sire_reg = str(row['SIRE REG']).strip() if pd.notna(row['SIRE REG']) else None
-                mgs_reg = str(row['MGS REG']).strip() if pd.notna(row['MGS REG']) else None
-                mmgs_reg = str(row['MMGS REG']).strip() if pd.notna(row['MMGS REG']) else None
-                
-                # 处理GIB值（可能是百分比格式）
-                gib_value = None
-                if pd.notna(row['GIB']):
-                    try:
-                        gib_str = str(row['GIB']).strip()
-                        # 检查是否包含百分号
-                        if gib_str.endswith('%'):
-                            # 移除百分号并转换为浮点数
-                            gib_percentage = float(gib_str.rstrip('%'))
-                            # 已经是百分比形式，直接除以100
-                            gib_value = gib_percentage / 100.0
-                        else:
-                            # 没有百分号，数据库中的值是百分比形式（如18.6代表18.6%）
-                            gib_percentage = float(gib_str)
-                            # 始终将其视为百分比，需要除以100转换为小数
-                            gib_value = gib_percentage / 100.0
-                        
-                        # 验证值是否在合理范围内（允许负值，因为GIB可以是负的）
-                        # 根据实际数据调整范围：允许-30%到100%
-                        if gib_value < -0.3 or gib_value > 1:
-                            logging.warning(f"公牛 {bull_reg} 的GIB值 {gib_str} (转换后: {gib_value:.4f}) 超出正常范围(-30%到100%)，将不使用此值")
-                            gib_value = None
-                    except (ValueError, TypeError) as e:
-                        logging.warning(f"公牛 {bull_reg} 的GIB值 '{row['GIB']}' 无法转换为数值: {e}")
-                        gib_value = None
-                
-                if not bull_reg:
-                    continue
-                
-                # 创建虚拟母亲和外祖母ID
-                virtual_dam_id = f"{bull_reg}_dam"
-                virtual_mgd_id = f"{bull_reg}_mgd"
-                
-                # 添加公牛本身，增加gib字段
-                self.pedigree[bull_reg] = {
-                    'sire': sire_reg if sire_reg else "",
-                    'dam': virtual_dam_id,
-                    'type': 'bull',
-                    'gib': gib_value  # 添加GIB值
-                }
-                
-                # 添加虚拟母亲
-                self.pedigree[virtual_dam_id] = {
-                    'sire': mgs_reg if mgs_reg else "",
-                    'dam': virtual_mgd_id,
-                    'type': 'virtual_cow',
-                    'gib': None  # 虚拟节点没有GIB值
-                }
-                self.virtual_nodes.add(virtual_dam_id)
-                
-                # 添加虚拟外祖母
-                self.pedigree[virtual_mgd_id] = {
-                    'sire': mmgs_reg if mmgs_reg else "",
-                    'dam': "",
-                    'type': 'virtual_cow',
-                    'gib': None  # 虚拟节点没有GIB值
-                }
-                self.virtual_nodes.add(virtual_mgd_id)
+            rows = zip(df['BULL REG'].tolist(), df['SIRE REG'].tolist(), df['MGS REG'].tolist(),
+                       df['MMGS REG'].tolist(), df['GIB'].tolist())
+            for idx, (bull_reg, sire_reg, mgs_reg, mmgs_reg, gib_raw) in enumerate(rows):
+                gib_value = self._parse_gib(gib_raw, bull_reg)
+                records = self._bull_records(bull_reg, sire_reg, mgs_reg, mmgs_reg, gib_value)
+                self.pedigree.update(records)
+                self.virtual_nodes.update((f"{bull_reg}_dam", f"{bull_reg}_mgd"))
                 
                 # 更新进度
                 if progress_callback and idx % 1000 == 0:
                     progress = 40 + int((idx / total_bulls) * 40)
                     progress_callback(progress, f"已处理 {idx}/{total_bulls} 头公牛...")
             
+            # 全部公牛的行哈希随缓存保存，供下次增量更新比对
+            self._row_hash_overlay = dict(zip(df['BULL REG'].tolist(), df['row_hash'].tolist()))
+            self.revision += 1
             logging.info(f"系谱库构建完成，包含{len(self.pedigree)}个动物，其中{len(self.virtual_nodes)}个虚拟节点，耗时{time.time()-start_time:.2f}秒")
             
             if progress_callback:
@@ -617,32 +878,53 @@ class PedigreeDatabase:
                 'replaced_virtual': 0,  # 替换的虚拟节点
                 'preserved': 0     # 保留的现有节点
             }
+            changed_ids = set()
             
             # 遍历母牛系谱的每个动物
             for animal_id, info in cow_pedigree.items():
                 # 情况1：ID已存在于公牛系谱且不是虚拟节点
+                # 注意：列式缓存视图按需生成记录字典，修改后须整体写回
                 if animal_id in self.pedigree and animal_id not in self.virtual_nodes:
                     # 公牛数据优先，不修改
                     # 但如果原来没有GIB值而新数据有，则更新GIB
-                    if self.pedigree[animal_id].get('gib') is None and info.get('gib') is not None:
-                        self.pedigree[animal_id]['gib'] = info['gib']
+                    existing = self.pedigree[animal_id]
+                    if existing.get('gib') is None and info.get('gib') is not None:
+                        existing['gib'] = info['gib']
+                        self.pedigree[animal_id] = existing
+                        changed_ids.add(animal_id)
+                        self.modified_bull_nodes.add(animal_id)
                     stats['preserved'] += 1
                     continue
                     
                 # 情况2：ID是虚拟节点，用实际信息替换
                 elif animal_id in self.virtual_nodes:
                     # 更新父母信息和GIB值，但保留虚拟节点标记
-                    self.pedigree[animal_id]['sire'] = info['sire']
-                    self.pedigree[animal_id]['dam'] = info['dam']
+                    existing = self.pedigree[animal_id]
+                    existing['sire'] = info['sire']
+                    existing['dam'] = info['dam']
                     if info.get('gib') is not None:
-                        self.pedigree[animal_id]['gib'] = info['gib']
+                        existing['gib'] = info['gib']
+                    self.pedigree[animal_id] = existing
+                    changed_ids.add(animal_id)
+                    self.modified_bull_nodes.add(animal_id)
                     stats['replaced_virtual'] += 1
                     
                 # 情况3：全新的ID，直接添加
                 else:
                     self.pedigree[animal_id] = info
+                    changed_ids.add(animal_id)
                     stats['added'] += 1
             
+            if changed_ids:
+                records = sorted(
+                    (animal_id, self.pedigree[animal_id].get('sire'), self.pedigree[animal_id].get('dam'),
+                     self.pedigree[animal_id].get('gib'))
+                    for animal_id in changed_ids
+                )
+                self._merge_digest = hashlib.sha1(
+                    f"{self._merge_digest}:{records!r}".encode('utf-8')
+                ).hexdigest()
+            self._record_changes(changed_ids)
             logging.info(f"系谱合并完成，新增节点: {stats['added']}，替换虚拟节点: {stats['replaced_virtual']}，"
                         f"保留现有节点: {stats['preserved']}")
                         
@@ -715,7 +997,8 @@ def load_or_build_pedigree(db_path: Path, pedigree_cache_path: Optional[Path] =
             progress_callback(-1, f"加载或构建系谱库失败: {e}")
         raise
         
-def update_pedigree(db_path: Path, pedigree_cache_path: Optional[Path] = None, progress_callback=None):
+def update_pedigree(db_path: Path, pedigree_cache_path: Optional[Path] = None, progress_callback=None,
+                    incremental: bool = False, pedigree_db: Optional[PedigreeDatabase] = None):
     """
     强制更新系谱库
     
@@ -723,6 +1006,8 @@ def update_pedigree(db_path: Path, pedigree_cache_path: Optional[Path] = None, p
         db_path: 本地bull_library.db的路径
         pedigree_cache_path: 系谱库缓存文件路径
         progress_callback: 进度回调函数
+        incremental: 是否优先按bull_library行差异增量更新，无法增量时自动全量重建
+        pedigree_db: 增量更新时复用的已加载系谱库实例（其派生的计算缓存只失效受影响部分）
     
     Returns:
         PedigreeDatabase: 系谱库管理器实例
@@ -731,6 +1016,16 @@ def update_pedigree(db_path: Path, pedigree_cache_path: Optional[Path] = None, p
         if progress_callback:
             progress_callback(0, "初始化系谱库管理器...")
             
+        if incremental:
+            if pedigree_db is None:
+                pedigree_db = PedigreeDatabase(db_path, pedigree_cache_path)
+                pedigree_db.load_pedigree()
+            if progress_callback:
+                progress_callback(10, "开始增量更新系谱库...")
+            if pedigree_db.update_bull_pedigree_incremental(progress_callback):
+                return pedigree_db
+            logging.info("无法增量更新系谱库，改为全量重建")
+
         # 创建系谱库管理器
         pedigree_db = PedigreeDatabase(db_path, pedigree_cache_path)
         
@@ -746,4 +1041,4 @@ def update_pedigree(db_path: Path, pedigree_cache_path: Optional[Path] = None, p
         logging.error(f"更新系谱库失败: {e}")
         if progress_callback:
             progress_callback(-1, f"更新系谱库失败: {e}")
-        raise 
\ No newline at end of file
+        raise 
@@ -11,6 +11,8 @@ import numpy as np
 from functools import lru_cache
 import re
 
+from core.data.bull_library_access import lookup_bull
+
 # 定义Animal类型，用于类型提示
 class Animal(Dict[str, Any]):
     """表示一个动物的系谱信息"""
@@ -277,29 +279,17 @@ class PedigreeManager:
             return None
             
         try:
-            conn = sqlite3.connect(self.db_path)
-            query = """
-                SELECT `BULL NAAB` as naab, `BULL REG` as reg, 
-                       `SIRE REG` as sire_reg, `MGS REG` as mgs_reg,
-                       `MMGS REG` as mmgs_reg, GIB as gib
-                FROM bull_library 
-                WHERE `BULL NAAB` = ? OR `BULL REG` = ?
-            """
-            
-            result = pd.read_sql_query(query, conn, params=[bull_id, bull_id])
-            conn.close()
-            
-            if len(result) > 0:
-                info = result.iloc[0].to_dict()
+            info = lookup_bull(bull_id, ['SIRE REG', 'MGS REG', 'MMGS REG', 'GIB'], db_path=self.db_path)
+            if info:
                 return {
                     'id': bull_id,
                     'type': 'bull',
-                    'reg': info.get('reg'),
-                    'naab': info.get('naab'),
-                    'sire_reg': info.get('sire_reg'),
-                    'mgs_reg': info.get('mgs_reg'),
-                    'mmgs_reg': info.get('mmgs_reg'),
-                    'gib': info.get('gib')
+                    'reg': info.get('BULL REG'),
+                    'naab': info.get('BULL NAAB'),
+                    'sire_reg': info.get('SIRE REG'),
+                    'mgs_reg': info.get('MGS REG'),
+                    'mmgs_reg': info.get('MMGS REG'),
+                    'gib': info.get('GIB')
                 }
             return None
         except Exception as e:
@@ -0,0 +1,519 @@
+# core/inbreeding/pedigree_store.py
+
+"""
+列式系谱存储
+
+把 {animal_id: {'sire', 'dam', 'type', 'gib'}} 形式的系谱保存为一组可内存映射的 .npy 文件：
+
+- ids.npy:   ID表，按字节序排序的UTF-8字节串（行号即在ID表中的位置，二分查找定位）
+- sire.npy / dam.npy: int32 行号，-1 表示未知
+- type.npy:  uint8 类型编码，0 表示该ID只作为父母被引用、本身不在系谱中
+- gib.npy:   float32 GIB值，NaN 表示无
+- naab.npy / reg.npy: NAAB→REG 映射（按NAAB排序）
+- row_hash.npy（可选）: uint64 公牛在bull_library中源数据行的哈希，0 表示无；供增量更新比对
+
+冷启动时以 mmap 方式打开，几乎不复制数据；PedigreeView 等视图类在其上提供与原字典相同的接口，
+写入只进入内存覆盖层，不修改磁盘文件。
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from collections.abc import MutableMapping, MutableSet
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT_VERSION = 1
+# 并发写入时替换存储目录的最大尝试次数
+SAVE_REPLACE_ATTEMPTS = 20
+
+# 类型编码，下标即编码值
+TYPE_NAMES = ['', 'bull', 'virtual_cow', 'cow', 'unknown']
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES) if name}
+
+
+def _encode_ids(ids: Iterable[str]) -> np.ndarray:
+    """把ID编码为排序后的定长字节串数组"""
+    encoded = sorted({str(i).encode('utf-8') for i in ids})
+    if not encoded:
+        return np.array([], dtype='S1')
+    return np.array(encoded, dtype=f"S{max(len(e) for e in encoded) or 1}")
+
+
+def _lookup(keys: np.ndarray, key) -> int:
+    """在排序字节串数组中二分查找，未找到返回-1"""
+    if not isinstance(key, str) or not key or len(keys) == 0:
+        return -1
+    raw = key.encode('utf-8')
+    if len(raw) > keys.dtype.itemsize:
+        return -1
+    pos = int(np.searchsorted(keys, raw))
+    if pos < len(keys) and keys[pos] == raw:
+        return pos
+    return -1
+
+
+def _lookup_many(keys: np.ndarray, values: Iterable[str]) -> np.ndarray:
+    """批量二分查找，未找到的返回-1"""
+    values = [str(v).encode('utf-8') if v else b'' for v in values]
+    rows = np.full(len(values), -1, dtype=np.int64)
+    if not values or len(keys) == 0:
+        return rows
+    width = keys.dtype.itemsize
+    fits = np.array([0 < len(v) <= width for v in values], dtype=bool)
+    encoded = np.array(values, dtype=keys.dtype)
+    pos = np.minimum(np.searchsorted(keys, encoded), len(keys) - 1)
+    hit = fits & (keys[pos] == encoded)
+    rows[hit] = pos[hit]
+    return rows
+
+
+class PedigreeStore:
+    """系谱列式存储（只读数组集合）"""
+
+    FILES = ('ids', 'sire', 'dam', 'type', 'gib', 'naab', 'reg')
+    OPTIONAL_FILES = ('row_hash',)
+
+    def __init__(self, ids: np.ndarray, sire: np.ndarray, dam: np.ndarray, types: np.ndarray,
+                 gib: np.ndarray, naab: np.ndarray, reg: np.ndarray,
+                 row_hash: Optional[np.ndarray] = None):
+        self.ids = ids
+        self.sire = sire
+        self.dam = dam
+        self.types = types
+        self.gib = gib
+        self.naab = naab
+        self.reg = reg
+        self.row_hash = row_hash
+        self.meta: Dict = {}
+
+    @classmethod
+    def from_pedigree(cls, pedigree: Dict, virtual_nodes: Iterable[str] = (),
+                      naab_to_reg_map: Optional[Dict] = None,
+                      row_hashes: Optional[Dict[str, int]] = None) -> 'PedigreeStore':
+        """
+        由字典形式的系谱构建列式存储
+
+        Args:
+            pedigree: {animal_id: {'sire', 'dam', 'type', 'gib'}}
+            virtual_nodes: 虚拟节点ID集合（类型未标注时按virtual_cow编码）
+            naab_to_reg_map: NAAB到REG的映射
+            row_hashes: {公牛REG: 源数据行哈希}，为None时不保存行哈希
+        """
+        virtual_nodes = set(virtual_nodes)
+        referenced = set(pedigree.keys())
+        for info in pedigree.values():
+            if info.get('sire'):
+                referenced.add(info['sire'])
+            if info.get('dam'):
+                referenced.add(info['dam'])
+
+        ids = _encode_ids(referenced)
+        n = len(ids)
+        sire = np.full(n, -1, dtype=np.int32)
+        dam = np.full(n, -1, dtype=np.int32)
+        types = np.zeros(n, dtype=np.uint8)
+        gib = np.full(n, np.nan, dtype=np.float32)
+
+        def rows_of(values):
+            """批量定位ID行号，空值返回-1（所有非空ID都已在ID表中）"""
+            encoded = np.array([(v or '').encode('utf-8') for v in values], dtype=ids.dtype)
+            found = np.searchsorted(ids, encoded).astype(np.int32)
+            found[encoded == b''] = -1
+            return found
+
+        keys = list(pedigree.keys())
+        infos = [pedigree[k] for k in keys]
+        rows = rows_of(keys)
+        sire[rows] = rows_of([info.get('sire') for info in infos])
+        dam[rows] = rows_of([info.get('dam') for info in infos])
+
+        unknown = TYPE_CODES['unknown']
+        types[rows] = np.array([
+            TYPE_CODES.get(info.get('type') or ('virtual_cow' if key in virtual_nodes else 'unknown'), unknown)
+            for key, info in zip(keys, infos)
+        ], dtype=np.uint8)
+        gib[rows] = np.array([
+            np.nan if info.get('gib') is None else info['gib'] for info in infos
+        ], dtype=np.float32)
+
+        naab_to_reg_map = naab_to_reg_map or {}
+        naab = _encode_ids(naab_to_reg_map.keys())
+        reg_values = [naab_to_reg_map[k.decode('utf-8')].encode('utf-8') for k in naab.tolist()]
+        reg = np.array(reg_values, dtype=f"S{max((len(r) for r in reg_values), default=1) or 1}")
+
+        row_hash = None
+        if row_hashes is not None:
+            row_hash = np.zeros(n, dtype=np.uint64)
+            hashed = [k for k in row_hashes if k in pedigree]
+            row_hash[rows_of(hashed)] = np.array([row_hashes[k] for k in hashed], dtype=np.uint64)
+
+        return cls(ids, sire, dam, types, gib, naab, reg, row_hash)
+
+    def save(self, directory: Path) -> Dict:
+        """
+        原子地写入存储目录（先写临时目录再替换）
+
+        临时目录和被替换的旧目录名带随机后缀，多个进程同时写入时不会删除彼此的临时文件；
+        替换时目录被其他写入抢先放回则重试，最后完成替换的一次写入生效。
+
+        Returns:
+            Dict: 写入的元数据，其中 token 唯一标识本次写入的内容
+        """
+        directory = Path(directory)
+        token = uuid.uuid4().hex
+        tmp_dir = directory.with_name(f"{directory.name}.tmp-{token}")
+        old_dir = directory.with_name(f"{directory.name}.old-{token}")
+        tmp_dir.mkdir(parents=True)
+
+        arrays = {
+            'ids': self.ids, 'sire': self.sire, 'dam': self.dam, 'type': self.types,
+            'gib': self.gib, 'naab': self.naab, 'reg': self.reg,
+        }
+        if self.row_hash is not None:
+            arrays['row_hash'] = self.row_hash
+        for name, array in arrays.items():
+            np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(array))
+
+        meta = {
+            'version': STORE_FORMAT_VERSION,
+            'count': int((self.types > 0).sum()),
+            'timestamp': time.time(),
+            'token': token,
+        }
+        with open(tmp_dir / 'meta.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        for attempt in range(SAVE_REPLACE_ATTEMPTS):
+            shutil.rmtree(old_dir, ignore_errors=True)
+            try:
+                os.replace(directory, old_dir)
+            except FileNotFoundError:
+                pass  # 目录不存在或刚被其他写入移走
+            try:
+                os.replace(tmp_dir, directory)
+                break
+            except OSError:
+                # 其他写入抢先放入了新目录（os.replace 不能覆盖非空目录）
+                if attempt == SAVE_REPLACE_ATTEMPTS - 1:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    raise
+        shutil.rmtree(old_dir, ignore_errors=True)
+        self.meta = meta
+        return meta
+
+    @classmethod
+    def exists(cls, directory: Path) -> bool:
+        directory = Path(directory)
+        return (directory / 'meta.json').exists() and all(
+            (directory / f"{name}.npy").exists() for name in cls.FILES
+        )
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> 'PedigreeStore':
+        """
+        打开存储目录
+
+        Args:
+            directory: 存储目录
+            mmap: 是否以只读内存映射方式打开
+        """
+        directory = Path(directory)
+        with open(directory / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_FORMAT_VERSION:
+            raise ValueError(f"系谱存储格式版本不匹配: {meta.get('version')}")
+
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode=mode) for name in cls.FILES}
+        for name in cls.OPTIONAL_FILES:
+            path = directory / f"{name}.npy"
+            arrays[name] = np.load(path, mmap_mode=mode) if path.exists() else None
+        store = cls(arrays['ids'], arrays['sire'], arrays['dam'], arrays['type'],
+                    arrays['gib'], arrays['naab'], arrays['reg'], arrays['row_hash'])
+        store.meta = meta
+        return store
+
+    def row_of(self, animal_id) -> int:
+        """ID所在行号，不在ID表中返回-1"""
+        return _lookup(self.ids, animal_id)
+
+    def rows_of(self, animal_ids: Iterable[str]) -> np.ndarray:
+        """批量定位行号，不在ID表中的返回-1"""
+        return _lookup_many(self.ids, animal_ids)
+
+    def id_at(self, row: int) -> str:
+        return self.ids[row].decode('utf-8') if row >= 0 else ""
+
+    def info_at(self, row: int) -> Dict:
+        """按行号构建与原系谱字典相同格式的记录"""
+        gib = self.gib[row]
+        return {
+            'sire': self.id_at(int(self.sire[row])),
+            'dam': self.id_at(int(self.dam[row])),
+            'type': TYPE_NAMES[self.types[row]],
+            # float32 只有约7位有效数字，读出时截断多余的二进制尾数
+            'gib': None if np.isnan(gib) else round(float(gib), 7),
+        }
+
+
+class PedigreeView(MutableMapping):
+    """
+    列式存储上的系谱字典视图
+
+    读取时按需从数组构建记录字典；写入（新增或覆盖记录）进入内存覆盖层。
+    修改记录须整体写回：pedigree[animal_id] = info。
+    """
+
+    def __init__(self, store: PedigreeStore):
+        self._store = store
+        self._overlay: Dict[str, Dict] = {}
+        self._deleted = set()
+        self._stored_count = int((store.types > 0).sum())
+        self._extra_count = 0  # 覆盖层中不在存储内的新增记录数
+
+    def _stored_row(self, key) -> int:
+        row = self._store.row_of(key)
+        if row >= 0 and self._store.types[row] > 0 and key not in self._deleted:
+            return row
+        return -1
+
+    def __getitem__(self, key):
+        if key in self._overlay:
+            return self._overlay[key]
+        row = self._stored_row(key)
+        if row < 0:
+            raise KeyError(key)
+        return self._store.info_at(row)
+
+    def __setitem__(self, key, value):
+        if key not in self._overlay and self._stored_row(key) < 0:
+            self._extra_count += 1
+        self._deleted.discard(key)
+        self._overlay[key] = value
+
+    def __delitem__(self, key):
+        if key in self._overlay:
+            del self._overlay[key]
+            if self._stored_row(key) < 0:
+                self._extra_count -= 1
+                return
+        elif self._stored_row(key) < 0:
+            raise KeyError(key)
+        self._deleted.add(key)
+        self._stored_count -= 1
+
+    def __contains__(self, key):
+        return key in self._overlay or self._stored_row(key) >= 0
+
+    def __iter__(self):
+        types = self._store.types
+        for row in np.flatnonzero(types > 0).tolist():
+            key = self._store.id_at(row)
+            if key not in self._deleted:
+                yield key
+        for key in list(self._overlay):
+            if self._store.row_of(key) < 0 or types[self._store.row_of(key)] == 0:
+                yield key
+
+    def __len__(self):
+        return self._stored_count + self._extra_count
+
+    def to_integer_pedigree(self) -> 'IntegerPedigree':
+        """向量化转换为整数父母数组，存储中的记录在前、覆盖层新增的记录在后"""
+        store = self._store
+        overlay_keys = list(self._overlay)
+        overlay_rows = store.rows_of(overlay_keys)
+
+        # 存储中仍有效的记录：类型非0、未删除、未被覆盖层替换
+        live = store.types > 0
+        hidden = overlay_rows[overlay_rows >= 0]
+        live[hidden] = False
+        deleted_rows = store.rows_of(self._deleted)
+        live[deleted_rows[deleted_rows >= 0]] = False
+        base_rows = np.flatnonzero(live)
+
+        n_base = len(base_rows)
+        n = n_base + len(overlay_keys) + 1
+        row_to_index = np.zeros(len(store.ids), dtype=np.int64)
+        row_to_index[base_rows] = np.arange(1, n_base + 1)
+        overlay_index = {key: n_base + 1 + k for k, key in enumerate(overlay_keys)}
+        found = overlay_rows >= 0
+        row_to_index[overlay_rows[found]] = np.arange(n_base + 1, n)[found]
+
+        sire = np.zeros(n, dtype=np.int32)
+        dam = np.zeros(n, dtype=np.int32)
+        unresolved: Dict[str, List[int]] = {}
+        children = np.arange(1, n_base + 1)
+        for arr, parents in ((sire, store.sire[base_rows]), (dam, store.dam[base_rows])):
+            parents = np.asarray(parents, dtype=np.int64)
+            known = parents >= 0
+            mapped = np.where(known, row_to_index[np.maximum(parents, 0)], 0)
+            arr[1:n_base + 1] = mapped
+            for child, row in zip(children[known & (mapped == 0)].tolist(), parents[known & (mapped == 0)].tolist()):
+                unresolved.setdefault(store.id_at(row), []).append(child)
+
+        types = np.zeros(n, dtype=np.uint8)
+        types[1:n_base + 1] = store.types[base_rows]
+        gib = np.full(n, np.nan, dtype=np.float64)
+        # 与 info_at 一致：截断float32多余的二进制尾数
+        gib[1:n_base + 1] = np.round(np.asarray(store.gib[base_rows], dtype=np.float64), 7)
+
+        ids = [''] + [raw.decode('utf-8') for raw in store.ids[base_rows].tolist()] + overlay_keys
+        for key, i in overlay_index.items():
+            info = self._overlay[key]
+            for arr, field in ((sire, 'sire'), (dam, 'dam')):
+                parent = info.get(field)
+                if not parent:
+                    continue
+                p = overlay_index.get(parent)
+                if p is None:
+                    row = store.row_of(parent)
+                    p = int(row_to_index[row]) if row >= 0 else 0
+                arr[i] = p
+                if p == 0:
+                    unresolved.setdefault(parent, []).append(i)
+            types[i] = TYPE_CODES.get(info.get('type'), TYPE_CODES['unknown'])
+            if info.get('gib') is not None:
+                gib[i] = info['gib']
+
+        return IntegerPedigree(ids, sire, dam, types, gib, unresolved)
+
+
+class VirtualNodeSet(MutableSet):
+    """列式存储上的虚拟节点集合视图（类型为virtual_cow的记录）"""
+
+    def __init__(self, store: PedigreeStore):
+        self._store = store
+        self._added = set()
+        self._removed = set()
+
+    def _stored(self, key) -> bool:
+        row = self._store.row_of(key)
+        return row >= 0 and self._store.types[row] == TYPE_CODES['virtual_cow']
+
+    def __contains__(self, key):
+        if key in self._removed:
+            return False
+        return key in self._added or self._stored(key)
+
+    def __iter__(self):
+        rows = np.flatnonzero(self._store.types == TYPE_CODES['virtual_cow']).tolist()
+        for row in rows:
+            key = self._store.id_at(row)
+            if key not in self._removed:
+                yield key
+        for key in self._added:
+            if not self._stored(key):
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def add(self, key):
+        self._removed.discard(key)
+        if not self._stored(key):
+            self._added.add(key)
+
+    def discard(self, key):
+        self._added.discard(key)
+        if self._stored(key):
+            self._removed.add(key)
+
+
+class NaabRegMap(MutableMapping):
+    """列式存储上的NAAB→REG映射视图，新增映射进入内存覆盖层"""
+
+    def __init__(self, store: PedigreeStore):
+        self._store = store
+        self._overlay: Dict[str, str] = {}
+
+    def __getitem__(self, key):
+        if key in self._overlay:
+            return self._overlay[key]
+        row = _lookup(self._store.naab, key)
+        if row < 0:
+            raise KeyError(key)
+        return self._store.reg[row].decode('utf-8')
+
+    def __setitem__(self, key, value):
+        self._overlay[key] = value
+
+    def __delitem__(self, key):
+        del self._overlay[key]
+
+    def __contains__(self, key):
+        return key in self._overlay or _lookup(self._store.naab, key) >= 0
+
+    def __iter__(self):
+        for raw in self._store.naab.tolist():
+            key = raw.decode('utf-8')
+            if key not in self._overlay:
+                yield key
+        yield from list(self._overlay)
+
+    def __len__(self):
+        return len(self._store.naab) + sum(
+            1 for key in self._overlay if _lookup(self._store.naab, key) < 0
+        )
+
+
+class IntegerPedigree:
+    """
+    整数化的系谱：下标0为未知亲本占位，1..n 为系谱中的个体（顺序任意，不保证父母在前）
+
+    Attributes:
+        ids: 个体ID列表（下标0为空字符串）
+        sire / dam: 父母下标（int32），0 表示未知或不在系谱中
+        types: 类型编码（uint8，见 TYPE_NAMES）
+        gib: GIB值（float64），NaN 表示无
+        unresolved: 引用了系谱外父母的个体 {父母ID: [子代下标]}
+    """
+
+    def __init__(self, ids: List[str], sire: np.ndarray, dam: np.ndarray, types: np.ndarray,
+                 gib: np.ndarray, unresolved: Dict[str, List[int]]):
+        self.ids = ids
+        self.sire = sire
+        self.dam = dam
+        self.types = types
+        self.gib = gib
+        self.unresolved = unresolved
+
+
+def integer_pedigree(pedigree) -> IntegerPedigree:
+    """
+    把系谱（字典或PedigreeView）转换为整数父母数组
+
+    PedigreeView 直接在列式数组上向量化转换，只有覆盖层中的记录逐条处理。
+    """
+    if isinstance(pedigree, PedigreeView):
+        return pedigree.to_integer_pedigree()
+
+    keys = list(pedigree.keys())
+    index = {key: i + 1 for i, key in enumerate(keys)}
+    n = len(keys) + 1
+    sire = np.zeros(n, dtype=np.int32)
+    dam = np.zeros(n, dtype=np.int32)
+    types = np.zeros(n, dtype=np.uint8)
+    gib = np.full(n, np.nan, dtype=np.float64)
+    unresolved: Dict[str, List[int]] = {}
+    for i, key in enumerate(keys, start=1):
+        info = pedigree[key]
+        for arr, field in ((sire, 'sire'), (dam, 'dam')):
+            parent = info.get(field)
+            if parent:
+                p = index.get(parent, 0)
+                arr[i] = p
+                if p == 0:
+                    unresolved.setdefault(parent, []).append(i)
+        types[i] = TYPE_CODES.get(info.get('type'), TYPE_CODES['unknown'])
+        if info.get('gib') is not None:
+            gib[i] = info['gib']
+    return IntegerPedigree([''] + keys, sire, dam, types, gib, unresolved)
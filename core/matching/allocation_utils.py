@@ -3,7 +3,7 @@
 """
 
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -179,4 +179,146 @@ def adjust_allocation_for_constraints(
         if not allocated:
             unallocated_cows.append(cow_id)
     
-    return final_allocation, unallocated_cows
\ No newline at end of file
+    return final_allocation, unallocated_cows
+
+
+def solve_capacitated_assignment(
+    cow_index: np.ndarray,
+    bull_index: np.ndarray,
+    gains: np.ndarray,
+    capacities: np.ndarray,
+    n_cows: int,
+    max_iterations: int = None
+) -> Optional[np.ndarray]:
+    """
+    带容量约束的最优指派（运输问题）
+
+    每头母牛至多分配1头公牛，每头公牛至多分配 capacities 头母牛，使所选配对的总收益最大。
+    收益统一平移为不小于收益极差+1的正数，使多分配一头母牛优先于提高已分配母牛的收益。
+
+    公牛数远少于母牛数，因此在公牛（加一个"未分配"节点）之间的剩余网络上做负环消去：
+    从贪心解出发，节点 j→k 的边权为 j 中任一母牛改配到 k 的最小收益损失（j 有空余配额时
+    也可以把空位移给 k，损失为0），反复用 Bellman-Ford 找负环并沿环移动母牛，没有负环时即为最优解。
+
+    Args:
+        cow_index: 每个候选配对的母牛序号（0..n_cows-1）
+        bull_index: 每个候选配对的公牛序号（0..len(capacities)-1）
+        gains: 每个候选配对的收益（后代得分）
+        capacities: 每头公牛可分配的母牛数
+        n_cows: 母牛数
+        max_iterations: 最多消去的负环数，默认为 10×母牛数
+
+    Returns:
+        每个候选配对是否选中（bool数组）；超过迭代次数时返回None
+    """
+    gains = np.asarray(gains, dtype=np.float64)
+    cow_index = np.asarray(cow_index, dtype=np.int64)
+    bull_index = np.asarray(bull_index, dtype=np.int64)
+    if len(gains) == 0:
+        return np.zeros(0, dtype=bool)
+
+    n_bulls = len(capacities)
+    unassigned = n_bulls  # "未分配"节点，容量不限，收益为0
+    n_nodes = n_bulls + 1
+    tolerance = 1e-9
+    if max_iterations is None:
+        max_iterations = 10 * n_cows
+
+    spread = float(gains.max() - gains.min())
+    values = np.full((n_cows, n_nodes), -np.inf)
+    values[cow_index, bull_index] = gains - gains.min() + spread + 1.0
+    values[:, unassigned] = 0.0
+    pair_ids = np.full((n_cows, n_bulls), -1, dtype=np.int64)
+    pair_ids[cow_index, bull_index] = np.arange(len(gains))
+
+    spare = np.asarray(capacities, dtype=np.int64).copy()
+    placement = np.full(n_cows, unassigned, dtype=np.int64)
+
+    # 初始解：收益高的母牛先选，取仍有空余配额的最佳公牛
+    preferences = np.argsort(-values[:, :n_bulls], axis=1, kind='stable')
+    for cow in np.argsort(-values[:, :n_bulls].max(axis=1), kind='stable'):
+        for bull in preferences[cow]:
+            if values[cow, bull] == -np.inf:
+                break
+            if spare[bull] > 0:
+                spare[bull] -= 1
+                placement[cow] = bull
+                break
+
+    def has_spare(node):
+        return node == unassigned or spare[node] > 0
+
+    def edge_costs(node):
+        """node 中任一母牛（或空位）改配到各节点的最小收益损失"""
+        cows = np.flatnonzero(placement == node)
+        costs = np.full(n_nodes, np.inf)
+        if len(cows):
+            costs = (values[cows, node][:, None] - values[cows]).min(axis=0)
+        if has_spare(node):
+            costs = np.minimum(costs, 0.0)
+        costs[node] = np.inf
+        return costs
+
+    costs = np.array([edge_costs(node) for node in range(n_nodes)])
+
+    for _ in range(max_iterations):
+        # Bellman-Ford（虚拟源点到各节点距离为0），第 n_nodes 轮仍能松弛说明存在负环
+        distance = np.zeros(n_nodes)
+        predecessor = np.full(n_nodes, -1, dtype=np.int64)
+        relaxed = np.zeros(n_nodes, dtype=bool)
+        for _ in range(n_nodes):
+            candidates = distance[:, None] + costs
+            best = candidates.argmin(axis=0)
+            best_distance = candidates[best, np.arange(n_nodes)]
+            relaxed = best_distance < distance - tolerance
+            if not relaxed.any():
+                break
+            distance[relaxed] = best_distance[relaxed]
+            predecessor[relaxed] = best[relaxed]
+        if not relaxed.any():
+            break
+
+        # 沿前驱回溯进入负环
+        node = int(np.flatnonzero(relaxed)[0])
+        for _ in range(n_nodes):
+            node = int(predecessor[node])
+        cycle = [node]
+        previous = int(predecessor[node])
+        while previous != node:
+            cycle.append(previous)
+            previous = int(predecessor[previous])
+        cycle.reverse()
+        edges = list(zip(cycle, cycle[1:] + cycle[:1]))
+        if sum(costs[source, target] for source, target in edges) >= -tolerance:
+            break
+
+        # 先为每条边选出移动的母牛（或空位），再统一移动
+        moves = []
+        for source, target in edges:
+            cows = np.flatnonzero(placement == source)
+            cow, loss = None, np.inf
+            if len(cows):
+                losses = values[cows, source] - values[cows, target]
+                position = int(losses.argmin())
+                cow, loss = int(cows[position]), losses[position]
+            if has_spare(source) and loss >= 0.0:
+                cow = None
+            moves.append((source, target, cow))
+        for source, target, cow in moves:
+            if cow is not None:
+                placement[cow] = target
+            else:
+                if source != unassigned:
+                    spare[source] -= 1
+                if target != unassigned:
+                    spare[target] += 1
+        for node in set(cycle):
+            costs[node] = edge_costs(node)
+    else:
+        logger.warning(f"最优分配在 {max_iterations} 次迭代内未收敛")
+        return None
+
+    selected = np.zeros(len(gains), dtype=bool)
+    assigned = np.flatnonzero(placement != unassigned)
+    selected[pair_ids[assigned, placement[assigned]]] = True
+    return selected
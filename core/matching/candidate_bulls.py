@@ -0,0 +1,274 @@
+"""
+候选公牛集合
+
+推荐汇总原来把每头母牛的有效公牛列表写成 Python 字面量字符串（常规_valid_bulls / 性控_valid_bulls），
+分配时再对每头母牛、每种冻精类型 ast.literal_eval 一次，数千头母牛×数十头公牛时这一往返占了
+分配的大部分时间，也让推荐汇总xlsx变得很大。
+
+本模块按冻精类型以CSR结构保存按后代得分排序的候选公牛（每头母牛一段连续的公牛序号、后代得分、
+近交系数、隐性基因状态），从推荐生成一直传到分配和最终报告；项目目录下保存为压缩的 .npz，
+供界面上的分配读取。.npz 同时记录对应推荐汇总的行数和文件标识，推荐汇总重新生成或被修改后
+旧的候选公牛不再使用。
+"""
+
+import ast
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from core.data.dataset_io import file_signature
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_COLUMNS = ['cow_id', 'semen_type', 'rank', 'bull_id', 'offspring_score', 'inbreeding_coeff', 'gene_status']
+# 推荐汇总中旧格式的候选公牛列
+LEGACY_COLUMNS = {'常规': '常规_valid_bulls', '性控': '性控_valid_bulls'}
+# 项目中保存的候选公牛
+CANDIDATES_FILENAME = 'individual_mating_candidates.npz'
+
+
+class CandidateBulls:
+    """每头母牛、每种冻精类型按后代得分从高到低排列的有效候选公牛（CSR结构）"""
+
+    def __init__(self, cow_ids: Sequence[str] = ()):
+        """
+        Args:
+            cow_ids: 母牛号（行顺序）；同一母牛号出现多次时使用第一行
+        """
+        self.cow_ids = np.asarray([str(cow_id) for cow_id in cow_ids], dtype=object)
+        self._cow_rows: Dict[str, int] = {}
+        for row, cow_id in enumerate(self.cow_ids.tolist()):
+            self._cow_rows.setdefault(cow_id, row)
+        # 冻精类型 → {'bull_ids', 'offsets', 'bull_index', 'offspring_score', 'inbreeding_coeff', 'gene_code', 'gene_labels'}
+        self._parts: Dict[str, dict] = {}
+        # 从 .npz 读取时：保存时推荐汇总的行数和文件标识
+        self.summary_rows: Optional[int] = None
+        self.summary_signature: Optional[tuple] = None
+
+    def __len__(self) -> int:
+        return sum(len(part['bull_index']) for part in self._parts.values())
+
+    @property
+    def semen_types(self) -> List[str]:
+        return list(self._parts)
+
+    def add(self, semen_type: str, bull_ids: Sequence[str], counts: np.ndarray, bull_index: np.ndarray,
+            offspring_scores: np.ndarray, inbreeding_coeffs: np.ndarray,
+            gene_codes: np.ndarray = None, gene_labels: Sequence[str] = ('Safe',)):
+        """
+        添加一种冻精类型的候选公牛
+
+        Args:
+            semen_type: 冻精类型
+            bull_ids: 该类型的公牛号（bull_index 的取值范围）
+            counts: 每头母牛（按 cow_ids 的行顺序）的候选公牛数
+            bull_index: 按母牛顺序、每头母牛内按排名拼接的公牛序号
+            offspring_scores: 与 bull_index 对应的后代得分
+            inbreeding_coeffs: 与 bull_index 对应的近交系数
+            gene_codes: 与 bull_index 对应的隐性基因状态序号（默认全为0）
+            gene_labels: 隐性基因状态序号对应的文字
+        """
+        bull_index = np.asarray(bull_index, dtype=np.int32)
+        self._parts[semen_type] = {
+            'bull_ids': np.asarray([str(bull_id) for bull_id in bull_ids], dtype=object),
+            'offsets': np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]),
+            'bull_index': bull_index,
+            'offspring_score': np.asarray(offspring_scores, dtype=np.float64),
+            'inbreeding_coeff': np.asarray(inbreeding_coeffs, dtype=np.float64),
+            'gene_code': (np.zeros(len(bull_index), dtype=np.int8) if gene_codes is None
+                          else np.asarray(gene_codes, dtype=np.int8)),
+            'gene_labels': list(gene_labels),
+        }
+
+    @classmethod
+    def from_recommendations(cls, recommendations_df: pd.DataFrame) -> 'CandidateBulls':
+        """
+        从推荐汇总中旧格式的 *_valid_bulls 列（字面量字符串或列表）建立，用于早期生成的推荐文件
+        """
+        if recommendations_df is None or 'cow_id' not in recommendations_df.columns:
+            return cls()
+        candidates = cls(recommendations_df['cow_id'].astype(str).tolist())
+
+        for semen_type, legacy_column in LEGACY_COLUMNS.items():
+            if legacy_column not in recommendations_df.columns:
+                continue
+            bull_positions: Dict[str, int] = {}
+            gene_positions: Dict[str, int] = {}
+            counts, bull_index, scores, inbreeding, gene_codes = [], [], [], [], []
+            for value in recommendations_df[legacy_column]:
+                if isinstance(value, str):
+                    try:
+                        value = ast.literal_eval(value)
+                    except Exception:
+                        value = []
+                if not isinstance(value, (list, tuple)):
+                    value = []
+                counts.append(len(value))
+                for bull in value:
+                    bull_index.append(bull_positions.setdefault(str(bull['bull_id']), len(bull_positions)))
+                    scores.append(bull.get('offspring_score', 0))
+                    inbreeding.append(bull.get('inbreeding_coeff', 0))
+                    gene_codes.append(gene_positions.setdefault(bull.get('gene_status', 'Unknown'), len(gene_positions)))
+            candidates.add(semen_type, list(bull_positions), np.asarray(counts, dtype=np.int64), bull_index,
+                           scores, inbreeding, gene_codes, list(gene_positions))
+
+        if len(candidates):
+            logger.info(f"已从推荐汇总的旧格式列读取候选公牛: {len(candidates)}条")
+        return candidates
+
+    def _bounds(self, cow_id: str, semen_type: str):
+        part = self._parts.get(semen_type)
+        row = self._cow_rows.get(str(cow_id))
+        if part is None or row is None:
+            return None, 0, 0
+        return part, int(part['offsets'][row]), int(part['offsets'][row + 1])
+
+    def bulls(self, cow_id: str, semen_type: str) -> List[dict]:
+        """
+        母牛的候选公牛（按后代得分从高到低）
+
+        每次调用返回新的字典，调用方可以直接修改或排序。
+
+        Returns:
+            List[dict]: [{'bull_id', 'offspring_score', 'inbreeding_coeff', 'gene_status'}, ...]，没有候选时为空列表
+        """
+        part, start, stop = self._bounds(cow_id, semen_type)
+        if start == stop:
+            return []
+        labels = part['gene_labels']
+        return [
+            {
+                'bull_id': bull_id,
+                'offspring_score': offspring_score,
+                'inbreeding_coeff': inbreeding_coeff,
+                'gene_status': labels[gene_code],
+            }
+            for bull_id, offspring_score, inbreeding_coeff, gene_code in zip(
+                part['bull_ids'][part['bull_index'][start:stop]].tolist(),
+                part['offspring_score'][start:stop].tolist(),
+                part['inbreeding_coeff'][start:stop].tolist(),
+                part['gene_code'][start:stop].tolist(),
+            )
+        ]
+
+    def count(self, cow_id: str, semen_type: str) -> int:
+        """母牛的候选公牛数"""
+        _, start, stop = self._bounds(cow_id, semen_type)
+        return stop - start
+
+    def to_frame(self) -> pd.DataFrame:
+        """展开为长表（列为 CANDIDATE_COLUMNS），用于查看和导出"""
+        frames = []
+        for semen_type, part in self._parts.items():
+            counts = np.diff(part['offsets'])
+            rows = np.repeat(np.arange(len(counts)), counts)
+            frames.append(pd.DataFrame({
+                'cow_id': self.cow_ids[rows],
+                'semen_type': semen_type,
+                'rank': np.arange(len(rows)) - np.repeat(part['offsets'][:-1], counts) + 1,
+                'bull_id': part['bull_ids'][part['bull_index']],
+                'offspring_score': part['offspring_score'],
+                'inbreeding_coeff': part['inbreeding_coeff'],
+                'gene_status': np.asarray(part['gene_labels'], dtype=object)[part['gene_code']],
+            }))
+        if not frames:
+            return pd.DataFrame({column: pd.Series(dtype=object) for column in CANDIDATE_COLUMNS})
+        return pd.concat(frames, ignore_index=True)
+
+    def save(self, project_path: Union[str, Path], summary_path: Union[str, Path], summary_rows: int) -> bool:
+        """
+        保存到项目的 analysis_results（压缩的 .npz）
+
+        Args:
+            project_path: 项目路径
+            summary_path: 已写入的推荐汇总文件（记录其文件标识）
+            summary_rows: 推荐汇总的行数
+        """
+        path = Path(project_path) / "analysis_results" / CANDIDATES_FILENAME
+        signature = file_signature(summary_path)
+        if signature is None:
+            logger.warning(f"推荐汇总不存在，不保存候选公牛: {summary_path}")
+            return False
+        arrays = {
+            'cow_ids': np.asarray(self.cow_ids.tolist(), dtype=str),
+            'semen_types': np.asarray(self.semen_types, dtype=str),
+            'summary_rows': np.int64(summary_rows),
+            'summary_signature': np.asarray(signature, dtype=np.int64),
+        }
+        for k, part in enumerate(self._parts.values()):
+            arrays[f'{k}_bull_ids'] = np.asarray(part['bull_ids'].tolist(), dtype=str)
+            arrays[f'{k}_gene_labels'] = np.asarray(part['gene_labels'], dtype=str)
+            for name in ('offsets', 'bull_index', 'offspring_score', 'inbreeding_coeff', 'gene_code'):
+                arrays[f'{k}_{name}'] = part[name]
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(path.stem + '.tmp.npz')
+            np.savez_compressed(temp_path, **arrays)
+            temp_path.replace(path)
+            return True
+        except Exception as e:
+            logger.warning(f"保存候选公牛失败: {e}")
+            return False
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'CandidateBulls':
+        """读取 save 保存的 .npz"""
+        with np.load(path, allow_pickle=False) as data:
+            candidates = cls(data['cow_ids'].tolist())
+            for k, semen_type in enumerate(data['semen_types'].tolist()):
+                offsets = data[f'{k}_offsets']
+                candidates.add(semen_type, data[f'{k}_bull_ids'].tolist(), np.diff(offsets),
+                               data[f'{k}_bull_index'], data[f'{k}_offspring_score'],
+                               data[f'{k}_inbreeding_coeff'], data[f'{k}_gene_code'],
+                               data[f'{k}_gene_labels'].tolist())
+            if 'summary_signature' in data:
+                candidates.summary_rows = int(data['summary_rows'])
+                candidates.summary_signature = tuple(int(value) for value in data['summary_signature'])
+        return candidates
+
+    def matches_summary(self, recommendations_df: pd.DataFrame = None, summary_path: Union[str, Path] = None) -> bool:
+        """是否与推荐汇总对应（行数、文件标识都与保存时一致；未提供的一项不比较）"""
+        if self.summary_signature is None:
+            return False
+        if recommendations_df is not None and len(recommendations_df) != self.summary_rows:
+            return False
+        return summary_path is None or file_signature(summary_path) == self.summary_signature
+
+
+def load_candidates(project_path: Union[str, Path],
+                    recommendations_df: pd.DataFrame = None,
+                    summary_path: Union[str, Path] = None) -> CandidateBulls:
+    """
+    读取推荐汇总对应的候选公牛
+
+    推荐汇总带有旧格式的 *_valid_bulls 列（早期版本或简化推荐生成的文件）时以这些列为准，
+    否则读取项目中保存的候选公牛；保存的候选公牛与推荐汇总不对应（以前生成的）时不使用。
+
+    Args:
+        project_path: 项目路径
+        recommendations_df: 推荐汇总
+        summary_path: 推荐汇总文件
+
+    Returns:
+        CandidateBulls
+    """
+    if recommendations_df is not None and any(column in recommendations_df.columns
+                                              for column in LEGACY_COLUMNS.values()):
+        return CandidateBulls.from_recommendations(recommendations_df)
+
+    path = Path(project_path) / "analysis_results" / CANDIDATES_FILENAME
+    if path.exists():
+        try:
+            candidates = CandidateBulls.load(path)
+        except Exception as e:
+            logger.warning(f"读取候选公牛失败: {e}")
+        else:
+            if candidates.matches_summary(recommendations_df, summary_path):
+                return candidates
+            logger.warning("保存的候选公牛与当前推荐汇总不对应（可能是以前生成的），请重新生成选配推荐")
+            return CandidateBulls()
+    logger.warning("未找到候选公牛数据")
+    return CandidateBulls()
@@ -13,6 +13,9 @@ from datetime import datetime
 from ..grouping.group_manager import GroupManager
 from .matrix_recommendation_generator import MatrixRecommendationGenerator
 from .cycle_based_matcher import CycleBasedMatcher
+from .candidate_bulls import CandidateBulls
+from core.data.dataset_io import write_dataset
+from core.data.project_data import get_project_data
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +31,8 @@ class CompleteMatingExecutor:
             project_path: 项目路径
         """
         self.project_path = Path(project_path)
+        # 项目数据上下文：分组、推荐矩阵、分配共用解析结果，每个文件只解析一次
+        self.project_data = get_project_data(self.project_path)
         
         # 缓存约束数据，避免重复I/O
         self.cached_inbreeding_df = None
@@ -49,6 +54,7 @@ class CompleteMatingExecutor:
                 skip_missing_bulls: bool = False,
                 selected_groups: Optional[List[str]] = None,
                 grouping_mode: Optional[str] = None,
+                allocation_solver: str = 'greedy',
                 progress_callback: Optional[callable] = None) -> Dict[str, Any]:
         """
         执行完整的个体选配流程
@@ -62,14 +68,16 @@ class CompleteMatingExecutor:
             skip_missing_bulls: 是否跳过缺失数据的公牛
             selected_groups: 用户选中的分组列表，如果为None则处理所有分组
             grouping_mode: 分组模式 ('manual' 或 'auto')
+            allocation_solver: 1选分配方式，'greedy'（按得分顺序贪心）或 'optimal'（总后代得分最大）
             progress_callback: 进度回调函数
 
         Returns:
-            结果字典，包含成功标志和最终报告路径
+            结果字典，包含成功标志、最终报告路径和推荐矩阵路径（xlsx，需要查看时用 export_matrices_excel 导出）
         """
         result = {
             'success': False,
             'report_path': None,
+            'matrix_path': None,
             'error': None
         }
         
@@ -113,7 +121,7 @@ class CompleteMatingExecutor:
             for strategy_file in possible_paths:
                 if strategy_file.exists():
                     try:
-                        strategy_df = pd.read_excel(strategy_file)
+                        strategy_df = self.project_data.read(strategy_file)
                         # 确保相关ID列保持为字符串格式（如果存在）
                         for col in ['cow_id', '母牛号', 'bull_id', '公牛号']:
                             if col in strategy_df.columns:
@@ -254,7 +262,7 @@ class CompleteMatingExecutor:
             if index_file.exists():
                 try:
                     # 读取原文件
-                    original_df = pd.read_excel(index_file)
+                    original_df = self.project_data.read(index_file)
                     # 确保cow_id保持为字符串格式（修复pandas读取时自动转换的问题）
                     if 'cow_id' in original_df.columns:
                         original_df['cow_id'] = original_df['cow_id'].astype(str)
@@ -273,7 +281,7 @@ class CompleteMatingExecutor:
                     if 'cow_id' in original_df.columns:
                         original_df['cow_id'] = original_df['cow_id'].astype(str)
                     # 保存回文件
-                    original_df.to_excel(index_file, index=False)
+                    write_dataset(original_df, index_file)
                     logger.info(f"已更新分组信息到: {index_file}")
                 except Exception as e:
                     logger.warning(f"更新分组文件失败: {e}")
@@ -312,8 +320,13 @@ class CompleteMatingExecutor:
             
             # 保存推荐矩阵
             matrix_path = self.project_path / "analysis_results" / "个体选配推荐矩阵.xlsx"
-            self.recommendation_generator.save_matrices(matrices, matrix_path)
-            logger.info(f"推荐矩阵已保存至: {matrix_path}")
+            # 数值矩阵保存为同名 .npz（需要查看时再导出xlsx）
+            if self.recommendation_generator.save_matrices(matrices, matrix_path):
+                result['matrix_path'] = matrix_path
+
+            # 候选公牛（每头母牛按后代得分排序的全部有效公牛），供分配和最终报告使用；
+            # 写完兼容格式的推荐汇总后再保存，记录其文件标识
+            candidates = self.recommendation_generator.candidates
             
             # 步骤4: 执行分配 (60%)
             if progress_callback:
@@ -322,12 +335,14 @@ class CompleteMatingExecutor:
             # 设置匹配器参数
             # 首先加载公牛数据
             bull_data_path = self.project_path / "standardized_data" / "processed_bull_data.xlsx"
-            if not self.matcher.load_data(recommendations_df, bull_data_path):
+            if not self.matcher.load_data(recommendations_df, bull_data_path, candidates):
                 logger.warning("使用备用方法设置匹配器数据")
                 self.matcher.recommendations_df = recommendations_df
+                self.matcher.candidates = candidates
                 self.matcher.bull_data = self.recommendation_generator.bull_data  # 使用推荐生成器的公牛数据
                 
             # 设置其他参数
+            self.matcher.solver = allocation_solver
             self.matcher.bull_inventory = bull_inventory.copy()
             self.matcher.inbreeding_threshold = inbreeding_threshold
             self.matcher.control_defect_genes = control_defect_genes
@@ -366,7 +381,8 @@ class CompleteMatingExecutor:
                 recommendations_df,
                 grouped_cows,
                 all_grouped_cows,  # 传递所有分组的母牛数据
-                selected_groups  # 传递选中的分组
+                selected_groups,  # 传递选中的分组
+                candidates
             )
             
             logger.info("===== 步骤5完成：最终报告统计 =====")
@@ -386,7 +402,7 @@ class CompleteMatingExecutor:
             # 如果已存在报告，读取现有数据并智能合并
             if report_path.exists():
                 try:
-                    existing_report = pd.read_excel(report_path)
+                    existing_report = self.project_data.read(report_path)
                     # 确保母牛号保持为字符串格式
                     if '母牛号' in existing_report.columns:
                         existing_report['母牛号'] = existing_report['母牛号'].astype(str)
@@ -454,6 +470,7 @@ class CompleteMatingExecutor:
             with pd.ExcelWriter(compat_path, engine='openpyxl') as writer:
                 final_report.to_excel(writer, index=False)
                 _force_text_columns(writer.sheets[list(writer.sheets.keys())[0]], final_report, id_cols_to_clean)
+            candidates.save(self.project_path, compat_path, len(final_report))
             
             if progress_callback:
                 progress_callback("选配完成！", 100)
@@ -473,10 +490,9 @@ class CompleteMatingExecutor:
         """预加载约束数据，避免重复I/O操作"""
         try:
             # 1. 加载近交系数及隐性基因分析结果
-            possible_files = list(self.project_path.glob("**/备选公牛_近交系数及隐性基因分析结果*.xlsx"))
-            if possible_files:
-                latest_file = max(possible_files, key=lambda x: x.stat().st_mtime)
-                self.cached_inbreeding_df = pd.read_excel(latest_file)
+            latest_file = self.project_data.latest("备选公牛_近交系数及隐性基因分析结果*.xlsx")
+            if latest_file is not None:
+                self.cached_inbreeding_df = self.project_data.read(latest_file)
                 # 确保母牛号和公牛号保持为字符串格式
                 if '母牛号' in self.cached_inbreeding_df.columns:
                     self.cached_inbreeding_df['母牛号'] = self.cached_inbreeding_df['母牛号'].astype(str)
@@ -490,7 +506,7 @@ class CompleteMatingExecutor:
             # 2. 加载公牛数据
             bull_file = self.project_path / "standardized_data" / "processed_bull_data.xlsx"
             if bull_file.exists():
-                self.cached_bull_data = pd.read_excel(bull_file)
+                self.cached_bull_data = self.project_data.read(bull_file)
                 # 确保bull_id保持为字符串格式
                 if 'bull_id' in self.cached_bull_data.columns:
                     self.cached_bull_data['bull_id'] = self.cached_bull_data['bull_id'].astype(str)
@@ -520,7 +536,8 @@ class CompleteMatingExecutor:
             self.cached_sexed_bulls = pd.DataFrame()
             self.cached_regular_bulls = pd.DataFrame()
 
-    def _generate_breeding_notes(self, cow_id: str, rec_info: pd.Series, semen_type: str, alloc_row: pd.Series = None) -> str:
+    def _generate_breeding_notes(self, cow_id: str, rec_info: pd.Series, semen_type: str, alloc_row: pd.Series = None,
+                                 candidates: CandidateBulls = None) -> str:
         """
         生成选配备注信息
         
@@ -529,17 +546,22 @@ class CompleteMatingExecutor:
             rec_info: 推荐信息行
             semen_type: 冻精类型 ('性控' 或 '常规')
             alloc_row: 分配结果行（可选）
+            candidates: 候选公牛（可选，有时按候选数判断缺少的推荐位置）
         
         Returns:
             备注字符串
         """
         # 检查推荐矩阵中的推荐情况
         rec_missing_positions = []
-        for i in range(1, 4):
-            rec_col = f'推荐{semen_type}冻精{i}选'
-            if rec_col in rec_info.index:
-                if pd.isna(rec_info[rec_col]) or not str(rec_info[rec_col]).strip():
-                    rec_missing_positions.append(i)
+        if candidates is not None:
+            candidate_count = candidates.count(cow_id, semen_type)
+            rec_missing_positions = [i for i in range(1, 4) if i > candidate_count]
+        else:
+            for i in range(1, 4):
+                rec_col = f'推荐{semen_type}冻精{i}选'
+                if rec_col in rec_info.index:
+                    if pd.isna(rec_info[rec_col]) or not str(rec_info[rec_col]).strip():
+                        rec_missing_positions.append(i)
         
         # 分析约束过滤情况
         return self._analyze_constraint_filtering(cow_id, semen_type, rec_missing_positions)
@@ -767,11 +789,12 @@ class CompleteMatingExecutor:
                               recommendations_df: pd.DataFrame,
                               grouped_cows: pd.DataFrame,
                               all_grouped_cows: pd.DataFrame = None,
-                              selected_groups: List[str] = None) -> pd.DataFrame:
+                              selected_groups: List[str] = None,
+                              candidates: CandidateBulls = None) -> pd.DataFrame:
         """
         生成最终的个体选配报告
 
-        按照指定的表头格式生成报告
+        按照指定的表头格式生成报告；提供 candidates 时备注中的缺少推荐按候选公牛数判断
         """
         logger.info(f"开始生成最终报告...")
         logger.info(f"  allocation_df 行数: {len(allocation_df)}")
@@ -817,8 +840,8 @@ class CompleteMatingExecutor:
                 group_value = str(group_value)
                 
             # 生成备注信息
-            sexed_note = self._generate_breeding_notes(cow_id, rec_info, '性控', alloc_row)
-            regular_note = self._generate_breeding_notes(cow_id, rec_info, '常规', alloc_row)
+            sexed_note = self._generate_breeding_notes(cow_id, rec_info, '性控', alloc_row, candidates)
+            regular_note = self._generate_breeding_notes(cow_id, rec_info, '常规', alloc_row, candidates)
 
             # 辅助函数：还原公牛号为原始格式
             def restore_bull_id(bull_id):
@@ -11,15 +11,31 @@ from typing import Dict, List, Tuple, Optional
 from collections import defaultdict
 import math
 
-from .allocation_utils import calculate_proportional_allocation, calculate_equal_allocation
+from .allocation_utils import (
+    calculate_proportional_allocation, calculate_equal_allocation, solve_capacitated_assignment
+)
+from .candidate_bulls import CandidateBulls
+from core.data.dataset_io import write_dataset
+from core.data.project_data import get_project_data
 
 logger = logging.getLogger(__name__)
 
 class CycleBasedMatcher:
     """基于周期的选配分配器"""
     
-    def __init__(self):
+    SOLVERS = ('greedy', 'optimal')
+
+    def __init__(self, solver: str = 'greedy'):
+        """
+        Args:
+            solver: 1选分配方式。'greedy' 按母牛得分顺序贪心分配；
+                'optimal' 把每个周期的1选作为运输问题求总后代得分最大的分配（求解失败时退回贪心）
+        """
+        if solver not in self.SOLVERS:
+            raise ValueError(f"未知的分配方式: {solver}")
+        self.solver = solver
         self.recommendations_df = None
+        self.candidates = None  # 候选公牛（CandidateBulls）
         self.bull_data = None
         self.bull_inventory = {}  # 公牛库存 {(bull_id, semen_type): remaining_count}
         self.bull_scores = {}  # 公牛得分 {bull_id: score}
@@ -27,17 +43,26 @@ class CycleBasedMatcher:
         self.inbreeding_threshold = 6.25  # 默认近交系数阈值
         self.control_defect_genes = True  # 默认控制隐性基因
         
-    def load_data(self, recommendations_df: pd.DataFrame, bull_data_path: Path) -> bool:
-        """加载数据"""
+    def load_data(self, recommendations_df: pd.DataFrame, bull_data_path: Path,
+                  candidates: Optional[CandidateBulls] = None) -> bool:
+        """
+        加载数据
+
+        Args:
+            recommendations_df: 推荐汇总
+            bull_data_path: 公牛数据文件
+            candidates: 候选公牛；为None时从推荐汇总的旧格式 *_valid_bulls 列建立
+        """
         try:
             self.recommendations_df = recommendations_df
+            self.candidates = candidates
             
             # 尝试加载母牛指数数据
             project_path = bull_data_path.parent.parent
             index_file = project_path / "analysis_results" / "processed_index_cow_index_scores.xlsx"
             if index_file.exists():
                 try:
-                    index_df = pd.read_excel(index_file)
+                    index_df = get_project_data(project_path).read(index_file)
                     # 确保cow_id保持为字符串格式（修复pandas读取时自动转换的问题）
                     if 'cow_id' in index_df.columns:
                         index_df['cow_id'] = index_df['cow_id'].astype(str)
@@ -58,7 +83,7 @@ class CycleBasedMatcher:
             
             # 加载公牛数据
             if bull_data_path.exists():
-                self.bull_data = pd.read_excel(bull_data_path)
+                self.bull_data = get_project_data(project_path).read(bull_data_path)
                 # 确保bull_id保持为字符串格式
                 if 'bull_id' in self.bull_data.columns:
                     self.bull_data['bull_id'] = self.bull_data['bull_id'].astype(str)
@@ -67,7 +92,7 @@ class CycleBasedMatcher:
                 bull_index_file = project_path / "analysis_results" / "processed_index_bull_scores.xlsx"
                 if bull_index_file.exists():
                     try:
-                        bull_index_df = pd.read_excel(bull_index_file)
+                        bull_index_df = get_project_data(project_path).read(bull_index_file)
                         # 确保bull_id保持为字符串格式
                         if 'bull_id' in bull_index_df.columns:
                             bull_index_df['bull_id'] = bull_index_df['bull_id'].astype(str)
@@ -183,6 +208,9 @@ class CycleBasedMatcher:
             logger.error("recommendations_df 为 None")
             return pd.DataFrame()
 
+        if self.candidates is None:
+            self.candidates = CandidateBulls.from_recommendations(self.recommendations_df)
+
         logger.info(f"recommendations_df 类型: {type(self.recommendations_df)}")
         logger.info(f"recommendations_df 列: {list(self.recommendations_df.columns) if hasattr(self.recommendations_df, 'columns') else 'No columns'}")
 
@@ -336,8 +364,9 @@ class CycleBasedMatcher:
 
         total_cows = len(cycle_cows)
 
-        # 第一步：按比例分配1选
-        self._allocate_first_choice_proportional(cycle_name, cycle_cows, semen_type)
+        # 第一步：按比例分配1选（最优分配求解失败时退回贪心分配）
+        if not (self.solver == 'optimal' and self._allocate_first_choice_optimal(cycle_name, cycle_cows, semen_type)):
+            self._allocate_first_choice_proportional(cycle_name, cycle_cows, semen_type)
 
         # 第二步：为每头母牛处理递进分配
         for idx, (_, cow) in enumerate(cycle_cows.iterrows()):
@@ -347,26 +376,11 @@ class CycleBasedMatcher:
             # 记录进度
             if current_cow % 50 == 0 or current_cow == total_cows:
                 logger.info(f"{cycle_name} {semen_type}递进分配进度: ({current_cow}/{total_cows}头)")
-            valid_bulls_key = f'{semen_type}_valid_bulls'
-            
+
             # 获取有效公牛列表
-            valid_bulls_str = cow.get(valid_bulls_key, None)
-            if valid_bulls_str is None:
-                logger.debug(f"母牛 {cow_id} 没有 {semen_type} 有效公牛列表")
-                continue
-                
-            # 解析字符串形式的列表
-            valid_bulls = []
-            if isinstance(valid_bulls_str, str):
-                try:
-                    import ast
-                    valid_bulls = ast.literal_eval(valid_bulls_str)
-                except:
-                    valid_bulls = []
-            else:
-                valid_bulls = valid_bulls_str
-            
+            valid_bulls = self.candidates.bulls(cow_id, semen_type)
             if not valid_bulls:
+                logger.debug(f"母牛 {cow_id} 没有 {semen_type} 有效公牛列表")
                 continue
             
             # 计算每个公牛的后代得分并排序
@@ -462,20 +476,13 @@ class CycleBasedMatcher:
             # 记录进度
             if current_cow % 100 == 0 or current_cow == total_cows:
                 logger.info(f"{cycle_name} {semen_type}第1选准备: ({current_cow}/{total_cows}头)")
-            valid_bulls_key = f'{semen_type}_valid_bulls'
-            
-            valid_bulls = cow.get(valid_bulls_key, None)
-            if valid_bulls is not None:
-                # 如果是字符串，尝试解析
-                if isinstance(valid_bulls, str):
-                    try:
-                        import ast
-                        valid_bulls = ast.literal_eval(valid_bulls)
-                    except:
-                        valid_bulls = []
+
+            # 所有有效公牛（不过滤配额，用于递进）
+            all_valid_bulls = self.candidates.bulls(cow_id, semen_type)
+            if all_valid_bulls:
                 # 只保留有库存和配额的公牛（使用复合键查询库存）
                 valid_bulls = [
-                    b for b in valid_bulls
+                    b for b in all_valid_bulls
                     if b['bull_id'] in bull_quotas and
                     bull_quotas[b['bull_id']] > 0 and
                     self.bull_inventory.get((b['bull_id'], semen_type), 0) > 0 and
@@ -495,29 +502,13 @@ class CycleBasedMatcher:
                     
                     # 按后代得分排序（高分优先）
                     valid_bulls.sort(key=lambda x: x.get('offspring_score', 0), reverse=True)
-                    
-                # 获取原始的所有有效公牛（不过滤配额）
-                all_valid_bulls_raw = cow.get(valid_bulls_key, None)
-                all_valid_bulls = []
-                if all_valid_bulls_raw is not None:
-                    if isinstance(all_valid_bulls_raw, str):
-                        try:
-                            import ast
-                            all_valid_bulls = ast.literal_eval(all_valid_bulls_raw)
-                        except:
-                            all_valid_bulls = []
-                    else:
-                        all_valid_bulls = all_valid_bulls_raw
-                    
-                if all_valid_bulls:
-                    candidates.append({
-                        'cow_id': cow_id,
-                        'cow_score': cow.get('Combine Index Score', 0),
-                        'valid_bulls': valid_bulls,  # 满足配额的公牛
-                        'all_valid_bulls': all_valid_bulls  # 所有有效公牛（用于递进）
-                    })
-                else:
-                    skipped_cows.append(cow_id)
+
+                candidates.append({
+                    'cow_id': cow_id,
+                    'cow_score': cow.get('Combine Index Score', 0),
+                    'valid_bulls': valid_bulls,  # 满足配额的公牛
+                    'all_valid_bulls': all_valid_bulls  # 所有有效公牛（用于递进）
+                })
             else:
                 skipped_cows.append(cow_id)
                     
@@ -563,6 +554,75 @@ class CycleBasedMatcher:
         actual_allocation = dict(used_quotas)
         logger.info(f"实际分配: {actual_allocation}")
         
+    def _allocate_first_choice_optimal(self, cycle_name: str, cycle_cows: pd.DataFrame, semen_type: str) -> bool:
+        """
+        分配1选（最优分配）
+
+        与按比例分配使用相同的配额（按库存比例）作为每头公牛的容量，近交系数阈值和隐性基因风险为硬约束，
+        求总后代得分最大的分配，结果与母牛的排列顺序无关。
+
+        Returns:
+            bool: 是否完成分配；False 时调用方退回按比例贪心分配
+        """
+        bull_inventories = {
+            bull_id: count for (bull_id, bull_semen_type), count in self.bull_inventory.items()
+            if count > 0 and bull_semen_type == semen_type
+        }
+        if not bull_inventories:
+            logger.warning(f"{cycle_name} 没有可用的{semen_type}公牛")
+            return True
+
+        total_cows = len(cycle_cows)
+        bull_quotas = calculate_proportional_allocation(bull_inventories, total_cows, ensure_minimum=True)
+        bull_ids = [bull_id for bull_id, quota in bull_quotas.items() if quota > 0]
+        bull_positions = {bull_id: j for j, bull_id in enumerate(bull_ids)}
+        logger.info(f"{cycle_name} {semen_type}1选（最优分配）：{total_cows} 头母牛，配额 {bull_quotas}")
+
+        # 候选配对（母牛序号、公牛序号、配对信息）
+        cow_ids = cycle_cows['cow_id'].astype(str).tolist()
+        if 'Combine Index Score' in cycle_cows.columns:
+            cow_scores = cycle_cows['Combine Index Score'].tolist()
+        else:
+            cow_scores = [0] * total_cows
+        pair_cows, pair_bulls, pair_info = [], [], []
+        for i, (cow_id, cow_score) in enumerate(zip(cow_ids, cow_scores)):
+            for bull in self.candidates.bulls(cow_id, semen_type):
+                j = bull_positions.get(bull['bull_id'])
+                if j is None or not self._meets_constraints(bull):
+                    continue
+                bull_score = self.bull_scores.get(bull['bull_id'], 0)
+                bull['offspring_score'] = 0.5 * (cow_score + bull_score)
+                bull['bull_score'] = bull_score
+                pair_cows.append(i)
+                pair_bulls.append(j)
+                pair_info.append(bull)
+
+        gains = np.array([bull['offspring_score'] for bull in pair_info], dtype=np.float64)
+        if not np.isfinite(gains).all():
+            logger.warning(f"{cycle_name} {semen_type}1选：后代得分含缺失值，改用按比例分配")
+            return False
+
+        selected = solve_capacitated_assignment(
+            np.array(pair_cows, dtype=np.int64), np.array(pair_bulls, dtype=np.int64), gains,
+            np.array([bull_quotas[bull_id] for bull_id in bull_ids]), total_cows
+        )
+        if selected is None:
+            logger.warning(f"{cycle_name} {semen_type}1选：最优分配求解失败，改用按比例分配")
+            return False
+
+        # 按母牛在周期中的顺序记录
+        used_quotas = defaultdict(int)
+        for k in sorted(np.flatnonzero(selected), key=lambda k: pair_cows[k]):
+            bull_info = pair_info[k]
+            self._record_allocation(cow_ids[pair_cows[k]], bull_info['bull_id'], semen_type, 1, bull_info)
+            used_quotas[bull_info['bull_id']] += 1
+
+        unallocated = total_cows - int(selected.sum())
+        if unallocated:
+            logger.warning(f"{cycle_name} {semen_type}1选: {unallocated}头母牛没有符合条件的公牛或配额不足")
+        logger.info(f"实际分配: {dict(used_quotas)}，总后代得分 {gains[selected].sum():.2f}")
+        return True
+
     def _allocate_second_third_choice(self, cycle_name: str, cycle_cows: pd.DataFrame,
                                      semen_type: str, choice_num: int):
         """分配2选或3选（平均分配给库存>0的公牛）"""
@@ -601,17 +661,8 @@ class CycleBasedMatcher:
             already_allocated = self._get_cow_allocations(cow_id, semen_type)
             
             # 获取该母牛的有效公牛列表
-            valid_bulls_key = f'{semen_type}_valid_bulls'
-            valid_bulls = cow.get(valid_bulls_key, None)
-            if valid_bulls is not None:
-                # 如果是字符串，尝试解析
-                if isinstance(valid_bulls, str):
-                    try:
-                        import ast
-                        valid_bulls = ast.literal_eval(valid_bulls)
-                    except:
-                        valid_bulls = []
-                
+            valid_bulls = self.candidates.bulls(cow_id, semen_type)
+            if valid_bulls:
                 # 计算每个公牛的后代得分
                 cow_score = cow.get('Combine Index Score', 0)
                 for bull in valid_bulls:
@@ -773,7 +824,7 @@ class CycleBasedMatcher:
     def save_allocation_result(self, result_df: pd.DataFrame, output_path: Path):
         """保存分配结果"""
         try:
-            result_df.to_excel(output_path, index=False)
+            write_dataset(result_df, output_path)
             logger.info(f"分配结果已保存至: {output_path}")
             return True
         except Exception as e:
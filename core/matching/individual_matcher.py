@@ -13,6 +13,7 @@ import logging
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Set
 from collections import defaultdict
+from core.data.dataset_io import read_dataset, write_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +37,7 @@ class IndividualMatcher:
             if not index_file.exists():
                 raise FileNotFoundError(f"未找到母牛指数文件: {index_file}")
             
-            self.cow_data = pd.read_excel(index_file)
+            self.cow_data = read_dataset(index_file)
             # 只处理在场的母牛
             self.cow_data = self.cow_data[
                 (self.cow_data['sex'] == '母') & 
@@ -48,14 +49,14 @@ class IndividualMatcher:
             if not bull_file.exists():
                 raise FileNotFoundError(f"未找到备选公牛文件: {bull_file}")
             
-            self.bull_data = pd.read_excel(bull_file)
+            self.bull_data = read_dataset(bull_file)
             
             # 加载选配报告数据
             report_file = project_path / "analysis_results" / "individual_mating_report.xlsx"
             if not report_file.exists():
                 raise FileNotFoundError(f"未找到选配报告文件: {report_file}")
             
-            self.selection_report = pd.read_excel(report_file)
+            self.selection_report = read_dataset(report_file)
             
             logger.info(f"数据加载完成: {len(self.cow_data)}头母牛, {len(self.bull_data)}头公牛")
             return True
@@ -311,7 +312,7 @@ class IndividualMatcher:
     def save_results(self, result_df: pd.DataFrame, output_path: Path):
         """保存选配结果"""
         try:
-            result_df.to_excel(output_path, index=False)
+            write_dataset(result_df, output_path)
             logger.info(f"选配结果已保存至: {output_path}")
             return True
         except Exception as e:
@@ -65,6 +65,7 @@ class MatingWorker(QThread):
                 skip_missing_bulls=self.params.get('skip_missing_bulls', False),
                 selected_groups=self.params.get('selected_groups', None),  # 传递选中的分组
                 grouping_mode=self.params.get('grouping_mode', None),  # 传递分组模式
+                allocation_solver=self.params.get('allocation_solver', 'greedy'),
                 progress_callback=progress_callback
             )
             
@@ -9,6 +9,9 @@ import logging
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import json
+from core.data.project_data import get_project_data
+from .candidate_bulls import CandidateBulls
+from .matrix_storage import container_path, save_matrix_container, write_matrices_excel
 
 logger = logging.getLogger(__name__)
 
@@ -24,11 +27,14 @@ class MatrixRecommendationGenerator:
         self.cow_data = None
         self.bull_data = None
         self.inbreeding_data = None
+        self.computed_inbreeding = {}  # 分析结果中缺失、由表格法补算的近交系数 {(cow_id, bull_id): F}
         self.genetic_defect_data = None
         self.cow_score_columns = []  # 存储找到的母牛得分列
         self.group_manager = None  # 分组管理器
         self.last_error = None  # 存储最后的错误信息
         self.skipped_bulls = []  # 存储被跳过的公牛
+        self.candidates = None  # 最近一次生成的候选公牛（CandidateBulls）
+        self._inbreeding_cache = {}  # 数值近交系数矩阵 {(母牛号元组, 公牛号元组): ndarray}
 
     @staticmethod
     def _is_valid_identifier(value) -> bool:
@@ -56,6 +62,42 @@ class MatrixRecommendationGenerator:
             values = frame[column].where(frame[column].notna(), '').astype(str).str.strip()
             mask |= values.eq(target)
         return mask
+
+    @classmethod
+    def _resolve_bull_id_column(cls, frame: pd.DataFrame) -> pd.Series:
+        """逐行选择可用的公牛号（_resolve_row_bull_id 的向量化版本），没有时为空字符串"""
+        result = pd.Series('', index=frame.index, dtype=object)
+        unresolved = pd.Series(True, index=frame.index)
+        for column in cls.BULL_ID_COLUMNS:
+            if column not in frame.columns:
+                continue
+            text = frame[column].astype(str).str.strip()
+            valid = frame[column].notna() & text.ne('') & ~text.str.lower().isin(['nan', 'none', 'null'])
+            take = unresolved & valid
+            result[take] = text[take]
+            unresolved &= ~valid
+        return result
+
+    @staticmethod
+    def _pair_matrix(pairs: pd.DataFrame, cow_ids: List[str], bull_ids: List[str], fill, dtype):
+        """
+        把 (cow_id, bull_id, value) 长表散布为 母牛×公牛 矩阵
+
+        Returns:
+            (matrix, found): 矩阵（没有记录的配对为 fill）与是否有记录的布尔矩阵
+        """
+        cow_index = pd.Index(pd.unique(np.asarray(cow_ids, dtype=object)))
+        bull_index = pd.Index(pd.unique(np.asarray(bull_ids, dtype=object)))
+        matrix = np.full((len(cow_index), len(bull_index)), fill, dtype=dtype)
+        found = np.zeros((len(cow_index), len(bull_index)), dtype=bool)
+        if len(pairs):
+            rows = cow_index.get_indexer(pairs['cow_id'])
+            cols = bull_index.get_indexer(pairs['bull_id'])
+            keep = (rows >= 0) & (cols >= 0)
+            matrix[rows[keep], cols[keep]] = pairs['value'].to_numpy()[keep]
+            found[rows[keep], cols[keep]] = True
+        block = np.ix_(cow_index.get_indexer(cow_ids), bull_index.get_indexer(bull_ids))
+        return matrix[block], found[block]
         
     def load_data(self, skip_missing_bulls: bool = False) -> bool:
         """加载所需数据
@@ -76,7 +118,7 @@ class MatrixRecommendationGenerator:
                 logger.error(error_msg)
                 self.last_error = error_msg
                 return False
-            self.cow_data = pd.read_excel(cow_file)
+            self.cow_data = get_project_data(self.project_path).read(cow_file)
             # 确保cow_id保持为字符串格式（修复pandas自动转换为数字的问题）
             if 'cow_id' in self.cow_data.columns:
                 self.cow_data['cow_id'] = self.cow_data['cow_id'].astype(str)
@@ -116,7 +158,7 @@ class MatrixRecommendationGenerator:
                 logger.error(error_msg)
                 self.last_error = error_msg
                 return False
-            self.bull_data = pd.read_excel(bull_file)
+            self.bull_data = get_project_data(self.project_path).read(bull_file)
             # 确保bull_id保持为字符串格式（修复pandas自动转换为数字的问题）
             if 'bull_id' in self.bull_data.columns:
                 self.bull_data['bull_id'] = self.bull_data['bull_id'].astype(str)
@@ -150,9 +192,9 @@ class MatrixRecommendationGenerator:
         """加载近交系数数据"""
         try:
             # 尝试查找备选公牛近交系数文件
-            possible_files = list(self.project_path.glob("**/备选公牛_近交系数及隐性基因分析结果*.xlsx"))
+            latest_file = get_project_data(self.project_path).latest("备选公牛_近交系数及隐性基因分析结果*.xlsx")
 
-            if not possible_files:
+            if latest_file is None:
                 error_msg = (
                     f"缺少文件：备选公牛_近交系数及隐性基因分析结果*.xlsx\n"
                     f"搜索路径：{self.project_path}\n"
@@ -162,9 +204,7 @@ class MatrixRecommendationGenerator:
                 self.last_error = error_msg
                 return False
             
-            # 使用最新的文件
-            latest_file = max(possible_files, key=lambda x: x.stat().st_mtime)
-            self.inbreeding_data = pd.read_excel(latest_file)
+            self.inbreeding_data = get_project_data(self.project_path).read(latest_file)
             # 确保母牛号和公牛号保持为字符串格式
             if '母牛号' in self.inbreeding_data.columns:
                 self.inbreeding_data['母牛号'] = self.inbreeding_data['母牛号'].astype(str)
@@ -243,7 +283,7 @@ class MatrixRecommendationGenerator:
                 self.last_error = error_msg
                 return False
 
-            bull_scores_df = pd.read_excel(bull_scores_file)
+            bull_scores_df = get_project_data(self.project_path).read(bull_scores_file)
             # 确保bull_id保持为字符串格式
             if 'bull_id' in bull_scores_df.columns:
                 bull_scores_df['bull_id'] = bull_scores_df['bull_id'].astype(str)
@@ -436,6 +476,7 @@ class MatrixRecommendationGenerator:
             progress_callback: 进度回调函数，接收(message, percentage)
         """
         logger.info("开始生成配对矩阵...")
+        self._inbreeding_cache = {}
 
         if progress_callback:
             progress_callback("正在准备数据...", 5)
@@ -518,25 +559,16 @@ class MatrixRecommendationGenerator:
         ))
         bull_scores = np.array([bull_scores_dict[bid] for bid in bull_ids])
 
-        # 预处理：获取母牛得分向量
-        cow_scores = []
-        for cow_id in cow_ids:
-            cow_row = self.cow_data[self.cow_data['cow_id'].astype(str) == cow_id]
-            if not cow_row.empty:
-                # 从已识别的得分列中获取得分
-                score_found = False
-                for col in self.cow_score_columns:
-                    if col in cow_row.columns and pd.notna(cow_row.iloc[0][col]):
-                        cow_scores.append(cow_row.iloc[0][col])
-                        score_found = True
-                        break
-
-                if not score_found:
-                    raise ValueError(f"母牛 {cow_id} 缺少得分数据")
-            else:
-                raise ValueError(f"找不到母牛 {cow_id} 的数据")
-
-        cow_scores = np.array(cow_scores)
+        # 预处理：获取母牛得分向量（同一母牛号有多行时取第一行）
+        scores_by_cow = pd.Series(self._cow_score_series().to_numpy(), index=self.cow_data['cow_id'].astype(str))
+        scores_by_cow = scores_by_cow[~scores_by_cow.index.duplicated()]
+        cow_scores = scores_by_cow.reindex(cow_ids)
+        if cow_scores.isna().any():
+            missing_cow = cow_scores.index[cow_scores.isna()][0]
+            if missing_cow in scores_by_cow.index:
+                raise ValueError(f"母牛 {missing_cow} 缺少得分数据")
+            raise ValueError(f"找不到母牛 {missing_cow} 的数据")
+        cow_scores = cow_scores.to_numpy()
 
         # 向量化计算后代得分矩阵
         # 使用广播创建矩阵：每个母牛得分与所有公牛得分的平均
@@ -556,73 +588,82 @@ class MatrixRecommendationGenerator:
         return score_matrix
         
     def _create_inbreeding_matrix(self, cow_ids: List[str], bull_ids: List[str]) -> pd.DataFrame:
-        """创建近交系数矩阵（优化版）"""
-        import numpy as np
+        """创建近交系数矩阵（float32数值，导出Excel时才格式化为百分比）
 
-        # 如果没有近交数据，直接返回全0矩阵
-        if self.inbreeding_data is None:
-            logger.info("没有近交系数数据，使用默认值0")
-            return pd.DataFrame("0.000%", index=cow_ids, columns=bull_ids)
+        优先使用备选公牛近交分析结果；分析结果中没有的配对由表格法计算器批量补算。
+        """
+        result = self._inbreeding_values(cow_ids, bull_ids)
+        inbreeding_matrix = pd.DataFrame(result.astype(np.float32), index=cow_ids, columns=bull_ids)
 
-        # 预处理：创建查找字典
-        inbreeding_dict = {}
+        non_zero_count = int(np.count_nonzero(result > 0))
+        logger.info(f"近交系数矩阵：非零值数量 = {non_zero_count}/{len(cow_ids)*len(bull_ids)}")
 
-        # 找到实际的列名
-        cow_cols = ['母牛号', 'dam_id', 'cow_id']
-        coeff_cols = ['后代近交系数', '近交系数', 'inbreeding_coefficient']
+        return inbreeding_matrix
 
-        cow_col = next((col for col in cow_cols if col in self.inbreeding_data.columns), None)
-        coeff_col = next((col for col in coeff_cols if col in self.inbreeding_data.columns), None)
+    def _inbreeding_values(self, cow_ids: List[str], bull_ids: List[str], fill_missing: bool = True) -> np.ndarray:
+        """
+        母牛×公牛 近交系数（数值）矩阵
 
-        if cow_col and coeff_col:
-            # 构建查找字典，一次遍历
-            for _, row in self.inbreeding_data.iterrows():
-                row_bull_id = self._resolve_row_bull_id(row)
-                if not row_bull_id:
-                    continue
-                key = (str(row[cow_col]), row_bull_id)
-                value = row[coeff_col]
-                if pd.notna(value):
-                    if isinstance(value, str) and '%' in value:
-                        value = float(value.replace('%', '')) / 100
-                    inbreeding_dict[key] = float(value)
-
-        # 使用向量化操作创建矩阵
-        result = np.zeros((len(cow_ids), len(bull_ids)))
-
-        for i, cow_id in enumerate(cow_ids):
-            for j, bull_id in enumerate(bull_ids):
-                key = (str(cow_id), str(bull_id))
-                result[i, j] = inbreeding_dict.get(key, 0.0)
-
-        # 转换为DataFrame并格式化
-        inbreeding_matrix = pd.DataFrame(result, index=cow_ids, columns=bull_ids)
-
-        # 向量化格式化
-        # DataFrame.applymap was removed in pandas 3.0. Apply Series.map
-        # column-by-column so the desktop app remains compatible with both
-        # older pandas releases and the current runtime.
-        formatted_matrix = inbreeding_matrix.apply(
-            lambda column: column.map(lambda x: f"{x*100:.3f}%")
-        )
+        Args:
+            cow_ids: 母牛号
+            bull_ids: 公牛号
+            fill_missing: 是否用表格法补算分析结果中缺失的配对（否则按补算记录或0处理）
 
-        non_zero_count = (inbreeding_matrix > 0).sum().sum()
-        logger.info(f"近交系数矩阵：非零值数量 = {non_zero_count}/{len(cow_ids)*len(bull_ids)}")
+        Returns:
+            np.ndarray: float64 矩阵
+        """
+        key = (tuple(cow_ids), tuple(bull_ids))
+        cached = self._inbreeding_cache.get(key)
+        if cached is not None:
+            return cached
+
+        result, found = self._pair_matrix(self._inbreeding_pairs(), cow_ids, bull_ids, 0.0, np.float64)
+        if fill_missing:
+            if not found.all():
+                self._fill_missing_inbreeding(result, found, cow_ids, bull_ids)
+            self._inbreeding_cache[key] = result
+        return result
+
+    def _fill_missing_inbreeding(self, result, found, cow_ids: List[str], bull_ids: List[str]):
+        """用表格法批量计算近交分析结果中缺失的配对，并记录供推荐汇总使用"""
+        import numpy as np
 
-        return formatted_matrix
+        missing_cows = np.flatnonzero(~found.all(axis=1))
+        missing_bulls = np.flatnonzero(~found.all(axis=0))
+        logger.info(f"近交分析结果缺少 {int((~found).sum())} 个配对，使用表格法批量计算")
+
+        try:
+            from core.inbreeding.tabular_inbreeding_calculator import get_tabular_inbreeding_calculator
+            calculator = get_tabular_inbreeding_calculator()
+
+            # 母牛系谱尚未并入系谱库时先合并，否则母牛个体无法定位
+            pedigree = calculator.pedigree_db.pedigree
+            sub_cow_ids = [str(cow_ids[i]) for i in missing_cows]
+            if not any(cow_id in pedigree for cow_id in sub_cow_ids):
+                cow_file = self.project_path / "standardized_data" / "processed_cow_data.xlsx"
+                if cow_file.exists():
+                    calculator.pedigree_db.build_cow_pedigree(
+                        cow_file, export_temp_file=False, export_merged_file=False
+                    )
+
+            sub_bull_ids = [str(bull_ids[j]) for j in missing_bulls]
+            values = calculator.calculate_offspring_inbreeding_matrix(sub_bull_ids, sub_cow_ids).T
+        except Exception as e:
+            logger.warning(f"表格法补算近交系数失败，缺失配对按0处理: {e}")
+            return
+
+        block = np.ix_(missing_cows, missing_bulls)
+        fill = ~found[block]
+        result[block] = np.where(fill, values, result[block])
+        for i, j in zip(*np.nonzero(fill)):
+            self.computed_inbreeding[(sub_cow_ids[i], sub_bull_ids[j])] = float(values[i, j])
         
     def _create_genetic_defect_matrix(self, cow_ids: List[str], bull_ids: List[str]) -> pd.DataFrame:
-        """创建隐性基因状态矩阵（优化版）"""
-        import numpy as np
-
+        """创建隐性基因状态矩阵（int8：0=safe，1=risk，导出Excel时才转换为文字）"""
         # 如果没有隐性基因数据，直接返回全"safe"矩阵
         if self.genetic_defect_data is None:
             logger.info("没有隐性基因数据，使用默认值safe")
-            return pd.DataFrame("safe", index=cow_ids, columns=bull_ids)
-
-        # 预处理：创建查找字典
-        cow_defects = {}
-        bull_defects = {}
+            return pd.DataFrame(np.zeros((len(cow_ids), len(bull_ids)), dtype=np.int8), index=cow_ids, columns=bull_ids)
 
         # 找到实际的列名
         id_cols = ['母牛号', '公牛号', 'animal_id', 'bull_id', 'cow_id']
@@ -630,50 +671,28 @@ class MatrixRecommendationGenerator:
 
         id_col = next((col for col in id_cols if col in self.genetic_defect_data.columns), None)
 
+        risk = np.zeros((len(cow_ids), len(bull_ids)), dtype=bool)
         if id_col and defect_cols:
-            # 构建查找字典
-            for _, row in self.genetic_defect_data.iterrows():
-                animal_id = str(row[id_col])
-                defects = []
-                for col in defect_cols:
-                    if pd.notna(row[col]) and str(row[col]).upper() == 'C':
-                        defects.append(col)
-
-                # 同时存储到母牛和公牛字典中
-                if animal_id in cow_ids:
-                    cow_defects[animal_id] = defects
-                if animal_id in bull_ids:
-                    bull_defects[animal_id] = defects
-
-        # 使用向量化操作创建矩阵
-        result = []
-
-        for cow_id in cow_ids:
-            row_result = []
-            cow_carriers = cow_defects.get(str(cow_id), [])
-
-            for bull_id in bull_ids:
-                bull_carriers = bull_defects.get(str(bull_id), [])
-
-                # 检查是否有相同的隐性基因携带
-                if cow_carriers and bull_carriers:
-                    common = set(cow_carriers) & set(bull_carriers)
-                    if common:
-                        row_result.append("risk")
-                    else:
-                        row_result.append("safe")
-                else:
-                    row_result.append("safe")
+            # 携带者矩阵（个体×隐性基因），同一个体多行时取最后一行
+            data = self.genetic_defect_data[[id_col] + defect_cols]
+            carriers = pd.DataFrame(
+                {col: data[col].notna() & data[col].astype(str).str.upper().eq('C') for col in defect_cols}
+            )
+            carriers.index = data[id_col].astype(str)
+            carriers = carriers[~carriers.index.duplicated(keep='last')]
 
-            result.append(row_result)
+            cow_carriers = carriers.reindex(pd.Index(cow_ids).astype(str), fill_value=False).to_numpy(dtype=np.int32)
+            bull_carriers = carriers.reindex(pd.Index(bull_ids).astype(str), fill_value=False).to_numpy(dtype=np.int32)
+            # 有相同的隐性基因携带即为风险
+            risk = (cow_carriers @ bull_carriers.T) > 0
 
-        genetic_matrix = pd.DataFrame(result, index=cow_ids, columns=bull_ids)
+        genetic_matrix = pd.DataFrame(risk.astype(np.int8), index=cow_ids, columns=bull_ids)
 
-        risk_count = (genetic_matrix == "risk").sum().sum()
+        risk_count = int(risk.sum())
         logger.info(f"隐性基因矩阵：风险配对数量 = {risk_count}/{len(cow_ids)*len(bull_ids)}")
 
         return genetic_matrix
-        
+
     def _get_inbreeding_coefficient(self, cow_id: str, bull_id: str) -> float:
         """获取近交系数"""
         if self.inbreeding_data is None:
@@ -786,40 +805,61 @@ class MatrixRecommendationGenerator:
             
         return "-"
         
-    def _build_inbreeding_dict(self) -> dict:
-        """预构建近交系数查找字典"""
-        inbreeding_dict = {}
+    def _inbreeding_pairs(self) -> pd.DataFrame:
+        """
+        近交系数长表 (cow_id, bull_id, value)
 
-        if self.inbreeding_data is None:
-            return inbreeding_dict
+        同一配对有多条记录时取最后一条；表格法补算的配对只在分析结果中没有时加入。
+        """
+        pairs = pd.DataFrame({'cow_id': pd.Series(dtype=object), 'bull_id': pd.Series(dtype=object),
+                              'value': pd.Series(dtype=np.float64)})
+        cow_col = coeff_col = None
 
-        # 找到实际的列名
-        cow_cols = ['母牛号', 'dam_id', 'cow_id']
-        coeff_cols = ['后代近交系数', '近交系数', 'inbreeding_coefficient']
+        if self.inbreeding_data is not None:
+            # 找到实际的列名
+            cow_cols = ['母牛号', 'dam_id', 'cow_id']
+            coeff_cols = ['后代近交系数', '近交系数', 'inbreeding_coefficient']
 
-        cow_col = next((col for col in cow_cols if col in self.inbreeding_data.columns), None)
-        coeff_col = next((col for col in coeff_cols if col in self.inbreeding_data.columns), None)
+            cow_col = next((col for col in cow_cols if col in self.inbreeding_data.columns), None)
+            coeff_col = next((col for col in coeff_cols if col in self.inbreeding_data.columns), None)
 
         if cow_col and coeff_col:
-            for _, row in self.inbreeding_data.iterrows():
-                row_bull_id = self._resolve_row_bull_id(row)
-                if not row_bull_id:
-                    continue
-                key = (str(row[cow_col]), row_bull_id)
-                value = row[coeff_col]
-                if pd.notna(value):
-                    if isinstance(value, str) and '%' in value:
-                        value = float(value.replace('%', '')) / 100
-                    inbreeding_dict[key] = float(value)
-
-        return inbreeding_dict
-
-    def _build_genetic_dict(self) -> dict:
-        """预构建隐性基因查找字典"""
-        genetic_dict = {}
+            data = self.inbreeding_data
+            values = data[coeff_col]
+            if not pd.api.types.is_numeric_dtype(values):
+                # 百分比字符串（如 "3.125%"）转换为小数
+                text = values.where(values.notna(), '').astype(str).str.strip()
+                percent = values.map(lambda v: isinstance(v, str)) & text.str.contains('%', regex=False)
+                numbers = pd.to_numeric(text.str.replace('%', '', regex=False).where(values.notna()))
+                values = numbers.where(~percent, numbers / 100)
+            pairs = pd.DataFrame({
+                'cow_id': data[cow_col].astype(str),
+                'bull_id': self._resolve_bull_id_column(data),
+                'value': values.astype(np.float64),
+            })
+            pairs = pairs[pairs['bull_id'].ne('') & pairs['value'].notna()]
+            pairs = pairs.drop_duplicates(['cow_id', 'bull_id'], keep='last')
+
+        if self.computed_inbreeding:
+            computed = pd.DataFrame(
+                [(cow_id, bull_id, value) for (cow_id, bull_id), value in self.computed_inbreeding.items()],
+                columns=['cow_id', 'bull_id', 'value']
+            )
+            pairs = pd.concat([pairs, computed], ignore_index=True).drop_duplicates(['cow_id', 'bull_id'], keep='first')
+
+        return pairs
+
+    def _high_risk_pairs(self) -> pd.DataFrame:
+        """
+        隐性基因高风险配对长表 (cow_id, bull_id, value)
+
+        任一隐性基因状态为"高风险"的配对为高风险；同一配对有多条记录时取最后一条。
+        """
+        pairs = pd.DataFrame({'cow_id': pd.Series(dtype=object), 'bull_id': pd.Series(dtype=object),
+                              'value': pd.Series(dtype=bool)})
 
         if self.genetic_defect_data is None:
-            return genetic_dict
+            return pairs
 
         # 找到实际的列名
         cow_cols = ['母牛号', 'dam_id', 'cow_id']
@@ -831,176 +871,146 @@ class MatrixRecommendationGenerator:
                        'Cholesterol deficiency', 'Chondrodysplasia']
 
         if cow_col:
-            for _, row in self.genetic_defect_data.iterrows():
-                row_bull_id = self._resolve_row_bull_id(row)
-                if not row_bull_id:
-                    continue
-                key = (str(row[cow_col]), row_bull_id)
-
-                # 检查各种隐性基因
-                for gene in defect_genes:
-                    if gene in row.index:
-                        status = str(row[gene]).strip()
-                        if status == '高风险':
-                            genetic_dict[key] = '高风险'
-                            break
-                else:
-                    genetic_dict[key] = 'Safe'
-
-        return genetic_dict
+            data = self.genetic_defect_data
+            high_risk = pd.Series(False, index=data.index)
+            for gene in defect_genes:
+                if gene in data.columns:
+                    high_risk |= data[gene].astype(str).str.strip().eq('高风险')
+            pairs = pd.DataFrame({
+                'cow_id': data[cow_col].astype(str),
+                'bull_id': self._resolve_bull_id_column(data),
+                'value': high_risk,
+            })
+            pairs = pairs[pairs['bull_id'].ne('')].drop_duplicates(['cow_id', 'bull_id'], keep='last')
+            pairs = pairs[pairs['value']]
+
+        return pairs
+
+    def _cow_score_series(self) -> pd.Series:
+        """每头母牛的得分（依次取第一个非空的得分列，与 _get_cow_score 一致），没有得分时为NaN"""
+        scores = pd.Series(np.nan, index=self.cow_data.index, dtype=object)
+        for col in reversed(self.cow_score_columns):
+            if col in self.cow_data.columns:
+                values = self.cow_data[col]
+                scores = values.where(values.notna(), scores)
+        return scores.astype(np.float64)
 
     def _generate_recommendation_summary(self, progress_callback=None) -> pd.DataFrame:
-        """生成推荐汇总（优化版）"""
-        import numpy as np
+        """
+        生成推荐汇总（向量化）
 
-        recommendations = []
-        skipped_cows = 0
+        按冻精类型在 母牛×公牛 的后代得分、近交系数、隐性基因高风险矩阵上计算：不满足约束的配对用布尔掩码排除，
+        每头母牛的有效公牛按后代得分从高到低稳定排序（同分时保持公牛顺序）。
+        全部有效公牛保存到 self.candidates（长表），推荐汇总取每头母牛的前3选。
+        """
         total_cows = len(self.cow_data)
-
         logger.info(f"开始生成推荐汇总，母牛总数: {total_cows}")
+        if progress_callback:
+            progress_callback(f"生成推荐汇总 ({total_cows}头)", 85)
 
-        # 预构建近交系数和隐性基因查找字典
-        inbreeding_dict = self._build_inbreeding_dict()
-        genetic_dict = self._build_genetic_dict()
-
-        # 分别处理常规和性控公牛
-        regular_bulls = self.bull_data[self.bull_data['semen_type'] == '常规']
-        sexed_bulls = self.bull_data[self.bull_data['semen_type'] == '性控']
-
-        # 预计算公牛得分
-        regular_bull_scores = dict(zip(regular_bulls['bull_id'].astype(str), regular_bulls['Index Score'])) if not regular_bulls.empty else {}
-        sexed_bull_scores = dict(zip(sexed_bulls['bull_id'].astype(str), sexed_bulls['Index Score'])) if not sexed_bulls.empty else {}
-
-        for idx, (_, cow) in enumerate(self.cow_data.iterrows()):
-            cow_id = str(cow['cow_id'])
-            current_cow_num = idx + 1
-
-            # 更新进度（更频繁的更新）
-            if progress_callback:
-                if current_cow_num <= 10 or current_cow_num % 10 == 0 or current_cow_num == total_cows:
-                    progress_msg = f"生成推荐汇总 ({current_cow_num}/{total_cows}头)"
-                    progress_pct = int(85 + (current_cow_num / total_cows) * 10)  # 85-95%
-                    progress_callback(progress_msg, progress_pct)
-
-            # 复制母牛基本信息
-            rec = {
-                'cow_id': cow_id,
-                'breed': cow.get('breed', ''),
-                'group': cow.get('group', ''),
-                'birth_date': cow.get('birth_date', ''),
-                'index_score': self._get_cow_score(cow)
-            }
-
-            cow_score = rec['index_score']
-            if cow_score is None:
+        cow_ids = self.cow_data['cow_id'].astype(str).tolist()
+        cow_id_array = np.asarray(cow_ids, dtype=object)
+        cow_scores = self._cow_score_series()
+        has_score = cow_scores.notna().to_numpy()
+        cow_values = cow_scores.to_numpy()
+        high_risk_pairs = self._high_risk_pairs()
+
+        if not has_score.all():
+            for cow_id in cow_id_array[~has_score]:
                 logger.warning(f"母牛 {cow_id} 没有得分，跳过该母牛")
-                skipped_cows += 1
-                recommendations.append(rec)
-                continue
-
-            has_valid_bulls = False
-
-            # 为每种冻精类型生成前3个推荐
-            for semen_type, bull_scores_dict in [('常规', regular_bull_scores), ('性控', sexed_bull_scores)]:
-                if not bull_scores_dict:
-                    # 填充空值
-                    for i in range(3):
-                        rec[f'推荐{semen_type}冻精{i+1}选'] = ''
-                        rec[f'{semen_type}冻精{i+1}近交系数'] = ''
-                        rec[f'{semen_type}冻精{i+1}隐性基因情况'] = ''
-                        rec[f'{semen_type}冻精{i+1}得分'] = ''
-                    rec[f'{semen_type}_valid_bulls'] = '[]'
-                    continue
-
-                # 快速计算所有公牛得分
-                bull_recommendations = []
-
-                for bull_id, bull_score in bull_scores_dict.items():
-                    # 计算后代得分
-                    offspring_score = 0.5 * (cow_score + bull_score)
-
-                    # 从字典中查找近交系数和隐性基因状态
-                    inbreeding_key = (cow_id, bull_id)
-                    inbreeding_coeff = inbreeding_dict.get(inbreeding_key, 0.0)
-                    gene_status = genetic_dict.get(inbreeding_key, 'Safe')
-
-                    # 只添加满足约束的公牛
-                    if inbreeding_coeff <= self.inbreeding_threshold and gene_status != '高风险':
-                        bull_recommendations.append({
-                            'bull_id': bull_id,
-                            'offspring_score': offspring_score,
-                            'inbreeding_coeff': inbreeding_coeff,
-                            'gene_status': gene_status
-                        })
-
-                # 按得分排序
-                bull_recommendations.sort(key=lambda x: x['offspring_score'], reverse=True)
-
-                if bull_recommendations:
-                    has_valid_bulls = True
-
-                # 保存前3个推荐
-                for i in range(3):
-                    if i < len(bull_recommendations):
-                        rec[f'推荐{semen_type}冻精{i+1}选'] = bull_recommendations[i]['bull_id']
-                        rec[f'{semen_type}冻精{i+1}近交系数'] = f"{bull_recommendations[i]['inbreeding_coeff']*100:.3f}%"
-                        rec[f'{semen_type}冻精{i+1}隐性基因情况'] = bull_recommendations[i]['gene_status']
-                        rec[f'{semen_type}冻精{i+1}得分'] = round(bull_recommendations[i]['offspring_score'], 2)
-                    else:
-                        rec[f'推荐{semen_type}冻精{i+1}选'] = ''
-                        rec[f'{semen_type}冻精{i+1}近交系数'] = ''
-                        rec[f'{semen_type}冻精{i+1}隐性基因情况'] = ''
-                        rec[f'{semen_type}冻精{i+1}得分'] = ''
-
-                # 保存所有有效公牛信息
-                rec[f'{semen_type}_valid_bulls'] = str(bull_recommendations)
 
-            if not has_valid_bulls:
-                logger.debug(f"母牛 {cow_id} 没有任何有效的公牛可选")
-                skipped_cows += 1
+        def cow_column(name):
+            return self.cow_data[name].to_numpy() if name in self.cow_data.columns else ''
+
+        def summary_column(values, present):
+            # 有推荐的位置填值，没有推荐为空字符串，没有得分的母牛为空值
+            column = np.full(total_cows, '', dtype=object)
+            column[present] = values[present] if isinstance(values, np.ndarray) else values
+            column[~has_score] = np.nan
+            return column
+
+        summary = {
+            'cow_id': cow_ids,
+            'breed': cow_column('breed'),
+            'group': cow_column('group'),
+            'birth_date': cow_column('birth_date'),
+            'index_score': cow_values,
+        }
+        has_valid_bulls = np.zeros(total_cows, dtype=bool)
+        self.candidates = CandidateBulls(cow_ids)
+
+        for semen_type in ['常规', '性控']:
+            type_bulls = self.bull_data[self.bull_data['semen_type'] == semen_type]
+            # 公牛号重复时位置取第一次出现、得分取最后一条
+            bull_scores_dict = dict(zip(type_bulls['bull_id'].astype(str), type_bulls['Index Score']))
+            bull_ids = list(bull_scores_dict)
+            n_bulls = len(bull_ids)
+
+            if n_bulls:
+                bull_values = np.asarray(list(bull_scores_dict.values()), dtype=np.float64)
+                inbreeding = self._inbreeding_values(cow_ids, bull_ids, fill_missing=False)
+                high_risk, _ = self._pair_matrix(high_risk_pairs, cow_ids, bull_ids, False, bool)
+
+                # 后代得分 = 双亲平均；只保留满足约束的配对
+                offspring = 0.5 * (cow_values[:, None] + bull_values[None, :])
+                valid = has_score[:, None] & (inbreeding <= self.inbreeding_threshold) & ~high_risk
+                ranked = np.argsort(np.where(valid, -offspring, np.inf), axis=1, kind='stable')
+                counts = valid.sum(axis=1)
+                has_valid_bulls |= counts > 0
+
+                # 全部有效公牛：每头母牛排名在前 counts 个的公牛（按行拼接）
+                rows, positions = np.nonzero(np.arange(n_bulls)[None, :] < counts[:, None])
+                cols = ranked[rows, positions]
+                self.candidates.add(semen_type, bull_ids, counts, cols, offspring[rows, cols], inbreeding[rows, cols])
+
+            # 前3个推荐
+            for i in range(3):
+                present = has_score & (counts > i) if n_bulls else np.zeros(total_cows, dtype=bool)
+                if present.any():
+                    col = ranked[:, i]
+                    top_bulls = np.asarray(bull_ids, dtype=object)[col]
+                    top_inbreeding = np.array([f"{value*100:.3f}%" for value in inbreeding[np.arange(total_cows), col]],
+                                              dtype=object)
+                    top_scores = np.round(offspring[np.arange(total_cows), col], 2).astype(object)
+                else:
+                    top_bulls = top_inbreeding = top_scores = ''
+                summary[f'推荐{semen_type}冻精{i+1}选'] = summary_column(top_bulls, present)
+                summary[f'{semen_type}冻精{i+1}近交系数'] = summary_column(top_inbreeding, present)
+                summary[f'{semen_type}冻精{i+1}隐性基因情况'] = summary_column('Safe', present)
+                summary[f'{semen_type}冻精{i+1}得分'] = summary_column(top_scores, present)
 
-            recommendations.append(rec)
+        skipped_cows = int((~has_valid_bulls).sum())
+        for cow_id in cow_id_array[has_score & ~has_valid_bulls]:
+            logger.debug(f"母牛 {cow_id} 没有任何有效的公牛可选")
 
         logger.info(f"推荐汇总生成完成:")
         logger.info(f"  总母牛数: {total_cows}")
         logger.info(f"  跳过的母牛数: {skipped_cows}")
-        logger.info(f"  生成推荐的母牛数: {len(recommendations)}")
+        logger.info(f"  生成推荐的母牛数: {total_cows}")
+        logger.info(f"  候选公牛: {len(self.candidates)}条")
+        if progress_callback:
+            progress_callback(f"生成推荐汇总 ({total_cows}/{total_cows}头)", 95)
 
-        return pd.DataFrame(recommendations)
+        return pd.DataFrame(summary).infer_objects()
         
-    def save_matrices(self, matrices: Dict[str, pd.DataFrame], output_file: Path):
-        """保存所有矩阵到Excel文件"""
+    def save_matrices(self, matrices: Dict[str, pd.DataFrame], output_file: Path, excel: bool = False):
+        """保存所有矩阵
+
+        矩阵以数值形式保存到与 output_file 同名的 .npz 容器；只有 excel=True 时才格式化并写入xlsx，
+        否则删除旧的xlsx（需要查看时由 export_matrices_excel 按需导出）。
+        """
         try:
-            # 确保所有矩阵的索引（母牛号）保持为字符串格式
-            processed_matrices = {}
-            for sheet_name, df in matrices.items():
-                df_copy = df.copy()
-                # 如果索引是母牛号，转换为字符串
-                if df_copy.index.name in ['cow_id', '母牛号', '耳号'] or any(isinstance(idx, (int, float)) for idx in df_copy.index):
-                    df_copy.index = df_copy.index.astype(str)
-                processed_matrices[sheet_name] = df_copy
-
-            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-                for sheet_name, df in processed_matrices.items():
-                    df.to_excel(writer, sheet_name=sheet_name)
-                    
-                    # 调整列宽
-                    worksheet = writer.sheets[sheet_name]
-                    for column in worksheet.columns:
-                        max_length = 0
-                        column = [cell for cell in column]
-                        for cell in column:
-                            try:
-                                if len(str(cell.value)) > max_length:
-                                    max_length = len(str(cell.value))
-                            except:
-                                pass
-                        adjusted_width = min(max_length + 2, 30)
-                        worksheet.column_dimensions[column[0].column_letter].width = adjusted_width
-                        
-            logger.info(f"配对矩阵已保存至: {output_file}")
+            output_file = Path(output_file)
+            if not save_matrix_container(matrices, container_path(output_file)):
+                return False
+
+            if excel:
+                write_matrices_excel(matrices, output_file)
+                logger.info(f"配对矩阵已导出至: {output_file}")
+            elif output_file.exists():
+                output_file.unlink()
             return True
-            
+
         except Exception as e:
             logger.error(f"保存配对矩阵失败: {e}")
             return False
@@ -0,0 +1,178 @@
+"""
+配对矩阵存储
+
+母牛×公牛 配对矩阵（后代得分、近交系数、隐性基因）原来以格式化的字符串（"3.125%"、"safe"/"risk"）
+整表写入xlsx，1万头母牛×200头公牛就是数百万个字符串单元格，内存和写入时间都很高。
+
+现在矩阵以数值保存：
+- 后代得分: float64（稠密）
+- 近交系数: float32，只保存非零配对（稀疏）
+- 隐性基因: 0=safe、1=risk，按位压缩
+- 其他表（如推荐汇总）原样保存
+
+全部写入一个压缩的 .npz 容器（与xlsx同名）。只有明确要求导出Excel时才格式化并写入xlsx。
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CONTAINER_SUFFIX = '.npz'
+INBREEDING_SUFFIX = '_近交系数'
+DEFECT_SUFFIX = '_隐性基因'
+SCORE_SUFFIX = '_后代得分'
+# 隐性基因矩阵的编码
+DEFECT_LABELS = ('safe', 'risk')
+
+
+def container_path(output_file: Union[str, Path]) -> Path:
+    """xlsx 对应的矩阵容器路径"""
+    return Path(output_file).with_suffix(CONTAINER_SUFFIX)
+
+
+def _labels(values) -> np.ndarray:
+    return np.asarray([str(value) for value in values], dtype=str)
+
+
+def save_matrix_container(matrices: Dict[str, pd.DataFrame], path: Union[str, Path]) -> bool:
+    """
+    把矩阵保存为压缩容器
+
+    Args:
+        matrices: {工作表名: DataFrame}，近交系数/隐性基因/后代得分矩阵为数值
+        path: 容器路径（.npz）
+
+    Returns:
+        bool: 是否保存成功
+    """
+    path = Path(path)
+    arrays = {'sheets': _labels(matrices)}
+    for k, (sheet_name, df) in enumerate(matrices.items()):
+        prefix = f'{k}_'
+        arrays[prefix + 'index'] = _labels(df.index)
+        arrays[prefix + 'columns'] = _labels(df.columns)
+        if sheet_name.endswith(INBREEDING_SUFFIX):
+            values = df.to_numpy(dtype=np.float32)
+            rows, cols = np.nonzero(values)
+            arrays[prefix + 'kind'] = np.array('sparse')
+            arrays[prefix + 'rows'] = rows.astype(np.int32)
+            arrays[prefix + 'cols'] = cols.astype(np.int32)
+            arrays[prefix + 'values'] = values[rows, cols]
+        elif sheet_name.endswith(DEFECT_SUFFIX):
+            arrays[prefix + 'kind'] = np.array('bitmask')
+            arrays[prefix + 'bits'] = np.packbits(df.to_numpy(dtype=np.int8) != 0, axis=None)
+        elif sheet_name.endswith(SCORE_SUFFIX):
+            arrays[prefix + 'kind'] = np.array('dense')
+            arrays[prefix + 'values'] = df.to_numpy(dtype=np.float64)
+        else:
+            # 其他表按单元格原样保存（需要 allow_pickle 读取）
+            arrays[prefix + 'kind'] = np.array('table')
+            arrays[prefix + 'values'] = df.to_numpy(dtype=object)
+            arrays[prefix + 'columns'] = np.asarray(list(df.columns), dtype=object)
+            arrays[prefix + 'index'] = np.asarray(list(df.index), dtype=object)
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.stem + '.tmp' + CONTAINER_SUFFIX)
+        np.savez_compressed(temp_path, **arrays)
+        temp_path.replace(path)
+        logger.info(f"配对矩阵已保存至: {path} ({path.stat().st_size / 1024:.1f} KB)")
+        return True
+    except Exception as e:
+        logger.error(f"保存配对矩阵容器失败: {e}")
+        return False
+
+
+def load_matrix_container(path: Union[str, Path]) -> Dict[str, pd.DataFrame]:
+    """
+    读取矩阵容器
+
+    Returns:
+        Dict[str, pd.DataFrame]: {工作表名: DataFrame}（数值矩阵：近交系数 float32，隐性基因 int8）
+    """
+    matrices = {}
+    with np.load(path, allow_pickle=True) as data:
+        for k, sheet_name in enumerate(data['sheets'].tolist()):
+            prefix = f'{k}_'
+            kind = str(data[prefix + 'kind'])
+            index = data[prefix + 'index'].tolist()
+            columns = data[prefix + 'columns'].tolist()
+            shape = (len(index), len(columns))
+            if kind == 'sparse':
+                values = np.zeros(shape, dtype=np.float32)
+                values[data[prefix + 'rows'], data[prefix + 'cols']] = data[prefix + 'values']
+            elif kind == 'bitmask':
+                bits = np.unpackbits(data[prefix + 'bits'], count=shape[0] * shape[1])
+                values = bits.reshape(shape).astype(np.int8)
+            else:
+                values = data[prefix + 'values']
+            df = pd.DataFrame(values, index=index, columns=columns)
+            matrices[sheet_name] = df.infer_objects() if kind == 'table' else df
+    return matrices
+
+
+def format_for_excel(sheet_name: str, df: pd.DataFrame) -> pd.DataFrame:
+    """把数值矩阵格式化为Excel中显示的文字（近交系数为百分比，隐性基因为safe/risk）"""
+    if sheet_name.endswith(INBREEDING_SUFFIX):
+        values = df.to_numpy(dtype=np.float64)
+        text = np.array([f"{value*100:.3f}%" for value in values.ravel().tolist()], dtype=object)
+        return pd.DataFrame(text.reshape(values.shape), index=df.index, columns=df.columns)
+    if sheet_name.endswith(DEFECT_SUFFIX):
+        labels = np.asarray(DEFECT_LABELS, dtype=object)
+        return pd.DataFrame(labels[(df.to_numpy() != 0).astype(np.int8)], index=df.index, columns=df.columns)
+    return df
+
+
+def write_matrices_excel(matrices: Dict[str, pd.DataFrame], output_file: Union[str, Path]):
+    """格式化后写入xlsx（每个矩阵一个工作表）"""
+    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        for sheet_name, df in matrices.items():
+            df = format_for_excel(sheet_name, df).copy()
+            # 确保所有矩阵的索引（母牛号）保持为字符串格式
+            if df.index.name in ['cow_id', '母牛号', '耳号'] or any(isinstance(idx, (int, float)) for idx in df.index):
+                df.index = df.index.astype(str)
+            df.to_excel(writer, sheet_name=sheet_name)
+
+            # 调整列宽
+            worksheet = writer.sheets[sheet_name]
+            for column in worksheet.columns:
+                max_length = 0
+                column = [cell for cell in column]
+                for cell in column:
+                    try:
+                        if len(str(cell.value)) > max_length:
+                            max_length = len(str(cell.value))
+                    except:
+                        pass
+                adjusted_width = min(max_length + 2, 30)
+                worksheet.column_dimensions[column[0].column_letter].width = adjusted_width
+
+
+def export_matrices_excel(output_file: Union[str, Path]) -> bool:
+    """
+    按需把矩阵容器导出为xlsx
+
+    Args:
+        output_file: xlsx 路径（容器为同名 .npz）
+
+    Returns:
+        bool: xlsx 是否存在（已存在或导出成功）
+    """
+    output_file = Path(output_file)
+    if output_file.exists():
+        return True
+    path = container_path(output_file)
+    if not path.exists():
+        return False
+    try:
+        write_matrices_excel(load_matrix_container(path), output_file)
+        logger.info(f"配对矩阵已导出至: {output_file}")
+        return True
+    except Exception as e:
+        logger.error(f"导出配对矩阵失败: {e}")
+        return False
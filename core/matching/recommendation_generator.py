@@ -11,6 +11,7 @@ from typing import Dict, List, Tuple, Optional
 from sqlalchemy import create_engine, text
 from core.data.update_manager import LOCAL_DB_PATH
 from core.inbreeding.inbreeding_calculator import InbreedingCalculator
+from core.data.dataset_io import read_dataset, write_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +31,7 @@ class RecommendationGenerator:
             if not index_file.exists():
                 raise FileNotFoundError(f"未找到母牛指数文件: {index_file}")
             
-            self.cow_data = pd.read_excel(index_file)
+            self.cow_data = read_dataset(index_file)
             # 只处理在场的母牛
             self.cow_data = self.cow_data[
                 (self.cow_data['sex'] == '母') & 
@@ -42,13 +43,13 @@ class RecommendationGenerator:
             if not bull_file.exists():
                 raise FileNotFoundError(f"未找到备选公牛文件: {bull_file}")
             
-            self.bull_data = pd.read_excel(bull_file)
+            self.bull_data = read_dataset(bull_file)
             
             # 尝试加载公牛指数得分
             bull_index_file = project_path / "analysis_results" / "processed_index_bull_scores.xlsx"
             if bull_index_file.exists():
                 try:
-                    bull_index_data = pd.read_excel(bull_index_file)
+                    bull_index_data = read_dataset(bull_index_file)
                     # 查找指数列（可能是 xxx_index 格式）
                     index_columns = [col for col in bull_index_data.columns if col.endswith('_index')]
                     
@@ -286,7 +287,7 @@ class RecommendationGenerator:
             recommendations_df = recommendations_df[ordered_columns]
             
             # 保存到Excel
-            recommendations_df.to_excel(output_path, index=False)
+            write_dataset(recommendations_df, output_path)
             logger.info(f"选配推荐报告已保存至: {output_path}")
             return True
         except Exception as e:
@@ -9,6 +9,7 @@ import logging
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import json
+from core.data.dataset_io import read_dataset, write_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -70,7 +71,7 @@ class SimpleRecommendationGenerator:
                 logger.error(f"未找到母牛指数文件: {cow_file}")
                 return False
                 
-            self.cow_data = pd.read_excel(cow_file)
+            self.cow_data = read_dataset(cow_file)
             # 筛选在场母牛
             self.cow_data = self.cow_data[
                 (self.cow_data['sex'] == '母') & 
@@ -85,7 +86,7 @@ class SimpleRecommendationGenerator:
                 logger.error(f"未找到公牛数据文件: {bull_file}")
                 return False
                 
-            self.bull_data = pd.read_excel(bull_file)
+            self.bull_data = read_dataset(bull_file)
             
             # 确保有必要的列
             if 'bull_id' not in self.bull_data.columns:
@@ -110,7 +111,7 @@ class SimpleRecommendationGenerator:
             # 3. 加载公牛指数（如果有）
             bull_index_file = self.project_path / "analysis_results" / "processed_index_bull_scores.xlsx"
             if bull_index_file.exists():
-                bull_index_data = pd.read_excel(bull_index_file)
+                bull_index_data = read_dataset(bull_index_file)
                 if 'bull_id' in bull_index_data.columns:
                     # 找到指数列
                     index_cols = [col for col in bull_index_data.columns if col.endswith('_index')]
@@ -157,7 +158,7 @@ class SimpleRecommendationGenerator:
                     
             if analysis_file:
                 logger.info(f"找到分析文件: {analysis_file.name}")
-                analysis_data = pd.read_excel(analysis_file)
+                analysis_data = read_dataset(analysis_file)
                 
                 # 保存原始数据用于查找
                 self.inbreeding_data = analysis_data
@@ -360,6 +361,6 @@ class SimpleRecommendationGenerator:
         save_cols = [col for col in all_cols if col in recommendations.columns]
         
         # 保存到Excel
-        recommendations[save_cols].to_excel(output_file, index=False)
+        write_dataset(recommendations[save_cols], output_file)
         
         logger.info(f"推荐报告已保存，包含 {len(recommendations)} 条记录")
\ No newline at end of file
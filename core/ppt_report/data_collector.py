@@ -35,16 +35,30 @@ def _to_float(value):
 class DataCollector:
     """从Excel报告收集PPT所需的数据"""
 
-    def __init__(self, excel_report_path: Path):
+    def __init__(self, excel_report_path: Path, report_model=None):
         """
         初始化数据收集器
 
         Args:
             excel_report_path: Excel综合报告路径
+            report_model: 报告数据模型（可选，提供时直接从模型解析Sheet，不再读取xlsx）
         """
         self.excel_path = excel_report_path
+        self.report_model = report_model
         self.data_cache = {}
 
+    def _read_excel(self, sheet_name, header=0):
+        """读取Sheet（sheet_name 为列表时返回字典），有报告数据模型时从模型解析"""
+        if self.report_model is None:
+            return pd.read_excel(self.excel_path, sheet_name=sheet_name, header=header)
+        if isinstance(sheet_name, list):
+            return {
+                name: self.report_model.read_frame(name, header=header)
+                for name in sheet_name
+                if name in self.report_model
+            }
+        return self.report_model.read_frame(sheet_name, header=header)
+
     def collect_all_data(self) -> Dict:
         """
         收集所有需要的数据
@@ -66,7 +80,7 @@ class DataCollector:
                 meta['sheet_name'] for meta in EXCEL_SHEET_MAPPING.values()
                 if not meta.get('detail_only', False) and meta.get('header', 0) == 0
             ]
-            all_sheets = pd.read_excel(self.excel_path, sheet_name=needed_sheets, header=0)
+            all_sheets = self._read_excel(needed_sheets, header=0)
             t1 = _time.perf_counter()
             logger.info(f"✓ 批量读取Excel完成，读取 {len(all_sheets)}/{len(EXCEL_SHEET_MAPPING)} 个Sheet（跳过明细表），耗时: {t1-t0:.2f}秒")
         except Exception as e:
@@ -134,7 +148,7 @@ class DataCollector:
             DataFrame或None
         """
         try:
-            df = pd.read_excel(self.excel_path, sheet_name=sheet_name, header=header)
+            df = self._read_excel(sheet_name, header=header)
             header_text = "无header" if header is None else "含表头"
             logger.info("✓ 读取Sheet: %s (%s行, %s)", sheet_name, len(df), header_text)
             return df
@@ -175,7 +189,7 @@ class DataCollector:
             return self.data_cache[cache_key]
 
         try:
-            df = pd.read_excel(self.excel_path, sheet_name=sheet_name, header=header)
+            df = self._read_excel(sheet_name, header=header)
             self.data_cache[cache_key] = df
             logger.info(f"✓ 读取原始Sheet '{sheet_name}' (header={header}): {len(df)}行 x {len(df.columns)}列")
             return df
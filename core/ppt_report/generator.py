@@ -15,6 +15,7 @@ from pptx import Presentation
 from pptx.util import Inches
 from openpyxl import load_workbook
 
+from ..excel_report.report_model import ReportModel
 from .utils import find_excel_report
 from .data_collector import DataCollector
 from .chart_creator import ChartCreator
@@ -59,6 +60,8 @@ class ExcelBasedPPTGenerator:
         # 缓存的openpyxl workbook（避免重复加载，每次加载需要约21秒）
         self._cached_workbook = None
         self._cached_workbook_data_only = None
+        # Excel生成时保存的报告数据模型（接口与只读workbook一致，可替代上面两个workbook）
+        self._report_model = None
 
         logger.info(f"初始化PPT生成器: {farm_name}, 汇报人: {reporter_name}")
 
@@ -165,6 +168,7 @@ class ExcelBasedPPTGenerator:
             if self._cached_workbook_data_only:
                 self._cached_workbook_data_only.close()
                 self._cached_workbook_data_only = None
+            self._report_model = None
             self._report_progress(progress_callback, "✓ 清理完成", 100)
 
             logger.info("=" * 60)
@@ -188,8 +192,13 @@ class ExcelBasedPPTGenerator:
                 raise FileNotFoundError("未找到Excel综合报告，请先生成Excel报告")
             logger.info(f"找到Excel报告: {self.excel_report_path.name}")
 
+        # 报告数据模型（Excel生成时保存；存在且有效时不再解析xlsx）
+        self._report_model = ReportModel.load(self.excel_report_path)
+        if self._report_model is not None:
+            logger.info("✓ 使用报告数据模型，跳过Excel workbook加载")
+
         # 数据收集器
-        self.data_collector = DataCollector(self.excel_report_path)
+        self.data_collector = DataCollector(self.excel_report_path, self._report_model)
 
         # 图表生成器
         self.chart_creator = ChartCreator()
@@ -207,7 +216,8 @@ class ExcelBasedPPTGenerator:
         """
         并行初始化：两个workbook加载 与 数据收集+PPT创建 同时进行
 
-        三个任务并行：
+        有报告数据模型时直接使用模型（数据、样式、图表、图片齐全），不加载workbook；
+        否则三个任务并行：
         - 线程1: load_workbook(data_only=True)  ~15s（图表/表格数据读取用）
         - 线程2: load_workbook(data_only=False) ~20s（时间线图片提取用）
         - 主线程: 数据收集 ~8s + PPT创建 ~1s
@@ -219,6 +229,13 @@ class ExcelBasedPPTGenerator:
         # 基础初始化（快速，不含workbook加载）
         self._initialize_components()
 
+        if self._report_model is not None:
+            self._cached_workbook_data_only = self._report_model
+            self._cached_workbook = self._report_model.view(data_only=False)
+            self._collected_data = self._collect_data_and_create_presentation(progress_callback)
+            self._report_progress(progress_callback, "✓ 全部初始化完成", 18)
+            return
+
         excel_path_str = str(self.excel_report_path)
         wb_data_only_result = [None]
         wb_full_result = [None]
@@ -245,17 +262,7 @@ class ExcelBasedPPTGenerator:
             wb_future2 = executor.submit(_load_wb_full)
 
             # 主线程同时执行：数据收集 + PPT创建
-            self._report_progress(progress_callback, "正在读取Excel报告数据...", 3)
-            data = self.data_collector.collect_all_data()
-            self.farm_info = data.get('farm_info_dict', {}) or {}
-            if self.farm_name and self.farm_name != "牧场":
-                self.farm_info["farm_name"] = self.farm_name
-                data["farm_info_dict"] = self.farm_info
-            self._report_progress(progress_callback, "✓ 数据读取完成", 12)
-
-            self._report_progress(progress_callback, "正在创建PPT...", 12)
-            self._create_presentation()
-            self._report_progress(progress_callback, "✓ PPT创建完成", 15)
+            data = self._collect_data_and_create_presentation(progress_callback)
 
             # 等待两个workbook加载完成
             self._report_progress(progress_callback, "等待workbook加载完成...", 15)
@@ -269,6 +276,21 @@ class ExcelBasedPPTGenerator:
         # 确保data被存储以供后续使用
         self._collected_data = data
 
+    def _collect_data_and_create_presentation(self, progress_callback=None) -> dict:
+        """数据收集 + PPT创建"""
+        self._report_progress(progress_callback, "正在读取Excel报告数据...", 3)
+        data = self.data_collector.collect_all_data()
+        self.farm_info = data.get('farm_info_dict', {}) or {}
+        if self.farm_name and self.farm_name != "牧场":
+            self.farm_info["farm_name"] = self.farm_name
+            data["farm_info_dict"] = self.farm_info
+        self._report_progress(progress_callback, "✓ 数据读取完成", 12)
+
+        self._report_progress(progress_callback, "正在创建PPT...", 12)
+        self._create_presentation()
+        self._report_progress(progress_callback, "✓ PPT创建完成", 15)
+        return data
+
     def _create_presentation(self):
         """创建PPT演示文稿"""
         # 查找模板（从程序根目录）
@@ -53,7 +53,14 @@ class Part6BullsDetailBuilder(BaseSlideBuilder):
             return
 
         try:
-            df_bulls_detail = pd.read_excel(excel_path, sheet_name="已用公牛性状明细", header=None)
+            # 优先经 DataCollector 读取（有报告数据模型时不再解析xlsx）
+            data_collector = data.get("data_collector")
+            if data_collector is not None:
+                df_bulls_detail = data_collector.get_raw_sheet("已用公牛性状明细", header=None)
+                if df_bulls_detail is None:
+                    raise ValueError("Sheet读取失败")
+            else:
+                df_bulls_detail = pd.read_excel(excel_path, sheet_name="已用公牛性状明细", header=None)
             logger.info(f"✓ 读取bulls_detail数据（无header）: {len(df_bulls_detail)}行 x {len(df_bulls_detail.columns)}列")
         except Exception as e:
             logger.error(f"读取已用公牛性状明细Sheet失败: {e}")
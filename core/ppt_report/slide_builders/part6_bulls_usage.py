@@ -49,7 +49,14 @@ class Part6BullsUsageBuilder(BaseSlideBuilder):
             return
 
         try:
-            df_bulls = pd.read_excel(excel_path, sheet_name="已用公牛性状汇总", header=None)
+            # 优先经 DataCollector 读取（有报告数据模型时不再解析xlsx）
+            data_collector = data.get("data_collector")
+            if data_collector is not None:
+                df_bulls = data_collector.get_raw_sheet("已用公牛性状汇总", header=None)
+                if df_bulls is None:
+                    raise ValueError("Sheet读取失败")
+            else:
+                df_bulls = pd.read_excel(excel_path, sheet_name="已用公牛性状汇总", header=None)
             logger.info(f"✓ 读取bulls_usage数据（无header）: {len(df_bulls)}行 x {len(df_bulls.columns)}列")
         except Exception as e:
             logger.error(f"读取已用公牛性状汇总Sheet失败: {e}")
@@ -6,12 +6,13 @@ echo "准备部署data_api.py到服务器..."
 
 # 服务器信息
 SERVER="ecs-user@39.96.189.27"
-REMOTE_PATH="/home/ecs-user/api/data_api.py"
-LOCAL_PATH="./api/data_api.py"
+REMOTE_DIR="/home/ecs-user/api"
+# data_api.py 依赖 config.py 和 db_pool.py，需一起上传
+LOCAL_FILES="./api/data_api.py ./api/config.py ./api/db_pool.py"
 
 # 上传文件
-echo "上传data_api.py到服务器..."
-scp $LOCAL_PATH $SERVER:$REMOTE_PATH
+echo "上传data_api.py及其依赖到服务器..."
+scp $LOCAL_FILES $SERVER:$REMOTE_DIR/
 
 if [ $? -eq 0 ]; then
     echo "✓ 文件上传成功"
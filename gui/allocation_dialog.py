@@ -11,6 +11,7 @@ import pandas as pd
 import logging
 
 from core.matching.cycle_based_matcher import CycleBasedMatcher
+from core.matching.candidate_bulls import load_candidates
 
 logger = logging.getLogger(__name__)
 
@@ -135,7 +136,8 @@ class AllocationDialog(QDialog):
             
             # 加载公牛数据
             bull_data_path = self.project_path / "standardized_data" / "processed_bull_data.xlsx"
-            if not self.matcher.load_data(recommendations_df, bull_data_path):
+            candidates = load_candidates(self.project_path, recommendations_df, recommendations_file)
+            if not self.matcher.load_data(recommendations_df, bull_data_path, candidates):
                 # 检查是否所有库存都是0
                 if self.matcher.check_zero_inventory():
                     QMessageBox.warning(
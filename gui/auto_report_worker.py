@@ -7,6 +7,7 @@
 import logging
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
 from PyQt6.QtCore import QThread, pyqtSignal
 
@@ -133,11 +134,13 @@ class AutoReportWorker(QThread):
         raw_data_dir = self.project_path / "raw_data"
         raw_data_dir.mkdir(parents=True, exist_ok=True)
         excel_path = raw_data_dir / "cow_data.xlsx"
-        YQNDataConverter.convert_herd_to_excel(merged_data, excel_path)
+        # 直接在内存中标准化，raw_data下的xlsx在后台存档
+        herd_df = YQNDataConverter.herd_to_frame(merged_data)
         self.progress.emit(6, "数据转换完成")
 
         # 下载配种记录 (6-10%)
         self.progress.emit(6, "正在下载配种记录...")
+        breeding_df = None
         try:
             all_breeding_data = []
             for i, farm in enumerate(self.farms):
@@ -154,16 +157,21 @@ class AutoReportWorker(QThread):
 
             if merged_breeding:
                 merged_breeding_api = {"data": {"rows": merged_breeding}}
-                breeding_excel_path = raw_data_dir / "breeding_records.xlsx"
-                YQNDataConverter.convert_breeding_records_to_excel(
-                    merged_breeding_api, breeding_excel_path
-                )
+                breeding_df = YQNDataConverter.breeding_records_to_frame(merged_breeding_api)
             self.progress.emit(11, "配种记录转换完成")
         except Exception as e:
             logger.warning(f"配种记录下载失败（不影响主流程）: {e}")
 
+        # 与上次同步的快照比较，只重新标准化变化的部分
+        from core.data.herd_sync import HerdSnapshotStore
+        sync_store = HerdSnapshotStore(
+            self.project_path.parent, [farm['code'] for farm in self.farms],
+            source_system="伊起牛", is_merged=self.is_merged
+        )
+        herd_delta = sync_store.diff(herd_df, breeding_df)
+
         # 标准化牛群数据 (11-22%)
-        self.progress.emit(11, "正在标准化牛群数据...")
+        self.progress.emit(11, f"正在标准化牛群数据（{herd_delta.summary()}）...")
 
         def standardize_progress(*args):
             if len(args) == 2:
@@ -183,12 +191,15 @@ class AutoReportWorker(QThread):
             input_files=[excel_path],
             project_path=self.project_path,
             progress_callback=standardize_progress,
-            source_system="伊起牛"
+            source_system="伊起牛",
+            raw_df=herd_df,
+            remap_breeding=breeding_df is None,
+            herd_delta=herd_delta
         )
 
         # 标准化配种记录 (22-25%)
         breeding_excel = self.project_path / "raw_data" / "breeding_records.xlsx"
-        if breeding_excel.exists():
+        if breeding_df is not None:
             self.progress.emit(22, "正在标准化配种记录...")
 
             def breeding_std_progress(*args):
@@ -211,10 +222,14 @@ class AutoReportWorker(QThread):
                     input_files=[breeding_excel],
                     project_path=self.project_path,
                     progress_callback=breeding_std_progress,
-                    source_system="伊起牛"
+                    source_system="伊起牛",
+                    raw_df=breeding_df,
+                    herd_delta=herd_delta
                 )
             except Exception as e:
                 logger.warning(f"配种记录标准化失败: {e}")
+                herd_delta.breeding_frame = None
+        sync_store.save(herd_delta, herd_df, breeding_df)
 
         # 下载冻精库存 (25-26%)
         self.progress.emit(25, "正在下载冻精库存...")
@@ -284,7 +299,7 @@ class AutoReportWorker(QThread):
         raw_dir = self.project_path / "raw_data"
         raw_dir.mkdir(parents=True, exist_ok=True)
         excel_path = raw_dir / "cow_data.xlsx"
-        HMYDataConverter.convert_herd_to_excel(merged_data, excel_path)
+        herd_df = HMYDataConverter.herd_to_frame(merged_data)
 
         self.progress.emit(12, "正在标准化慧牧云牛群数据...")
 
@@ -308,6 +323,7 @@ class AutoReportWorker(QThread):
             project_path=self.project_path,
             progress_callback=standardize_progress,
             source_system="慧牧云",
+            raw_df=herd_df,
         )
         FileManager.save_project_metadata(
             self.project_path, self.farms, data_source="慧牧云"
@@ -323,7 +339,7 @@ class AutoReportWorker(QThread):
         优化：将原来3轮串行改为2轮。
         唯一真实依赖：cow_index 需要 cow_traits 输出，其余6个任务完全独立。
 
-        第1轮 (30-65%): 6个独立任务并行
+        第1轮 (30-65%): 6个独立任务在常驻进程池中并行（不受GIL限制）
           cow_traits, bull_traits, mated_bull_traits, bull_index,
           inbreeding_mated, inbreeding_candidate
         第2轮 (65-75%): cow_index (依赖 cow_traits)
@@ -343,7 +359,7 @@ class AutoReportWorker(QThread):
             (
                 "母牛性状分析",
                 run_cow_traits,
-                (project, None, self._make_sub_progress("母牛性状分析", 30, 65)),
+                (project, None),
             )
         ]
         if has_bulls:
@@ -352,21 +368,17 @@ class AutoReportWorker(QThread):
                     (
                         "备选公牛性状分析",
                         run_bull_traits,
-                        (project, None, self._make_sub_progress("备选公牛性状分析", 30, 65)),
+                        (project, None),
                     ),
                     (
                         "公牛指数排名",
                         run_bull_index,
-                        (project, None, self._make_sub_progress("公牛指数排名", 30, 65)),
+                        (project, None),
                     ),
                     (
                         "备选公牛近交分析",
                         run_inbreeding_analysis,
-                        (
-                            project,
-                            "candidate",
-                            self._make_sub_progress("备选公牛近交分析", 30, 65),
-                        ),
+                        (project, "candidate"),
                     ),
                 ]
             )
@@ -379,16 +391,12 @@ class AutoReportWorker(QThread):
                     (
                         "已配公牛性状分析",
                         run_mated_bull_traits,
-                        (project, None, self._make_sub_progress("已配公牛性状分析", 30, 65)),
+                        (project, None),
                     ),
                     (
                         "已配公牛近交分析",
                         run_inbreeding_analysis,
-                        (
-                            project,
-                            "mated",
-                            self._make_sub_progress("已配公牛近交分析", 30, 65),
-                        ),
+                        (project, "mated"),
                     ),
                 ]
             )
@@ -399,12 +407,18 @@ class AutoReportWorker(QThread):
         self.progress.emit(30, f"开始数据分析（{len(task_specs)}项并行）...")
         self.parallel_start.emit(task_display_names)
 
-        with ThreadPoolExecutor(max_workers=max(1, len(task_specs))) as executor:
-            futures = {
-                executor.submit(function, *args): name
-                for name, function, args in task_specs
-            }
+        if any(function is run_inbreeding_analysis for _, function, _ in task_specs):
+            # 系谱库在主进程中先行准备好（不存在时构建并落盘），
+            # 避免多个近交分析子进程同时构建、同时写入同一存储目录
+            try:
+                from core.data.update_manager import get_pedigree_db
+                get_pedigree_db()
+            except Exception as e:
+                logger.warning(f"预先加载系谱库失败，由近交分析任务自行加载: {e}")
 
+        futures, thread_executor = self._submit_parallel_tasks(task_specs)
+        pool_broken = False
+        try:
             for future in as_completed(futures):
                 task_name = futures[future]
 
@@ -419,9 +433,17 @@ class AutoReportWorker(QThread):
                         self.progress.emit(0, f"{task_name}失败: {msg}")
                         self.sub_task_done.emit(task_name, False)
                 except Exception as e:
+                    pool_broken = pool_broken or isinstance(e, BrokenProcessPool)
                     self.results['failed_items'].append((task_name, str(e)))
                     self.progress.emit(0, f"{task_name}异常: {str(e)[:50]}")
                     self.sub_task_done.emit(task_name, False)
+        finally:
+            if thread_executor is not None:
+                thread_executor.shutdown(wait=True)
+            if pool_broken or thread_executor is not None:
+                # 子进程异常退出或提交失败，丢弃进程池（此时其中的任务均已结束），下次运行时重新创建
+                from core.analysis_pool import shutdown_analysis_pool
+                shutdown_analysis_pool(wait=False)
 
         self.parallel_end.emit()
 
@@ -443,6 +465,45 @@ class AutoReportWorker(QThread):
 
         self.progress.emit(75, "所有数据分析完成")
 
+    def _submit_parallel_tasks(self, task_specs):
+        """
+        提交第1轮并行任务
+
+        优先使用常驻进程池（各任务真正并行，进度经队列转发到子任务回调）；
+        进程池不可用时退回线程池：已提交到进程池且能取消的任务连同未提交的任务改由线程池执行，
+        已经开始运行的任务保留在进程池中，避免同一任务执行两次。
+
+        Returns:
+            Tuple[dict, Optional[ThreadPoolExecutor]]: ({future: 任务名}, 需要关闭的线程池)
+        """
+        from core.analysis_pool import get_analysis_pool
+
+        futures = {}
+        pending = list(task_specs)
+        try:
+            pool = get_analysis_pool()
+            while pending:
+                name, function, args = pending[0]
+                future = pool.submit(function, args, self._make_sub_progress(name, 30, 65))
+                futures[future] = (name, function, args)
+                pending.pop(0)
+            return {future: spec[0] for future, spec in futures.items()}, None
+        except Exception as e:
+            logger.warning(f"进程池不可用，改用线程池执行数据分析: {e}")
+
+        kept = {}
+        for future, spec in futures.items():
+            if future.cancel():
+                pending.append(spec)
+            else:
+                kept[future] = spec[0]
+
+        executor = ThreadPoolExecutor(max_workers=max(1, len(pending)))
+        for name, function, args in pending:
+            future = executor.submit(function, *args, progress_cb=self._make_sub_progress(name, 30, 65))
+            kept[future] = name
+        return kept, executor
+
     def _phase_excel_report(self):
         """Phase 3: Excel报告 (75-90%)"""
         from core.auto_analysis_runner import run_excel_report
@@ -52,18 +52,29 @@ class DataDownloadWorker(QThread):
     def run(self):
         """执行数据下载和标准化流程"""
         try:
-            total_farms = len(self.farms)
             all_api_data = []
 
-            # 步骤1: 下载各牧场牛群数据
-            for i, farm in enumerate(self.farms):
-                farm_code = farm['code']
-                farm_name = farm['name']
+            # 步骤1: 并发下载各牧场牛群数据、配种记录和冻精库存
+            self.progress.emit(10, f"正在下载 {len(self.farms)} 个牧场的数据...")
+            farm_names = {farm['code']: farm['name'] for farm in self.farms}
+            kind_names = {'herd': '牛群数据', 'breeding': '配种记录', 'stock': '冻精库存'}
 
-                progress_pct = int(10 + (i / total_farms) * 15)
-                self.progress.emit(progress_pct, f"正在下载 {farm_name} 数据...")
+            def download_progress(done, total, kind, farm_code):
+                self.progress.emit(
+                    int(10 + done / total * 15),
+                    f"已下载 {farm_names.get(farm_code, farm_code)} {kind_names[kind]} ({done}/{total})"
+                )
 
-                api_data = self.api_client.get_farm_herd(farm_code)
+            downloads = self.api_client.download_farms(
+                [farm['code'] for farm in self.farms],
+                progress_callback=download_progress,
+            )
+
+            for farm in self.farms:
+                farm_code = farm['code']
+                api_data = downloads['herd'][farm_code]
+                if isinstance(api_data, Exception):
+                    raise api_data
                 cow_count = len(api_data.get('data', []))
                 farm['cow_count'] = cow_count  # 更新实际数量
 
@@ -81,7 +92,7 @@ class DataDownloadWorker(QThread):
             total_cows = len(merged_data.get('data', []))
             self.progress.emit(28, f"数据合并完成，共 {total_cows} 头")
 
-            # 步骤3: 转换为Excel
+            # 步骤3: 转换为原始数据表（直接在内存中标准化，raw_data下的xlsx在后台存档）
             self.progress.emit(28, "正在转换数据格式...")
             raw_data_dir = self.project_path / "raw_data"
             raw_data_dir.mkdir(parents=True, exist_ok=True)
@@ -89,20 +100,19 @@ class DataDownloadWorker(QThread):
             excel_path = raw_data_dir / "cow_data.xlsx"
 
             # 使用转换器（不需要再添加前缀，merge_herd_data已处理）
-            YQNDataConverter.convert_herd_to_excel(merged_data, excel_path)
+            herd_df = YQNDataConverter.herd_to_frame(merged_data)
             self.progress.emit(32, "数据格式转换完成")
 
-            # 步骤3.5: 下载配种记录
-            self.progress.emit(32, "正在下载配种记录...")
+            # 步骤3.5: 转换配种记录（已在步骤1下载）
+            self.progress.emit(32, "正在处理配种记录...")
+            breeding_df = None
             try:
                 all_breeding_data = []
-                for i, farm in enumerate(self.farms):
+                for farm in self.farms:
                     farm_code = farm['code']
-                    farm_name = farm['name']
-                    progress_pct = int(32 + (i / total_farms) * 10)
-                    self.progress.emit(progress_pct, f"正在下载 {farm_name} 配种记录...")
-
-                    breeding_data = self.api_client.get_breeding_records(farm_code)
+                    breeding_data = downloads['breeding'][farm_code]
+                    if isinstance(breeding_data, Exception):
+                        raise breeding_data
                     all_breeding_data.append((farm_code, breeding_data))
 
                     # 统计记录数
@@ -117,10 +127,7 @@ class DataDownloadWorker(QThread):
                 if merged_breeding:
                     # 构建合并后的 api_data 格式供转换方法使用
                     merged_breeding_api = {"data": {"rows": merged_breeding}}
-                    breeding_excel_path = raw_data_dir / "breeding_records.xlsx"
-                    YQNDataConverter.convert_breeding_records_to_excel(
-                        merged_breeding_api, breeding_excel_path
-                    )
+                    breeding_df = YQNDataConverter.breeding_records_to_frame(merged_breeding_api)
                     self.progress.emit(45, f"配种记录下载完成，共 {len(merged_breeding)} 条")
                 else:
                     self.logger.warning("配种记录为空，跳过")
@@ -130,8 +137,14 @@ class DataDownloadWorker(QThread):
                 self.logger.warning(f"配种记录下载失败（不影响主流程）: {e}")
                 self.progress.emit(45, f"配种记录下载失败: {str(e)[:50]}，继续处理...")
 
-            # 步骤4: 标准化处理
-            self.progress.emit(50, "正在进行数据标准化...")
+            # 步骤4: 标准化处理（与上次同步的快照比较，只重新标准化变化的部分）
+            from core.data.herd_sync import HerdSnapshotStore
+            sync_store = HerdSnapshotStore(
+                self.project_path.parent, [farm['code'] for farm in self.farms],
+                source_system="伊起牛", is_merged=self.is_merged
+            )
+            herd_delta = sync_store.diff(herd_df, breeding_df)
+            self.progress.emit(50, f"正在进行数据标准化（{herd_delta.summary()}）...")
 
             def standardize_progress(*args):
                 if len(args) == 2:
@@ -148,40 +161,47 @@ class DataDownloadWorker(QThread):
                 except Exception as e:
                     self.logger.warning(f"进度回调出错: {e}, args={args}")
 
+            # 本次下载了配种记录时，随后直接标准化新记录，不再用旧的原始配种记录重新映射父号
             standardized_path = upload_and_standardize_cow_data(
                 input_files=[excel_path],
                 project_path=self.project_path,
                 progress_callback=standardize_progress,
-                source_system="伊起牛"
+                source_system="伊起牛",
+                raw_df=herd_df,
+                remap_breeding=breeding_df is None,
+                herd_delta=herd_delta
             )
 
             self.progress.emit(88, "牛群数据标准化完成")
 
             # 步骤4.5: 配种记录标准化
             breeding_excel = self.project_path / "raw_data" / "breeding_records.xlsx"
-            if breeding_excel.exists():
+            if breeding_df is not None:
                 self.progress.emit(90, "正在标准化配种记录...")
                 try:
                     from core.data.uploader import upload_and_standardize_breeding_data
                     upload_and_standardize_breeding_data(
                         input_files=[breeding_excel],
                         project_path=self.project_path,
-                        source_system="伊起牛"
+                        source_system="伊起牛",
+                        raw_df=breeding_df,
+                        herd_delta=herd_delta
                     )
                     self.progress.emit(93, "配种记录标准化完成")
                 except Exception as e:
                     self.logger.warning(f"配种记录标准化失败（不影响主流程）: {e}")
+                    herd_delta.breeding_frame = None
+            sync_store.save(herd_delta, herd_df, breeding_df)
 
-            # 步骤4.6: 下载冻精库存并标准化为备选公牛
-            self.progress.emit(93, "正在下载冻精库存...")
+            # 步骤4.6: 冻精库存（已在步骤1下载）标准化为备选公牛
+            self.progress.emit(93, "正在处理冻精库存...")
             try:
                 all_stock_records = []
                 for farm in self.farms:
                     farm_code = farm['code']
-                    farm_name = farm['name']
-                    self.progress.emit(93, f"正在下载 {farm_name} 冻精库存...")
-
-                    stock_data = self.api_client.get_stock_detail(farm_code)
+                    stock_data = downloads['stock'][farm_code]
+                    if isinstance(stock_data, Exception):
+                        raise stock_data
                     stock_records = stock_data.get("data", [])
                     all_stock_records.extend(stock_records)
                     self.logger.info(f"下载牧场 {farm_code} 冻精库存: {len(stock_records)} 条")
@@ -257,7 +277,7 @@ class HMYDataDownloadWorker(QThread):
             raw_dir = self.project_path / "raw_data"
             raw_dir.mkdir(parents=True, exist_ok=True)
             excel_path = raw_dir / "cow_data.xlsx"
-            HMYDataConverter.convert_herd_to_excel(merged_data, excel_path)
+            herd_df = HMYDataConverter.herd_to_frame(merged_data)
 
             self.progress.emit(65, "正在标准化慧牧云牛群数据...")
 
@@ -282,6 +302,7 @@ class HMYDataDownloadWorker(QThread):
                 project_path=self.project_path,
                 progress_callback=standardize_progress,
                 source_system="慧牧云",
+                raw_df=herd_df,
             )
             FileManager.save_project_metadata(
                 self.project_path, self.farms, data_source="慧牧云"
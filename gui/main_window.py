@@ -2511,6 +2511,12 @@ class MainWindow(QMainWindow):
         self.gene_control_checkbox = QCheckBox("控制隐性基因")
         self.gene_control_checkbox.setChecked(True)
         gene_control_layout.addWidget(self.gene_control_checkbox)
+        self.optimal_allocation_checkbox = QCheckBox("最优分配")
+        self.optimal_allocation_checkbox.setToolTip(
+            "1选按库存比例的配额求总后代得分最大的分配，结果与母牛顺序无关；\n"
+            "不勾选时按母牛得分顺序依次分配"
+        )
+        gene_control_layout.addWidget(self.optimal_allocation_checkbox)
         gene_control_layout.addStretch()
         
         # 添加手动分组和分组更新按钮
@@ -3426,6 +3432,10 @@ class MainWindow(QMainWindow):
         else:  # 无视近交
             return 100.0
     
+    def _get_allocation_solver(self) -> str:
+        """获取1选分配方式"""
+        return 'optimal' if self.optimal_allocation_checkbox.isChecked() else 'greedy'
+    
     def _collect_semen_counts(self):
         """收集冻精支数信息，返回{(bull_id, semen_type): count}"""
         semen_inventory = {}
@@ -3480,7 +3490,8 @@ class MainWindow(QMainWindow):
         files_to_clear = [
             "个体选配报告.xlsx",
             "individual_mating_report.xlsx",
-            "个体选配推荐矩阵.xlsx"
+            "个体选配推荐矩阵.xlsx",
+            "个体选配推荐矩阵.npz"
         ]
 
         for filename in files_to_clear:
@@ -3832,13 +3843,14 @@ class MainWindow(QMainWindow):
         # 显示成功消息
         message = (
             "选配推荐已生成！\n\n"
-            "生成了以下文件：\n"
-            f"1. 配对矩阵文件：{output_file.name}\n"
+            "已保存以下结果：\n"
+            f"1. 配对矩阵：{output_file.name}\n"
             f"   - 包含所有母牛×公牛的配对信息\n"
-            f"   - 分别显示后代得分、近交系数、隐性基因状态\n\n"
+            f"   - 分别显示后代得分、近交系数、隐性基因状态\n"
+            f"   - 以数值形式保存，查看时导出为Excel文件\n\n"
             f"2. 推荐汇总文件：individual_mating_report.xlsx\n"
             f"   - 用于选配分配功能\n\n"
-            "是否打开配对矩阵文件查看？"
+            "是否导出并打开配对矩阵文件查看？"
         )
         
         reply = QMessageBox.information(
@@ -3852,6 +3864,11 @@ class MainWindow(QMainWindow):
         # 如果用户选择查看，打开文件
         if reply == QMessageBox.StandardButton.Yes:
             try:
+                # 配对矩阵以数值容器保存，查看时才导出为xlsx
+                from core.matching.matrix_storage import export_matrices_excel
+                if not export_matrices_excel(output_file):
+                    QMessageBox.warning(self, "打开失败", f"无法导出配对矩阵文件: {output_file.name}")
+                    return
                 QDesktopServices.openUrl(QUrl.fromLocalFile(str(output_file)))
             except Exception as e:
                 QMessageBox.warning(self, "打开失败", f"无法打开文件: {str(e)}")
@@ -3935,7 +3952,8 @@ class MainWindow(QMainWindow):
             'cycle_days': 21,
             'skip_missing_bulls': skip_missing_bulls,
             'selected_groups': selected_groups,  # 添加选中的分组
-            'grouping_mode': self.grouping_mode  # 添加分组模式
+            'grouping_mode': self.grouping_mode,  # 添加分组模式
+            'allocation_solver': self._get_allocation_solver()
         }
 
         # 使用多线程进度对话框
@@ -4412,6 +4430,20 @@ class MainWindow(QMainWindow):
                 QPushButton:hover { background-color: #2471a3; }
             """)
 
+            matrix_path = result.get('matrix_path')
+            export_matrix_btn = QPushButton("导出推荐矩阵")
+            export_matrix_btn.setToolTip("将母牛×公牛推荐矩阵导出为Excel文件并打开")
+            export_matrix_btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #8e44ad; color: white; border: none;
+                    padding: 9px 18px; border-radius: 4px;
+                    font-weight: bold; font-size: 13px;
+                }
+                QPushButton:hover { background-color: #7d3c98; }
+                QPushButton:disabled { background-color: #bdc3c7; }
+            """)
+            export_matrix_btn.setEnabled(matrix_path is not None)
+
             push_btn = QPushButton("推送到伊起牛")
             push_btn.setStyleSheet("""
                 QPushButton {
@@ -4450,17 +4482,35 @@ class MainWindow(QMainWindow):
                 except Exception as e:
                     QMessageBox.warning(self, "打开失败", f"无法打开文件夹: {e}")
 
+            def _export_matrix():
+                try:
+                    # 推荐矩阵以数值容器保存，查看时才导出为xlsx
+                    from core.matching.matrix_storage import export_matrices_excel
+                    QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+                    try:
+                        exported = export_matrices_excel(matrix_path)
+                    finally:
+                        QApplication.restoreOverrideCursor()
+                    if not exported:
+                        QMessageBox.warning(self, "导出失败", f"无法导出推荐矩阵文件: {matrix_path.name}")
+                        return
+                    QDesktopServices.openUrl(QUrl.fromLocalFile(str(matrix_path)))
+                except Exception as e:
+                    QMessageBox.warning(self, "导出失败", f"无法导出推荐矩阵: {e}")
+
             def _push():
                 dialog.close()
                 self.on_push_mating_results()
 
             open_file_btn.clicked.connect(_open_file)
             open_folder_btn.clicked.connect(_open_folder)
+            export_matrix_btn.clicked.connect(_export_matrix)
             push_btn.clicked.connect(_push)
             close_btn.clicked.connect(dialog.accept)
 
             btn_layout.addWidget(open_file_btn)
             btn_layout.addWidget(open_folder_btn)
+            btn_layout.addWidget(export_matrix_btn)
             btn_layout.addWidget(push_btn)
             btn_layout.addStretch()
             btn_layout.addWidget(close_btn)
@@ -4539,9 +4589,10 @@ class MainWindow(QMainWindow):
         # 执行分配
         try:
             from core.matching.cycle_based_matcher import CycleBasedMatcher
+            from core.matching.candidate_bulls import load_candidates
             
             # 创建匹配器
-            matcher = CycleBasedMatcher()
+            matcher = CycleBasedMatcher(solver=self._get_allocation_solver())
             matcher.inbreeding_threshold = self._get_inbreeding_threshold()
             matcher.control_defect_genes = self.gene_control_checkbox.isChecked()
             
@@ -4552,7 +4603,8 @@ class MainWindow(QMainWindow):
             recommendations_df = pd.read_excel(report_file)
             bull_data_path = self.selected_project_path / "standardized_data" / "processed_bull_data.xlsx"
             
-            if not matcher.load_data(recommendations_df, bull_data_path):
+            candidates = load_candidates(self.selected_project_path, recommendations_df, report_file)
+            if not matcher.load_data(recommendations_df, bull_data_path, candidates):
                 self.progress_dialog.close()
                 QMessageBox.critical(self, "错误", "数据加载失败")
                 return
@@ -57,6 +57,7 @@ class RecommendationWorker(QThread):
                 self.progress_updated.emit("正在保存推荐汇总...", 90)
                 summary_file = self.project_path / "analysis_results" / "individual_mating_report.xlsx"
                 matrices['推荐汇总'].to_excel(summary_file, index=False)
+                self.matrix_generator.candidates.save(self.project_path, summary_file, len(matrices['推荐汇总']))
                 
                 # 推荐完成
                 self.progress_updated.emit("选配推荐生成完成！", 100)
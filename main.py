@@ -65,6 +65,10 @@ def main():
     root_dir = Path(__file__).parent
     os.environ['GENETIC_IMPROVE_ROOT'] = str(root_dir)
 
+    # pandas 2.x 开启写时复制，项目数据缓存返回浅拷贝而不是整表复制
+    from core.data.project_data import enable_copy_on_write
+    enable_copy_on_write()
+
     app = QApplication(sys.argv)
 
     # 强制设置为浅色模式，不跟随系统深色模式
@@ -244,4 +248,7 @@ def main():
     return app.exec()
 
 if __name__ == "__main__":
+    # 打包后的程序启动数据分析子进程时需要
+    import multiprocessing
+    multiprocessing.freeze_support()
     sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+生成bull_library增量包并更新版本文件
+
+用法:
+    python scripts/build_bull_library_delta.py <旧版本数据库> --from-version <旧版本号>
+
+新版本数据库与版本文件取 data/databases/ 下的 bull_library.db 与 bull_library_version.json。
+生成的增量包写入 data/databases/deltas/，版本文件补充 sha256/size/content_hash 并登记增量包，
+随后由 upload_database_to_oss.py 一并上传。
+"""
+
+import argparse
+import gzip
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.data.bull_library_downloader import build_delta_package, compute_content_hash, file_sha256
+
+# 版本文件中保留的增量包数量（更早的版本直接下载完整数据库）
+MAX_DELTAS = 12
+
+
+def build_delta(old_db_path: Path, from_version: str) -> bool:
+    """生成从 from_version 到当前版本的增量包"""
+    database_dir = project_root / "data" / "databases"
+    new_db_path = database_dir / "bull_library.db"
+    version_file = database_dir / "bull_library_version.json"
+
+    if not new_db_path.exists() or not version_file.exists():
+        print(f"错误：数据库或版本文件不存在: {database_dir}")
+        return False
+
+    with open(version_file, 'r', encoding='utf-8') as f:
+        version_info = json.load(f)
+    to_version = str(version_info['version'])
+
+    print(f"比较 {from_version} → {to_version} ...")
+    package = build_delta_package(old_db_path, new_db_path, str(from_version), to_version)
+    print(f"变更公牛: {len(package['deleted'])} 个删除，{len(package['rows'])} 行新增或修改")
+
+    delta_dir = database_dir / "deltas"
+    delta_dir.mkdir(parents=True, exist_ok=True)
+    delta_name = f"bull_library_{from_version}_to_{to_version}.json.gz"
+    delta_path = delta_dir / delta_name
+    with gzip.open(delta_path, 'wt', encoding='utf-8') as f:
+        json.dump(package, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"增量包: {delta_path} ({delta_path.stat().st_size / 1024:.1f} KB)")
+
+    conn = sqlite3.connect(new_db_path)
+    try:
+        content_hash = compute_content_hash(conn)
+    finally:
+        conn.close()
+
+    # 客户端按 from → to 依次串接增量包；同一起点只保留最新的一个
+    deltas = [entry for entry in version_info.get('deltas') or [] if str(entry.get('from')) != str(from_version)]
+    deltas.append({
+        'from': str(from_version),
+        'to': to_version,
+        'file': delta_name,
+        'sha256': file_sha256(delta_path),
+        'size': delta_path.stat().st_size,
+    })
+    version_info.update({
+        'sha256': file_sha256(new_db_path),
+        'size': new_db_path.stat().st_size,
+        'content_hash': content_hash,
+        'deltas': deltas[-MAX_DELTAS:],
+    })
+
+    with open(version_file, 'w', encoding='utf-8') as f:
+        json.dump(version_info, f, ensure_ascii=False, indent=2)
+    print(f"✅ 版本文件已更新: {version_file}")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成bull_library增量包")
+    parser.add_argument("old_db", type=Path, help="旧版本bull_library.db")
+    parser.add_argument("--from-version", required=True, help="旧版本号")
+    args = parser.parse_args()
+    sys.exit(0 if build_delta(args.old_db, args.from_version) else 1)
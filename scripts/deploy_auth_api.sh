@@ -33,6 +33,8 @@ fi
 # 这里需要手动复制 api/auth_api.py 文件到服务器
 echo "请手动将以下文件复制到 ${SERVICE_DIR}:"
 echo "  - api/auth_api.py"
+echo "  - api/db_pool.py"
+echo "  - api/hmy_proxy.py"
 echo "  - requirements.txt (可选，用于安装依赖)"
 
 # 3. 设置环境变量
@@ -68,7 +70,7 @@ fi
 echo "📦 安装Python依赖..."
 source "${PYTHON_ENV}/bin/activate"
 pip install --upgrade pip
-pip install fastapi uvicorn sqlalchemy pymysql pyjwt python-multipart
+pip install fastapi uvicorn sqlalchemy pymysql pyjwt python-multipart httpx cryptography
 
 # 6. 创建systemd服务文件
 echo "⚙️  创建systemd服务..."
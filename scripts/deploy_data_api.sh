@@ -14,6 +14,10 @@ fi
 
 # 创建API目录
 mkdir -p ~/api
+echo "请确认以下文件已复制到 ~/api:"
+echo "  - api/data_api.py"
+echo "  - api/config.py"
+echo "  - api/db_pool.py"
 
 # 安装Python依赖
 echo "安装依赖包..."
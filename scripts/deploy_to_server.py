@@ -98,6 +98,9 @@ def deploy_auth_api():
     # 4. 复制认证API文件
     if not copy_file_to_server(auth_api_file, "~/genetic_improve_auth/auth_api.py", "复制认证API文件"):
         return False
+    for module_name in ("db_pool.py", "hmy_proxy.py"):
+        if not copy_file_to_server(auth_api_file.parent / module_name, f"~/genetic_improve_auth/{module_name}", f"复制{module_name}"):
+            return False
 
     # 5. 创建环境变量文件
     env_content = '''# 数据库配置
@@ -138,7 +141,7 @@ API_PORT=8081
         "python3 -m venv venv",
         "source venv/bin/activate",
         "pip install --upgrade pip",
-        "pip install fastapi uvicorn sqlalchemy pymysql pyjwt python-multipart"
+        "pip install fastapi uvicorn sqlalchemy pymysql pyjwt python-multipart httpx cryptography"
     ]
 
     if not run_ssh_command(" && ".join(commands), "安装Python依赖"):
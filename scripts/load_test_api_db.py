@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+认证API数据库访问压测
+
+以 SQLite 文件库（或 --database-url 指定的 MySQL 测试库）代替线上数据库，每条语句附加模拟的网络往返延迟，
+按不同的连接池/线程池大小并发发送登录请求，输出吞吐量。数据库操作不阻塞事件循环时，
+吞吐量应随线程数近似线性增长（直到达到并发请求数）。
+
+用法:
+    python scripts/load_test_api_db.py --requests 200 --latency-ms 20 --workers 1 2 4 8 16
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import event, text
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def prepare_sqlite(path: Path) -> str:
+    url = f"sqlite:///{path}"
+    from api.db_pool import DatabasePool
+
+    pool = DatabasePool(url, pool_size=1, max_overflow=0)
+    with pool.engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS `id-pw` (ID TEXT PRIMARY KEY, PW TEXT, name TEXT)"))
+        conn.execute(text("INSERT OR REPLACE INTO `id-pw` VALUES ('10000001', 'pw', '压测')"))
+    pool.dispose()
+    return url
+
+
+async def run_load(app, total: int, concurrency: int) -> float:
+    """并发发送登录请求，返回耗时（秒）"""
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+        async def login():
+            async with semaphore:
+                response = await client.post(
+                    "/api/auth/login", json={"username": "10000001", "password": "pw"}
+                )
+                if not response.json().get("success"):
+                    raise RuntimeError(response.text)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(total)))
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="认证API数据库访问压测")
+    parser.add_argument("--requests", type=int, default=200, help="每轮请求数")
+    parser.add_argument("--concurrency", type=int, default=64, help="同时进行的请求数")
+    parser.add_argument("--latency-ms", type=float, default=20, help="每条语句的模拟延迟（毫秒）")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="连接池/线程池大小")
+    parser.add_argument("--database-url", help="测试库连接串（需已有 id-pw 表及压测账号），默认使用临时 SQLite 库")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DB_PASSWORD", "load-test")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        url = args.database_url or prepare_sqlite(Path(tmpdir) / "load_test.db")
+        from api import auth_api
+        from api.db_pool import DatabasePool
+
+        print(f"请求数 {args.requests}，并发 {args.concurrency}，模拟延迟 {args.latency_ms}ms")
+        baseline = None
+        for workers in args.workers:
+            auth_api.db = DatabasePool(url, pool_size=workers, max_overflow=0)
+            latency = args.latency_ms / 1000
+
+            @event.listens_for(auth_api.db.engine, "before_cursor_execute")
+            def _sleep(*_args):
+                time.sleep(latency)
+
+            elapsed = asyncio.run(run_load(auth_api.app, args.requests, args.concurrency))
+            throughput = args.requests / elapsed
+            baseline = baseline or throughput / workers
+            print(f"  线程数 {workers:3d}: {throughput:8.1f} 请求/秒  (线性比例 {throughput / (baseline * workers):.2f})")
+            auth_api.db.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -98,9 +98,23 @@ def upload_database():
         bucket.put_object_acl(oss_key, oss2.OBJECT_ACL_PUBLIC_READ)
         print("已设置为公共读权限")
 
-        # 上传版本文件
-        print("\n上传版本文件...")
+        # 上传增量包（build_bull_library_delta.py 生成，登记在版本文件中）
         version_file = project_root / "data" / "databases" / "bull_library_version.json"
+        if version_file.exists():
+            import json
+            with open(version_file, 'r', encoding='utf-8') as f:
+                deltas = json.load(f).get('deltas') or []
+            for entry in deltas:
+                delta_path = project_root / "data" / "databases" / "deltas" / entry['file']
+                delta_key = f"releases/bull_library/deltas/{entry['file']}"
+                if not delta_path.exists():
+                    continue
+                bucket.put_object_from_file(delta_key, str(delta_path))
+                bucket.put_object_acl(delta_key, oss2.OBJECT_ACL_PUBLIC_READ)
+                print(f"✅ 增量包已上传: {OSS_BASE_URL}/{delta_key}")
+
+        # 上传版本文件（最后上传，客户端看到新版本时数据库与增量包都已就绪）
+        print("\n上传版本文件...")
         if version_file.exists():
             version_key = "releases/bull_library/bull_library_version.json"
             bucket.put_object_from_file(version_key, str(version_file))
@@ -0,0 +1,105 @@
+"""带容量约束的最优指派与线性规划（scipy HiGHS）结果对照测试。"""
+
+from __future__ import annotations
+
+import unittest
+
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import coo_matrix
+
+from core.matching.allocation_utils import solve_capacitated_assignment
+
+
+def shifted_gains(gains: np.ndarray) -> np.ndarray:
+    """与求解器相同的收益平移（不小于收益极差+1的正数）。"""
+    gains = np.asarray(gains, dtype=np.float64)
+    return gains - gains.min() + (gains.max() - gains.min()) + 1.0
+
+
+def lp_optimum(cow_index, bull_index, gains, capacities, n_cows) -> float:
+    """运输问题的线性规划最优值（约束矩阵全幺模，LP 最优即整数最优）。"""
+    n_pairs = len(gains)
+    rows = np.concatenate([cow_index, n_cows + bull_index])
+    cols = np.concatenate([np.arange(n_pairs), np.arange(n_pairs)])
+    a_ub = coo_matrix((np.ones(2 * n_pairs), (rows, cols)), shape=(n_cows + len(capacities), n_pairs))
+    b_ub = np.concatenate([np.ones(n_cows), capacities])
+    result = linprog(-shifted_gains(gains), A_ub=a_ub, b_ub=b_ub, bounds=(0, 1), method='highs')
+    assert result.status == 0, result.message
+    return -result.fun
+
+
+class CapacitatedAssignmentTest(unittest.TestCase):
+    def assert_optimal(self, cow_index, bull_index, gains, capacities, n_cows):
+        cow_index = np.asarray(cow_index, dtype=np.int64)
+        bull_index = np.asarray(bull_index, dtype=np.int64)
+        gains = np.asarray(gains, dtype=np.float64)
+        capacities = np.asarray(capacities, dtype=np.int64)
+
+        selected = solve_capacitated_assignment(cow_index, bull_index, gains, capacities, n_cows)
+        self.assertIsNotNone(selected)
+        self.assertEqual(selected.dtype, bool)
+
+        # 可行性：每头母牛至多1头公牛，每头公牛不超过容量
+        self.assertTrue((np.bincount(cow_index[selected], minlength=n_cows) <= 1).all())
+        self.assertTrue((np.bincount(bull_index[selected], minlength=len(capacities)) <= capacities).all())
+
+        expected = lp_optimum(cow_index, bull_index, gains, capacities, n_cows)
+        self.assertAlmostEqual(shifted_gains(gains)[selected].sum(), expected, places=6)
+        return selected
+
+    def test_random_cases_match_lp(self):
+        rng = np.random.default_rng(20240611)
+        for _ in range(200):
+            n_cows = int(rng.integers(1, 40))
+            n_bulls = int(rng.integers(1, 8))
+            mask = rng.random((n_cows, n_bulls)) < rng.uniform(0.3, 1.0)
+            cow_index, bull_index = np.nonzero(mask)
+            if len(cow_index) == 0:
+                continue
+            if rng.random() < 0.5:
+                gains = rng.normal(200, 50, len(cow_index))
+            else:
+                # 整数得分，制造大量并列
+                gains = rng.integers(0, 5, len(cow_index)).astype(float)
+            capacities = rng.integers(0, max(2, n_cows // n_bulls + 2), n_bulls)
+            with self.subTest(n_cows=n_cows, n_bulls=n_bulls):
+                self.assert_optimal(cow_index, bull_index, gains, capacities, n_cows)
+
+    def test_greedy_order_is_not_optimal(self):
+        # 母牛0两头公牛都可以，母牛1只能配公牛0；贪心让母牛0先占公牛0
+        selected = self.assert_optimal([0, 0, 1], [0, 1, 0], [10.0, 9.0, 9.5], [1, 1], 2)
+        self.assertEqual(selected.tolist(), [False, True, True])
+
+    def test_capacity_binds(self):
+        # 4头母牛只有1头公牛、容量2：选出得分最高的两头
+        selected = self.assert_optimal([0, 1, 2, 3], [0, 0, 0, 0], [1.0, 4.0, 3.0, 2.0], [2], 4)
+        self.assertEqual(selected.tolist(), [False, True, True, False])
+
+    def test_zero_capacity_bull_is_never_used(self):
+        selected = self.assert_optimal([0, 0, 1, 1], [0, 1, 0, 1], [5.0, 9.0, 5.0, 9.0], [2, 0], 2)
+        self.assertEqual(selected.tolist(), [True, False, True, False])
+
+    def test_capacity_exceeds_cows(self):
+        selected = self.assert_optimal([0, 1, 2], [0, 0, 1], [1.0, 2.0, 3.0], [10, 10], 3)
+        self.assertTrue(selected.all())
+
+    def test_all_ties_assign_as_many_cows_as_possible(self):
+        n_cows, n_bulls = 7, 3
+        cow_index, bull_index = np.nonzero(np.ones((n_cows, n_bulls), dtype=bool))
+        selected = self.assert_optimal(cow_index, bull_index, np.full(len(cow_index), 3.0), [2, 1, 2], n_cows)
+        self.assertEqual(selected.sum(), 5)
+
+    def test_cow_without_pairs_is_left_unassigned(self):
+        selected = self.assert_optimal([0, 2], [0, 0], [1.0, 2.0], [2], 3)
+        self.assertTrue(selected.all())
+
+    def test_empty_input(self):
+        selected = solve_capacitated_assignment(
+            np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0), np.array([3]), 0
+        )
+        self.assertEqual(len(selected), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+"""认证 API 与数据 API 数据库访问回归测试（以 SQLite 文件库代替 MySQL）。"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+from sqlalchemy import event, text
+
+from api.db_pool import DatabasePool
+
+TEST_JWT_MATERIAL = "test-jwt-signing-value"
+TEST_DB_MATERIAL = "test-db-value"
+# 模拟数据库往返延迟（秒）
+QUERY_LATENCY = 0.1
+
+
+def create_stand_in(path: Path) -> str:
+    """建立与线上表结构对应的 SQLite 库，返回连接串。"""
+    url = f"sqlite:///{path}"
+    pool = DatabasePool(url, pool_size=1, max_overflow=0)
+    with pool.engine.begin() as conn:
+        conn.execute(text("CREATE TABLE `id-pw` (ID TEXT PRIMARY KEY, PW TEXT, name TEXT)"))
+        conn.execute(text(
+            "CREATE TABLE invitation_codes (id INTEGER PRIMARY KEY, code TEXT, status INTEGER, "
+            "max_uses INTEGER, current_uses INTEGER, expire_time TIMESTAMP)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE miss_bull (id INTEGER PRIMARY KEY AUTOINCREMENT, bull TEXT, "
+            "classification TEXT, farm TEXT)"
+        ))
+        conn.execute(text("CREATE TABLE db_version (id INTEGER PRIMARY KEY, version TEXT, update_time TEXT)"))
+        conn.execute(text("INSERT INTO `id-pw` VALUES ('10000001', 'pw', '测试')"))
+        conn.execute(text("INSERT INTO invitation_codes VALUES (1, 'INVITE', 1, 5, 0, NULL)"))
+        conn.execute(text("INSERT INTO db_version VALUES (1, '2026.10.01', '2026-10-01 08:00:00')"))
+    pool.dispose()
+    return url
+
+
+def add_latency(pool: DatabasePool, seconds: float):
+    """每条语句执行前阻塞等待，模拟同步驱动的网络往返。"""
+    @event.listens_for(pool.engine, "before_cursor_execute")
+    def _sleep(*_args):
+        time.sleep(seconds)
+
+
+class APIDatabaseTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.environment = patch.dict(
+            os.environ,
+            {"DB_PASSWORD": TEST_DB_MATERIAL, "JWT_SECRET": TEST_JWT_MATERIAL},
+            clear=False,
+        )
+        cls.environment.start()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.url = create_stand_in(Path(cls.tmpdir.name) / "stand_in.db")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.environment.stop()
+        cls.tmpdir.cleanup()
+
+    def _use_pool(self, module, pool_size=8):
+        pool = DatabasePool(self.url, pool_size=pool_size, max_overflow=0)
+        patcher = patch.object(module, "db", pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(pool.dispose)
+        return pool
+
+    @staticmethod
+    def _concurrent(app, requests):
+        """通过 ASGI 并发发送请求，返回（响应列表, 耗时秒数）。"""
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                started = time.perf_counter()
+                responses = await asyncio.gather(
+                    *(client.request(method, url, **kwargs) for method, url, kwargs in requests)
+                )
+                return responses, time.perf_counter() - started
+
+        return asyncio.run(run())
+
+
+class AuthAPIDatabaseTests(APIDatabaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from api import auth_api
+
+        cls.auth_api = auth_api
+
+    def test_engine_is_shared_between_requests(self):
+        self._use_pool(self.auth_api)
+        self.assertIs(self.auth_api.get_db_engine(), self.auth_api.get_db_engine())
+
+    def test_login_register_and_profile(self):
+        self._use_pool(self.auth_api)
+        app = self.auth_api.app
+        responses, _ = self._concurrent(app, [
+            ("POST", "/api/auth/login", {"json": {"username": "10000001", "password": "pw"}}),
+            ("POST", "/api/auth/login", {"json": {"username": "10000001", "password": "bad"}}),
+            ("POST", "/api/auth/register", {"json": {
+                "employee_id": "10000002", "password": "pw2", "invite_code": "INVITE", "name": "新用户",
+            }}),
+        ])
+        login, bad_login, register = [response.json() for response in responses]
+        self.assertTrue(login["success"])
+        self.assertFalse(bad_login["success"])
+        self.assertTrue(register["success"], register["message"])
+
+        headers = {"Authorization": f"Bearer {login['data']['token']}"}
+        (profile,), _ = self._concurrent(app, [("GET", "/api/auth/profile", {"headers": headers})])
+        self.assertEqual(profile.json()["data"]["name"], "测试")
+
+        with self.auth_api.db.engine.connect() as conn:
+            uses = conn.execute(text("SELECT current_uses FROM invitation_codes WHERE code='INVITE'")).scalar()
+        self.assertEqual(uses, 1)
+
+    def test_concurrent_logins_do_not_block_event_loop(self):
+        pool = self._use_pool(self.auth_api, pool_size=8)
+        add_latency(pool, QUERY_LATENCY)
+        login = ("POST", "/api/auth/login", {"json": {"username": "10000001", "password": "pw"}})
+
+        responses, elapsed = self._concurrent(self.auth_api.app, [login] * 8)
+
+        self.assertTrue(all(response.json()["success"] for response in responses))
+        # 串行执行需要 8 × QUERY_LATENCY
+        self.assertLess(elapsed, 4 * QUERY_LATENCY)
+
+
+class DataAPIDatabaseTests(APIDatabaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from api import data_api
+
+        cls.data_api = data_api
+
+    def setUp(self):
+        patcher = patch.object(self.data_api, "_miss_bull_table", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_missing_bulls_use_one_bulk_insert(self):
+        pool = self._use_pool(self.data_api)
+        statements = []
+
+        @event.listens_for(pool.engine, "before_cursor_execute")
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("INSERT"):
+                statements.append(statement)
+
+        bulls = [{"bull": f"551HO{i:05d}", "classification": "性控"} for i in range(50)]
+        bulls[3]["farm"] = "F1"
+        (response,), _ = self._concurrent(
+            self.data_api.app, [("POST", "/api/data/missing_bulls", {"json": {"bulls": bulls}})]
+        )
+
+        self.assertEqual(response.json()["data"]["uploaded_count"], 50)
+        self.assertEqual(len(statements), 1)
+        with pool.engine.connect() as conn:
+            rows = conn.execute(text("SELECT COUNT(*), COUNT(farm) FROM miss_bull")).fetchone()
+        self.assertEqual(tuple(rows), (50, 1))
+
+    def test_missing_bulls_reject_unknown_fields(self):
+        self._use_pool(self.data_api)
+        (response,), _ = self._concurrent(
+            self.data_api.app,
+            [("POST", "/api/data/missing_bulls", {"json": {"bulls": [{"bull": "1", "bad`col": "x"}]}})],
+        )
+
+        self.assertEqual(response.status_code, 500)
+
+    def test_version_reads_through_pool(self):
+        pool = self._use_pool(self.data_api, pool_size=4)
+        add_latency(pool, QUERY_LATENCY)
+
+        responses, elapsed = self._concurrent(
+            self.data_api.app, [("GET", "/api/data/version", {})] * 4
+        )
+
+        self.assertTrue(all(r.json()["data"]["version"] == "2026.10.01" for r in responses))
+        self.assertLess(elapsed, 3 * QUERY_LATENCY)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""bull_library 增量包生成 → 应用后与新版本数据库内容哈希一致的往返测试。"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from core.data.bull_library_downloader import (
+    apply_delta_package, build_delta_package, compute_content_hash, read_delta_package,
+)
+
+COLUMNS = ['BULL NAAB', 'BULL REG', 'TPI', 'NM$', 'BIRTH DATE']
+
+OLD_ROWS = [
+    ('001HO00001', 'HOUSA000000001', 2800, 650.5, '2019-01-01'),
+    ('007HO00001', 'HOUSA000000001', 2800, 650.5, '2019-01-01'),  # 同一BULL REG的多行
+    ('001HO00002', 'HOUSA000000002', 2700, None, '2018-05-05'),
+    ('001HO00003', 'HOUSA000000003', 2600, 500.0, '2017-03-03'),
+    ('001HO00009', None, 2500, 300.0, None),
+]
+
+NEW_ROWS = [
+    ('001HO00001', 'HOUSA000000001', 2810, 655.0, '2019-01-01'),  # 修改
+    ('007HO00001', 'HOUSA000000001', 2810, 655.0, '2019-01-01'),
+    ('001HO00002', 'HOUSA000000002', 2700, None, '2018-05-05'),   # 不变
+    ('001HO00004', 'HOUSA000000004', 2900, 700.25, '2021-02-02'),  # 新增
+    ('001HO00009', None, 2550, 310.0, None),                      # BULL REG为空的行被修改
+]
+# HOUSA000000003 被删除
+
+
+def create_db(path: Path, rows, columns=COLUMNS) -> Path:
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(f"CREATE TABLE bull_library ({column_list})")
+        order = [COLUMNS.index(column) for column in columns]
+        conn.executemany(f"INSERT INTO bull_library VALUES ({', '.join('?' for _ in columns)})",
+                         [tuple(row[i] for i in order) for row in rows])
+        conn.commit()
+    finally:
+        conn.close()
+    return path
+
+
+def content_hash(path: Path) -> str:
+    conn = sqlite3.connect(path)
+    try:
+        return compute_content_hash(conn)
+    finally:
+        conn.close()
+
+
+class DeltaPackageRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.dir = Path(self.tmpdir.name)
+        self.old_db = create_db(self.dir / 'old.db', OLD_ROWS)
+        self.new_db = create_db(self.dir / 'new.db', NEW_ROWS)
+
+    def write_package(self, package: dict) -> Path:
+        """与发布脚本相同的方式写出增量包"""
+        path = self.dir / 'delta.json.gz'
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(package, f, ensure_ascii=False, separators=(',', ':'))
+        return path
+
+    def apply(self, db_path: Path, package: dict) -> int:
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            changed = apply_delta_package(conn, package)
+            conn.execute("COMMIT")
+            return changed
+        finally:
+            conn.close()
+
+    def test_applied_delta_matches_new_database(self):
+        package = build_delta_package(self.old_db, self.new_db, '1', '2')
+        self.assertEqual(package['deleted'], ['HOUSA000000003'])
+        self.assertEqual(len(package['rows']), 4)
+        self.assertNotEqual(content_hash(self.old_db), content_hash(self.new_db))
+
+        package = read_delta_package(self.write_package(package))
+        self.assertEqual(self.apply(self.old_db, package), 4)
+        self.assertEqual(content_hash(self.old_db), content_hash(self.new_db))
+
+        # 重复应用同一增量包结果不变
+        self.apply(self.old_db, package)
+        self.assertEqual(content_hash(self.old_db), content_hash(self.new_db))
+
+    def test_content_hash_ignores_row_and_column_order(self):
+        reordered = create_db(self.dir / 'reordered.db', list(reversed(NEW_ROWS)))
+        self.assertEqual(content_hash(reordered), content_hash(self.new_db))
+
+        # 本地表列顺序不同时仍可应用增量包
+        local = create_db(self.dir / 'local.db', OLD_ROWS, columns=list(reversed(COLUMNS)))
+        self.apply(local, build_delta_package(self.old_db, self.new_db, '1', '2'))
+        conn = sqlite3.connect(local)
+        try:
+            column_list = ", ".join(f'"{column}"' for column in COLUMNS)
+            rows = sorted(conn.execute(f"SELECT {column_list} FROM bull_library"), key=repr)
+        finally:
+            conn.close()
+        self.assertEqual(rows, sorted(NEW_ROWS, key=repr))
+
+    def test_mismatched_columns_are_rejected(self):
+        package = build_delta_package(self.old_db, self.new_db, '1', '2')
+        package['columns'] = package['columns'][:-1]
+        conn = sqlite3.connect(self.old_db)
+        try:
+            with self.assertRaises(ValueError):
+                apply_delta_package(conn, package)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
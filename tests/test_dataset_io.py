@@ -0,0 +1,103 @@
+"""数据集副本与 pd.read_excel 结果一致性、多工作表读取及只保存副本模式的测试。"""
+
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from core.data.dataset_io import (
+    copy_dataset, dataset_exists, dataset_signature, export_excel, read_dataset,
+    write_dataset, write_dataset_sheets,
+)
+
+
+def sample_frame(offset: int = 0) -> pd.DataFrame:
+    return pd.DataFrame({
+        'cow_id': [f"{i + offset:06d}" for i in range(6)],
+        'birth_date': pd.to_datetime(['2020-01-03', None, '2021-05-06', '2019-12-31', '2022-02-02', '2020-07-07']),
+        'score': [1.5, np.nan, -2.25, 3.0, 0.1, 7.0],
+        'count': np.arange(6) + offset,
+        'flag': [True, False, True, True, False, False],
+    })
+
+
+class DatasetIoTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.dir = Path(self.tmpdir.name)
+
+    def test_single_sheet_matches_read_excel(self):
+        path = self.dir / 'data.xlsx'
+        write_dataset(sample_frame(), path)
+        self.assertTrue(path.exists())
+        assert_frame_equal(read_dataset(path), pd.read_excel(path))
+        assert_frame_equal(read_dataset(path, dtype={'cow_id': str}, usecols=['cow_id', 'score']),
+                           pd.read_excel(path, dtype={'cow_id': str}, usecols=['cow_id', 'score']))
+        all_sheets = read_dataset(path, sheet_name=None)
+        self.assertEqual(list(all_sheets), ['Sheet1'])
+        assert_frame_equal(all_sheets['Sheet1'], pd.read_excel(path))
+
+    def test_multi_sheet_matches_read_excel(self):
+        path = self.dir / 'yearly.xlsx'
+        write_dataset_sheets({'A': sample_frame(), 'B': sample_frame(10)}, path)
+        expected = pd.read_excel(path, sheet_name=None)
+        result = read_dataset(path, sheet_name=None)
+        self.assertEqual(list(result), list(expected))
+        for name in expected:
+            assert_frame_equal(result[name], expected[name])
+        assert_frame_equal(read_dataset(path, sheet_name='B'), expected['B'])
+        assert_frame_equal(read_dataset(path, sheet_name=1), expected['B'])
+
+    def test_modified_xlsx_invalidates_copy(self):
+        path = self.dir / 'data.xlsx'
+        write_dataset(sample_frame(), path)
+        sample_frame(100).to_excel(path, index=False)
+        assert_frame_equal(read_dataset(path), pd.read_excel(path))
+
+    def test_copy_only_and_export(self):
+        path = self.dir / 'yearly.xlsx'
+        path.write_bytes(b'stale')
+        sheets = {'A': sample_frame(), 'B': sample_frame(10)}
+        write_dataset_sheets(sheets, path, excel=False)
+        # 旧的xlsx被删除，只保留副本
+        self.assertFalse(path.exists())
+        self.assertTrue(dataset_exists(path))
+        self.assertIsNotNone(dataset_signature(path))
+        copy_only = read_dataset(path, sheet_name=None)
+
+        self.assertTrue(export_excel(path))
+        self.assertTrue(path.exists())
+        expected = pd.read_excel(path, sheet_name=None)
+        self.assertEqual(list(copy_only), list(expected))
+        for name in expected:
+            assert_frame_equal(copy_only[name], expected[name])
+
+    def test_copy_only_copy_dataset(self):
+        src, dst = self.dir / 'src.xlsx', self.dir / 'dst.xlsx'
+        write_dataset(sample_frame(), src, excel=False)
+        copy_dataset(src, dst)
+        self.assertFalse(dst.exists())
+        assert_frame_equal(read_dataset(dst), read_dataset(src))
+
+    def test_unsupported_data_falls_back_to_xlsx(self):
+        path = self.dir / 'formula.xlsx'
+        write_dataset(pd.DataFrame({'a': ['=1+1', 'x']}), path, excel=False)
+        self.assertTrue(path.exists())
+
+    def test_missing_dataset(self):
+        path = self.dir / 'missing.xlsx'
+        self.assertFalse(dataset_exists(path))
+        self.assertIsNone(dataset_signature(path))
+        self.assertFalse(export_excel(path))
+        with self.assertRaises(FileNotFoundError):
+            read_dataset(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
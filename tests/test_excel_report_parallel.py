@@ -0,0 +1,181 @@
+"""并行构建Sheet（进程池 + 工作表合并）与顺序构建结果逐单元格一致的测试。"""
+
+from __future__ import annotations
+
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from core.analysis_pool import shutdown_analysis_pool
+from core.excel_report.generator import ExcelReportGenerator
+from core.excel_report.sheet_builders import Sheet3Builder
+
+
+def traits_data() -> dict:
+    """Sheet 5-8 数据：分布表、原生图表、matplotlib 正态分布图和明细表"""
+    rng = np.random.default_rng(7)
+    n = 120
+    detail = pd.DataFrame({
+        'cow_id': [f"C{i:04d}" for i in range(n)],
+        'sex': '母',
+        'lac': rng.integers(0, 4, n),
+        'age': rng.uniform(0.2, 6.0, n).round(2),
+        'birth_date': pd.Timestamp('2018-01-01') + pd.to_timedelta(rng.integers(0, 2000, n), unit='D'),
+        '是否在场': np.where(rng.random(n) < 0.8, '是', '否'),
+        'TPI_score': rng.normal(2600, 200, n).round(1),
+        'NM$_score': rng.normal(400, 150, n).round(1),
+    })
+    detail['birth_year'] = detail['birth_date'].dt.year
+    distribution = pd.DataFrame({
+        '分布区间': ['<2400', '2400-2600', '2600-2800', '>=2800'],
+        '头数': [20, 40, 35, 25],
+        '占比': [0.167, 0.333, 0.292, 0.208],
+    })
+    return {
+        'tpi_distribution_present': distribution,
+        'tpi_distribution_all': distribution.assign(头数=distribution['头数'] + 5),
+        'nm_distribution_present': distribution,
+        'nm_distribution_all': distribution,
+        'detail_df': detail,
+    }
+
+
+def inbreeding_data() -> dict:
+    """Sheet 12 数据：带填充色的分布表、柱状图和饼图"""
+    distribution = {
+        'intervals': ['<3.125%', '3.125%-6.25%', '6.25%-12.5%', '>12.5%'],
+        'counts': [50, 30, 15, 5],
+        'ratios': [0.5, 0.3, 0.15, 0.05],
+        'risk_levels': ['低', '中', '高', '极高'],
+        'total': 100,
+    }
+    return {
+        'all_years_distribution': distribution,
+        'recent_12m_distribution': distribution,
+        'date_range': {'start': '2024-01-01', 'end': '2024-12-31'},
+        'yearly_trend': [
+            {'year': 2023, 'total_count': 60, 'high_risk_count': 5, 'high_risk_ratio': 5 / 60,
+             'extreme_risk_count': 0, 'extreme_risk_ratio': 0.0},
+            {'year': 2024, 'total_count': 40, 'high_risk_count': 0, 'high_risk_ratio': 0.0,
+             'extreme_risk_count': 2, 'extreme_risk_ratio': 0.05},
+        ],
+    }
+
+
+def candidate_genes_data() -> dict:
+    """Sheet 17 数据：合并单元格、行高和条形图"""
+    genes = [
+        {'gene_name': name, 'gene_translation': translation, 'mature_homozygous': m, 'mature_ratio': m / 60,
+         'heifer_homozygous': h, 'heifer_ratio': h / 40, 'total_homozygous': m + h, 'total_ratio': (m + h) / 100}
+        for name, translation, m, h in [('HH1', '单倍型1', 3, 1), ('HH3', '', 0, 2), ('BLAD', '白细胞黏附缺陷', 1, 0)]
+    ]
+
+    def risk(mature, heifer):
+        return {'mature_homozygous': mature, 'mature_ratio': mature / 60, 'heifer_homozygous': heifer,
+                'heifer_ratio': heifer / 40, 'total_homozygous': mature + heifer, 'total_ratio': (mature + heifer) / 100}
+
+    bulls = [
+        {'bull_id': bull_id, 'original_bull_id': f"{bull_id}-ORIG", 'mature_cow_count': 60, 'heifer_count': 40,
+         'total_cow_count': 100, 'gene_coverage': {'mature_evaluable': 55, 'heifer_evaluable': 38,
+                                                   'total_evaluable': 93, 'missing': 7},
+         'gene_summary': genes, 'total_risk': total_risk}
+        for bull_id, total_risk in [('001HO00001', risk(4, 3)), ('001HO00002', risk(0, 0))]
+    ]
+    return {'bulls': bulls}
+
+
+def report_tasks() -> list:
+    def task(label, name, builder, data, parts=None):
+        return {'label': label, 'name': name, 'hint': '', 'start': 0, 'end': 0, 'builder': builder,
+                'data': data, 'builder_kwargs': {}, 'parts': parts}
+
+    return [
+        task("5-8", "育种性状分析", 'Sheet3Builder', traits_data(), parts=Sheet3Builder.PARTS),
+        task("12", "配种记录-近交系数分析", 'Sheet6Builder', inbreeding_data()),
+        task("17", "备选公牛-隐性基因分析", 'Sheet12Builder', candidate_genes_data()),
+        task("20", "选配推荐结果", None, None),
+    ]
+
+
+def style_key(cell) -> tuple:
+    return (cell.number_format, repr(cell.font), repr(cell.fill), repr(cell.border),
+            repr(cell.alignment), repr(cell.protection))
+
+
+class ParallelSheetBuildTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.dir = Path(cls.tmpdir.name)
+        cls.paths = {}
+        for mode in ('sequential', 'parallel'):
+            generator = ExcelReportGenerator(cls.dir, parallel_sheets=True)
+            tasks = report_tasks()
+            if mode == 'sequential':
+                generator._build_sheets_sequential(tasks)
+            else:
+                generator._build_sheets_parallel(tasks)
+            path = cls.dir / f"{mode}.xlsx"
+            generator.wb.save(path)
+            cls.paths[mode] = path
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_analysis_pool()
+        cls.tmpdir.cleanup()
+
+    def test_sheets_values_and_styles_match(self):
+        sequential = load_workbook(self.paths['sequential'])
+        parallel = load_workbook(self.paths['parallel'])
+        self.assertEqual(sequential.sheetnames, parallel.sheetnames)
+        self.assertIn('TPI分布分析', sequential.sheetnames)
+        for name in sequential.sheetnames:
+            ws_seq, ws_par = sequential[name], parallel[name]
+            with self.subTest(sheet=name):
+                self.assertEqual(ws_seq.dimensions, ws_par.dimensions)
+                for row_seq, row_par in zip(ws_seq.iter_rows(), ws_par.iter_rows()):
+                    for cell_seq, cell_par in zip(row_seq, row_par):
+                        self.assertEqual(cell_seq.value, cell_par.value, cell_seq.coordinate)
+                        self.assertEqual(style_key(cell_seq), style_key(cell_par), cell_seq.coordinate)
+                self.assertEqual(sorted(map(str, ws_seq.merged_cells.ranges)),
+                                 sorted(map(str, ws_par.merged_cells.ranges)))
+                self.assertEqual({k: d.width for k, d in ws_seq.column_dimensions.items()},
+                                 {k: d.width for k, d in ws_par.column_dimensions.items()})
+                self.assertEqual({k: d.height for k, d in ws_seq.row_dimensions.items()},
+                                 {k: d.height for k, d in ws_par.row_dimensions.items()})
+                self.assertEqual(ws_seq.freeze_panes, ws_par.freeze_panes)
+
+    def test_charts_and_images_match(self):
+        sequential = load_workbook(self.paths['sequential'])
+        parallel = load_workbook(self.paths['parallel'])
+        total_charts = total_images = 0
+        for name in sequential.sheetnames:
+            ws_seq, ws_par = sequential[name], parallel[name]
+            with self.subTest(sheet=name):
+                self.assertEqual([(type(c).__name__, c.anchor._from.row, c.anchor._from.col) for c in ws_seq._charts],
+                                 [(type(c).__name__, c.anchor._from.row, c.anchor._from.col) for c in ws_par._charts])
+                self.assertEqual([(i.anchor._from.row, i.anchor._from.col, i._data()) for i in ws_seq._images],
+                                 [(i.anchor._from.row, i.anchor._from.col, i._data()) for i in ws_par._images])
+            total_charts += len(ws_seq._charts)
+            total_images += len(ws_seq._images)
+        self.assertGreater(total_charts, 0)
+        self.assertGreater(total_images, 0)
+
+    def test_saved_parts_are_identical(self):
+        # 样式按相同顺序登记，除文档属性（保存时间）外每个部件逐字节相同
+        with zipfile.ZipFile(self.paths['sequential']) as seq, zipfile.ZipFile(self.paths['parallel']) as par:
+            self.assertEqual(seq.namelist(), par.namelist())
+            for member in seq.namelist():
+                if member == 'docProps/core.xml':
+                    continue
+                with self.subTest(member=member):
+                    self.assertEqual(seq.read(member), par.read(member))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""牛群增量同步（按耳号与内容摘要只重新标准化变化部分）的结果与完整标准化一致的测试。"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from core.data.dataset_io import read_dataset
+from core.data.herd_sync import HerdSnapshotStore
+from core.data.uploader import (
+    upload_and_standardize_breeding_data, upload_and_standardize_cow_data, wait_for_raw_archives,
+)
+
+SIRES = ['001HO00001', '007HO00002', '011HO00003', '029HO00004']
+
+
+def raw_herd(n: int = 40, seed: int = 3) -> pd.DataFrame:
+    """伊起牛格式的原始牛群：前10头为后面母牛的母亲或外祖母"""
+    rng = np.random.default_rng(seed)
+    ids = [f"22{i:04d}" for i in range(n)]
+    dams = [None if i < 10 else ids[rng.integers(0, i // 2)] for i in range(n)]
+    birth = pd.Timestamp('2016-01-01') + pd.to_timedelta(np.arange(n) * 45, unit='D')
+    lac = rng.integers(0, 4, n)
+    return pd.DataFrame({
+        '耳号': ids,
+        '品种': '荷斯坦',
+        '性别': '母',
+        '父亲号': [SIRES[i % len(SIRES)] for i in range(n)],
+        '母亲号': dams,
+        '外祖父': [SIRES[(i + 1) % len(SIRES)] for i in range(n)],
+        '出生日期': birth.strftime('%Y-%m-%d'),
+        '胎次': lac,
+        '最近产犊日期': [None if l == 0 else '2024-03-01' for l in lac],
+        '日龄': rng.integers(300, 3000, n),
+        '月龄': rng.integers(10, 100, n).astype(float),
+        '泌乳天数': [np.nan if l == 0 else float(rng.integers(5, 400)) for l in lac],
+        '繁育状态': rng.choice(['未配', '已配', '初检孕', '复检孕'], n),
+        '是否在场': np.where(rng.random(n) < 0.85, '是', '否'),
+    })
+
+
+def raw_breeding(herd: pd.DataFrame, n: int = 60, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        '耳号': rng.choice(herd['耳号'].to_numpy(), n),
+        '配种日期': (pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 300, n), unit='D'))
+        .strftime('%Y-%m-%d %H:%M:%S'),
+        '冻精编号': rng.choice(SIRES, n),
+        '冻精类型': rng.choice(['普通冻精', '性控冻精'], n),
+    })
+
+
+def next_day(herd: pd.DataFrame, breeding: pd.DataFrame):
+    """第二天的数据：计数列全部变化，少数母牛新增、离开或修改，配种记录增加"""
+    herd = herd.copy()
+    herd['日龄'] += 1
+    herd.loc[herd['泌乳天数'].notna(), '泌乳天数'] += 1
+    herd.loc[herd.index[::3], '月龄'] += 1
+    # 母亲的出生日期变化：影响女儿的 birth_date_dam 和外孙女的 birth_date_mgd
+    herd.loc[2, '出生日期'] = '2015-06-06'
+    herd.loc[15, '父亲号'] = SIRES[0]
+    herd.loc[20, '繁育状态'] = '初检孕'
+    # 离开的母牛是其他母牛的母亲
+    herd = herd.drop(index=[5, 30])
+    added = raw_herd(3, seed=11).assign(耳号=['239001', '239002', '239003'], 母亲号=[None, '220003', '239001'])
+    herd = pd.concat([herd, added], ignore_index=True)
+
+    new_records = raw_breeding(herd, 8, seed=13)
+    breeding = pd.concat([breeding, new_records, breeding.iloc[[0]]], ignore_index=True)
+    return herd, breeding
+
+
+class HerdSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.dir = Path(self.tmpdir.name)
+
+    def sync(self, root: Path, herd: pd.DataFrame, breeding: pd.DataFrame):
+        """与自动报告相同的流程：比较快照 → 标准化母牛 → 标准化配种记录 → 保存快照"""
+        project = root / 'project'
+        project.mkdir(parents=True, exist_ok=True)
+        store = HerdSnapshotStore(root, ['F001'])
+        delta = store.diff(herd, breeding)
+        with contextlib.redirect_stdout(io.StringIO()):
+            upload_and_standardize_cow_data(
+                [project / 'raw_data' / 'cow_data.xlsx'], project, raw_df=herd, remap_breeding=False,
+                herd_delta=delta,
+            )
+            upload_and_standardize_breeding_data(
+                [project / 'raw_data' / 'breeding_records.xlsx'], project, raw_df=breeding, herd_delta=delta,
+            )
+        store.save(delta, herd, breeding)
+        wait_for_raw_archives()
+        return delta
+
+    def outputs(self, root: Path) -> dict:
+        standardized = root / 'project' / 'standardized_data'
+        result = {}
+        for name in ('processed_cow_data.xlsx', 'processed_breeding_data.xlsx'):
+            result[name] = (read_dataset(standardized / name), pd.read_excel(standardized / name))
+        return result
+
+    def test_incremental_matches_full(self):
+        herd = raw_herd()
+        breeding = raw_breeding(herd)
+        herd2, breeding2 = next_day(herd, breeding)
+
+        incremental, full = self.dir / 'incremental', self.dir / 'full'
+        first = self.sync(incremental, herd, breeding)
+        self.assertFalse(first.incremental)
+        delta = self.sync(incremental, herd2, breeding2)
+        self.assertTrue(delta.incremental)
+        self.assertEqual(delta.added, {'239001', '239002', '239003'})
+        self.assertEqual(delta.changed, {'220002', '220015', '220020'})
+        self.assertEqual(delta.removed, {'220005', '220030'})
+        self.assertEqual(delta.new_breeding, 9)
+
+        self.assertFalse(self.sync(full, herd2, breeding2).incremental)
+        expected = self.outputs(full)
+        for name, (dataset, workbook) in self.outputs(incremental).items():
+            with self.subTest(file=name):
+                assert_frame_equal(dataset, expected[name][0])
+                assert_frame_equal(workbook, expected[name][1])
+
+    def test_unchanged_herd_reuses_everything(self):
+        herd = raw_herd()
+        breeding = raw_breeding(herd)
+        self.sync(self.dir, herd, breeding)
+        before = self.outputs(self.dir)
+        delta = self.sync(self.dir, herd, breeding)
+        self.assertTrue(delta.incremental)
+        self.assertEqual((delta.added, delta.changed, delta.removed, delta.new_breeding), (set(), set(), set(), 0))
+        for name, (dataset, _) in self.outputs(self.dir).items():
+            with self.subTest(file=name):
+                assert_frame_equal(dataset, before[name][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
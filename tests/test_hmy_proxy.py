@@ -2,18 +2,24 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 import os
 import unittest
 from datetime import date
 from unittest.mock import patch
 
+import httpx
 import requests
 from fastapi.testclient import TestClient
 
+from api import hmy_proxy
 from api.hmy_api_client import HMYApiClient
 from api.hmy_proxy import (
+    AsyncHMYProxyClient,
     HMYProxyClient,
     HMYProxyConfigError,
+    HMYProxyUpstreamError,
     is_hmy_user_allowed,
 )
 
@@ -24,9 +30,10 @@ TEST_CLIENT_CREDENTIAL = "test-jwt-value"
 
 
 class FakeResponse:
-    def __init__(self, payload, status_code=200):
+    def __init__(self, payload, status_code=200, lines=None):
         self._payload = payload
         self.status_code = status_code
+        self._lines = lines or []
 
     def raise_for_status(self):
         if self.status_code >= 400:
@@ -35,6 +42,12 @@ class FakeResponse:
     def json(self):
         return self._payload
 
+    def iter_lines(self):
+        return iter(self._lines)
+
+    def close(self):
+        pass
+
 
 class FakeSession:
     def __init__(self, responses):
@@ -49,6 +62,54 @@ class FakeSession:
         return self.responses.pop(0)
 
 
+class FakeUpstream:
+    """本地模拟的慧牧云牛群分页接口（httpx.MockTransport 处理函数）。"""
+
+    def __init__(self, rows, count=None, fail_pages=()):
+        self.rows = rows
+        self.count = len(rows) if count is None else count
+        self.fail_pages = set(fail_pages)
+        self.secret = HMYProxyClient(
+            aes_key=TEST_CIPHER_MATERIAL,
+            base_url="https://hmy.example.test",
+            session=FakeSession([]),
+        )._make_secret()
+        self.pages = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request):
+        if request.headers.get("secret") != self.secret:
+            return httpx.Response(401)
+        page_size = int(request.url.params["pageSize"])
+        page_num = int(request.url.params["pageNum"])
+        self.pages.append(page_num)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        if page_num in self.fail_pages:
+            return httpx.Response(500)
+        start = (page_num - 1) * page_size
+        return httpx.Response(
+            200,
+            json={
+                "code": 200,
+                "count": self.count,
+                "data": self.rows[start:start + page_size],
+            },
+        )
+
+    def client(self):
+        return AsyncHMYProxyClient(
+            aes_key=TEST_CIPHER_MATERIAL,
+            base_url="https://hmy.example.test",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self)),
+        )
+
+
 class HMYProxyClientTests(unittest.TestCase):
     def test_proxy_encrypts_header_and_validates_response(self):
         material = TEST_CIPHER_MATERIAL
@@ -99,11 +160,50 @@ class HMYProxyClientTests(unittest.TestCase):
         self.assertFalse(is_hmy_user_allowed("not-allowed"))
 
 
+class AsyncHMYProxyClientTests(unittest.TestCase):
+    @staticmethod
+    def _collect(client, page_size):
+        async def run():
+            try:
+                return [
+                    page
+                    async for page in client.iter_cow_pages(
+                        "farm-1", page_size=page_size, concurrency=3
+                    )
+                ]
+            finally:
+                await client.aclose()
+
+        return asyncio.run(run())
+
+    def test_prefetches_pages_concurrently_in_order(self):
+        upstream = FakeUpstream([{"id": i} for i in range(10)])
+
+        with patch.object(hmy_proxy, "Cipher", wraps=hmy_proxy.Cipher) as cipher:
+            pages = self._collect(upstream.client(), page_size=2)
+
+        rows = [row["id"] for page in pages for row in page["data"]]
+        self.assertEqual(rows, list(range(10)))
+        self.assertEqual(sorted(upstream.pages), [1, 2, 3, 4, 5])
+        self.assertGreater(upstream.max_in_flight, 1)
+        self.assertLessEqual(upstream.max_in_flight, 3)
+        # 当天请求头只生成一次
+        self.assertEqual(cipher.call_count, 1)
+
+    def test_incomplete_pages_raise_upstream_error(self):
+        upstream = FakeUpstream([{"id": i} for i in range(3)], count=5)
+
+        with self.assertRaises(HMYProxyUpstreamError):
+            self._collect(upstream.client(), page_size=2)
+
+
 class HMYDesktopClientTests(unittest.TestCase):
     def test_desktop_uses_jwt_proxy_and_merges_pages(self):
         material = TEST_CLIENT_CREDENTIAL
         session = FakeSession(
             [
+                # 旧版服务端没有整场流式接口
+                FakeResponse({"detail": "Not Found"}, 404),
                 FakeResponse(
                     {"code": 200, "count": 3, "data": [{"id": 1}, {"id": 2}]}
                 ),
@@ -124,16 +224,54 @@ class HMYDesktopClientTests(unittest.TestCase):
             session.headers["Authorization"],
             f"Bearer {material}",
         )
+        self.assertTrue(session.calls[0][0].endswith("/api/auth/hmy/cows/all"))
         self.assertTrue(
             all(
                 call[0].endswith("/api/auth/hmy/cows")
-                for call in session.calls
+                for call in session.calls[1:]
             )
         )
         self.assertTrue(
             all("secret" not in call[1].get("headers", {}) for call in session.calls)
         )
 
+    def test_desktop_reads_streamed_pages(self):
+        lines = [
+            json.dumps({"type": "meta", "count": 3}).encode("utf-8"),
+            json.dumps({"type": "rows", "data": [{"id": 1}, {"id": 2}]}).encode("utf-8"),
+            b"",
+            json.dumps({"type": "rows", "data": [{"id": 3}]}).encode("utf-8"),
+        ]
+        session = FakeSession([FakeResponse(None, lines=lines)])
+        client = HMYApiClient(
+            auth_token=TEST_CLIENT_CREDENTIAL,
+            proxy_base_url="https://api.example.test",
+            session=session,
+        )
+
+        payload = client.get_farm_herd("farm-1")
+
+        self.assertEqual(payload["count"], 3)
+        self.assertEqual([row["id"] for row in payload["data"]], [1, 2, 3])
+        self.assertEqual(len(session.calls), 1)
+        self.assertTrue(session.calls[0][1]["stream"])
+
+    def test_desktop_reports_interrupted_stream(self):
+        lines = [
+            json.dumps({"type": "meta", "count": 3}).encode("utf-8"),
+            json.dumps({"type": "rows", "data": [{"id": 1}]}).encode("utf-8"),
+            json.dumps({"type": "error", "detail": "upstream"}).encode("utf-8"),
+        ]
+        session = FakeSession([FakeResponse(None, lines=lines)])
+        client = HMYApiClient(
+            auth_token=TEST_CLIENT_CREDENTIAL,
+            proxy_base_url="https://api.example.test",
+            session=session,
+        )
+
+        with self.assertRaisesRegex(RuntimeError, "暂时不可用"):
+            client.get_farm_herd("farm-1")
+
     def test_desktop_maps_forbidden_without_exposing_response(self):
         session = FakeSession([FakeResponse({"detail": "forbidden"}, 403)])
         client = HMYApiClient(
@@ -182,13 +320,16 @@ class HMYAuthRouteTests(unittest.TestCase):
 
         self.assertEqual(response.status_code, 403)
 
+    def _patch_upstream(self, upstream):
+        return patch.object(
+            self.auth_api,
+            "get_async_proxy_client",
+            side_effect=upstream.client,
+        )
+
     def test_route_returns_page_for_whitelisted_user(self):
         expected = {"code": 200, "count": 1, "data": [{"id": 1}]}
-        with patch.object(
-            self.auth_api.HMYProxyClient,
-            "get_cow_page",
-            return_value=expected,
-        ):
+        with self._patch_upstream(FakeUpstream([{"id": 1}])):
             response = self.client.get(
                 "/api/auth/hmy/cows",
                 params={"farmCode": "farm-1", "pageSize": 1, "pageNum": 1},
@@ -198,6 +339,58 @@ class HMYAuthRouteTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), expected)
 
+    def test_route_uses_shared_upstream_client(self):
+        async def shared_clients():
+            first = hmy_proxy.get_async_proxy_client()
+            second = hmy_proxy.get_async_proxy_client()
+            await hmy_proxy.close_async_proxy_client()
+            return first, second
+
+        first, second = asyncio.run(shared_clients())
+        self.assertIs(first, second)
+
+    def test_route_streams_all_pages_as_ndjson(self):
+        upstream = FakeUpstream([{"id": i} for i in range(5)])
+        with self._patch_upstream(upstream):
+            response = self.client.get(
+                "/api/auth/hmy/cows/all",
+                params={"farmCode": "farm-1", "pageSize": 2},
+                headers=self._headers("10075345"),
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            response.headers["content-type"].startswith("application/x-ndjson")
+        )
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(lines[0], {"type": "meta", "count": 5})
+        self.assertEqual(
+            [row["id"] for line in lines[1:] for row in line["data"]],
+            list(range(5)),
+        )
+
+    def test_route_stream_maps_upstream_failure(self):
+        with self._patch_upstream(FakeUpstream([{"id": 1}], fail_pages={1})):
+            response = self.client.get(
+                "/api/auth/hmy/cows/all",
+                params={"farmCode": "farm-1"},
+                headers=self._headers("10075345"),
+            )
+
+        self.assertEqual(response.status_code, 502)
+
+    def test_route_stream_reports_interrupted_upstream(self):
+        upstream = FakeUpstream([{"id": i} for i in range(5)], fail_pages={3})
+        with self._patch_upstream(upstream):
+            response = self.client.get(
+                "/api/auth/hmy/cows/all",
+                params={"farmCode": "farm-1", "pageSize": 2},
+                headers=self._headers("10075345"),
+            )
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(lines[-1]["type"], "error")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,136 @@
+"""表格法近交系数（Meuwissen–Luo）与 Colleau 间接法后代近交系数的已知系谱测试。"""
+
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from core.data import update_manager
+from core.inbreeding import tabular_inbreeding_calculator
+from core.inbreeding.path_inbreeding_calculator import PathInbreedingCalculator
+from core.inbreeding.pedigree_database import PedigreeDatabase
+from core.inbreeding.tabular_inbreeding_calculator import TabularInbreedingCalculator
+
+# A、B、C、D 为奠基者；E、F 为全同胞（A×B），G 为 E、F 的半同胞（A×C）；
+# H = E×F（全同胞交配），I = E×G（半同胞交配），J = H×I（系谱中存在多条经 A、E 的环路），
+# K 只有父亲已知，L = J×D（与无亲缘个体交配）。子代写在前面，检验重编号的拓扑排序。
+PEDIGREE = {
+    'L': ('J', 'D'),
+    'J': ('H', 'I'),
+    'K': ('I', ''),
+    'I': ('E', 'G'),
+    'H': ('E', 'F'),
+    'G': ('A', 'C'),
+    'F': ('A', 'B'),
+    'E': ('A', 'B'),
+    'A': ('', ''),
+    'B': ('', ''),
+    'C': ('', ''),
+    'D': ('', ''),
+}
+
+# 手工按 a(i,j) = 0.5·(a(j,s_i) + a(j,d_i))、a(i,i) = 1 + 0.5·a(s_i,d_i) 逐行计算的分子亲缘矩阵
+ANIMALS = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J']
+A_MATRIX = np.array([
+    # A     B      C      D    E       F       G       H      I       J
+    [1.0,  0.0,   0.0,   0.0, 0.5,    0.5,    0.5,    0.5,   0.5,    0.5],     # A
+    [0.0,  1.0,   0.0,   0.0, 0.5,    0.5,    0.0,    0.5,   0.25,   0.375],   # B
+    [0.0,  0.0,   1.0,   0.0, 0.0,    0.0,    0.5,    0.0,   0.25,   0.125],   # C
+    [0.0,  0.0,   0.0,   1.0, 0.0,    0.0,    0.0,    0.0,   0.0,    0.0],     # D
+    [0.5,  0.5,   0.0,   0.0, 1.0,    0.5,    0.25,   0.75,  0.625,  0.6875],  # E
+    [0.5,  0.5,   0.0,   0.0, 0.5,    1.0,    0.25,   0.75,  0.375,  0.5625],  # F
+    [0.5,  0.0,   0.5,   0.0, 0.25,   0.25,   1.0,    0.25,  0.625,  0.4375],  # G
+    [0.5,  0.5,   0.0,   0.0, 0.75,   0.75,   0.25,   1.25,  0.5,    0.875],   # H
+    [0.5,  0.25,  0.25,  0.0, 0.625,  0.375,  0.625,  0.5,   1.125,  0.8125],  # I
+    [0.5,  0.375, 0.125, 0.0, 0.6875, 0.5625, 0.4375, 0.875, 0.8125, 1.25],    # J
+])
+
+
+class TabularInbreedingTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        db = PedigreeDatabase(Path(self.tmpdir.name) / 'bull_library.db')
+        db.pedigree = {
+            animal: {'sire': sire, 'dam': dam, 'type': 'cow', 'gib': None}
+            for animal, (sire, dam) in PEDIGREE.items()
+        }
+        self.calculator = TabularInbreedingCalculator(db)
+
+    def test_matrix_is_symmetric(self):
+        np.testing.assert_array_equal(A_MATRIX, A_MATRIX.T)
+
+    def test_inbreeding_matches_a_matrix_diagonal(self):
+        expected = np.diag(A_MATRIX) - 1.0
+        np.testing.assert_allclose(self.calculator.get_inbreeding_batch(ANIMALS), expected)
+        # 全同胞交配 1/4，半同胞交配 1/8
+        self.assertAlmostEqual(self.calculator.get_inbreeding('H'), 0.25)
+        self.assertAlmostEqual(self.calculator.get_inbreeding('I'), 0.125)
+
+    def test_compute_all_matches_a_matrix(self):
+        F = self.calculator.compute_all()
+        for animal, expected in zip(ANIMALS, np.diag(A_MATRIX) - 1.0):
+            self.assertAlmostEqual(F[self.calculator.get_index(animal)], expected)
+        # 单亲已知、与无亲缘个体交配的个体不近交
+        self.assertEqual(F[self.calculator.get_index('K')], 0.0)
+        self.assertEqual(F[self.calculator.get_index('L')], 0.0)
+
+    def test_offspring_inbreeding_matches_half_relationship(self):
+        bulls = ['H', 'E', 'G', 'J', 'D', 'UNKNOWN']
+        cows = ANIMALS + ['UNKNOWN']
+        matrix = self.calculator.calculate_offspring_inbreeding_matrix(bulls, cows, chunk_size=2)
+
+        self.assertEqual(matrix.shape, (len(bulls), len(cows)))
+        expected = 0.5 * A_MATRIX[[ANIMALS.index(b) for b in bulls[:-1]]]
+        np.testing.assert_allclose(matrix[:-1, :-1], expected)
+        # 不在系谱中的个体为0
+        self.assertFalse(matrix[-1].any())
+        self.assertFalse(matrix[:, -1].any())
+
+    def test_offspring_inbreeding_matches_tabular_for_existing_matings(self):
+        # H、I、J 的近交系数就是其父母作为配对的后代近交系数
+        for animal in ('H', 'I', 'J'):
+            sire, dam = PEDIGREE[animal]
+            matrix = self.calculator.calculate_offspring_inbreeding_matrix([sire], [dam])
+            self.assertAlmostEqual(matrix[0, 0], self.calculator.get_inbreeding(animal))
+
+
+class PathInbreedingTest(unittest.TestCase):
+    """通径法中共同祖先的 F_A 取自表格法（按完整系谱计算）"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        db = PedigreeDatabase(Path(self.tmpdir.name) / 'bull_library.db')
+        # M = H×D、N = H×C，P = M×N：唯一有效的共同祖先 H 自身近交（F_H = 1/4）
+        pedigree = dict(PEDIGREE, M=('H', 'D'), N=('H', 'C'), P=('M', 'N'))
+        db.pedigree = {
+            animal: {'sire': sire, 'dam': dam, 'type': 'cow', 'gib': None}
+            for animal, (sire, dam) in pedigree.items()
+        }
+        for patcher in (mock.patch.object(update_manager, 'pedigree_db_instance', db),
+                        mock.patch.object(tabular_inbreeding_calculator, '_tabular_calculator_instance', None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.calculator = PathInbreedingCalculator()
+
+    def test_inbred_common_ancestor(self):
+        # (1/2)^3 × (1 + F_H) = 0.15625；此前 F_H 由6代通径法的个体近交系数给出（0.5），结果为 0.1875
+        F, contributions, paths = self.calculator.calculate_potential_offspring_inbreeding('M', 'N')
+        self.assertAlmostEqual(F, 0.15625)
+        self.assertEqual(set(contributions), {'H'})
+        self.assertEqual(paths['H'][0][4], 0.25)
+        self.assertAlmostEqual(F, self.calculator.tabular_calculator.get_inbreeding('P'))
+
+        # 个体近交系数的通径明细同样记录完整系谱的 F_H
+        _, contributions, paths = self.calculator.calculate_inbreeding_coefficient('P')
+        self.assertEqual(set(contributions), {'H'})
+        self.assertEqual([path[4] for path in paths['H']], [0.25])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""近交系数持久化缓存（SQLite）的读写、淘汰，以及表格法计算器按系谱版本命中/失效的测试。"""
+
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from core.inbreeding.inbreeding_cache import InbreedingCache, open_inbreeding_cache
+from core.inbreeding.pedigree_database import PedigreeDatabase
+from core.inbreeding.tabular_inbreeding_calculator import TabularInbreedingCalculator
+
+# A、B 为公牛系谱节点；E、F 全同胞，H = E×F，I = E×G，J = H×I
+PEDIGREE = {
+    'A': ('', '', 'bull'),
+    'B': ('', '', 'bull'),
+    'C': ('', '', 'cow'),
+    'E': ('A', 'B', 'cow'),
+    'F': ('A', 'B', 'cow'),
+    'G': ('A', 'C', 'cow'),
+    'H': ('E', 'F', 'cow'),
+    'I': ('E', 'G', 'cow'),
+    'J': ('H', 'I', 'cow'),
+    'K': ('I', '', 'cow'),
+}
+
+
+class RecordingCache(InbreedingCache):
+    """记录每次读取命中的个体"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.hits = []
+
+    def get_inbreeding_many(self, version, animal_ids):
+        result = super().get_inbreeding_many(version, animal_ids)
+        self.hits.extend(key.split('#')[0] for key in result)
+        return result
+
+
+class InbreedingCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = Path(self.tmpdir.name) / 'cache' / 'inbreeding.db'
+
+    def test_animal_round_trip_and_version(self):
+        cache = InbreedingCache(self.path)
+        cache.set_inbreeding_many('v1', {'A': 0.125, 'B': 0.0})
+        self.assertEqual(cache.get_inbreeding_many('v1', ['A', 'B', 'X']), {'A': 0.125, 'B': 0.0})
+        self.assertEqual(cache.get_inbreeding_many('v2', ['A', 'B']), {})
+        # 其他进程/实例打开同一文件
+        self.assertEqual(InbreedingCache(self.path).get_inbreeding_many('v1', ['A']), {'A': 0.125})
+
+    def test_pair_round_trip(self):
+        cache = InbreedingCache(self.path)
+        cache.set_offspring_inbreeding_many('v1', [('S1', 'D1', 0.25), ('S1', 'D2', 0.0), ('S2', 'D1', 0.5)])
+        self.assertEqual(cache.get_offspring_inbreeding('v1', 'S1'), {'D1': 0.25, 'D2': 0.0})
+        self.assertEqual(cache.get_offspring_inbreeding('v1', 'S1', ['D2', 'D9']), {'D2': 0.0})
+        self.assertEqual(cache.get_offspring_inbreeding('v2', 'S1'), {})
+
+    def test_eviction_keeps_recently_used(self):
+        cache = InbreedingCache(self.path, max_animal_entries=10)
+        cache.set_inbreeding_many('v1', {f"old{i}": 0.0 for i in range(10)})
+        cache.set_inbreeding_many('v1', {'new': 0.5})
+        self.assertEqual(cache.get_inbreeding_many('v1', ['new']), {'new': 0.5})
+        remaining = cache.get_inbreeding_many('v1', [f"old{i}" for i in range(10)])
+        self.assertEqual(len(remaining) + 1, int(10 * InbreedingCache.EVICT_TO_RATIO))
+
+    def test_unwritable_path_disables_cache(self):
+        blocker = Path(self.tmpdir.name) / 'file'
+        blocker.write_text('')
+        with self.assertLogs(level='WARNING'):
+            self.assertIsNone(open_inbreeding_cache(blocker / 'inbreeding.db'))
+
+
+class TabularPersistentCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.cache = RecordingCache(Path(self.tmpdir.name) / 'inbreeding.db')
+        self.db = self.new_database(PEDIGREE)
+
+    def new_database(self, pedigree) -> PedigreeDatabase:
+        db = PedigreeDatabase(Path(self.tmpdir.name) / 'bull_library.db')
+        db.pedigree = {
+            animal: {'sire': sire, 'dam': dam, 'type': kind, 'gib': None}
+            for animal, (sire, dam, kind) in pedigree.items()
+        }
+        return db
+
+    def compute(self, db) -> dict:
+        """用持久化缓存计算全部个体，返回 {ID: F}，并与不用缓存的结果比较"""
+        self.cache.hits = []
+        calculator = TabularInbreedingCalculator(db, persistent_cache=self.cache)
+        F = calculator.compute_all()
+        result = {animal: F[calculator.get_index(animal)] for animal in db.pedigree}
+        uncached = TabularInbreedingCalculator(db).compute_all()
+        np.testing.assert_allclose(F, uncached)
+        return result
+
+    def test_second_calculator_hits(self):
+        first = self.compute(self.db)
+        self.assertEqual(self.cache.hits, [])
+        self.assertAlmostEqual(first['H'], 0.25)
+        self.assertAlmostEqual(first['J'], 0.25)
+
+        second = self.compute(self.db)
+        self.assertEqual(sorted(self.cache.hits), sorted(PEDIGREE))
+        self.assertEqual(second, first)
+
+    def test_changed_cow_invalidates_itself_and_descendants(self):
+        self.compute(self.db)
+        # I 的母亲由 G 改为 F（全同胞交配）：I 及其后代 J、K 不再命中
+        changed = dict(PEDIGREE, I=('E', 'F', 'cow'))
+        db = self.new_database(changed)
+        db._reset_version(self.db._base_token)
+        result = self.compute(db)
+        self.assertEqual(sorted(self.cache.hits), sorted(set(PEDIGREE) - {'I', 'J', 'K'}))
+        self.assertAlmostEqual(result['I'], 0.25)
+
+    def test_bull_version_change_invalidates_all(self):
+        self.compute(self.db)
+        self.db._reset_version()
+        self.compute(self.db)
+        self.assertEqual(self.cache.hits, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
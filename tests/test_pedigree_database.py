@@ -0,0 +1,103 @@
+"""系谱库构建、列式缓存加载与按 bull_library 行差异增量更新的回归测试。"""
+
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from core.inbreeding.pedigree_database import PedigreeDatabase
+
+N_BULLS = 300
+
+
+def bull_row(i: int) -> tuple:
+    """(BULL REG, SIRE REG, MGS REG, MMGS REG, GIB, BULL NAAB)"""
+    sire = f"HOUSA{i - 7:09d}" if i >= 7 else None
+    mgs = f"HOUSA{i - 13:09d}" if i >= 13 else None
+    return (f"HOUSA{i:09d}", sire, mgs, None, f"{i % 9}.5" if i % 4 else None, f"{i % 900:03d}HO{i:05d}")
+
+
+class PedigreeIncrementalUpdateTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.db_path = Path(self.tmpdir.name) / 'bull_library.db'
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "CREATE TABLE bull_library (`BULL REG` TEXT, `SIRE REG` TEXT, `MGS REG` TEXT, "
+                "`MMGS REG` TEXT, `GIB` TEXT, `BULL NAAB` TEXT)"
+            )
+        self.insert_bulls(range(N_BULLS))
+
+    def insert_bulls(self, indices):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany("INSERT INTO bull_library VALUES (?, ?, ?, ?, ?, ?)", [bull_row(i) for i in indices])
+
+    def new_database(self) -> PedigreeDatabase:
+        return PedigreeDatabase(self.db_path)
+
+    def update(self, db: PedigreeDatabase) -> str:
+        """增量更新，返回完成日志"""
+        with self.assertLogs(level='INFO') as logs:
+            self.assertTrue(db.update_bull_pedigree_incremental())
+        messages = [m for m in logs.output if '系谱库增量更新完成' in m]
+        self.assertEqual(len(messages), 1, logs.output)
+        return messages[0]
+
+    def test_build_then_add_one_bull(self):
+        db = self.new_database()
+        db.build_pedigree()
+        self.assertEqual(len(db.pedigree), 3 * N_BULLS)
+
+        self.insert_bulls([N_BULLS])
+        message = self.update(db)
+        self.assertIn('新增/修改1头公牛，删除0头', message)
+        self.assertIn(f"HOUSA{N_BULLS:09d}", db.pedigree)
+        self.assertEqual(len(db._delta['row_hashes']), 1)
+
+    def test_load_then_update_twice(self):
+        self.new_database().build_pedigree()
+
+        db = self.new_database()
+        self.assertEqual(len(db.load_pedigree()), 3 * N_BULLS)
+        self.insert_bulls([N_BULLS])
+        self.assertIn('新增/修改1头公牛，删除0头', self.update(db))
+
+        # 重新加载（带delta.pkl）后再次更新：已在增量中的公牛不应再被视为变更
+        db = self.new_database()
+        db.load_pedigree()
+        self.assertIn(f"HOUSA{N_BULLS:09d}", db.pedigree)
+        self.insert_bulls([N_BULLS + 1])
+        self.assertIn('新增/修改1头公牛，删除0头', self.update(db))
+        self.assertIn('新增/修改0头公牛，删除0头', self.update(db))
+
+    def test_merged_cows_do_not_count_towards_rebuild_threshold(self):
+        db = self.new_database()
+        db.build_pedigree()
+        # 阈值只按公牛系谱规模计算（300头×3节点×5% = 45）：合并了大量母牛后，
+        # 20头新公牛（60个节点）仍应改为全量重建
+        for i in range(100000):
+            db.pedigree[f"COW{i}"] = {'sire': '', 'dam': '', 'type': 'cow', 'gib': None}
+        self.insert_bulls(range(N_BULLS, N_BULLS + 20))
+        with self.assertLogs(level='INFO') as logs:
+            self.assertFalse(db.update_bull_pedigree_incremental())
+        self.assertTrue(any('改为全量重建' in m for m in logs.output))
+
+    def test_stored_row_hashes_keep_64_bits(self):
+        db = self.new_database()
+        db.build_pedigree()
+        value = 0xDEADBEEFCAFEBABE
+        db._row_hash_overlay = {'HOUSA000000001': value}
+        hashes = db._stored_row_hashes(['HOUSA000000001', 'HOUSA000000002', 'MISSING'])
+        self.assertEqual(hashes.dtype, np.uint64)
+        self.assertEqual(int(hashes[0]), value)
+        self.assertNotEqual(int(hashes[1]), 0)
+        self.assertEqual(int(hashes[2]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
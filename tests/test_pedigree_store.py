@@ -0,0 +1,118 @@
+"""列式系谱存储的保存/加载往返及其字典视图与原系谱字典一致的测试。"""
+
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from core.inbreeding.pedigree_store import (
+    NaabRegMap, PedigreeStore, PedigreeView, VirtualNodeSet, integer_pedigree,
+)
+
+PEDIGREE = {
+    'HOUSA000000001': {'sire': '', 'dam': '', 'type': 'bull', 'gib': 1.5},
+    'HOUSA000000002': {'sire': 'HOUSA000000001', 'dam': 'V_HOUSA000000002', 'type': 'bull', 'gib': 0.1234567},
+    'V_HOUSA000000002': {'sire': 'HOUSA000000009', 'dam': '', 'type': 'virtual_cow', 'gib': None},
+    '母牛001': {'sire': 'HOUSA000000002', 'dam': '母牛000', 'type': 'cow', 'gib': None},
+    '母牛000': {'sire': 'HOUSA000000001', 'dam': '', 'type': 'cow', 'gib': -2.0},
+    'X1': {'sire': '', 'dam': '', 'type': None, 'gib': None},
+}
+VIRTUAL_NODES = {'V_HOUSA000000002'}
+NAAB_TO_REG = {'001HO00001': 'HOUSA000000001', '011HO00002': 'HOUSA000000002'}
+ROW_HASHES = {'HOUSA000000001': 0xDEADBEEFCAFEBABE, 'HOUSA000000002': 1}
+
+
+def expected_record(info: dict) -> dict:
+    """存储读出的记录：类型未标注的为unknown，GIB按float32精度"""
+    gib = info['gib']
+    return {
+        'sire': info['sire'], 'dam': info['dam'], 'type': info['type'] or 'unknown',
+        'gib': None if gib is None else round(float(np.float32(gib)), 7),
+    }
+
+
+class PedigreeStoreRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.directory = Path(self.tmpdir.name) / 'pedigree_store'
+        self.store = PedigreeStore.from_pedigree(PEDIGREE, VIRTUAL_NODES, NAAB_TO_REG, ROW_HASHES)
+        self.meta = self.store.save(self.directory)
+
+    def test_save_and_load(self):
+        self.assertTrue(PedigreeStore.exists(self.directory))
+        self.assertEqual(self.meta['count'], len(PEDIGREE))
+        for mmap in (True, False):
+            with self.subTest(mmap=mmap):
+                loaded = PedigreeStore.load(self.directory, mmap=mmap)
+                self.assertEqual(loaded.meta['token'], self.meta['token'])
+                for name in PedigreeStore.FILES:
+                    attr = 'types' if name == 'type' else name
+                    np.testing.assert_array_equal(getattr(loaded, attr), getattr(self.store, attr))
+                np.testing.assert_array_equal(loaded.row_hash, self.store.row_hash)
+                self.assertEqual(loaded.row_hash.dtype, np.uint64)
+                self.assertEqual(int(loaded.row_hash[loaded.row_of('HOUSA000000001')]), 0xDEADBEEFCAFEBABE)
+
+    def test_views_match_dicts(self):
+        store = PedigreeStore.load(self.directory)
+        view = PedigreeView(store)
+        self.assertEqual(len(view), len(PEDIGREE))
+        self.assertEqual(set(view), set(PEDIGREE))
+        for key, info in PEDIGREE.items():
+            self.assertEqual(view[key], expected_record(info), key)
+        # 只作为父母被引用、本身不在系谱中的ID
+        self.assertNotIn('HOUSA000000009', view)
+        self.assertGreaterEqual(store.row_of('HOUSA000000009'), 0)
+        self.assertEqual(set(VirtualNodeSet(store)), VIRTUAL_NODES)
+        self.assertEqual(dict(NaabRegMap(store)), NAAB_TO_REG)
+
+    def test_view_overlay_does_not_touch_store(self):
+        view = PedigreeView(PedigreeStore.load(self.directory))
+        view['新母牛'] = {'sire': 'HOUSA000000001', 'dam': '', 'type': 'cow', 'gib': None}
+        view['母牛000'] = {'sire': '', 'dam': '', 'type': 'cow', 'gib': None}
+        del view['X1']
+        self.assertEqual(len(view), len(PEDIGREE))
+        self.assertNotIn('X1', view)
+        self.assertEqual(view['母牛000']['sire'], '')
+
+        reopened = PedigreeView(PedigreeStore.load(self.directory))
+        self.assertIn('X1', reopened)
+        self.assertNotIn('新母牛', reopened)
+        self.assertEqual(reopened['母牛000']['sire'], 'HOUSA000000001')
+
+        # 向量化的整数化结果与逐条转换一致
+        plain = {key: view[key] for key in view}
+        for pedigree in (view, plain):
+            ints = integer_pedigree(pedigree)
+            parents = {ints.ids[i]: (ints.ids[ints.sire[i]], ints.ids[ints.dam[i]]) for i in range(1, len(ints.ids))}
+            with self.subTest(source=type(pedigree).__name__):
+                self.assertEqual(parents, {
+                    key: (info['sire'] if info['sire'] in plain else '', info['dam'] if info['dam'] in plain else '')
+                    for key, info in plain.items()
+                })
+                self.assertEqual(set(ints.unresolved), {'HOUSA000000009'})
+
+    def test_save_replaces_previous_store(self):
+        store = PedigreeStore.from_pedigree({'A': {'sire': '', 'dam': '', 'type': 'cow', 'gib': None}})
+        meta = store.save(self.directory)
+        self.assertNotEqual(meta['token'], self.meta['token'])
+        loaded = PedigreeStore.load(self.directory)
+        self.assertEqual(list(PedigreeView(loaded)), ['A'])
+        self.assertIsNone(loaded.row_hash)
+        self.assertEqual(sorted(p.name for p in self.directory.parent.iterdir()), ['pedigree_store'])
+
+    def test_version_mismatch_is_rejected(self):
+        meta_path = self.directory / 'meta.json'
+        meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        meta['version'] = -1
+        meta_path.write_text(json.dumps(meta), encoding='utf-8')
+        with self.assertRaises(ValueError):
+            PedigreeStore.load(self.directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""报告数据模型与 openpyxl 重新加载报告（data_only=True/False）结果一致的往返测试。"""
+
+from __future__ import annotations
+
+import datetime
+import tempfile
+import unittest
+from copy import copy
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.chart import LineChart, Reference
+from openpyxl.drawing.image import Image
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from PIL import Image as PILImage
+
+from core.excel_report.formatters import ChartBuilder, StyleManager
+from core.excel_report.report_model import ReportModel, model_path_for
+from core.excel_report.sheet_builders import Sheet12Builder
+
+
+def png_bytes() -> bytes:
+    buffer = BytesIO()
+    PILImage.new('RGB', (40, 20), (200, 30, 30)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def build_report() -> Workbook:
+    wb = Workbook()
+    wb.remove(wb.active)
+
+    # 构建器生成的工作表：合并单元格、填充色、行高、条形图
+    genes = [{'gene_name': name, 'gene_translation': '', 'mature_homozygous': i, 'mature_ratio': i / 60,
+              'heifer_homozygous': 1, 'heifer_ratio': 0.025, 'total_homozygous': i + 1, 'total_ratio': (i + 1) / 100}
+             for i, name in enumerate(['HH1', 'HH2', 'HH3', 'HH4', 'HH5', 'BLAD'])]
+    Sheet12Builder(wb, StyleManager(), ChartBuilder()).build({'bulls': [{
+        'bull_id': '001HO00001', 'original_bull_id': 'USA001', 'mature_cow_count': 60, 'heifer_count': 40,
+        'total_cow_count': 100, 'gene_coverage': {}, 'gene_summary': genes,
+        'total_risk': {key: value for key, value in genes[-1].items() if key not in ('gene_name', 'gene_translation')},
+    }]})
+
+    # 各类单元格值、数字格式、公式、错误值、图表和内存中的图片（同 Sheet 8）
+    ws = wb.create_sheet("数据")
+    ws.append(['名称', '数量', '占比', '日期', '是否', '合计'])
+    ws.append(['A', 3, 0.125, datetime.datetime(2024, 3, 1, 8, 30), True, '=B2+B3'])
+    ws.append(['B', 2.5, 1 / 3, datetime.date(2023, 12, 31), False, '=SUM(B2:B3)'])
+    ws.append(['C', 10 ** 17, 1e-9, None, None, '#N/A'])
+    for row in ws.iter_rows(min_row=2, min_col=3, max_col=3):
+        row[0].number_format = '0.0%'
+    ws['A1'].font = Font(name='微软雅黑', bold=True, color='FFFFFF')
+    ws['A1'].fill = PatternFill(start_color='2E5C8A', end_color='2E5C8A', fill_type='solid')
+    ws['A1'].border = Border(bottom=Side(style='medium'))
+    ws['A1'].alignment = Alignment(horizontal='center', wrap_text=True)
+    ws.merge_cells('A6:C7')
+    ws['A6'] = '合并说明'
+    ws.column_dimensions['A'].width = 18
+    ws.row_dimensions[6].height = 30
+    chart = LineChart()
+    chart.add_data(Reference(ws, min_col=2, min_row=1, max_row=4), titles_from_data=True)
+    ws.add_chart(chart, 'H2')
+    ws.add_image(Image(BytesIO(png_bytes())), 'H20')
+
+    wb.create_sheet("空表")
+    return wb
+
+
+class ReportModelRoundTripTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.path = Path(cls.tmpdir.name) / '报告.xlsx'
+        # 与报告生成器相同：先提取模型，写入xlsx后再保存模型
+        wb = build_report()
+        model = ReportModel.from_workbook(wb)
+        wb.save(cls.path)
+        cls.model_path = model.save(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def assert_matches_workbook(self, model, data_only: bool):
+        wb = load_workbook(self.path, data_only=data_only)
+        self.assertEqual(model.sheetnames, wb.sheetnames)
+        for name in wb.sheetnames:
+            ws, sheet = wb[name], model[name]
+            with self.subTest(sheet=name, data_only=data_only):
+                self.assertEqual(list(sheet.values), list(ws.values))
+                for row in ws.iter_rows():
+                    for cell in row:
+                        model_cell = sheet.cell(row=cell.row, column=cell.column)
+                        self.assertEqual(model_cell.value, cell.value, cell.coordinate)
+                        self.assertEqual(type(model_cell.value), type(cell.value), cell.coordinate)
+                        if cell.value is not None:
+                            self.assertEqual(model_cell.data_type, cell.data_type, cell.coordinate)
+                        # openpyxl 返回样式代理对象，复制出样式对象再比较
+                        self.assertEqual(model_cell.font, copy(cell.font), cell.coordinate)
+                        self.assertEqual(model_cell.fill, copy(cell.fill), cell.coordinate)
+                        self.assertEqual(model_cell.border, copy(cell.border), cell.coordinate)
+                        self.assertEqual(model_cell.alignment, copy(cell.alignment), cell.coordinate)
+                        self.assertEqual(model_cell.number_format, cell.number_format, cell.coordinate)
+                self.assertEqual(sorted(map(str, sheet.merged_cells.ranges)),
+                                 sorted(map(str, ws.merged_cells.ranges)))
+                for key, dimension in ws.column_dimensions.items():
+                    self.assertEqual(sheet.column_dimensions[key].width, dimension.width, key)
+                for key, dimension in ws.row_dimensions.items():
+                    self.assertEqual(sheet.row_dimensions[key].height, dimension.height, key)
+                self.assertEqual([type(c).__name__ for c in sheet._charts], [type(c).__name__ for c in ws._charts])
+                self.assertEqual([len(c.series) for c in sheet._charts], [len(c.series) for c in ws._charts])
+                self.assertEqual([i._data() for i in sheet._images], [i._data() for i in ws._images])
+        return wb
+
+    def test_load_matches_data_only_workbook(self):
+        model = ReportModel.load(self.path)
+        self.assertIsNotNone(model)
+        self.assertTrue(model.data_only)
+        wb = self.assert_matches_workbook(model, data_only=True)
+        # openpyxl 写入的公式没有缓存结果
+        self.assertIsNone(wb['数据']['F2'].value)
+        self.assertIsNone(model['数据']['F2'].value)
+
+    def test_view_matches_full_workbook(self):
+        model = ReportModel.load(self.path).view(data_only=False)
+        self.assertFalse(model.data_only)
+        self.assert_matches_workbook(model, data_only=False)
+        self.assertEqual(model['数据']['F3'].value, '=SUM(B2:B3)')
+        self.assertEqual(model['数据']['F3'].data_type, 'f')
+
+    def test_charts_and_images_are_present(self):
+        model = ReportModel.load(self.path)
+        self.assertEqual(len(model['数据']._charts), 1)
+        self.assertEqual(model['数据']._images[0]._data(), png_bytes())
+        self.assertEqual(len(model['备选公牛-隐性基因分析']._charts), 1)
+        self.assertIn('A1:G1', map(str, model['备选公牛-隐性基因分析'].merged_cells.ranges))
+
+    def test_read_frame_matches_read_excel(self):
+        model = ReportModel.load(self.path)
+        for name in model.sheetnames:
+            with self.subTest(sheet=name):
+                pd.testing.assert_frame_equal(model.read_frame(name), pd.read_excel(self.path, sheet_name=name))
+
+    def test_modified_report_is_ignored(self):
+        self.assertEqual(self.model_path, model_path_for(self.path))
+        copy_path = self.path.with_name('副本.xlsx')
+        copy_path.write_bytes(self.path.read_bytes())
+        self.assertIsNone(ReportModel.load(copy_path))
+
+
+if __name__ == "__main__":
+    unittest.main()